@@ -14,6 +14,9 @@ import "./interfaces/IERC721TokenAuthor.sol";
 contract ThronNFT is ERC721, ERC721Enumerable, ERC721URIStorage, Ownable, IERC721TokenAuthor {
     uint256 public nextTokenId = 0;
     mapping (uint256 => address) private _tokenAuthor;
+    // author => list of authored token ids, token id => index in the author's list
+    mapping (address => uint256[]) private _authoredTokens;
+    mapping (uint256 => uint256) private _authoredTokensIndex;
 
     constructor() ERC721("ThroneNFT", "THNNFT") {}
 
@@ -49,18 +52,89 @@ contract ThronNFT is ERC721, ERC721Enumerable, ERC721URIStorage, Ownable, IERC72
     function _mint(address to, uint256 tokenId) internal override {
         super._mint(to, tokenId);  // take care about multiple inheritance
         _tokenAuthor[tokenId] = to;
+        _authoredTokensIndex[tokenId] = _authoredTokens[to].length;
+        _authoredTokens[to].push(tokenId);
     }
 
     function _burn(uint256 tokenId) internal override(ERC721, ERC721URIStorage) {
         super._burn(tokenId);  // take care about multiple inheritance
+        _removeAuthoredToken(_tokenAuthor[tokenId], tokenId);
         delete _tokenAuthor[tokenId];
     }
 
+    /**
+     * @dev Swap and pop, same as ERC721Enumerable does for owned tokens.
+     */
+    function _removeAuthoredToken(address author, uint256 tokenId) private {
+        uint256[] storage tokens = _authoredTokens[author];
+        uint256 lastTokenId = tokens[tokens.length - 1];
+        uint256 tokenIndex = _authoredTokensIndex[tokenId];
+        tokens[tokenIndex] = lastTokenId;
+        _authoredTokensIndex[lastTokenId] = tokenIndex;
+        tokens.pop();
+        delete _authoredTokensIndex[tokenId];
+    }
+
     function tokenAuthor(uint256 tokenId) external override view returns(address) {
         require(_exists(tokenId), "query for nonexistent token");
         return _tokenAuthor[tokenId];
     }
 
+    function authoredTokensCount(address author) external view returns(uint256) {
+        return _authoredTokens[author].length;
+    }
+
+    /**
+     * @dev Returns up to `limit` tokens of `owner` starting from `offset` in one call:
+     * ids, URIs and authors. Returns empty arrays if `offset` is beyond the owner's balance.
+     */
+    function tokensOfOwner(address owner, uint256 offset, uint256 limit) external view
+        returns (uint256[] memory tokenIds, string[] memory uris, address[] memory authors)
+    {
+        tokenIds = new uint256[](_pageSize(ERC721.balanceOf(owner), offset, limit));
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            tokenIds[i] = tokenOfOwnerByIndex(owner, offset + i);
+        }
+        uris = _tokenURIs(tokenIds);
+        authors = new address[](tokenIds.length);
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            authors[i] = _tokenAuthor[tokenIds[i]];
+        }
+    }
+
+    /**
+     * @dev Returns up to `limit` tokens minted by `author` starting from `offset` in one call:
+     * ids, URIs and current owners. Burned tokens are removed, so the order isn't stable across burns.
+     */
+    function tokensByAuthor(address author, uint256 offset, uint256 limit) external view
+        returns (uint256[] memory tokenIds, string[] memory uris, address[] memory owners)
+    {
+        uint256[] storage authored = _authoredTokens[author];
+        tokenIds = new uint256[](_pageSize(authored.length, offset, limit));
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            tokenIds[i] = authored[offset + i];
+        }
+        uris = _tokenURIs(tokenIds);
+        owners = new address[](tokenIds.length);
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            owners[i] = ERC721.ownerOf(tokenIds[i]);
+        }
+    }
+
+    function _pageSize(uint256 total, uint256 offset, uint256 limit) private pure returns (uint256) {
+        if (offset >= total) {
+            return 0;
+        }
+        return total - offset < limit ? total - offset : limit;
+    }
+
+    function _tokenURIs(uint256[] memory tokenIds) private view returns (string[] memory uris) {
+        uris = new string[](tokenIds.length);
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            uris[i] = tokenURI(tokenIds[i]);
+        }
+    }
+
     function _beforeTokenTransfer(address from, address to, uint256 tokenId) internal override(ERC721, ERC721Enumerable) {
         ERC721Enumerable._beforeTokenTransfer(from, to, tokenId);
     }
@@ -43,7 +43,9 @@ contract AdminPausableUpgradeSafe {
      * @dev Modifier to only allow functions to be called when not paused.
      */
     modifier whenNotPaused() {
-        require(!_paused, Errors.PAUSED);
+        if (_paused) {
+            revert Errors.ContractPaused();
+        }
         _;
     }
 
@@ -51,7 +53,9 @@ contract AdminPausableUpgradeSafe {
      * @dev Modifier to only allow the admin as the caller.
      */
     modifier onlyAdmin() {
-        require(msg.sender == _admin, Errors.NOT_ADMIN);
+        if (msg.sender != _admin) {
+            revert Errors.NotAdmin();
+        }
         _;
     }
 
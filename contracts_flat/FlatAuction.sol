@@ -600,20 +600,25 @@ library DataTypes {
 // Contains error code strings
 
 library Errors {
-  string public constant INVALID_AUCTION_PARAMS = 'INVALID_AUCTION_PARAMS';
-  string public constant INVALID_ETHER_AMOUNT = 'INVALID_ETHER_AMOUNT';
-  string public constant AUCTION_EXISTS = 'AUCTION_EXISTS';
-  string public constant AUCTION_NOT_FINISHED = 'AUCTION_NOT_FINISHED';
-  string public constant AUCTION_FINISHED = 'AUCTION_FINISHED';
-  string public constant SMALL_BID_AMOUNT = 'SMALL_BID_AMOUNT';
-  string public constant PAUSED = 'PAUSED';
-  string public constant NO_RIGHTS = 'NO_RIGHTS';
-  string public constant NOT_ADMIN = 'NOT_ADMIN';
-  string public constant EMPTY_WINNER = 'EMPTY_WINNER';
-  string public constant AUCTION_ALREADY_STARTED = 'AUCTION_ALREADY_STARTED';
-  string public constant AUCTION_NOT_EXISTS = 'AUCTION_NOT_EXISTS';
-  string public constant NFT_CONTRACT_IS_NOT_ALLOWED = 'NFT_CONTRACT_IS_NOT_ALLOWED';
-  string public constant ZERO_ADDRESS = 'ZERO_ADDRESS';
+  error InvalidAuctionParams();
+  error InvalidEtherAmount();
+  error AuctionExists();
+  error AuctionNotFinished();
+  error AuctionFinished();
+  error SmallBidAmount();
+  error ContractPaused();
+  error NoRights();
+  error NotAdmin();
+  error EmptyWinner();
+  error AuctionAlreadyStarted();
+  error AuctionNotExists();
+  error NftContractIsNotAllowed();
+  error ZeroAddress();
+  error InvalidBidParams();
+  error BuyNowNotAvailable();
+  error CantBidTokenAuctionByEther();
+  error CantBidEtherAuctionByTokens();
+  error InsufficientDeposit();
 }
 
 /**
@@ -656,7 +661,9 @@ contract AdminPausableUpgradeSafe {
      * @dev Modifier to only allow functions to be called when not paused.
      */
     modifier whenNotPaused() {
-        require(!_paused, Errors.PAUSED);
+        if (_paused) {
+            revert Errors.ContractPaused();
+        }
         _;
     }
 
@@ -664,7 +671,9 @@ contract AdminPausableUpgradeSafe {
      * @dev Modifier to only allow the admin as the caller.
      */
     modifier onlyAdmin() {
-        require(msg.sender == _admin, Errors.NOT_ADMIN);
+        if (msg.sender != _admin) {
+            revert Errors.NotAdmin();
+        }
         _;
     }
 
@@ -732,8 +741,16 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
     uint40 constant MIN_OVERTIME_WINDOW = 1;
     uint40 constant MAX_AUCTION_DURATION = 365 days;
     uint40 constant MIN_AUCTION_DURATION = 1;
+    // operation bytes of the short entry points in `fallback`
+    bytes1 constant SHORT_BID = 0x01;
+    bytes1 constant SHORT_BID_ETHER = 0x02;
+    bytes1 constant SHORT_CLAIM = 0x03;
     IERC20 public payableToken;
     IERC721 public allowedNFT;
+    // optional price to buy the NFT at once, 0 if not set, in the auction's bid token
+    mapping(address => mapping(uint256 => uint256)) public nftAuction2nftID2buyNowPrice;
+    // free deposit of a bidder per token (0 for ether), funds of current bids are locked in the auctions
+    mapping(address => mapping(address => uint256)) public deposits;
 
     /**
      * @notice Emitted when a new auction is created.
@@ -752,6 +769,19 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         address priceToken
     );
 
+    /**
+     * @notice Emitted when an auction is created with a buy-now price.
+     *
+     * @param nft The NFT address of the token to auction.
+     * @param nftId The NFT ID of the token to auction.
+     * @param buyNowPrice The price to buy the NFT at once, in the auction's price token.
+     */
+    event BuyNowPriceSet(
+        address indexed nft,
+        uint256 indexed nftId,
+        uint256 buyNowPrice
+    );
+
     /**
      * @notice Emitted when a royalty paid to an author.
      *
@@ -775,11 +805,13 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param nft The NFT address of the token to auction.
      * @param nftId The NFT ID of the token to auction.
      * @param canceler Who canceled the auction.
+     * @param auctioneer The creator, the NFT is returned to.
      */
     event AuctionCanceled(
         address indexed nft,
         uint256 indexed nftId,
-        address indexed canceler
+        address indexed canceler,
+        address auctioneer
     );
 
     /**
@@ -827,6 +859,8 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param amount The amount used to bid.
      * @param amountToken The token of amount bid or 0 for ether.
      * @param endTimestamp The new end timestamp.
+     * @param previousBidder The outbid bidder or 0 for the first bid (equals `bidder` when raising own bid).
+     * @param refund The amount returned to the outbid bidder (credited to its deposit by `bidFromDeposit`).
      */
     event BidSubmitted(
         address indexed nft,
@@ -834,7 +868,9 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         address indexed bidder,
         uint256 amount,
         address amountToken,
-        uint40 endTimestamp
+        uint40 endTimestamp,
+        address previousBidder,
+        uint256 refund
     );
 
     /**
@@ -844,12 +880,20 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param nftId The NFT ID of the token claimed.
      * @param winner The winner of the NFT.
      * @param claimCaller Who called the claim method.
+     * @param auctioneer The creator of the auction.
+     * @param price The final price.
+     * @param priceToken The token of price or 0 for ether.
+     * @param auctioneerPayout The amount paid to the auctioneer (price minus author royalty).
      */
     event WonNftClaimed(
         address indexed nft,
         uint256 indexed nftId,
         address indexed winner,
-        address claimCaller
+        address claimCaller,
+        address auctioneer,
+        uint256 price,
+        address priceToken,
+        uint256 auctioneerPayout
     );
 
     /**
@@ -860,13 +904,54 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param startPrice The new reserve price.
      * @param startPriceToken The token of start price or 0 for ether.
      * @param reservePriceChanger The caller of the method.
+     * @param auctioneer The creator of the auction.
      */
     event ReservePriceChanged(
         address indexed nft,
         uint256 indexed nftId,
         uint256 startPrice,
         address startPriceToken,
-        address indexed reservePriceChanger
+        address indexed reservePriceChanger,
+        address auctioneer
+    );
+
+    /**
+     * @notice Emitted when funds are added to a deposit.
+     *
+     * @param account The depositor.
+     * @param token The deposited token or 0 for ether.
+     * @param amount The deposited amount.
+     */
+    event Deposited(
+        address indexed account,
+        address indexed token,
+        uint256 amount
+    );
+
+    /**
+     * @notice Emitted when funds are withdrawn from a deposit.
+     *
+     * @param account The depositor.
+     * @param token The withdrawn token or 0 for ether.
+     * @param amount The withdrawn amount.
+     */
+    event Withdrawn(
+        address indexed account,
+        address indexed token,
+        uint256 amount
+    );
+
+    /**
+     * @notice Emitted when `bidFromDeposit` debits the bidder's deposit or credits the outbid bidder's deposit.
+     *
+     * @param account The depositor.
+     * @param token The payable token or 0 for ether.
+     * @param delta The change of the deposit, negative for the bidder and positive for the outbid bidder.
+     */
+    event DepositMoved(
+        address indexed account,
+        address indexed token,
+        int256 delta
     );
 
     function getPaused() external view returns(bool) {
@@ -893,18 +978,15 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         address _allowedNFT,
         address _adminAddress
     ) external initializer {
-        require(
-            _adminAddress != address(0),
-            Errors.ZERO_ADDRESS
-        );
-        require(
-            _payableToken != address(0),
-            Errors.ZERO_ADDRESS
-        );
-        require(
-            _allowedNFT != address(0),
-            Errors.ZERO_ADDRESS
-        );
+        if (_adminAddress == address(0)) {
+            revert Errors.ZeroAddress();
+        }
+        if (_payableToken == address(0)) {
+            revert Errors.ZeroAddress();
+        }
+        if (_allowedNFT == address(0)) {
+            revert Errors.ZeroAddress();
+        }
         _admin = _adminAddress;
         payableToken = IERC20(_payableToken);
         allowedNFT = IERC721(_allowedNFT);
@@ -920,8 +1002,9 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param newAuctionDuration The new minimum auction duration to set.
      */
     function setAuctionDuration(uint40 newAuctionDuration) public onlyAdmin {
-        require(newAuctionDuration >= MIN_AUCTION_DURATION && newAuctionDuration <= MAX_AUCTION_DURATION,
-            Errors.INVALID_AUCTION_PARAMS);
+        if (newAuctionDuration < MIN_AUCTION_DURATION || newAuctionDuration > MAX_AUCTION_DURATION) {
+            revert Errors.InvalidAuctionParams();
+        }
         auctionDuration = newAuctionDuration;
         emit AuctionDurationSet(newAuctionDuration);
     }
@@ -932,8 +1015,9 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param newOvertimeWindow The new overtime window to set.
      */
     function setOvertimeWindow(uint40 newOvertimeWindow) public onlyAdmin {
-        require(newOvertimeWindow >= MIN_OVERTIME_WINDOW && newOvertimeWindow <= MAX_OVERTIME_WINDOW,
-            Errors.INVALID_AUCTION_PARAMS);
+        if (newOvertimeWindow < MIN_OVERTIME_WINDOW || newOvertimeWindow > MAX_OVERTIME_WINDOW) {
+            revert Errors.InvalidAuctionParams();
+        }
         overtimeWindow = newOvertimeWindow;
         emit OvertimeWindowSet(newOvertimeWindow);
     }
@@ -944,9 +1028,10 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param newMinPriceStepNumerator The new overtime window to set.
      */
     function setMinPriceStepNumerator(uint256 newMinPriceStepNumerator) public onlyAdmin {
-        require(newMinPriceStepNumerator >= MIN_MIN_PRICE_STEP_NUMERATOR &&
-                newMinPriceStepNumerator <= MAX_MIN_PRICE_STEP_NUMERATOR,
-            Errors.INVALID_AUCTION_PARAMS);
+        if (newMinPriceStepNumerator < MIN_MIN_PRICE_STEP_NUMERATOR ||
+                newMinPriceStepNumerator > MAX_MIN_PRICE_STEP_NUMERATOR) {
+            revert Errors.InvalidAuctionParams();
+        }
         minPriceStepNumerator = newMinPriceStepNumerator;
         emit MinPriceStepNumeratorSet(newMinPriceStepNumerator);
     }
@@ -957,7 +1042,9 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param newAuthorRoyaltyNumerator The new overtime window to set.
      */
     function setAuthorRoyaltyNumerator(uint256 newAuthorRoyaltyNumerator) public onlyAdmin {
-        require(newAuthorRoyaltyNumerator <= AUTHOR_ROYALTY_DENOMINATOR, Errors.INVALID_AUCTION_PARAMS);
+        if (newAuthorRoyaltyNumerator > AUTHOR_ROYALTY_DENOMINATOR) {
+            revert Errors.InvalidAuctionParams();
+        }
         authorRoyaltyNumerator = newAuthorRoyaltyNumerator;
         emit AuthorRoyaltyNumeratorSet(newAuthorRoyaltyNumerator);
     }
@@ -976,9 +1063,48 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         uint256 startPrice,
         bool isEtherPrice
     ) external nonReentrant whenNotPaused {
-        require(nft == address(allowedNFT), Errors.NFT_CONTRACT_IS_NOT_ALLOWED);
-        require(nftAuction2nftID2auction[nft][nftId].auctioneer == address(0), Errors.AUCTION_EXISTS);
-        require(startPrice > 0, Errors.INVALID_AUCTION_PARAMS);
+        _createAuction(nft, nftId, startPrice, isEtherPrice);
+    }
+
+    /**
+     * @dev Create new auction which can also be settled at once by `buyNow`.
+     *
+     * @param nft Address of ERC721 NFT contract.
+     * @param nftId Id of NFT token for the auction (must be approved for transfer by Auction smart-contract).
+     * @param startPrice Minimum price for the first bid in ether or tokens depending on isEtherPrice value.
+     * @param isEtherPrice True to create auction in ether, false to create auction in payableToken.
+     * @param buyNowPrice The price to buy the NFT at once, must not be less than `startPrice`.
+     */
+    function createAuctionWithBuyNow(
+        address nft,
+        uint256 nftId,
+        uint256 startPrice,
+        bool isEtherPrice,
+        uint256 buyNowPrice
+    ) external nonReentrant whenNotPaused {
+        if (buyNowPrice < startPrice) {
+            revert Errors.InvalidAuctionParams();
+        }
+        _createAuction(nft, nftId, startPrice, isEtherPrice);
+        nftAuction2nftID2buyNowPrice[nft][nftId] = buyNowPrice;
+        emit BuyNowPriceSet(nft, nftId, buyNowPrice);
+    }
+
+    function _createAuction(
+        address nft,
+        uint256 nftId,
+        uint256 startPrice,
+        bool isEtherPrice
+    ) internal {
+        if (nft != address(allowedNFT)) {
+            revert Errors.NftContractIsNotAllowed();
+        }
+        if (nftAuction2nftID2auction[nft][nftId].auctioneer != address(0)) {
+            revert Errors.AuctionExists();
+        }
+        if (startPrice == 0) {
+            revert Errors.InvalidAuctionParams();
+        }
         address token = isEtherPrice ? address(0) : address(payableToken);
         DataTypes.AuctionData memory auctionData = DataTypes.AuctionData(
             startPrice,
@@ -1003,19 +1129,81 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      * @param nftId The NFT ID of the token to claim.
      */
     function claimWonNFT(address nft, uint256 nftId) external nonReentrant whenNotPaused {
-        DataTypes.AuctionData storage auction = nftAuction2nftID2auction[nft][nftId];
+        _claimWonNFT(nft, nftId);
+    }
 
-        address auctioneer = auction.auctioneer;
+    /**
+     * @dev Settles the auction won by the current bidder, see `claimWonNFT`.
+     */
+    function _claimWonNFT(address nft, uint256 nftId) internal {
+        DataTypes.AuctionData storage auction = nftAuction2nftID2auction[nft][nftId];
         address winner = auction.currentBidder;
-        uint256 endTimestamp = auction.endTimestamp;
-        uint256 payToAuctioneer = auction.currentBid;
+
+        if (block.timestamp <= auction.endTimestamp) {
+            revert Errors.AuctionNotFinished();
+        }
+        if (winner == address(0)) {  // auction does not exist or did not start, no bid
+            revert Errors.EmptyWinner();
+        }
+
+        _settle(nft, nftId, auction.auctioneer, winner, auction.currentBid, auction.bidToken);
+    }
+
+    /**
+     * @notice Buys the NFT at the buy-now price of the auction, the current bidder is refunded.
+     * Not available once the current bid reaches the buy-now price.
+     *
+     * @param nft The NFT address of the token to buy.
+     * @param nftId The NFT ID of the token to buy.
+     */
+    function buyNow(address nft, uint256 nftId) external payable nonReentrant whenNotPaused {
+        DataTypes.AuctionData storage auction = nftAuction2nftID2auction[nft][nftId];
+        uint256 price = nftAuction2nftID2buyNowPrice[nft][nftId];
+        address previousBidder = auction.currentBidder;
+        uint256 refund = previousBidder == address(0) ? 0 : auction.currentBid;
         address bidToken = auction.bidToken;
 
-        require(block.timestamp > endTimestamp, Errors.AUCTION_NOT_FINISHED);
-        require(winner != address(0), Errors.EMPTY_WINNER);  // auction does not exist or did not start, no bid
+        if (auction.auctioneer == address(0)) {
+            revert Errors.AuctionNotExists();
+        }
+        if (price == 0 || refund >= price) {
+            revert Errors.BuyNowNotAvailable();
+        }
+        if (block.timestamp >= auction.endTimestamp && auction.endTimestamp != 0) {
+            revert Errors.AuctionFinished();
+        }
 
+        emit BidSubmitted(nft, nftId, msg.sender, price, bidToken, uint40(block.timestamp), previousBidder, refund);
+        if (bidToken == address(0)) {
+            if (msg.value != price) {
+                revert Errors.InvalidEtherAmount();
+            }
+        } else {
+            if (msg.value != 0) {
+                revert Errors.InvalidEtherAmount();
+            }
+            payableToken.safeTransferFrom(msg.sender, address(this), price);
+        }
+        if (refund > 0) {
+            _transferOut(bidToken, previousBidder, refund);
+        }
+        _settle(nft, nftId, auction.auctioneer, msg.sender, price, bidToken);
+    }
+
+    /**
+     * @dev Deletes the auction, pays the author royalty and the auctioneer and delivers the NFT to the winner.
+     * Shared by `claimWonNFT` and `buyNow`, the price must already be held by the contract.
+     */
+    function _settle(
+        address nft,
+        uint256 nftId,
+        address auctioneer,
+        address winner,
+        uint256 price,
+        address bidToken
+    ) internal {
         delete nftAuction2nftID2auction[nft][nftId];
-        emit WonNftClaimed(nft, nftId, winner, msg.sender);
+        delete nftAuction2nftID2buyNowPrice[nft][nftId];
 
         // the only one NFT we allow always supports this
 //        if (IERC165(nft).supportsInterface(type(IERC721TokenAuthor).interfaceId)) {  // danger: external calls
@@ -1030,23 +1218,18 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
 
         // warning will not work for usual erc721
         address author = IERC721TokenAuthor(nft).tokenAuthor(nftId);
+        uint256 payToAuthor = 0;
 //        if (author != address(0) && author != auctioneer) {
         if (author != auctioneer) {
-            uint256 payToAuthor = payToAuctioneer * authorRoyaltyNumerator / AUTHOR_ROYALTY_DENOMINATOR;
-            payToAuctioneer -= payToAuthor;
-            emit RoyaltyPaid(nft, nftId, author, payToAuthor, bidToken);
-            if (bidToken == address(0)) {
-                payable(author).transfer(payToAuthor);
-            } else {
-                payableToken.safeTransfer(author, payToAuthor);
-            }
+            payToAuthor = price * authorRoyaltyNumerator / AUTHOR_ROYALTY_DENOMINATOR;
         }
+        emit WonNftClaimed(nft, nftId, winner, msg.sender, auctioneer, price, bidToken, price - payToAuthor);
 
-        if (bidToken == address(0)) {
-            payable(auctioneer).transfer(payToAuctioneer);
-        } else {
-            payableToken.safeTransfer(auctioneer, payToAuctioneer);
+        if (author != auctioneer) {
+            emit RoyaltyPaid(nft, nftId, author, payToAuthor, bidToken);
+            _transferOut(bidToken, author, payToAuthor);
         }
+        _transferOut(bidToken, auctioneer, price - payToAuthor);
         IERC721(nft).transferFrom(address(this), winner, nftId);  // maybe use safeTransfer (I don't want unclear onERC721Received stuff)
     }
 
@@ -1060,7 +1243,9 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      */
     function getAuctionData(address nft, uint256 nftId) external view returns (DataTypes.AuctionData memory) {
         DataTypes.AuctionData memory auction = nftAuction2nftID2auction[nft][nftId];
-        require(auction.auctioneer != address(0), Errors.AUCTION_NOT_EXISTS);
+        if (auction.auctioneer == address(0)) {
+            revert Errors.AuctionNotExists();
+        }
         return auction;
     }
 
@@ -1075,20 +1260,18 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         uint256 nftId
     ) external whenNotPaused nonReentrant {
         DataTypes.AuctionData memory auction = nftAuction2nftID2auction[nft][nftId];
-        require(
-            auction.auctioneer != address(0),
-            Errors.AUCTION_NOT_EXISTS
-        );
-        require(
-            msg.sender == auction.auctioneer || msg.sender == _admin,
-            Errors.NO_RIGHTS
-        );
-        require(
-            auction.currentBidder == address(0),
-            Errors.AUCTION_ALREADY_STARTED
-        );  // auction can't be canceled if someone placed a bid.
+        if (auction.auctioneer == address(0)) {
+            revert Errors.AuctionNotExists();
+        }
+        if (msg.sender != auction.auctioneer && msg.sender != _admin) {
+            revert Errors.NoRights();
+        }
+        if (auction.currentBidder != address(0)) {  // auction can't be canceled if someone placed a bid.
+            revert Errors.AuctionAlreadyStarted();
+        }
         delete nftAuction2nftID2auction[nft][nftId];
-        emit AuctionCanceled(nft, nftId, msg.sender);
+        delete nftAuction2nftID2buyNowPrice[nft][nftId];
+        emit AuctionCanceled(nft, nftId, msg.sender, auction.auctioneer);
         // maybe use safeTransfer (I don't want unclear onERC721Received stuff)
         IERC721(nft).transferFrom(address(this), auction.auctioneer, nftId);
     }
@@ -1098,7 +1281,8 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
      *
      * @param nft The NFT address of the token.
      * @param nftId The NFT ID of the token.
-     * @param startPrice New start price in tokens or ether depending on auction type.
+     * @param startPrice New start price in tokens or ether depending on auction type, must not be greater
+     * than the buy-now price if the auction has one.
      */
     function changeReservePrice(
         address nft,
@@ -1106,24 +1290,24 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         uint256 startPrice
     ) external whenNotPaused nonReentrant {
         DataTypes.AuctionData memory auction = nftAuction2nftID2auction[nft][nftId];
-        require(
-            auction.auctioneer != address(0),
-            Errors.AUCTION_NOT_EXISTS
-        );
-        require(
-            msg.sender == auction.auctioneer || msg.sender == _admin,
-            Errors.NO_RIGHTS
-        );
-        require(
-            auction.currentBidder == address(0),
-            Errors.AUCTION_ALREADY_STARTED
-        );  // auction can't be canceled if someone placed a bid.
-        require(
-            startPrice > 0,
-            Errors.INVALID_AUCTION_PARAMS
-        );
+        if (auction.auctioneer == address(0)) {
+            revert Errors.AuctionNotExists();
+        }
+        if (msg.sender != auction.auctioneer && msg.sender != _admin) {
+            revert Errors.NoRights();
+        }
+        if (auction.currentBidder != address(0)) {  // auction can't be canceled if someone placed a bid.
+            revert Errors.AuctionAlreadyStarted();
+        }
+        if (startPrice == 0) {
+            revert Errors.InvalidAuctionParams();
+        }
+        uint256 buyNowPrice = nftAuction2nftID2buyNowPrice[nft][nftId];
+        if (buyNowPrice != 0 && startPrice > buyNowPrice) {  // `buyNow` must not sell below the reserve price
+            revert Errors.InvalidAuctionParams();
+        }
         nftAuction2nftID2auction[nft][nftId].currentBid = startPrice;
-        emit ReservePriceChanged(nft, nftId, startPrice, auction.bidToken, msg.sender);
+        emit ReservePriceChanged(nft, nftId, startPrice, auction.bidToken, msg.sender, auction.auctioneer);
     }
 
     /**
@@ -1138,88 +1322,298 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
         uint256 nftId,
         uint256 amount
     ) external whenNotPaused nonReentrant {
-        DataTypes.AuctionData storage auction = nftAuction2nftID2auction[nft][nftId];
-        require(auction.auctioneer != address(0), Errors.AUCTION_NOT_EXISTS);
-        uint256 currentBid = auction.currentBid;
-        address currentBidder = auction.currentBidder;
-        uint40 endTimestamp = auction.endTimestamp;
+        _placeBid(nft, nftId, amount, false);
+    }
 
-        require(
-            auction.bidToken != address(0),
-            "CANT_BID_ETHER_AUCTION_BY_TOKENS" // TODO: move string to errors
-        );
-        require(
-            block.timestamp < endTimestamp || endTimestamp == 0,
-            Errors.AUCTION_FINISHED
-        );
+    
+    /**
+     * @notice Place the bid in ether.
+     *
+     * @param nft The NFT address of the token.
+     * @param nftId The NFT ID of the token.
+     * @param amount Bid amount in ether.
+     */
+    function bidEther(
+        address nft,
+        uint256 nftId,
+        uint256 amount
+    ) external payable whenNotPaused nonReentrant {
+        _placeBid(nft, nftId, amount, true);
+    }
 
-        uint40 newEndTimestamp = auction.endTimestamp;
-        if (endTimestamp == 0) { // first bid
-            require(amount >= currentBid, Errors.SMALL_BID_AMOUNT);  // >= startPrice stored in currentBid
-            newEndTimestamp = uint40(block.timestamp) + auctionDuration;
-            auction.endTimestamp = newEndTimestamp;
+    /**
+     * @notice Place the bid from the deposit in the auction's token, no tokens are transferred.
+     * The amount to add is debited from the bidder's deposit, the outbid bidder's deposit is credited.
+     * This includes a bidder who bid from the wallet: it gets the refund back by calling `withdraw`.
+     *
+     * @param nft The NFT address of the token.
+     * @param nftId The NFT ID of the token.
+     * @param amount Bid amount in ether or payable tokens depending on the auction.
+     */
+    function bidFromDeposit(
+        address nft,
+        uint256 nftId,
+        uint256 amount
+    ) external whenNotPaused nonReentrant {
+        address bidToken = nftAuction2nftID2auction[nft][nftId].bidToken;
+        (address currentBidder, uint256 refund, uint256 more) = _bid(nft, nftId, amount, bidToken == address(0));
+        uint256 balance = deposits[msg.sender][bidToken];
+        if (balance < more) {
+            revert Errors.InsufficientDeposit();
+        }
+        deposits[msg.sender][bidToken] = balance - more;
+        if (more > 0) {
+            emit DepositMoved(msg.sender, bidToken, -int256(more));
+        }
+        if (refund > 0) {
+            deposits[currentBidder][bidToken] += refund;
+            emit DepositMoved(currentBidder, bidToken, int256(refund));
+        }
+    }
+
+    /**
+     * @notice Adds payable tokens to the deposit for `bidFromDeposit`.
+     *
+     * @param amount The amount to transfer from the caller (must be approved).
+     */
+    function deposit(uint256 amount) external whenNotPaused nonReentrant {
+        payableToken.safeTransferFrom(msg.sender, address(this), amount);
+        deposits[msg.sender][address(payableToken)] += amount;
+        emit Deposited(msg.sender, address(payableToken), amount);
+    }
+
+    /**
+     * @notice Adds `msg.value` to the ether deposit for `bidFromDeposit`.
+     */
+    function depositEther() external payable whenNotPaused nonReentrant {
+        deposits[msg.sender][address(0)] += msg.value;
+        emit Deposited(msg.sender, address(0), msg.value);
+    }
+
+    /**
+     * @notice Withdraws from the free deposit, funds of the caller's current bids stay locked.
+     * Not paused with the contract, it moves only the caller's own free balance.
+     *
+     * @param token The payable token or 0 for ether.
+     * @param amount The amount to withdraw.
+     */
+    function withdraw(address token, uint256 amount) external nonReentrant {
+        uint256 balance = deposits[msg.sender][token];
+        if (balance < amount) {
+            revert Errors.InsufficientDeposit();
+        }
+        deposits[msg.sender][token] = balance - amount;
+        emit Withdrawn(msg.sender, token, amount);
+        _transferOut(token, msg.sender, amount);
+    }
+
+    /**
+     * @notice Place the bid in tokens on an `allowedNFT` token with packed arguments.
+     *
+     * @param packed `nftId` (uint96) in the highest 12 bytes followed by `amount` (uint128), see `_unpackBid`.
+     */
+    function bidPacked(bytes32 packed) external whenNotPaused nonReentrant {
+        (uint256 nftId, uint256 amount) = _unpackBid(packed);
+        _placeBid(address(allowedNFT), nftId, amount, false);
+    }
+
+    /**
+     * @notice Place the bid in ether on an `allowedNFT` token with packed arguments.
+     *
+     * @param packed `nftId` (uint96) in the highest 12 bytes followed by `amount` (uint128), see `_unpackBid`.
+     */
+    function bidEtherPacked(bytes32 packed) external payable whenNotPaused nonReentrant {
+        (uint256 nftId, uint256 amount) = _unpackBid(packed);
+        _placeBid(address(allowedNFT), nftId, amount, true);
+    }
+
+    /**
+     * @notice Short entry points on `allowedNFT` tokens without a function selector, the calldata is
+     * one operation byte followed by the packed arguments:
+     * `SHORT_BID` or `SHORT_BID_ETHER` + nftId (uint96) + amount (uint128), 29 bytes,
+     * `SHORT_CLAIM` + nftId (uint96), 13 bytes.
+     * No function selector of the contract starts with an operation byte.
+     */
+    fallback() external payable whenNotPaused nonReentrant {
+        bytes1 operation = msg.data.length > 0 ? msg.data[0] : bytes1(0);
+        bool isEther = operation == SHORT_BID_ETHER;
+        bytes32 packed;
+        assembly {
+            packed := calldataload(1)
+        }
+        if (!isEther && msg.value != 0) {
+            revert Errors.InvalidEtherAmount();
+        }
+        if ((isEther || operation == SHORT_BID) && msg.data.length == 29) {
+            (uint256 nftId, uint256 amount) = _unpackBid(packed);
+            _placeBid(address(allowedNFT), nftId, amount, isEther);
+        } else if (operation == SHORT_CLAIM && msg.data.length == 13) {
+            _claimWonNFT(address(allowedNFT), uint256(packed) >> 160);
         } else {
-            require(amount >= (MINIMUM_STEP_DENOMINATOR + minPriceStepNumerator) * currentBid / MINIMUM_STEP_DENOMINATOR,
-                Errors.SMALL_BID_AMOUNT);  // >= step over the previous bid
-//            if (overtimeWindow > 0 && block.timestamp > endTimestamp - overtimeWindow) {
-            if (block.timestamp > endTimestamp - overtimeWindow) {
-                newEndTimestamp = uint40(block.timestamp) + overtimeWindow;
-                auction.endTimestamp = newEndTimestamp;
-            }
+            revert Errors.InvalidBidParams();
         }
+    }
 
-        auction.currentBidder = msg.sender;
-        auction.currentBid = amount;
+    /**
+     * @dev Splits packed bid arguments, the lowest 4 bytes are unused.
+     */
+    function _unpackBid(bytes32 packed) internal pure returns (uint256 nftId, uint256 amount) {
+        nftId = uint256(packed) >> 160;
+        amount = uint128(uint256(packed) >> 32);
+    }
 
-        if (currentBidder != msg.sender) {
-            if (currentBidder != address(0)) {
-                 payableToken.safeTransfer(currentBidder, currentBid);
+    /**
+     * @dev Places the bid and moves the funds, shared by all single bid entry points.
+     * Token bids pull the amount to add, ether bids must send it as `msg.value`. The previous bidder is refunded.
+     */
+    function _placeBid(address nft, uint256 nftId, uint256 amount, bool isEther) internal {
+        (address currentBidder, uint256 refund, uint256 more) = _bid(nft, nftId, amount, isEther);
+        if (isEther) {
+            if (msg.value != more) {
+                revert Errors.InvalidEtherAmount();
             }
-            payableToken.safeTransferFrom(msg.sender, address(this), amount);
         } else {
-            uint256 more = amount - currentBid;
             payableToken.safeTransferFrom(msg.sender, address(this), more);
         }
+        if (refund > 0) {
+            _transferOut(isEther ? address(0) : address(payableToken), currentBidder, refund);
+        }
+    }
 
-        emit BidSubmitted(nft, nftId, msg.sender, amount, auction.bidToken, newEndTimestamp);
+    /**
+     * @dev Pays ether if `token` is 0, payable tokens otherwise.
+     */
+    function _transferOut(address token, address to, uint256 amount) internal {
+        if (token == address(0)) {
+            payable(to).transfer(amount);
+        } else {
+            payableToken.safeTransfer(to, amount);
+        }
     }
 
-    
     /**
-     * @notice Place the bid in ether.
+     * @notice Place bids in tokens on several auctions at once.
+     * The total amount is pulled from the bidder with a single transfer,
+     * refunds to the same outbid bidder are summed up and paid once.
+     *
+     * @param nft The NFT address of the tokens.
+     * @param nftIds The NFT IDs of the tokens.
+     * @param amounts Bid amounts in payable tokens, one per NFT ID.
+     */
+    function bidMany(
+        address nft,
+        uint256[] calldata nftIds,
+        uint256[] calldata amounts
+    ) external whenNotPaused nonReentrant {
+        (uint256 total, address[] memory refundees, uint256[] memory refunds) = _bidMany(nft, nftIds, amounts, false);
+        payableToken.safeTransferFrom(msg.sender, address(this), total);
+        for (uint256 i = 0; i < refundees.length && refundees[i] != address(0); i++) {
+            payableToken.safeTransfer(refundees[i], refunds[i]);
+        }
+    }
+
+    /**
+     * @notice Place bids in ether on several auctions at once.
+     * `msg.value` must be equal to the sum of the bids (minus already placed bids of the same bidder),
+     * refunds to the same outbid bidder are summed up and paid once.
+     *
+     * @param nft The NFT address of the tokens.
+     * @param nftIds The NFT IDs of the tokens.
+     * @param amounts Bid amounts in ether, one per NFT ID.
+     */
+    function bidEtherMany(
+        address nft,
+        uint256[] calldata nftIds,
+        uint256[] calldata amounts
+    ) external payable whenNotPaused nonReentrant {
+        (uint256 total, address[] memory refundees, uint256[] memory refunds) = _bidMany(nft, nftIds, amounts, true);
+        if (msg.value != total) {
+            revert Errors.InvalidEtherAmount();
+        }
+        for (uint256 i = 0; i < refundees.length && refundees[i] != address(0); i++) {
+            payable(refundees[i]).transfer(refunds[i]);
+        }
+    }
+
+    /**
+     * @dev Places the bid, no funds are moved.
      *
      * @param nft The NFT address of the token.
      * @param nftId The NFT ID of the token.
-     * @param amount Bid amount in ether.
+     * @param amount Bid amount in tokens or ether.
+     * @param isEther True for ether bids, false for payable token bids.
+     *
+     * @return currentBidder The previous bidder or 0 if it's the first bid.
+     * @return refund The amount to return to the previous bidder (0 if there is nothing to return).
+     * @return more The amount to take from the bidder.
      */
-    function bidEther(
+    function _bid(
         address nft,
         uint256 nftId,
-        uint256 amount
-    ) external payable whenNotPaused nonReentrant {
+        uint256 amount,
+        bool isEther
+    ) internal returns (address currentBidder, uint256 refund, uint256 more) {
         DataTypes.AuctionData storage auction = nftAuction2nftID2auction[nft][nftId];
-        require(auction.auctioneer != address(0), Errors.AUCTION_NOT_EXISTS);
-        uint256 currentBid = auction.currentBid;
-        address currentBidder = auction.currentBidder;
+        uint256 currentBid;
+        uint40 newEndTimestamp;
+        (currentBidder, currentBid, newEndTimestamp) = _updateBid(auction, amount, isEther);
+
+        if (currentBidder != msg.sender) {
+            if (currentBidder != address(0)) {
+                refund = currentBid;
+            }
+            more = amount;
+        } else {
+            more = amount - currentBid;
+        }
+
+        emit BidSubmitted(nft, nftId, msg.sender, amount, auction.bidToken, newEndTimestamp, currentBidder, refund);
+    }
+
+    /**
+     * @dev Validates the bid against the auction rules and updates the auction.
+     *
+     * @return currentBidder The previous bidder or 0 if it's the first bid.
+     * @return currentBid The previous bid or the start price if it's the first bid.
+     * @return newEndTimestamp The new end timestamp.
+     */
+    function _updateBid(
+        DataTypes.AuctionData storage auction,
+        uint256 amount,
+        bool isEther
+    ) internal returns (address currentBidder, uint256 currentBid, uint40 newEndTimestamp) {
+        if (auction.auctioneer == address(0)) {
+            revert Errors.AuctionNotExists();
+        }
+        currentBid = auction.currentBid;
+        currentBidder = auction.currentBidder;
         uint40 endTimestamp = auction.endTimestamp;
 
-        require(
-            auction.bidToken == address(0),
-            "CANT_BID_TOKEN_AUCTION_BY_ETHER" // TODO: move string to errors
-        );
-        require(
-            block.timestamp < endTimestamp || endTimestamp == 0,
-            Errors.AUCTION_FINISHED
-        );
+        if (isEther) {
+            if (auction.bidToken != address(0)) {
+                revert Errors.CantBidTokenAuctionByEther();
+            }
+        } else {
+            if (auction.bidToken == address(0)) {
+                revert Errors.CantBidEtherAuctionByTokens();
+            }
+        }
+        if (block.timestamp >= endTimestamp && endTimestamp != 0) {
+            revert Errors.AuctionFinished();
+        }
 
-        uint40 newEndTimestamp = auction.endTimestamp;
+        newEndTimestamp = endTimestamp;
         if (endTimestamp == 0) { // first bid
-            require(amount >= currentBid, Errors.SMALL_BID_AMOUNT);  // >= startPrice stored in currentBid
+            if (amount < currentBid) {  // >= startPrice stored in currentBid
+                revert Errors.SmallBidAmount();
+            }
             newEndTimestamp = uint40(block.timestamp) + auctionDuration;
             auction.endTimestamp = newEndTimestamp;
         } else {
-            require(amount >= (MINIMUM_STEP_DENOMINATOR + minPriceStepNumerator) * currentBid / MINIMUM_STEP_DENOMINATOR,
-                Errors.SMALL_BID_AMOUNT);  // >= step over the previous bid
+            // >= step over the previous bid
+            if (amount < (MINIMUM_STEP_DENOMINATOR + minPriceStepNumerator) * currentBid / MINIMUM_STEP_DENOMINATOR) {
+                revert Errors.SmallBidAmount();
+            }
 //            if (overtimeWindow > 0 && block.timestamp > endTimestamp - overtimeWindow) {
             if (block.timestamp > endTimestamp - overtimeWindow) {
                 newEndTimestamp = uint40(block.timestamp) + overtimeWindow;
@@ -1229,22 +1623,55 @@ contract Auction is AdminPausableUpgradeSafe, ReentrancyGuard, Initializable {
 
         auction.currentBidder = msg.sender;
         auction.currentBid = amount;
+    }
 
-        if (currentBidder != msg.sender) {
-            require(msg.value == amount);
-            if (currentBidder != address(0)) {
-                payable(currentBidder).transfer(currentBid);
+    /**
+     * @dev Places the bids of `bidMany`/`bidEtherMany`, no funds are moved.
+     *
+     * @return total The amount to take from the bidder.
+     * @return refundees The outbid bidders, the array is terminated by the first zero address.
+     * @return refunds The amounts to return to `refundees`.
+     */
+    function _bidMany(
+        address nft,
+        uint256[] calldata nftIds,
+        uint256[] calldata amounts,
+        bool isEther
+    ) internal returns (uint256 total, address[] memory refundees, uint256[] memory refunds) {
+        if (nftIds.length == 0 || nftIds.length != amounts.length) {
+            revert Errors.InvalidBidParams();
+        }
+        refundees = new address[](nftIds.length);
+        refunds = new uint256[](nftIds.length);
+        for (uint256 i = 0; i < nftIds.length; i++) {
+            (address currentBidder, uint256 refund, uint256 more) = _bid(nft, nftIds[i], amounts[i], isEther);
+            total += more;
+            if (refund > 0) {
+                _addRefund(refundees, refunds, currentBidder, refund);
             }
-        } else {
-            uint256 more = amount - currentBid;
-            require(msg.value == more);
         }
+    }
 
-        emit BidSubmitted(nft, nftId, msg.sender, amount, address(0), newEndTimestamp);
+    /**
+     * @dev Adds the refund to the refundee's entry or to the first free one.
+     */
+    function _addRefund(
+        address[] memory refundees,
+        uint256[] memory refunds,
+        address refundee,
+        uint256 amount
+    ) internal pure {
+        for (uint256 i = 0; i < refundees.length; i++) {
+            if (refundees[i] == refundee || refundees[i] == address(0)) {
+                refundees[i] = refundee;
+                refunds[i] += amount;
+                return;
+            }
+        }
     }
 
     function getRevision() external pure returns(uint256) {
-        return 7;
+        return 9;
     }
-    uint256[50] private __gap;
+    uint256[48] private __gap;
 }
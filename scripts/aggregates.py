@@ -0,0 +1,189 @@
+"""Sale history and earnings aggregates maintained incrementally from `Auction` events.
+
+Every `BidSubmitted`, `WonNftClaimed` and `RoyaltyPaid` event updates the aggregates in O(1),
+queries are dict lookups. Updates of the last `max_reorg_depth` blocks are journaled as
+reversible deltas, so `rollback` undoes the blocks of an abandoned fork without a replay.
+`recompute` builds the same aggregates from the full event history with a plain scan,
+`check_consistency` compares both.
+
+Benchmark with `brownie run aggregates`.
+"""
+import time
+from collections import deque
+
+from scripts.snapshot import synthetic_events
+
+_MISSING = object()
+
+
+class ReorgTooDeep(Exception):
+    """Raised when a rollback goes below the oldest journaled block."""
+
+
+class Aggregates:
+    """
+    `last_sale` maps `(nft, nftId)` to `(price, priceToken, winner)` of the last claimed auction.
+    `royalties` maps author to `{token: total}`, `volume` maps auctioneer to `{token: total sold}`,
+    token is `ADDRESS_ZERO` for ether. `sales` maps auctioneer to the number of sold NFTs and
+    `bid_counts` maps `(nft, nftId)` to the number of bids in all its auctions.
+    """
+
+    def __init__(self, max_reorg_depth=64):
+        self.last_sale = {}
+        self.royalties = {}
+        self.volume = {}
+        self.sales = {}
+        self.bid_counts = {}
+        self.max_reorg_depth = max_reorg_depth
+        self._journal = deque()  # (block_number, block_hash, undo operations)
+        self._undo = None
+
+    @property
+    def head(self):
+        """Returns `(block_number, block_hash)` of the last applied block or None."""
+        return self._journal[-1][:2] if self._journal else None
+
+    def apply(self, name, args):
+        """Applies a single event outside of the journal, used for a full recomputation from finalized blocks."""
+        handler = getattr(self, '_on_' + name, None)
+        if handler is not None:
+            handler(args)
+
+    def apply_block(self, block_number, block_hash, events):
+        """Applies `(name, args)` events of a block, blocks must be applied in increasing order."""
+        if self._journal and block_number <= self._journal[-1][0]:
+            raise ValueError('block {} is not after the head {}, roll back first'.format(
+                block_number, self._journal[-1][0]))
+        self._undo = undo = []
+        try:
+            for name, args in events:
+                self.apply(name, args)
+        finally:
+            self._undo = None
+        self._journal.append((block_number, block_hash, undo))
+        while len(self._journal) > self.max_reorg_depth:
+            self._journal.popleft()
+
+    def block_hash(self, block_number):
+        """Returns the hash of an applied journaled block or None, used to find the fork point."""
+        for number, block_hash, _ in reversed(self._journal):
+            if number == block_number:
+                return block_hash
+            if number < block_number:
+                break
+        return None
+
+    def rollback(self, block_number):
+        """Undoes all blocks after `block_number`."""
+        journal = self._journal
+        if journal and journal[0][0] > block_number + 1:
+            raise ReorgTooDeep('journal starts at block {}'.format(journal[0][0]))
+        while journal and journal[-1][0] > block_number:
+            for operation in reversed(journal.pop()[2]):
+                self._revert(*operation)
+
+    @staticmethod
+    def _revert(mapping, key, previous, outer=None, owner=None):
+        if previous is _MISSING:
+            del mapping[key]
+            if outer is not None and not mapping:
+                del outer[owner]
+        else:
+            mapping[key] = previous
+
+    def _set(self, mapping, key, value):
+        if self._undo is not None:
+            self._undo.append((mapping, key, mapping.get(key, _MISSING)))
+        mapping[key] = value
+
+    def _add(self, outer, owner, key, amount):
+        """Adds `amount` to `outer[owner][key]`."""
+        inner = outer.get(owner)
+        if inner is None:
+            inner = outer[owner] = {}
+        previous = inner.get(key, _MISSING)
+        if self._undo is not None:
+            self._undo.append((inner, key, previous, outer, owner))
+        inner[key] = amount if previous is _MISSING else previous + amount
+
+    def _on_BidSubmitted(self, args):
+        key = (args['nft'], args['nftId'])
+        self._set(self.bid_counts, key, self.bid_counts.get(key, 0) + 1)
+
+    def _on_WonNftClaimed(self, args):
+        self._set(self.last_sale, (args['nft'], args['nftId']), (args['price'], args['priceToken'], args['winner']))
+        self._add(self.volume, args['auctioneer'], args['priceToken'], args['price'])
+        self._set(self.sales, args['auctioneer'], self.sales.get(args['auctioneer'], 0) + 1)
+
+    def _on_RoyaltyPaid(self, args):
+        self._add(self.royalties, args['author'], args['amountToken'], args['amount'])
+
+    def author_earnings(self, author):
+        """Returns `{token: total royalty}` of an author, `ADDRESS_ZERO` stands for ether."""
+        return dict(self.royalties.get(author, {}))
+
+    def auctioneer_volume(self, auctioneer):
+        """Returns `({token: total sold}, number of sales)` of an auctioneer."""
+        return dict(self.volume.get(auctioneer, {})), self.sales.get(auctioneer, 0)
+
+    def as_dict(self):
+        return {
+            'last_sale': self.last_sale,
+            'royalties': self.royalties,
+            'volume': self.volume,
+            'sales': self.sales,
+            'bid_counts': self.bid_counts,
+        }
+
+
+def recompute(events):
+    """Computes the aggregates in `as_dict` form from the full `(name, args)` history with plain scans."""
+    result = {'last_sale': {}, 'royalties': {}, 'volume': {}, 'sales': {}, 'bid_counts': {}}
+    for name, args in events:
+        if name == 'WonNftClaimed':
+            result['last_sale'][(args['nft'], args['nftId'])] = (args['price'], args['priceToken'], args['winner'])
+    for args in (args for name, args in events if name == 'WonNftClaimed'):
+        per_token = result['volume'].setdefault(args['auctioneer'], {})
+        per_token[args['priceToken']] = per_token.get(args['priceToken'], 0) + args['price']
+        result['sales'][args['auctioneer']] = result['sales'].get(args['auctioneer'], 0) + 1
+    for name, args in events:
+        if name == 'RoyaltyPaid':
+            per_token = result['royalties'].setdefault(args['author'], {})
+            per_token[args['amountToken']] = per_token.get(args['amountToken'], 0) + args['amount']
+        elif name == 'BidSubmitted':
+            key = (args['nft'], args['nftId'])
+            result['bid_counts'][key] = result['bid_counts'].get(key, 0) + 1
+    return result
+
+
+def check_consistency(aggregates, events):
+    """Returns names of aggregates differing from a full recomputation over `events`, empty if consistent."""
+    expected = recompute(events)
+    actual = aggregates.as_dict()
+    return [name for name in expected if expected[name] != actual[name]]
+
+
+def benchmark(n=1_000_000, block_size=100, reorg_depth=6):
+    """Prints events per second of incremental updates, the cost of a rollback and of a full recomputation."""
+    events = synthetic_events(n)
+    blocks = [events[i:i + block_size] for i in range(0, n, block_size)]
+    aggregates = Aggregates()
+    start = time.perf_counter()
+    for number, block in enumerate(blocks):
+        aggregates.apply_block(number, None, block)
+    elapsed = time.perf_counter() - start
+    print(f'incremental: {n} events in {elapsed:.2f}s, {n / elapsed:,.0f} events/s')
+
+    start = time.perf_counter()
+    aggregates.rollback(len(blocks) - 1 - reorg_depth)
+    for number in range(len(blocks) - reorg_depth, len(blocks)):
+        aggregates.apply_block(number, None, blocks[number])
+    print(f'reorg of {reorg_depth} blocks: {(time.perf_counter() - start) * 1000:.2f}ms')
+
+    start = time.perf_counter()
+    mismatches = check_consistency(aggregates, events)
+    print(f'full recomputation and check: {time.perf_counter() - start:.2f}s, mismatches: {mismatches}')
+
+
+def main():
+    benchmark()
@@ -0,0 +1,316 @@
+"""In-process query engine over live auctions with sorted secondary indexes.
+
+Marketplace views answered without scanning all auctions:
+
+- `ending_soon`: started auctions not finished yet, ordered by `endTimestamp`;
+- `price_between`: auctions in one currency with `currentBid` in a range, ordered by price;
+- `by_auctioneer`: auctions of one auctioneer in listing order;
+- `without_bids`: auctions with a zero `currentBidder` in listing order.
+
+Every index is a `SortedList` of key tuples ending with `(nft, nftId)`, so an event updates an
+index in O(log n): a `BidSubmitted` moves the auction in the price index, and in the end time
+index (the first bid starts the auction, later bids extend it within the overtime window).
+A query is a range scan of one index. Pages are continued with an opaque cursor, the key of the
+last returned item, so a page costs O(log n + limit) however deep it is. An auction moved by an
+update between two pages may be skipped or returned twice.
+
+The engine is fed with decoded `Auction` events in log order like `AuctionState`. Compare query
+latency with a full scan at 1M auctions with `brownie run auction_query`.
+"""
+import base64
+import json
+import random
+import resource
+import time
+from typing import NamedTuple
+
+from sortedcontainers import SortedList
+
+from scripts.auction_state import ADDRESS_ZERO, AUCTIONEER, BID_TOKEN, CURRENT_BID, CURRENT_BIDDER, END_TIMESTAMP
+
+LISTED = 5  # index of the listing sequence number in auction records, after the `DataTypes.AuctionData` fields
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+KEY_TYPES = {  # element types of the index keys of every view, cursors are client input
+    'ending_soon': (int, str, int),
+    'price_between': (str, int, str, int),
+    'by_auctioneer': (str, int, str, int),
+    'without_bids': (int, str, int),
+}
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not returned by the same view."""
+
+
+class Listing(NamedTuple):
+    nft: str
+    nft_id: int
+    current_bid: int
+    bid_token: str
+    auctioneer: str
+    current_bidder: str
+    end_timestamp: int
+
+
+class Page(NamedTuple):
+    items: list
+    cursor: str  # None on the last page
+
+
+def _encode_cursor(view, key):
+    return base64.urlsafe_b64encode(json.dumps([view, list(key)]).encode()).decode()
+
+
+def _decode_cursor(view, cursor):
+    try:
+        cursor_view, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('malformed cursor') from e
+    if cursor_view != view:
+        raise InvalidCursor('cursor of {} used for {}'.format(cursor_view, view))
+    types = KEY_TYPES[view]
+    if not isinstance(key, list) or len(key) != len(types) or any(
+            type(item) is not kind for item, kind in zip(key, types)):  # bool is not accepted as int
+        raise InvalidCursor('malformed cursor key for {}'.format(view))
+    return tuple(key)
+
+
+class AuctionQuery:
+    """
+    Applies decoded `Auction` events in log order and answers paginated range queries.
+
+    `auctions` maps `(nft, nftId)` to `[currentBid, bidToken, auctioneer, currentBidder, endTimestamp, listed]`,
+    `listed` orders auctions by creation.
+    """
+
+    def __init__(self):
+        self.auctions = {}
+        self.by_end = SortedList()  # (endTimestamp, nft, nftId) of started auctions
+        self.by_price = SortedList()  # (bidToken, currentBid, nft, nftId)
+        self.by_auctioneer = SortedList()  # (auctioneer, listed, nft, nftId)
+        self.without_bid = SortedList()  # (listed, nft, nftId)
+        self._listed = 0
+
+    def __len__(self):
+        return len(self.auctions)
+
+    def apply(self, name, args):
+        """Applies a single event, `args` is a mapping of the event arguments. Unknown events are ignored."""
+        handler = getattr(self, '_on_' + name, None)
+        if handler is not None:
+            handler(args)
+
+    def apply_many(self, events):
+        """Applies `(name, args)` pairs."""
+        for name, args in events:
+            self.apply(name, args)
+
+    def apply_records(self, records):
+        """Applies `LogDecoder` records."""
+        for record in records:
+            self.apply(record.name, record)
+
+    def get(self, nft, nft_id):
+        """Returns the `Listing` of an auction or None."""
+        record = self.auctions.get((nft, nft_id))
+        return None if record is None else Listing(nft, nft_id, *record[:LISTED])
+
+    def _on_AuctionCreated(self, args):
+        key = (args['nft'], args['nftId'])
+        self._listed += 1
+        record = [args['startPrice'], args['priceToken'], args['auctioneer'], ADDRESS_ZERO, 0, self._listed]
+        self.auctions[key] = record
+        self.by_price.add((record[BID_TOKEN], record[CURRENT_BID]) + key)
+        self.by_auctioneer.add((record[AUCTIONEER], record[LISTED]) + key)
+        self.without_bid.add((record[LISTED],) + key)
+
+    def _on_ReservePriceChanged(self, args):
+        key = (args['nft'], args['nftId'])
+        record = self.auctions[key]
+        self._set_price(key, record, args['startPrice'])
+
+    def _on_BidSubmitted(self, args):
+        key = (args['nft'], args['nftId'])
+        record = self.auctions[key]
+        self._set_price(key, record, args['amount'])
+        if record[CURRENT_BIDDER] == ADDRESS_ZERO:
+            self.without_bid.remove((record[LISTED],) + key)
+        record[CURRENT_BIDDER] = args['bidder']
+        if record[END_TIMESTAMP] != args['endTimestamp']:
+            if record[END_TIMESTAMP]:
+                self.by_end.remove((record[END_TIMESTAMP],) + key)
+            record[END_TIMESTAMP] = args['endTimestamp']
+            self.by_end.add((record[END_TIMESTAMP],) + key)
+
+    def _on_AuctionCanceled(self, args):
+        self._remove((args['nft'], args['nftId']))
+
+    def _on_WonNftClaimed(self, args):
+        self._remove((args['nft'], args['nftId']))
+
+    def _set_price(self, key, record, price):
+        self.by_price.remove((record[BID_TOKEN], record[CURRENT_BID]) + key)
+        record[CURRENT_BID] = price
+        self.by_price.add((record[BID_TOKEN], price) + key)
+
+    def _remove(self, key):
+        record = self.auctions.pop(key)
+        self.by_price.remove((record[BID_TOKEN], record[CURRENT_BID]) + key)
+        self.by_auctioneer.remove((record[AUCTIONEER], record[LISTED]) + key)
+        if record[END_TIMESTAMP]:
+            self.by_end.remove((record[END_TIMESTAMP],) + key)
+        if record[CURRENT_BIDDER] == ADDRESS_ZERO:
+            self.without_bid.remove((record[LISTED],) + key)
+
+    def _page(self, view, index, minimum, maximum, limit, cursor, reverse=False):
+        """Returns a page of auctions with index keys in `[minimum, maximum)` following the cursor."""
+        if not 0 < limit <= MAX_LIMIT:
+            raise ValueError('limit must be in 1..{}'.format(MAX_LIMIT))
+        inclusive = [True, False]
+        if cursor is not None:
+            after = _decode_cursor(view, cursor)
+            # a cursor never widens the range, e.g. when it is reused with other arguments of the view
+            if reverse:
+                if maximum is None or after < maximum:
+                    maximum = after
+            elif minimum is None or after >= minimum:
+                minimum, inclusive[0] = after, False
+        items = []
+        last = None
+        for key in index.irange(minimum, maximum, inclusive=tuple(inclusive), reverse=reverse):
+            if len(items) == limit:
+                return Page(items, _encode_cursor(view, last))
+            items.append(self.get(*key[-2:]))  # the last 2 items of index keys are the auction key
+            last = key
+        return Page(items, None)
+
+    def ending_soon(self, now, limit=DEFAULT_LIMIT, cursor=None):
+        """Started auctions ending after `now`, the soonest first."""
+        return self._page('ending_soon', self.by_end, (now + 1,), None, limit, cursor)
+
+    def price_between(self, low, high, bid_token=ADDRESS_ZERO, limit=DEFAULT_LIMIT, cursor=None, descending=False):
+        """Auctions in `bid_token` (zero address for ether) with `low <= currentBid <= high`, ordered by price."""
+        return self._page('price_between', self.by_price, (bid_token, low), (bid_token, high + 1), limit, cursor,
+                          descending)
+
+    def by_auctioneer_of(self, auctioneer, limit=DEFAULT_LIMIT, cursor=None, newest_first=True):
+        """Auctions of `auctioneer`, the newest listing first by default."""
+        return self._page('by_auctioneer', self.by_auctioneer, (auctioneer,), (auctioneer, float('inf')), limit,
+                          cursor, newest_first)
+
+    def without_bids(self, limit=DEFAULT_LIMIT, cursor=None, newest_first=True):
+        """Auctions nobody has bid on yet, the newest listing first by default."""
+        return self._page('without_bids', self.without_bid, None, None, limit, cursor, newest_first)
+
+
+def scan_ending_soon(query, now, limit=DEFAULT_LIMIT):
+    """The O(n) scan answering the first page of `ending_soon`, the baseline of the benchmark."""
+    started = ((record[END_TIMESTAMP], key) for key, record in query.auctions.items() if record[END_TIMESTAMP] > now)
+    return [query.get(*key) for _, key in sorted(started)[:limit]]
+
+
+def scan_price_between(query, low, high, bid_token=ADDRESS_ZERO, limit=DEFAULT_LIMIT):
+    matching = ((record[CURRENT_BID], key) for key, record in query.auctions.items()
+                if record[BID_TOKEN] == bid_token and low <= record[CURRENT_BID] <= high)
+    return [query.get(*key) for _, key in sorted(matching)[:limit]]
+
+
+def synthetic_events(n, seed=0, now=1_600_000_000, nft='0x' + '11' * 20, token='0x' + '22' * 20):
+    """Yields `(name, args)` creating `n` auctions, 60% of them get a bid, 5% are claimed or canceled."""
+    rng = random.Random(seed)
+    auctioneers = ['0x{:040x}'.format(rng.getrandbits(160)) for _ in range(max(1, n // 20))]
+    for nft_id in range(n):
+        price = rng.randint(10**15, 10**19)
+        bid_token = token if rng.random() < 0.5 else ADDRESS_ZERO
+        auctioneer = rng.choice(auctioneers)
+        yield 'AuctionCreated', {'nft': nft, 'nftId': nft_id, 'auctioneer': auctioneer, 'startPrice': price,
+                                 'priceToken': bid_token}
+        bidder = None
+        if rng.random() < 0.6:
+            bidder = rng.choice(auctioneers)
+            yield 'BidSubmitted', {'nft': nft, 'nftId': nft_id, 'bidder': bidder, 'amount': price,
+                                   'amountToken': bid_token, 'endTimestamp': now + rng.randint(-3600, 24 * 3600)}
+        if rng.random() < 0.05:
+            if bidder is None:
+                yield 'AuctionCanceled', {'nft': nft, 'nftId': nft_id, 'canceler': auctioneer,
+                                          'auctioneer': auctioneer}
+            else:
+                yield 'WonNftClaimed', {'nft': nft, 'nftId': nft_id, 'winner': bidder, 'auctioneer': auctioneer}
+
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+    return latencies[len(latencies) // 2] * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6
+
+
+def benchmark(n=1_000_000, queries=2000, updates=100_000, scans=5, seed=0):
+    """
+    Indexes `n` synthetic auctions, then prints the throughput of bids extending auctions, the latency
+    of the first and of the following pages of every view, the latency of the O(n) scan and the peak RSS.
+    """
+    rng = random.Random(seed)
+    now = 1_600_000_000
+    query = AuctionQuery()
+    start = time.perf_counter()
+    query.apply_many(synthetic_events(n, seed, now))
+    print(f'{len(query):,} live auctions indexed in {time.perf_counter() - start:.1f}s')
+
+    started = [key for key, record in query.auctions.items() if record[END_TIMESTAMP]]
+    start = time.perf_counter()
+    for _ in range(updates):
+        key = rng.choice(started)
+        record = query.auctions[key]
+        query.apply('BidSubmitted', {'nft': key[0], 'nftId': key[1], 'bidder': record[CURRENT_BIDDER],
+                                     'amount': record[CURRENT_BID] * 21 // 20, 'amountToken': record[BID_TOKEN],
+                                     'endTimestamp': max(record[END_TIMESTAMP], now + rng.randint(0, 900))})
+    elapsed = time.perf_counter() - start
+    print(f'{updates:,} bids with overtime extensions: {updates / elapsed:,.0f} updates/s')
+
+    auctioneers = [record[AUCTIONEER] for record in query.auctions.values()]
+
+    def price_range():
+        low = rng.randint(10**15, 10**19)
+        return low, low + 10**17
+
+    views = {
+        'ending_soon': (lambda: (now + rng.randint(0, 3600),), query.ending_soon),
+        'price_between': (price_range, query.price_between),
+        'by_auctioneer': (lambda: (rng.choice(auctioneers),), query.by_auctioneer_of),
+        'without_bids': (lambda: (), query.without_bids),
+    }
+    for name, (params, view) in views.items():
+        first, following = [], []
+        for _ in range(queries):
+            args = params()
+            started_at = time.perf_counter()
+            page = view(*args)
+            first.append(time.perf_counter() - started_at)
+            for _ in range(5):
+                if page.cursor is None:
+                    break
+                started_at = time.perf_counter()
+                page = view(*args, cursor=page.cursor)
+                following.append(time.perf_counter() - started_at)
+        p50, p99 = _percentiles(first)
+        line = f'{name}: first page p50 {p50:.0f}us p99 {p99:.0f}us'
+        if following:
+            line += ', next pages p50 {:.0f}us p99 {:.0f}us'.format(*_percentiles(following))
+        print(line)
+
+    for name, scan, view in (
+            ('ending_soon', lambda: scan_ending_soon(query, now), lambda: query.ending_soon(now)),
+            ('price_between', lambda: scan_price_between(query, 10**17, 10**18),
+             lambda: query.price_between(10**17, 10**18))):
+        latencies = []
+        for _ in range(scans):
+            started_at = time.perf_counter()
+            items = scan()
+            latencies.append(time.perf_counter() - started_at)
+        assert items == view().items
+        print(f'{name} full scan: {min(latencies) * 1000:.0f}ms')
+    print(f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB')
+
+
+def main():
+    benchmark()
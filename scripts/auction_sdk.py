@@ -0,0 +1,439 @@
+"""Typed JSON-RPC client of `Auction`, `ThronNFT` and `ThronCoin` with preflight validation.
+
+Before a transaction is signed, the client reads everything the contract checks (auction data,
+pause flag, price step, payable token balance and allowance, ether balance, gas price, nonce
+and the latest block) in a single JSON-RPC batch and validates the call locally, so bids that
+would revert with `SmallBidAmount`, `AuctionFinished`, `CantBidEtherAuctionByTokens`,
+a short allowance or `ContractPaused` raise a `PreflightError` subclass instead of burning gas.
+Transactions are signed with `eth_account` local accounts and sent over the same JSON-RPC
+session, no web3 instance is needed.
+
+The check runs against the latest block, a transaction racing with another one can still
+revert. Measure wasted gas with and without preflight in a contested bidding simulation with
+`brownie run auction_sdk`.
+"""
+import time
+from typing import NamedTuple, Optional
+
+import eth_abi
+import requests
+from eth_utils import keccak, to_checksum_address
+
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+MINIMUM_STEP_DENOMINATOR = 10000
+BID_GAS = 300_000
+CLAIM_GAS = 300_000
+CREATE_AUCTION_GAS = 300_000
+APPROVE_GAS = 100_000
+
+
+class PreflightError(Exception):
+    """A call that would revert, `reason` is the contract's custom error or revert reason."""
+    reason = None
+
+    def __init__(self, message, **details):
+        super().__init__(message)
+        self.details = details
+
+
+class AuctionPaused(PreflightError):
+    reason = 'ContractPaused'
+
+
+class AuctionNotFound(PreflightError):
+    reason = 'AuctionNotExists'
+
+
+class AuctionFinished(PreflightError):
+    reason = 'AuctionFinished'
+
+
+class AuctionNotFinished(PreflightError):
+    reason = 'AuctionNotFinished'
+
+
+class EmptyWinner(PreflightError):
+    reason = 'EmptyWinner'
+
+
+class BidTooSmall(PreflightError):
+    """`details['minimum']` is the smallest accepted bid."""
+    reason = 'SmallBidAmount'
+
+
+class WrongBidCurrency(PreflightError):
+    """Token bid on an ether auction or the other way around."""
+    reason = 'CantBidEtherAuctionByTokens'
+
+
+class InsufficientAllowance(PreflightError):
+    reason = 'ERC20: transfer amount exceeds allowance'
+
+
+class InsufficientBalance(PreflightError):
+    reason = 'ERC20: transfer amount exceeds balance'
+
+
+class NotTokenOwner(PreflightError):
+    reason = 'ERC721: transfer caller is not owner nor approved'
+
+
+class InvalidAuctionParams(PreflightError):
+    reason = 'InvalidAuctionParams'
+
+
+class TransactionFailed(Exception):
+    """Raised when a sent transaction reverts or is rejected by the node."""
+
+
+class AuctionData(NamedTuple):
+    current_bid: int
+    bid_token: str
+    auctioneer: str
+    current_bidder: str
+    end_timestamp: int
+
+    @property
+    def exists(self) -> bool:
+        return self.auctioneer != ADDRESS_ZERO
+
+    @property
+    def is_ether(self) -> bool:
+        return self.bid_token == ADDRESS_ZERO
+
+    @property
+    def started(self) -> bool:
+        return self.end_timestamp != 0
+
+
+class BidContext(NamedTuple):
+    """State read in one batch before a bid or claim."""
+    auction: AuctionData
+    paused: bool
+    min_price_step_numerator: int
+    token_balance: int
+    allowance: int
+    ether_balance: int
+    gas_price: int
+    nonce: int
+    block_number: int
+    timestamp: int
+
+
+def _selector(signature):
+    return keccak(text=signature)[:4]
+
+
+def _encode(signature, types=(), args=()):
+    return '0x' + (_selector(signature) + eth_abi.encode_abi(list(types), list(args))).hex()
+
+
+def _decode(types, result):
+    return eth_abi.decode_abi(types, bytes.fromhex(result[2:]))
+
+
+def minimum_bid(auction: AuctionData, min_price_step_numerator: int) -> int:
+    """Returns the smallest bid the contract accepts on the auction."""
+    if not auction.started:
+        return auction.current_bid
+    step = (MINIMUM_STEP_DENOMINATOR + min_price_step_numerator) * auction.current_bid
+    return -(-step // MINIMUM_STEP_DENOMINATOR)
+
+
+def check_bid(context: BidContext, bidder: str, amount: int, is_ether: bool, gas: int = BID_GAS,
+              time_margin: int = 0) -> int:
+    """
+    Validates a bid like `Auction._updateBid` and the funds transfer, returns the amount taken from
+    the bidder. `time_margin` seconds before the end the auction is already treated as finished.
+    """
+    auction = context.auction
+    if context.paused:
+        raise AuctionPaused('auction contract is paused')
+    if not auction.exists:
+        raise AuctionNotFound('auction does not exist')
+    if auction.is_ether != is_ether:
+        error = WrongBidCurrency('{} auction, bid in {}'.format(
+            'ether' if auction.is_ether else 'token', 'ether' if is_ether else 'tokens'))
+        if is_ether:
+            error.reason = 'CantBidTokenAuctionByEther'
+        raise error
+    if auction.started and context.timestamp + time_margin >= auction.end_timestamp:
+        raise AuctionFinished('auction ended at {}'.format(auction.end_timestamp), end_timestamp=auction.end_timestamp)
+    minimum = minimum_bid(auction, context.min_price_step_numerator)
+    if amount < minimum:
+        raise BidTooSmall('bid {} is below the minimum {}'.format(amount, minimum), minimum=minimum)
+    more = amount - auction.current_bid if auction.current_bidder == bidder else amount
+    if is_ether:
+        required = more + gas * context.gas_price
+        if context.ether_balance < required:
+            raise InsufficientBalance('ether balance {} is below {}'.format(context.ether_balance, required),
+                                      required=required)
+    else:
+        if context.token_balance < more:
+            raise InsufficientBalance('token balance {} is below {}'.format(context.token_balance, more),
+                                      required=more)
+        if context.allowance < more:
+            raise InsufficientAllowance('allowance {} is below {}'.format(context.allowance, more), required=more)
+    return more
+
+
+class AuctionClient:
+    """
+    :param rpc_url: JSON-RPC endpoint.
+    :param auction: address of the `Auction` contract, the NFT and payable token are read from it.
+    :param time_margin: seconds before the end an auction is treated as finished by preflight checks.
+    :param poll_interval: seconds between receipt polls.
+    """
+
+    def __init__(self, rpc_url: str, auction: str, time_margin: int = 0, poll_interval: float = 0.1,
+                 session: Optional[requests.Session] = None):
+        self.rpc_url = rpc_url
+        self.session = session or requests.Session()
+        self.time_margin = time_margin
+        self.poll_interval = poll_interval
+        self.auction = to_checksum_address(auction)
+        self.stats = {'batches': 0, 'sent': 0, 'rejected': 0, 'reverted': 0}
+        token, nft, chain_id = self._batch([
+            self._call_request(self.auction, 'payableToken()'),
+            self._call_request(self.auction, 'allowedNFT()'),
+            ('eth_chainId', []),
+        ])
+        self.token = to_checksum_address(_decode(['address'], token)[0])
+        self.nft = to_checksum_address(_decode(['address'], nft)[0])
+        self.chain_id = int(chain_id, 16)
+
+    # JSON-RPC
+
+    def _post(self, payload):
+        response = self.session.post(self.rpc_url, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _request(self, method, params):
+        result = self._post({'jsonrpc': '2.0', 'id': 0, 'method': method, 'params': params})
+        if 'error' in result:
+            raise TransactionFailed(result['error'].get('message', str(result['error'])))
+        return result['result']
+
+    def _batch(self, requests_):
+        """Sends `(method, params)` pairs as one JSON-RPC batch, returns the results in order."""
+        self.stats['batches'] += 1
+        payload = [{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+                   for i, (method, params) in enumerate(requests_)]
+        results = {item['id']: item for item in self._post(payload)}
+        for item in results.values():
+            if 'error' in item:
+                raise TransactionFailed('{} failed: {}'.format(requests_[item['id']][0], item['error']))
+        return [results[i]['result'] for i in range(len(requests_))]
+
+    @staticmethod
+    def _call_request(to, signature, types=(), args=()):
+        return 'eth_call', [{'to': to, 'data': _encode(signature, types, args)}, 'latest']
+
+    # reads
+
+    def read_bid_context(self, nft: str, nft_id: int, bidder: str) -> BidContext:
+        """Reads the state a bid or claim depends on in one JSON-RPC batch."""
+        (auction, paused, step, balance, allowance, ether_balance, gas_price, nonce, block) = self._batch([
+            self._call_request(self.auction, 'nftAuction2nftID2auction(address,uint256)', ['address', 'uint256'], [nft, nft_id]),
+            self._call_request(self.auction, 'getPaused()'),
+            self._call_request(self.auction, 'minPriceStepNumerator()'),
+            self._call_request(self.token, 'balanceOf(address)', ['address'], [bidder]),
+            self._call_request(self.token, 'allowance(address,address)', ['address', 'address'], [bidder, self.auction]),
+            ('eth_getBalance', [bidder, 'latest']),
+            ('eth_gasPrice', []),
+            ('eth_getTransactionCount', [bidder, 'pending']),
+            ('eth_getBlockByNumber', ['latest', False]),
+        ])
+        current_bid, bid_token, auctioneer, current_bidder, end = _decode(
+            ['uint256', 'address', 'address', 'address', 'uint40'], auction)
+        return BidContext(
+            auction=AuctionData(current_bid, to_checksum_address(bid_token), to_checksum_address(auctioneer),
+                                to_checksum_address(current_bidder), end),
+            paused=_decode(['bool'], paused)[0],
+            min_price_step_numerator=_decode(['uint256'], step)[0],
+            token_balance=_decode(['uint256'], balance)[0],
+            allowance=_decode(['uint256'], allowance)[0],
+            ether_balance=int(ether_balance, 16),
+            gas_price=int(gas_price, 16),
+            nonce=int(nonce, 16),
+            block_number=int(block['number'], 16),
+            timestamp=int(block['timestamp'], 16),
+        )
+
+    def auction_data(self, nft: str, nft_id: int) -> AuctionData:
+        result, = self._batch([self._call_request(
+            self.auction, 'nftAuction2nftID2auction(address,uint256)', ['address', 'uint256'], [nft, nft_id])])
+        current_bid, bid_token, auctioneer, current_bidder, end = _decode(
+            ['uint256', 'address', 'address', 'address', 'uint40'], result)
+        return AuctionData(current_bid, to_checksum_address(bid_token), to_checksum_address(auctioneer),
+                           to_checksum_address(current_bidder), end)
+
+    # transactions
+
+    def _transact(self, account, to, data, gas, nonce, gas_price, value=0):
+        signed = account.sign_transaction({
+            'to': to, 'data': data, 'value': value, 'gas': gas, 'gasPrice': gas_price, 'nonce': nonce,
+            'chainId': self.chain_id,
+        })
+        self.stats['sent'] += 1
+        try:
+            tx_hash = self._request('eth_sendRawTransaction', ['0x' + bytes(signed.rawTransaction).hex()])
+        except TransactionFailed:
+            self.stats['reverted'] += 1  # development nodes report reverts on send
+            raise
+        while True:
+            receipt = self._request('eth_getTransactionReceipt', [tx_hash])
+            if receipt is not None:
+                break
+            time.sleep(self.poll_interval)
+        if int(receipt['status'], 16) != 1:
+            self.stats['reverted'] += 1
+            raise TransactionFailed('reverted: {}'.format(tx_hash))
+        return receipt
+
+    def _preflight(self, check):
+        try:
+            return check()
+        except PreflightError:
+            self.stats['rejected'] += 1
+            raise
+
+    def bid(self, account, nft_id: int, amount: int, is_ether: bool = False, nft: Optional[str] = None,
+            gas: int = BID_GAS, preflight: bool = True) -> dict:
+        """Places a token or ether bid from a local account, returns the receipt."""
+        nft = nft or self.nft
+        context = self.read_bid_context(nft, nft_id, account.address)
+        if preflight:
+            more = self._preflight(lambda: check_bid(context, account.address, amount, is_ether, gas, self.time_margin))
+        else:
+            more = amount
+        if is_ether:
+            data = _encode('bidEther(address,uint256,uint256)', ['address', 'uint256', 'uint256'], [nft, nft_id, amount])
+            return self._transact(account, self.auction, data, gas, context.nonce, context.gas_price, value=more)
+        data = _encode('bid(address,uint256,uint256)', ['address', 'uint256', 'uint256'], [nft, nft_id, amount])
+        return self._transact(account, self.auction, data, gas, context.nonce, context.gas_price)
+
+    def claim(self, account, nft_id: int, nft: Optional[str] = None, gas: int = CLAIM_GAS,
+              preflight: bool = True) -> dict:
+        """Claims the won NFT of a finished auction, returns the receipt."""
+        nft = nft or self.nft
+        context = self.read_bid_context(nft, nft_id, account.address)
+
+        def check():
+            if context.paused:
+                raise AuctionPaused('auction contract is paused')
+            if context.timestamp < context.auction.end_timestamp:
+                raise AuctionNotFinished('auction ends at {}'.format(context.auction.end_timestamp))
+            if context.auction.current_bidder == ADDRESS_ZERO:
+                raise EmptyWinner('auction does not exist or has no bids')
+        if preflight:
+            self._preflight(check)
+        data = _encode('claimWonNFT(address,uint256)', ['address', 'uint256'], [nft, nft_id])
+        return self._transact(account, self.auction, data, gas, context.nonce, context.gas_price)
+
+    def create_auction(self, account, nft_id: int, start_price: int, is_ether: bool = False,
+                       gas: int = CREATE_AUCTION_GAS, preflight: bool = True) -> dict:
+        """Lists an approved `allowedNFT` token, returns the receipt."""
+        owner, approved, existing, paused, nonce, gas_price = self._batch([
+            self._call_request(self.nft, 'ownerOf(uint256)', ['uint256'], [nft_id]),
+            self._call_request(self.nft, 'getApproved(uint256)', ['uint256'], [nft_id]),
+            self._call_request(self.auction, 'nftAuction2nftID2auction(address,uint256)', ['address', 'uint256'],
+                               [self.nft, nft_id]),
+            self._call_request(self.auction, 'getPaused()'),
+            ('eth_getTransactionCount', [account.address, 'pending']),
+            ('eth_gasPrice', []),
+        ])
+
+        def check():
+            if _decode(['bool'], paused)[0]:
+                raise AuctionPaused('auction contract is paused')
+            if start_price <= 0:
+                raise InvalidAuctionParams('start price must be positive')
+            if _decode(['uint256', 'address', 'address', 'address', 'uint40'], existing)[2] != ADDRESS_ZERO:
+                error = InvalidAuctionParams('auction of token {} exists'.format(nft_id))
+                error.reason = 'AuctionExists'
+                raise error
+            if to_checksum_address(_decode(['address'], owner)[0]) != account.address:
+                raise NotTokenOwner('token {} is not owned by {}'.format(nft_id, account.address))
+            if to_checksum_address(_decode(['address'], approved)[0]) != self.auction:
+                raise NotTokenOwner('token {} is not approved for the auction'.format(nft_id))
+        if preflight:
+            self._preflight(check)
+        data = _encode('createAuction(address,uint256,uint256,bool)', ['address', 'uint256', 'uint256', 'bool'],
+                       [self.nft, nft_id, start_price, is_ether])
+        return self._transact(account, self.auction, data, gas, int(nonce, 16), int(gas_price, 16))
+
+    def approve_token(self, account, amount: int, gas: int = APPROVE_GAS) -> dict:
+        """Approves `amount` of the payable token for bids."""
+        nonce, gas_price = self._batch([('eth_getTransactionCount', [account.address, 'pending']), ('eth_gasPrice', [])])
+        data = _encode('approve(address,uint256)', ['address', 'uint256'], [self.auction, amount])
+        return self._transact(account, self.token, data, gas, int(nonce, 16), int(gas_price, 16))
+
+    def approve_nft(self, account, nft_id: int, gas: int = APPROVE_GAS) -> dict:
+        """Approves an NFT for `create_auction`."""
+        nonce, gas_price = self._batch([('eth_getTransactionCount', [account.address, 'pending']), ('eth_gasPrice', [])])
+        data = _encode('approve(address,uint256)', ['address', 'uint256'], [self.auction, nft_id])
+        return self._transact(account, self.nft, data, gas, int(nonce, 16), int(gas_price, 16))
+
+
+def _contested_bidding(client, accounts, nft_ids, rounds, preflight, rng):
+    """Every round all bidders read the auctions once and bid on stale data. Returns wasted gas."""
+    first_block = int(client._request('eth_blockNumber', []), 16) + 1
+    accepted = 0
+    for _ in range(rounds):
+        snapshot = {nft_id: client.auction_data(client.nft, nft_id) for nft_id in nft_ids}
+        for account in rng.sample(accounts, len(accounts)):
+            nft_id = rng.choice(nft_ids)
+            auction = snapshot[nft_id]
+            amount = minimum_bid(auction, 500)
+            is_ether = rng.random() < 0.1  # some bidders pick the wrong currency
+            try:
+                client.bid(account, nft_id, amount, is_ether=is_ether, preflight=preflight)
+                accepted += 1
+            except (PreflightError, TransactionFailed):
+                pass
+    wasted = 0
+    last_block = int(client._request('eth_blockNumber', []), 16)
+    for number in range(first_block, last_block + 1):
+        block = client._request('eth_getBlockByNumber', [hex(number), False])
+        for tx_hash in block['transactions']:
+            receipt = client._request('eth_getTransactionReceipt', [tx_hash])
+            if int(receipt['status'], 16) != 1:
+                wasted += int(receipt['gasUsed'], 16)
+    return accepted, wasted
+
+
+def benchmark(auctions=5, bidders=8, rounds=10):
+    """Prints gas wasted on reverted bids of contested bidding without and with preflight, on fresh contracts."""
+    import random
+    from brownie import ThronCoin, ThronNFT, Auction, accounts, web3
+    from scripts.tx_pipeline import local_accounts
+
+    for preflight in (False, True):
+        admin, author = accounts[:2]
+        coin = ThronCoin.deploy({'from': admin})
+        nft = ThronNFT.deploy({'from': admin})
+        auction = Auction.deploy({'from': admin})
+        auction.initialize(2 * 60, 5 * 60, 500, 100, coin.address, nft.address, admin, {'from': admin})
+        auction.unpause({'from': admin})
+        client = AuctionClient(web3.provider.endpoint_uri, auction.address)
+        bidder_accounts = local_accounts(accounts[2:2 + bidders])
+        for i, account in enumerate(bidder_accounts):
+            coin.mint(account.address, 10**24, {'from': admin})
+            # a quarter of the bidders forgot to approve enough tokens
+            client.approve_token(account, 10**15 if i % 4 == 0 else 10**24)
+        nft_ids = []
+        for _ in range(auctions):
+            nft_id = nft.mintWithTokenURI('uri', {'from': author}).events['Transfer']['tokenId']
+            nft.approve(auction, nft_id, {'from': author})
+            auction.createAuction(nft, nft_id, 10**16, False, {'from': author})
+            nft_ids.append(nft_id)
+        accepted, wasted = _contested_bidding(client, bidder_accounts, nft_ids, rounds, preflight, random.Random(43))
+        print(f'preflight={preflight}: {accepted} accepted bids, {client.stats["sent"]} sent, '
+              f'{client.stats["rejected"]} rejected locally, {client.stats["reverted"]} reverted, '
+              f'{wasted} gas wasted on reverts')
+
+
+def main():
+    benchmark()
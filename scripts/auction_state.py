@@ -0,0 +1,144 @@
+"""Auction state rebuilt from `Auction` event logs only.
+
+The reducer mirrors the `nftAuction2nftID2auction` mapping and the admin settings
+of the contract, so consumers never need `getAuctionData` calls at historical blocks.
+"""
+
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+
+# indexes of `DataTypes.AuctionData` fields, `getAuctionData` returns them in this order
+CURRENT_BID = 0
+BID_TOKEN = 1
+AUCTIONEER = 2
+CURRENT_BIDDER = 3
+END_TIMESTAMP = 4
+
+AUCTION_EVENTS = (
+    'AuctionCreated',
+    'AuctionCanceled',
+    'ReservePriceChanged',
+    'BidSubmitted',
+    'WonNftClaimed',
+    'RoyaltyPaid',
+    'MinPriceStepNumeratorSet',
+    'AuctionDurationSet',
+    'OvertimeWindowSet',
+    'AuthorRoyaltyNumeratorSet',
+    'Paused',
+    'Unpaused',
+    'AdminChanged',
+    'Deposited',
+    'Withdrawn',
+    'DepositMoved',
+)
+
+
+class AuctionState:
+    """
+    Applies decoded `Auction` events in log order.
+
+    `auctions` maps `(nft, nftId)` to a list in `DataTypes.AuctionData` order:
+    `[currentBid, bidToken, auctioneer, currentBidder, endTimestamp]`.
+    `bids` maps `(nft, nftId)` to the bid history `[(bidder, amount, amountToken, endTimestamp), ...]`
+    of all auctions of the token, `royalties` maps `(author, token)` to the total royalty paid.
+    `deposits` maps `(account, token)` to the free deposit like the `deposits` mapping, empty ones are dropped.
+    `block_number`/`block_hash` is the last processed block, it's set by the log follower.
+
+    `paused` is the state before the first event. `Auction` deployed on its own starts paused and is
+    unpaused by an event, while a proxy initialized by its constructor starts unpaused without one
+    (see `scripts.deploy_auction`), so pass `paused=False` for proxies.
+    """
+
+    def __init__(self, paused=True):
+        self.auctions = {}
+        self.bids = {}
+        self.royalties = {}
+        self.deposits = {}
+        self.config = {}
+        self.paused = paused
+        self.admin = None
+        self.block_number = None
+        self.block_hash = None
+
+    def apply(self, name, args):
+        """Applies a single event, `args` is a mapping of the event arguments. Unknown events are ignored."""
+        handler = getattr(self, '_on_' + name, None)
+        if handler is not None:
+            handler(args)
+
+    def apply_many(self, events):
+        """Applies `(name, args)` pairs."""
+        for name, args in events:
+            self.apply(name, args)
+
+    def set_block(self, block_number, block_hash):
+        """Marks all events up to `block_number` as processed."""
+        self.block_number = block_number
+        self.block_hash = block_hash
+
+    def get(self, nft, nft_id):
+        """Returns the auction data in `getAuctionData` order or None if there is no such auction."""
+        auction = self.auctions.get((nft, nft_id))
+        return tuple(auction) if auction is not None else None
+
+    def _on_AuctionCreated(self, args):
+        self.auctions[(args['nft'], args['nftId'])] = [
+            args['startPrice'], args['priceToken'], args['auctioneer'], ADDRESS_ZERO, 0]
+
+    def _on_ReservePriceChanged(self, args):
+        self.auctions[(args['nft'], args['nftId'])][CURRENT_BID] = args['startPrice']
+
+    def _on_BidSubmitted(self, args):
+        auction = self.auctions[(args['nft'], args['nftId'])]
+        auction[CURRENT_BID] = args['amount']
+        auction[CURRENT_BIDDER] = args['bidder']
+        auction[END_TIMESTAMP] = args['endTimestamp']
+        self.bids.setdefault((args['nft'], args['nftId']), []).append(
+            (args['bidder'], args['amount'], args['amountToken'], args['endTimestamp']))
+
+    def _on_AuctionCanceled(self, args):
+        del self.auctions[(args['nft'], args['nftId'])]
+
+    def _on_WonNftClaimed(self, args):
+        del self.auctions[(args['nft'], args['nftId'])]
+
+    def _on_RoyaltyPaid(self, args):
+        key = (args['author'], args['amountToken'])
+        self.royalties[key] = self.royalties.get(key, 0) + args['amount']
+
+    def _move_deposit(self, key, delta):
+        balance = self.deposits.get(key, 0) + delta
+        if balance:
+            self.deposits[key] = balance
+        else:
+            self.deposits.pop(key, None)
+
+    def _on_Deposited(self, args):
+        self._move_deposit((args['account'], args['token']), args['amount'])
+
+    def _on_Withdrawn(self, args):
+        self._move_deposit((args['account'], args['token']), -args['amount'])
+
+    def _on_DepositMoved(self, args):
+        self._move_deposit((args['account'], args['token']), args['delta'])
+
+    def _on_MinPriceStepNumeratorSet(self, args):
+        self.config['minPriceStepNumerator'] = args['minPriceStepNumerator']
+
+    def _on_AuctionDurationSet(self, args):
+        self.config['auctionDuration'] = args['auctionDuration']
+
+    def _on_OvertimeWindowSet(self, args):
+        self.config['overtimeWindow'] = args['overtimeWindow']
+
+    def _on_AuthorRoyaltyNumeratorSet(self, args):
+        self.config['authorRoyaltyNumerator'] = args['authorRoyaltyNumerator']
+
+    def _on_Paused(self, args):
+        self.paused = True
+
+    def _on_Unpaused(self, args):
+        self.paused = False
+
+    def _on_AdminChanged(self, args):
+        self.admin = args['to']
@@ -0,0 +1,278 @@
+"""WebSocket push of live bid updates, one block follower shared by all watchers.
+
+New blocks are polled once with `eth_getLogs` filtered by the `Auction` address and the
+`BidSubmitted`/`WonNftClaimed`/`AuctionCanceled` topics, decoded with `LogDecoder` and fanned
+out to clients subscribed to the `(nft, nftId)` of the event. Every event is serialized once.
+
+Clients send `{"subscribe": [[nft, nftId], ...]}` or `{"unsubscribe": [...]}` and receive
+`{"event": name, "nft": ..., "nftId": ..., ...}` with integers as decimal strings.
+A client has at most one pending message per subscribed auction: while a slow client is
+still sending, a newer event of the same auction replaces the pending one, so queues are
+bounded by `max_subscriptions` and clients always get the latest state.
+
+Run the 10k subscribers load test with `brownie run bid_push` (needs `ulimit -n` above 20k).
+"""
+import asyncio
+import json
+import random
+import time
+from collections import OrderedDict
+
+import aiohttp
+import websockets
+from eth_utils import keccak, to_checksum_address
+
+from scripts.log_decoder import LogDecoder
+
+PUSHED_EVENTS = {
+    'BidSubmitted': 'BidSubmitted(address,uint256,address,uint256,address,uint40,address,uint256)',
+    'WonNftClaimed': 'WonNftClaimed(address,uint256,address,address,address,uint256,address,uint256)',
+    'AuctionCanceled': 'AuctionCanceled(address,uint256,address,address)',
+}
+
+
+def encode_message(name, record):
+    """Serializes an event, integers are strings as amounts don't fit JavaScript numbers."""
+    message = {'event': name}
+    for key, value in record.items():
+        message[key] = str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+    return json.dumps(message, separators=(',', ':'))
+
+
+class Subscriber:
+    """A connected client: its subscriptions and the latest pending message per auction."""
+    __slots__ = ('websocket', 'keys', 'pending', 'ready', 'sent', 'coalesced')
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.keys = set()
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+
+    def push(self, key, message):
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = message
+        self.ready.set()
+
+    async def write(self):
+        """Sends pending messages oldest auction first, `send` waits while the client's socket buffer is full."""
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.pending:
+                _, message = self.pending.popitem(last=False)
+                await self.websocket.send(message)
+                self.sent += 1
+
+
+class BidPushServer:
+    """
+    :param rpc_url: JSON-RPC endpoint of the node.
+    :param auction: address of the `Auction` contract.
+    :param max_subscriptions: maximum number of auctions a client can watch.
+    :param poll_interval: seconds between `eth_blockNumber` polls.
+    :param metrics: `metrics.ServiceMetrics` recording RPC calls, lag and pushed events, optional.
+    """
+
+    def __init__(self, rpc_url, auction, max_subscriptions=100, poll_interval=1.0, decoder=None, metrics=None):
+        self.rpc_url = rpc_url
+        self.auction = auction
+        self.max_subscriptions = max_subscriptions
+        self.poll_interval = poll_interval
+        self.decoder = decoder or LogDecoder()
+        self.subscriptions = {}  # (nft, nftId) -> set of subscribers
+        self.clients = set()
+        self.last_block = None
+        self.stats = {'events': 0, 'messages': 0, 'rpc_calls': 0}
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.watch_stats('bid_push', self.stats)
+        self._topics = ['0x' + keccak(text=signature).hex() for signature in PUSHED_EVENTS.values()]
+
+    def publish(self, name, record):
+        """Queues the event for subscribers of its auction, returns the number of receivers."""
+        self.stats['events'] += 1
+        key = (record['nft'], record['nftId'])
+        subscribers = self.subscriptions.get(key)
+        if not subscribers:
+            return 0
+        message = encode_message(name, record)
+        for subscriber in subscribers:
+            subscriber.push(key, message)
+        self.stats['messages'] += len(subscribers)
+        return len(subscribers)
+
+    def _subscribe(self, subscriber, keys):
+        new = set(keys) - subscriber.keys
+        # a rejected request must not leave a part of its keys subscribed
+        if len(subscriber.keys) + len(new) > self.max_subscriptions:
+            raise ValueError('too many subscriptions')
+        for key in new:
+            subscriber.keys.add(key)
+            self.subscriptions.setdefault(key, set()).add(subscriber)
+
+    def _unsubscribe(self, subscriber, keys):
+        for key in keys:
+            subscriber.keys.discard(key)
+            subscriber.pending.pop(key, None)
+            subscribers = self.subscriptions.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscriptions[key]
+
+    @staticmethod
+    def _parse_keys(items):
+        return [(to_checksum_address(nft), int(nft_id)) for nft, nft_id in items]
+
+    async def handler(self, websocket, path):
+        """`websockets.serve` connection handler."""
+        subscriber = Subscriber(websocket)
+        self.clients.add(subscriber)
+        writer = asyncio.ensure_future(subscriber.write())
+        try:
+            async for raw in websocket:
+                try:
+                    request = json.loads(raw)
+                    if 'subscribe' in request:
+                        self._subscribe(subscriber, self._parse_keys(request['subscribe']))
+                    if 'unsubscribe' in request:
+                        self._unsubscribe(subscriber, self._parse_keys(request['unsubscribe']))
+                except (ValueError, TypeError, KeyError) as exc:
+                    await websocket.send(json.dumps({'error': str(exc)}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            writer.cancel()
+            self._unsubscribe(subscriber, list(subscriber.keys))
+            self.clients.discard(subscriber)
+
+    async def _rpc(self, session, method, params):
+        self.stats['rpc_calls'] += 1
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+        start = time.perf_counter()
+        try:
+            async with session.post(self.rpc_url, json=payload) as response:
+                response.raise_for_status()
+                result = await response.json()
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.rpc(method, time.perf_counter() - start, error=True)
+            raise
+        if self.metrics is not None:
+            items = result.get('result')
+            self.metrics.rpc(method, time.perf_counter() - start, batch=len(items) if isinstance(items, list) else None,
+                             error='error' in result)
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return result['result']
+
+    async def poll(self, session):
+        """Publishes pushed events of blocks mined since the last poll, returns the number of events."""
+        head = int(await self._rpc(session, 'eth_blockNumber', []), 16)
+        if self.last_block is None:
+            self.last_block = head
+            return 0
+        if self.metrics is not None:
+            self.metrics.lag(head, self.last_block)
+        if head <= self.last_block:
+            return 0
+        logs = await self._rpc(session, 'eth_getLogs', [{
+            'address': self.auction, 'fromBlock': hex(self.last_block + 1), 'toBlock': hex(head),
+            'topics': [self._topics]}])
+        records = self.decoder.decode_many(logs)
+        if self.metrics is not None:
+            records = self.metrics.count_events(list(records))
+        count = 0
+        for record in records:
+            self.publish(type(record).__name__, record)
+            count += 1
+        self.last_block = head
+        return count
+
+    async def follow(self):
+        """Polls new blocks forever."""
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    await self.poll(session)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                    pass  # the same block range is requested on the next poll
+                await asyncio.sleep(self.poll_interval)
+
+    async def serve(self, host='0.0.0.0', port=8765):
+        """Runs the WebSocket server and the block follower."""
+        async with websockets.serve(self.handler, host, port):
+            await self.follow()
+
+    def coalesced(self):
+        return sum(subscriber.coalesced for subscriber in self.clients)
+
+
+async def _load_test(subscribers, auctions, events, slow_share):
+    from aiohttp.test_utils import unused_port
+
+    server = BidPushServer('http://127.0.0.1:0', '0x' + '00' * 20)
+    port = unused_port()
+    nft = to_checksum_address('0x' + '11' * 20)
+    rng = random.Random(36)
+    final = {}
+    last = {}
+    published = asyncio.Event()
+
+    async def connect(i):
+        nft_id = rng.randrange(auctions)
+        websocket = await websockets.connect('ws://127.0.0.1:{}'.format(port), max_queue=None)
+        await websocket.send(json.dumps({'subscribe': [[nft, nft_id]]}))
+        return i, nft_id, websocket
+
+    async def read(i, nft_id, websocket, slow):
+        async for raw in websocket:
+            if slow:
+                await asyncio.sleep(0.05)
+            last[i] = json.loads(raw)['amount']
+            if published.is_set() and last[i] == final[nft_id]:
+                return
+
+    async with websockets.serve(server.handler, '127.0.0.1', port, max_queue=None):
+        start = time.perf_counter()
+        connections = []
+        for offset in range(0, subscribers, 500):
+            connections += await asyncio.gather(*(connect(i) for i in range(offset, min(offset + 500, subscribers))))
+        while sum(len(s) for s in server.subscriptions.values()) < subscribers:
+            await asyncio.sleep(0.01)
+        print(f'{subscribers} subscribers connected in {time.perf_counter() - start:.2f}s')
+
+        readers = {i: asyncio.ensure_future(read(i, nft_id, websocket, rng.random() < slow_share))
+                   for i, nft_id, websocket in connections}
+        start = time.perf_counter()
+        for amount in range(1, events + 1):
+            nft_id = rng.randrange(auctions)
+            final[nft_id] = str(amount)
+            server.publish('BidSubmitted', {'nft': nft, 'nftId': nft_id, 'amount': amount})
+            if amount % 100 == 0:
+                await asyncio.sleep(0)
+        published.set()
+        # wait until every client has the latest amount of its auction
+        pending = [readers[i] for i, nft_id, _ in connections if nft_id in final and last.get(i) != final[nft_id]]
+        await asyncio.gather(*pending)
+        elapsed = time.perf_counter() - start
+        sent = sum(subscriber.sent for subscriber in server.clients)
+        print(f'{events} events, {server.stats["messages"]} fan-out messages, {sent} sent, '
+              f'{server.coalesced()} coalesced in {elapsed:.2f}s: {sent / elapsed:,.0f} messages/s')
+        for reader in readers.values():
+            reader.cancel()
+        for _, _, websocket in connections:
+            await websocket.close()
+
+
+def benchmark(subscribers=10_000, auctions=200, events=5_000, slow_share=0.1):
+    """Prints connection time and fan-out throughput with `slow_share` of clients reading slowly."""
+    asyncio.get_event_loop().run_until_complete(_load_test(subscribers, auctions, events, slow_share))
+
+
+def main():
+    benchmark()
@@ -0,0 +1,137 @@
+"""Deployed bytecode size of the contracts and gas of typical reverted `Auction` calls.
+
+`Auction` reverts with the custom errors of `Errors` (4 bytes of revert data) instead of
+revert strings. Reports are committed to `contracts_flat/bytecode_reports/bytecode-r<revision>.json`
+next to the storage layouts. The tests keep `Auction` within `BYTECODE_GROWTH_MARGIN` bytes of
+the newest committed report and always `UPGRADE_HEADROOM` bytes below the EIP-170 limit, so
+a change that grows the contract has to come with a regenerated report.
+
+Print and write the report with `brownie run bytecode_report`. To compare two versions, run it
+with the contracts of the older one checked out (e.g. `git checkout 451d490 -- contracts`),
+restore them and run `brownie run bytecode_report main contracts_flat/bytecode_reports/bytecode-r7.json`,
+which prints both values and the difference of every entry.
+"""
+import json
+import os
+import re
+
+EIP170_LIMIT = 24_576
+# kept free below the EIP-170 limit for future upgrades of the implementation
+UPGRADE_HEADROOM = 2_048
+# allowed growth over the size measured in the newest committed report
+BYTECODE_GROWTH_MARGIN = 512
+REVERT_GAS_LIMIT = 300_000
+REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'contracts_flat', 'bytecode_reports')
+REPORT_FILE = os.path.join(REPORT_DIR, 'bytecode-r{revision}.json')
+REPORT_NAME = re.compile(r'^bytecode-r(\d+)\.json$')
+
+
+def latest_report(directory=REPORT_DIR):
+    """Returns the committed report of the highest revision or None if there is none."""
+    revisions = []
+    if os.path.isdir(directory):
+        revisions = [int(m.group(1)) for m in map(REPORT_NAME.match, os.listdir(directory)) if m]
+    if not revisions:
+        return None
+    with open(os.path.join(directory, 'bytecode-r{}.json'.format(max(revisions)))) as f:
+        return json.load(f)
+
+
+def auction_bytecode_budget(report=None):
+    """Returns the allowed `Auction` deployed size, the size in `report` plus the margin capped by the headroom."""
+    budget = EIP170_LIMIT - UPGRADE_HEADROOM
+    if report is not None:
+        budget = min(budget, report['bytecode_size']['Auction'] + BYTECODE_GROWTH_MARGIN)
+    return budget
+
+
+def deployed_size(container):
+    """Returns the deployed (runtime) bytecode size in bytes of a compiled brownie contract container."""
+    return len(container._build['deployedBytecode']) // 2
+
+
+def _reverted_gas(send):
+    from brownie import history
+    from brownie.exceptions import VirtualMachineError
+
+    try:
+        send()
+    except VirtualMachineError:
+        pass
+    tx = history[-1]
+    if tx.status != 0:
+        raise ValueError('transaction {} did not revert'.format(tx.txid))
+    return tx.gas_used
+
+
+def revert_gas(auction, nft, coin, admin, auctioneer, bidder, sleep):
+    """
+    Returns gas used by reverted transactions of common failures on a fresh, unpaused auction.
+    `sleep(seconds)` advances the chain time. The auction is paused afterwards.
+    """
+    tx = {'from': bidder, 'gas_limit': REVERT_GAS_LIMIT, 'allow_revert': True}
+    nft_id = nft.mintWithTokenURI('uri', {'from': auctioneer}).events['Transfer']['tokenId']
+    nft.approve(auction, nft_id, {'from': auctioneer})
+    auction.createAuction(nft, nft_id, 10**18, False, {'from': auctioneer})
+    coin.approve(auction, 10**19, {'from': bidder})
+    gas = {}
+    gas['createAuction NftContractIsNotAllowed'] = _reverted_gas(
+        lambda: auction.createAuction(coin, 1, 10**18, False, tx))
+    gas['bid SmallBidAmount'] = _reverted_gas(lambda: auction.bid(nft, nft_id, 1, tx))
+    gas['bidEther CantBidEtherAuctionByTokens'] = _reverted_gas(lambda: auction.bidEther(nft, nft_id, 10**18, tx))
+    auction.bid(nft, nft_id, 10**18, {'from': bidder})
+    gas['claimWonNFT AuctionNotFinished'] = _reverted_gas(lambda: auction.claimWonNFT(nft, nft_id, tx))
+    sleep(auction.auctionDuration() + 1)
+    gas['bid AuctionFinished'] = _reverted_gas(lambda: auction.bid(nft, nft_id, 2 * 10**18, tx))
+    auction.pause({'from': admin})
+    gas['bid ContractPaused'] = _reverted_gas(lambda: auction.bid(nft, nft_id, 2 * 10**18, tx))
+    return gas
+
+
+def compare(before, after):
+    """Returns `{entry: (before, after, difference)}` of the entries of two reports, None where one is missing."""
+    entries = {}
+    for section in ('bytecode_size', 'revert_gas'):
+        old, new = before.get(section, {}), after.get(section, {})
+        for name in sorted(set(old) | set(new)):
+            difference = new[name] - old[name] if name in old and name in new else None
+            entries['{} {}'.format(section, name)] = (old.get(name), new.get(name), difference)
+    return entries
+
+
+def main(before=None):
+    """
+    Deploys fresh contracts, prints bytecode sizes and revert gas and writes them to `REPORT_FILE`.
+    `before` is the path of a report of another version to compare with.
+    """
+    from brownie import ThronCoin, ThronNFT, Auction, accounts, chain
+
+    report = {'bytecode_size': {}, 'revert_gas': {}}
+    for container in (Auction, ThronNFT, ThronCoin):
+        report['bytecode_size'][container._name] = deployed_size(container)
+        print(f'{container._name}: {deployed_size(container)} bytes deployed')
+    admin, auctioneer, bidder = accounts[:3]
+    coin = ThronCoin.deploy({'from': admin})
+    nft = ThronNFT.deploy({'from': admin})
+    auction = Auction.deploy({'from': admin})
+    auction.initialize(2 * 60, 5 * 60, 500, 100, coin.address, nft.address, admin, {'from': admin})
+    auction.unpause({'from': admin})
+    coin.mint(bidder, 10**20, {'from': admin})
+    for name, gas in revert_gas(auction, nft, coin, admin, auctioneer, bidder, chain.sleep).items():
+        report['revert_gas'][name] = gas
+        print(f'{name}: {gas} gas')
+    report['revision'] = auction.getRevision()
+    path = REPORT_FILE.format(revision=report['revision'])
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    print(f'written to {path}')
+    if before is not None:
+        with open(before) as f:
+            previous = json.load(f)
+        print(f'revision {previous["revision"]} -> {report["revision"]}:')
+        for name, (old, new, difference) in compare(previous, report).items():
+            print(f'    {name}: {old} -> {new} ({difference:+d})' if difference is not None else
+                  f'    {name}: {old} -> {new}')
@@ -0,0 +1,308 @@
+"""Memory-compact, array-backed store of auctions and their bid history.
+
+`AuctionState` keeps a Python list per auction and a tuple per bid, several hundred bytes per
+record. Here every field is a column: addresses are interned into `uint32` indexes, amounts are
+fixed-width 32-byte big-endian wei in a `bytearray`, timestamps are 5-byte (`uint40`) values.
+Auction rows are addressed through a dense `nftId -> row` array per NFT contract (`ThronNFT`
+ids are sequential) with a dict fallback for sparse ids, rows of settled auctions are reused.
+Bids of an auction are chained backwards (`bid -> previous bid of the same auction`), so
+appending a bid is O(1) without per-auction lists. `AuctionView`/`BidView` are `__slots__` views.
+
+Benchmark memory and throughput at 10M bids with `brownie run compact_store`.
+"""
+import itertools
+import time
+import tracemalloc
+from array import array
+
+from scripts.auction_state import ADDRESS_ZERO, AuctionState
+from scripts.snapshot import iter_synthetic_events
+
+AMOUNT_SIZE = 32
+TIMESTAMP_SIZE = 5
+NO_ROW = -1
+DENSE_ID_LIMIT = 1 << 24  # larger ids go to the sparse index
+
+
+class AddressTable:
+    """Interns addresses to `uint32` indexes, index 0 is the zero address."""
+
+    def __init__(self):
+        self.addresses = [ADDRESS_ZERO]
+        self.indexes = {ADDRESS_ZERO: 0}
+
+    def intern(self, address):
+        index = self.indexes.get(address)
+        if index is None:
+            index = self.indexes[address] = len(self.addresses)
+            self.addresses.append(address)
+        return index
+
+    def __len__(self):
+        return len(self.addresses)
+
+
+class _RowIndex:
+    """`nftId -> row` of one NFT contract: a dense `int32` array for small ids, a dict for the rest."""
+    __slots__ = ('dense', 'sparse')
+
+    def __init__(self):
+        self.dense = array('i')
+        self.sparse = {}
+
+    def get(self, nft_id):
+        if nft_id < len(self.dense):
+            return self.dense[nft_id]
+        return self.sparse.get(nft_id, NO_ROW)
+
+    def set(self, nft_id, row):
+        if nft_id < DENSE_ID_LIMIT:
+            dense = self.dense
+            if nft_id >= len(dense):
+                dense.extend(array('i', [NO_ROW]) * max(nft_id + 1 - len(dense), len(dense) // 2))
+            dense[nft_id] = row
+        elif row == NO_ROW:
+            self.sparse.pop(nft_id, None)
+        else:
+            self.sparse[nft_id] = row
+
+
+class AuctionView:
+    """A live auction, fields in `DataTypes.AuctionData` terms."""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def current_bid(self):
+        return self._store._amount(self._store._current_bid, self._row)
+
+    @property
+    def bid_token(self):
+        return self._store.addresses.addresses[self._store._bid_token[self._row]]
+
+    @property
+    def auctioneer(self):
+        return self._store.addresses.addresses[self._store._auctioneer[self._row]]
+
+    @property
+    def current_bidder(self):
+        return self._store.addresses.addresses[self._store._current_bidder[self._row]]
+
+    @property
+    def end_timestamp(self):
+        return self._store._timestamp(self._store._end_timestamp, self._row)
+
+    def as_tuple(self):
+        """Returns the fields in `getAuctionData` order."""
+        return self.current_bid, self.bid_token, self.auctioneer, self.current_bidder, self.end_timestamp
+
+
+class BidView:
+    """A bid of the history."""
+    __slots__ = ('_store', '_bid')
+
+    def __init__(self, store, bid):
+        self._store = store
+        self._bid = bid
+
+    @property
+    def bidder(self):
+        return self._store.addresses.addresses[self._store._bidder[self._bid]]
+
+    @property
+    def amount(self):
+        return self._store._amount(self._store._bid_amount, self._bid)
+
+    @property
+    def end_timestamp(self):
+        return self._store._timestamp(self._store._bid_end, self._bid)
+
+    def as_tuple(self):
+        """Returns `(bidder, amount, endTimestamp)`."""
+        return self.bidder, self.amount, self.end_timestamp
+
+
+class CompactAuctionStore:
+    """Applies decoded `Auction` events like `AuctionState.apply`, with columnar storage."""
+
+    def __init__(self):
+        self.addresses = AddressTable()
+        self._indexes = {}  # nft address index -> _RowIndex
+        self._free_rows = array('i')
+        # auction columns
+        self._current_bid = bytearray()
+        self._bid_token = array('I')
+        self._auctioneer = array('I')
+        self._current_bidder = array('I')
+        self._end_timestamp = bytearray()
+        self._last_bid = array('i')  # last bid of the auction or -1
+        # bid columns
+        self._bidder = array('I')
+        self._bid_amount = bytearray()
+        self._bid_end = bytearray()
+        self._previous_bid = array('i')  # previous bid of the same auction or -1
+        self.live = 0
+
+    @staticmethod
+    def _amount(column, row):
+        return int.from_bytes(column[row * AMOUNT_SIZE:(row + 1) * AMOUNT_SIZE], 'big')
+
+    @staticmethod
+    def _timestamp(column, row):
+        return int.from_bytes(column[row * TIMESTAMP_SIZE:(row + 1) * TIMESTAMP_SIZE], 'big')
+
+    def _row(self, nft, nft_id):
+        index = self._indexes.get(self.addresses.indexes.get(nft))
+        return index.get(nft_id) if index is not None else NO_ROW
+
+    def get(self, nft, nft_id):
+        """Returns the auction data in `getAuctionData` order or None, like `AuctionState.get`."""
+        row = self._row(nft, nft_id)
+        return AuctionView(self, row).as_tuple() if row != NO_ROW else None
+
+    def view(self, nft, nft_id):
+        row = self._row(nft, nft_id)
+        return AuctionView(self, row) if row != NO_ROW else None
+
+    def bids(self, nft, nft_id):
+        """Returns bids of the live auction, oldest first."""
+        row = self._row(nft, nft_id)
+        result = []
+        bid = self._last_bid[row] if row != NO_ROW else NO_ROW
+        while bid != NO_ROW:
+            result.append(BidView(self, bid))
+            bid = self._previous_bid[bid]
+        result.reverse()
+        return result
+
+    def __len__(self):
+        return self.live
+
+    @property
+    def bid_count(self):
+        return len(self._bidder)
+
+    def apply(self, name, args):
+        """Applies a single event, unknown events are ignored."""
+        handler = getattr(self, '_on_' + name, None)
+        if handler is not None:
+            handler(args)
+
+    def apply_many(self, events):
+        """Applies `(name, args)` pairs."""
+        for name, args in events:
+            self.apply(name, args)
+
+    def _on_AuctionCreated(self, args):
+        intern = self.addresses.intern
+        nft = intern(args['nft'])
+        index = self._indexes.get(nft)
+        if index is None:
+            index = self._indexes[nft] = _RowIndex()
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._current_bid[row * AMOUNT_SIZE:(row + 1) * AMOUNT_SIZE] = args['startPrice'].to_bytes(AMOUNT_SIZE, 'big')
+            self._bid_token[row] = intern(args['priceToken'])
+            self._auctioneer[row] = intern(args['auctioneer'])
+            self._current_bidder[row] = 0
+            self._end_timestamp[row * TIMESTAMP_SIZE:(row + 1) * TIMESTAMP_SIZE] = bytes(TIMESTAMP_SIZE)
+            self._last_bid[row] = NO_ROW
+        else:
+            row = len(self._bid_token)
+            self._current_bid += args['startPrice'].to_bytes(AMOUNT_SIZE, 'big')
+            self._bid_token.append(intern(args['priceToken']))
+            self._auctioneer.append(intern(args['auctioneer']))
+            self._current_bidder.append(0)
+            self._end_timestamp += bytes(TIMESTAMP_SIZE)
+            self._last_bid.append(NO_ROW)
+        index.set(args['nftId'], row)
+        self.live += 1
+
+    def _on_ReservePriceChanged(self, args):
+        row = self._row(args['nft'], args['nftId'])
+        self._current_bid[row * AMOUNT_SIZE:(row + 1) * AMOUNT_SIZE] = args['startPrice'].to_bytes(AMOUNT_SIZE, 'big')
+
+    def _on_BidSubmitted(self, args):
+        row = self._row(args['nft'], args['nftId'])
+        amount = args['amount'].to_bytes(AMOUNT_SIZE, 'big')
+        end = args['endTimestamp'].to_bytes(TIMESTAMP_SIZE, 'big')
+        bidder = self.addresses.intern(args['bidder'])
+        self._current_bid[row * AMOUNT_SIZE:(row + 1) * AMOUNT_SIZE] = amount
+        self._current_bidder[row] = bidder
+        self._end_timestamp[row * TIMESTAMP_SIZE:(row + 1) * TIMESTAMP_SIZE] = end
+        self._previous_bid.append(self._last_bid[row])
+        self._last_bid[row] = len(self._bidder)
+        self._bidder.append(bidder)
+        self._bid_amount += amount
+        self._bid_end += end
+
+    def _delete(self, args):
+        nft = self.addresses.indexes[args['nft']]
+        index = self._indexes[nft]
+        row = index.get(args['nftId'])
+        index.set(args['nftId'], NO_ROW)
+        self._free_rows.append(row)
+        self.live -= 1
+
+    _on_AuctionCanceled = _delete
+    _on_WonNftClaimed = _delete
+
+    def memory_bytes(self):
+        """Returns the approximate memory of the columns, indexes and the address table."""
+        columns = [self._current_bid, self._end_timestamp, self._bid_amount, self._bid_end]
+        arrays = [self._bid_token, self._auctioneer, self._current_bidder, self._last_bid, self._bidder,
+                  self._previous_bid, self._free_rows]
+        total = sum(len(column) for column in columns)
+        total += sum(len(column) * column.itemsize for column in arrays)
+        for index in self._indexes.values():
+            total += len(index.dense) * index.dense.itemsize + len(index.sparse) * 100
+        # list slot, dict entry and the 42-character str object of every address
+        total += len(self.addresses) * (8 + 100 + 91)
+        return total
+
+
+def benchmark(bids=10_000_000, dict_bids=1_000_000):
+    """
+    Prints update throughput and memory per bid of the compact store with `bids` bids and of
+    `AuctionState` with `dict_bids` bids (measured with `tracemalloc`, so it's kept smaller).
+    """
+    def events_up_to(n_bids):
+        count = 0
+        for name, args in iter_synthetic_events():
+            yield name, args
+            if name == 'BidSubmitted':
+                count += 1
+                if count == n_bids:
+                    return
+
+    store = CompactAuctionStore()
+    elapsed = 0.0
+    events = events_up_to(bids)
+    while True:
+        chunk = list(itertools.islice(events, 100_000))  # event generation is excluded from timing
+        if not chunk:
+            break
+        start = time.perf_counter()
+        store.apply_many(chunk)
+        elapsed += time.perf_counter() - start
+    size = store.memory_bytes()
+    print(f'compact store: {store.bid_count:,} bids, {len(store):,} live auctions, {size / 2**20:.0f} MiB '
+          f'({size / store.bid_count:.1f} bytes/bid), {store.bid_count / elapsed:,.0f} bids/s')
+
+    events = list(events_up_to(dict_bids))
+    tracemalloc.start()
+    state = AuctionState()
+    start = time.perf_counter()
+    state.apply_many(events)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'AuctionState: {dict_bids:,} bids, {size / 2**20:.0f} MiB ({size / dict_bids:.1f} bytes/bid), '
+          f'{dict_bids / elapsed:,.0f} bids/s (under tracemalloc)')
+
+
+def main():
+    benchmark()
@@ -0,0 +1,102 @@
+"""Seeds auctions through `TxPipeline`, the Python counterpart of `create-auctions.js`.
+
+`seed_collection` mints, approves and lists a whole collection back to back. `main` replays the
+scenarios of `create-auctions.js` (create -> bid -> bid -> claim, create -> bid,
+create -> cancel), waiting for the auction end time instead of a fixed sleep.
+
+Seed with `brownie run create_auctions --network <network>`, compare with the sequential flow
+on a local chain with `brownie run create_auctions benchmark`.
+"""
+import time
+
+from scripts.mint_nft import send_mints, check_minted
+from scripts.tx_pipeline import TxPipeline, local_accounts, web3_contract
+
+APPROVE_GAS = 100_000
+CREATE_AUCTION_GAS = 300_000
+BID_GAS = 300_000
+CLAIM_GAS = 300_000
+CANCEL_GAS = 200_000
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def seed_collection(pipeline, nft, auction, account, uris, start_price, is_ether=False):
+    """Mints `uris`, approves and lists every token, all sent without waiting. Returns the token ids."""
+    mints, token_ids = send_mints(pipeline, nft, account, uris)
+    pending = []
+    for token_id in token_ids:
+        pending.append(pipeline.transact(account, nft.functions.approve(auction.address, token_id), APPROVE_GAS))
+        pending.append(pipeline.transact(
+            account, auction.functions.createAuction(nft.address, token_id, start_price, is_ether),
+            CREATE_AUCTION_GAS))
+    check_minted(pipeline, mints, token_ids, nft.address)
+    pipeline.wait_all(pending)
+    return token_ids
+
+
+def bid(pipeline, token, auction, account, nft_address, nft_id, amount):
+    """Sends the token approval and the bid back to back, returns the pending bid."""
+    pipeline.transact(account, token.functions.approve(auction.address, amount), APPROVE_GAS)
+    return pipeline.transact(account, auction.functions.bid(nft_address, nft_id, amount), BID_GAS)
+
+
+def wait_until(web3, timestamp, poll_interval=1):
+    """Waits until the latest block is later than `timestamp`."""
+    while web3.eth.get_block('latest')['timestamp'] <= timestamp:
+        time.sleep(poll_interval)
+
+
+def main():
+    from brownie import ThronCoin, ThronNFT, Auction, accounts, web3
+
+    token = web3_contract(web3, ThronCoin[-1])
+    nft = web3_contract(web3, ThronNFT[-1])
+    auction = web3_contract(web3, Auction[-1])
+    author, bidder1, bidder2 = local_accounts(accounts[:3])
+    unit = 10 ** token.functions.decimals().call()
+
+    with TxPipeline(web3) as pipeline:
+        # the three auctions are created at once
+        first, second = seed_collection(pipeline, nft, auction, author, [URI] * 2, 3 * unit)
+        third, = seed_collection(pipeline, nft, auction, bidder2, [URI], 75 * unit // 100)
+        print(f'auctions created: NFT [{nft.address}, {first}], [{nft.address}, {second}], [{nft.address}, {third}]')
+
+        # 1. create -> bid -> bid -> claim, 2. create -> bid
+        pipeline.wait_all([bid(pipeline, token, auction, bidder1, nft.address, first, 4 * unit),
+                           bid(pipeline, token, auction, bidder2, nft.address, second, 2 * unit)])
+        bid(pipeline, token, auction, bidder2, nft.address, first, 5 * unit).wait()
+        print(f'bids submitted by {bidder1.address} and {bidder2.address}')
+        # 3. create -> cancel
+        pipeline.transact(bidder2, auction.functions.cancelAuction(nft.address, third), CANCEL_GAS).wait()
+        print(f'cancelled auction of NFT [{nft.address}, {third}]')
+
+        wait_until(web3, auction.functions.getAuctionData(nft.address, first).call()[4])
+        pipeline.transact(bidder2, auction.functions.claimWonNFT(nft.address, first), CLAIM_GAS).wait()
+        print(f'auction finished, {bidder2.address} claimed won NFT {first}')
+
+
+def benchmark(n=100):
+    """Prints the time to list `n` NFTs sequentially with brownie and pipelined, on fresh contracts."""
+    from brownie import ThronCoin, ThronNFT, Auction, accounts, web3
+
+    admin, owner = accounts[0], accounts[1]
+    coin = ThronCoin.deploy({'from': admin})
+    nft = ThronNFT.deploy({'from': admin})
+    auction = Auction.deploy({'from': admin})
+    auction.initialize(2 * 60, 5 * 60, 500, 100, coin.address, nft.address, admin, {'from': admin})
+    auction.unpause({'from': admin})
+
+    start = time.perf_counter()
+    for _ in range(n):
+        nft_id = nft.mintWithTokenURI(URI, {'from': owner}).events['Transfer']['tokenId']
+        nft.approve(auction.address, nft_id, {'from': owner})
+        auction.createAuction(nft.address, nft_id, 1000, False, {'from': owner})
+    sequential = time.perf_counter() - start
+    print(f'sequential: {3 * n} transactions in {sequential:.2f}s')
+
+    account, = local_accounts([owner])
+    with TxPipeline(web3) as pipeline:
+        start = time.perf_counter()
+        seed_collection(pipeline, web3_contract(web3, nft), web3_contract(web3, auction), account, [URI] * n, 1000)
+        pipelined = time.perf_counter() - start
+    print(f'pipelined: {3 * n} transactions in {pipelined:.2f}s, {sequential / pipelined:.1f}x faster')
@@ -0,0 +1,67 @@
+"""Deploys `Auction` behind a `TransparentUpgradeableProxy` as in production.
+
+The proxy constructor delegates `initialize`, so the proxy storage is initialized in the
+deploying transaction. It starts unpaused because the constructor of `AdminPausableUpgradeSafe`
+pauses only the implementation's own storage. Calls from the proxy admin are never forwarded to
+`Auction` (they can only upgrade the proxy), so the proxy admin must differ from the auction admin.
+The proxied contract is named `AuctionProxy`, which keeps its gas apart from direct deployments
+in `brownie test --gas` reports.
+
+Deploy with `brownie run deploy_auction main <token> <nft> <proxy admin> --network <network>`.
+"""
+OVERTIME = 2 * 60  # in prod 15*60
+DURATION = 5 * 60  # in prod 24*3600
+MIN_STEP_NUMERATOR = 500  # 5%
+AUTHOR_ROYALTY_NUMERATOR = 100  # 1%
+DEPLOYMENTS = ('direct', 'proxy')
+
+
+def deploy_auction(admin, payable_token, allowed_nft, deployment='proxy', proxy_admin=None, overtime=OVERTIME,
+                   duration=DURATION, min_step_numerator=MIN_STEP_NUMERATOR,
+                   author_royalty_numerator=AUTHOR_ROYALTY_NUMERATOR):
+    """
+    Deploys an initialized, unpaused `Auction` administrated by `admin`.
+
+    :param deployment: 'proxy' deploys through `TransparentUpgradeableProxy` administrated by `proxy_admin`,
+        'direct' deploys the implementation alone, then initializes and unpauses it.
+    """
+    from brownie import Auction, Contract, TransparentUpgradeableProxy
+
+    if deployment not in DEPLOYMENTS:
+        raise ValueError('unknown deployment {!r}, expected one of {}'.format(deployment, DEPLOYMENTS))
+    implementation = Auction.deploy({'from': admin})
+    args = (overtime, duration, min_step_numerator, author_royalty_numerator, str(payable_token), str(allowed_nft),
+            str(admin))
+    if deployment == 'direct':
+        implementation.initialize(*args, {'from': admin})
+        implementation.unpause({'from': admin})
+        return implementation
+    if proxy_admin is None or str(proxy_admin) == str(admin):
+        raise ValueError('the proxy admin must be set and differ from the auction admin')
+    proxy = TransparentUpgradeableProxy.deploy(
+        implementation, proxy_admin, implementation.initialize.encode_input(*args), {'from': admin})
+    contract = Contract.from_abi('AuctionProxy', proxy.address, Auction.abi)
+    contract.tx = proxy.tx
+    return contract
+
+
+def upgrade_auction(proxy_address, proxy_admin, implementation=None, deployer=None):
+    """
+    Points the proxy to `implementation` (a freshly deployed `Auction` by default), returns the implementation.
+    The call is encoded by hand so the proxy address stays registered as `AuctionProxy`.
+    """
+    from brownie import Auction, TransparentUpgradeableProxy, web3
+
+    if implementation is None:
+        implementation = Auction.deploy({'from': deployer or proxy_admin})
+    data = web3.eth.contract(abi=TransparentUpgradeableProxy.abi).encodeABI('upgradeTo', [str(implementation)])
+    proxy_admin.transfer(str(proxy_address), 0, data=data)
+    return implementation
+
+
+def main(payable_token, allowed_nft, proxy_admin):
+    from brownie import accounts
+
+    admin = accounts[0]
+    auction = deploy_auction(admin, payable_token, allowed_nft, proxy_admin=proxy_admin)
+    print(f'Auction proxy deployed: {auction.address}, revision {auction.getRevision()}')
@@ -0,0 +1,73 @@
+"""Gas per bid of wallet bids and of bids from deposits.
+
+`bid` pulls the amount with `transferFrom` and refunds the outbid bidder with `transfer`, two
+calls of `ThronCoin` per bid (`bidEther` sends the refund with a value call). `bidFromDeposit`
+moves internal balances of `Auction` only: the bidder's deposit is debited and the outbid
+bidder's deposit credited. A drop where bidders outbid each other runs both ways through the
+production proxy, in tokens and in ether. The report gives the average gas of the outbids and
+the number of bids that fit into a block.
+
+Run the benchmark with `brownie run deposit_gas`.
+"""
+from scripts.deploy_auction import deploy_auction
+
+BLOCK_GAS_LIMIT = 30_000_000
+START_PRICE = 10**15
+PATHS = (('token', False, False), ('token', False, True), ('ether', True, False), ('ether', True, True))
+
+
+def outbid_gas(auction, nft, auctioneer, bidders, bids, is_ether, from_deposit, start_price=START_PRICE):
+    """
+    Lists a new auction and lets `bidders` outbid each other in turn `bids` times, returns the gas of every bid
+    but the first. Deposit bidders need deposits covering their bids, wallet bidders token approvals.
+    """
+    nft_id = nft.mintWithTokenURI('uri', {'from': auctioneer}).events['Transfer']['tokenId']
+    nft.approve(auction, nft_id, {'from': auctioneer})
+    auction.createAuction(nft, nft_id, start_price, is_ether, {'from': auctioneer})
+    step = auction.minPriceStepNumerator()
+    amount = start_price
+    gas = []
+    for i in range(bids):
+        bidder = bidders[i % len(bidders)]
+        if from_deposit:
+            tx = auction.bidFromDeposit(nft, nft_id, amount, {'from': bidder})
+        elif is_ether:
+            tx = auction.bidEther(nft, nft_id, amount, {'from': bidder, 'value': amount})
+        else:
+            tx = auction.bid(nft, nft_id, amount, {'from': bidder})
+        if i > 0:
+            gas.append(tx.gas_used)
+        amount = -(-amount * (10000 + step) // 10000)
+    return gas
+
+
+def benchmark(bids=40, bidder_count=4):
+    """Prints the average outbid gas and bids per block of wallet and deposit bids in tokens and ether."""
+    from brownie import ThronCoin, ThronNFT, accounts
+
+    admin, proxy_admin, auctioneer = accounts[:3]
+    bidders = accounts[3:3 + bidder_count]
+    coin = ThronCoin.deploy({'from': admin})
+    nft = ThronNFT.deploy({'from': admin})
+    auction = deploy_auction(admin, coin, nft, proxy_admin=proxy_admin)
+    funds = 10**18
+    for bidder in bidders:
+        coin.mint(bidder, 2 * funds, {'from': admin})
+        coin.approve(auction, 2 * funds, {'from': bidder})
+        auction.deposit(funds, {'from': bidder})
+        auction.depositEther({'from': bidder, 'value': funds})
+
+    averages = {}
+    for currency, is_ether, from_deposit in PATHS:
+        gas = outbid_gas(auction, nft, auctioneer, bidders, bids, is_ether, from_deposit)
+        average = sum(gas) // len(gas)
+        averages[currency, from_deposit] = average
+        print(f'{currency} {"deposit" if from_deposit else "wallet"} outbid: avg {average} gas '
+              f'(min {min(gas)}, max {max(gas)}), {BLOCK_GAS_LIMIT // average} bids per {BLOCK_GAS_LIMIT:,} gas block')
+    for currency in ('token', 'ether'):
+        wallet, deposit = averages[currency, False], averages[currency, True]
+        print(f'{currency}: deposit bids save {wallet - deposit} gas ({(wallet - deposit) / wallet:.0%}) per outbid')
+
+
+def main():
+    benchmark()
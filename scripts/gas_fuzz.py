@@ -0,0 +1,116 @@
+"""Worst-case gas per `Auction` entry point and code path, found by stateful fuzzing.
+
+`tests/test_gas_fuzz.py` drives random sequences of listings, outbids, same-bidder raises,
+overtime extensions, claims with and without author royalty, cancels, admin setter changes and
+pause toggles against a local chain. Every mined transaction is passed to `GasRecorder` with the
+entry point and the code path taken, derived from its events (e.g. `bid` `outbid+overtime`,
+`claimWonNFT` `royalty+ether`). A transaction above the ceiling of its entry point fails the
+rule, so Hypothesis shrinks the failure to a short sequence.
+
+At the end of the run the recorder writes `reports/gas-limits-<deployment>.json`. The file holds
+the maximum gas per entry point and path and the recommended wallet gas limit per entry point:
+the maximum over its paths plus `MARGIN`, rounded up to `ROUND_TO`. Print the file with
+`brownie run gas_fuzz main <path>`.
+"""
+import json
+import math
+import os
+
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+DEFAULT_CEILING = 300_000
+GAS_CEILINGS = {  # entry points with a ceiling below `DEFAULT_CEILING`
+    'cancelAuction': 150_000,
+    'changeReservePrice': 100_000,
+    'pause': 60_000,
+    'unpause': 60_000,
+    'setAuctionDuration': 60_000,
+    'setOvertimeWindow': 60_000,
+    'setMinPriceStepNumerator': 60_000,
+    'setAuthorRoyaltyNumerator': 60_000,
+}
+MARGIN = 0.2
+ROUND_TO = 5_000
+LIMITS_FILE = os.path.join('reports', 'gas-limits-{deployment}.json')
+
+
+class GasCeilingExceeded(AssertionError):
+    """A transaction used more gas than the ceiling of its entry point."""
+
+
+def ceiling(entry_point, ceilings=None):
+    return (GAS_CEILINGS if ceilings is None else ceilings).get(entry_point, DEFAULT_CEILING)
+
+
+def bid_path(bidder, bid_event, previous_end):
+    """
+    Returns the path of a bid from its `BidSubmitted` event: 'first', 'outbid' or 'raise' (the current bidder
+    bids again), with '+overtime' when a running auction was extended.
+    """
+    previous_bidder = bid_event['previousBidder']
+    if previous_bidder == ADDRESS_ZERO:
+        return 'first'
+    path = 'raise' if previous_bidder == bidder else 'outbid'
+    if bid_event['endTimestamp'] != previous_end:
+        path += '+overtime'
+    return path
+
+
+def claim_path(events, is_ether):
+    """Returns 'royalty' or 'no royalty' (the auctioneer is the author) and the currency of a settlement."""
+    return '{}+{}'.format('royalty' if 'RoyaltyPaid' in events else 'no royalty', 'ether' if is_ether else 'token')
+
+
+def recommended_limit(gas, margin=MARGIN, round_to=ROUND_TO):
+    return int(math.ceil(gas * (1 + margin) / round_to) * round_to)
+
+
+class GasRecorder:
+    """Keeps the maximum gas used per `(entry point, path)` and the transaction that used it."""
+
+    def __init__(self, ceilings=None):
+        self.ceilings = GAS_CEILINGS if ceilings is None else ceilings
+        self.paths = {}  # entry point -> {path: {'max': gas, 'count': n, 'tx': hash}}
+
+    def record(self, entry_point, path, tx):
+        """Records a mined transaction, raises `GasCeilingExceeded` above the ceiling of the entry point."""
+        stats = self.paths.setdefault(entry_point, {}).setdefault(path, {'max': 0, 'count': 0, 'tx': None})
+        stats['count'] += 1
+        if tx.gas_used > stats['max']:
+            stats['max'], stats['tx'] = tx.gas_used, tx.txid
+        limit = ceiling(entry_point, self.ceilings)
+        if tx.gas_used > limit:
+            raise GasCeilingExceeded('{} ({}) used {} gas, the ceiling is {}, tx {}'.format(
+                entry_point, path, tx.gas_used, limit, tx.txid))
+        return tx
+
+    def maximum(self, entry_point):
+        return max(stats['max'] for stats in self.paths[entry_point].values())
+
+    def recommendation(self, margin=MARGIN, round_to=ROUND_TO):
+        """Returns `{entry point: gas limit}` covering the worst observed path with `margin`."""
+        return {entry_point: recommended_limit(self.maximum(entry_point), margin, round_to)
+                for entry_point in sorted(self.paths)}
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        report = {
+            'margin': MARGIN,
+            'recommended_gas_limits': self.recommendation(),
+            'ceilings': {entry_point: ceiling(entry_point, self.ceilings) for entry_point in sorted(self.paths)},
+            'paths': {entry_point: dict(sorted(paths.items())) for entry_point, paths in sorted(self.paths.items())},
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        return report
+
+
+def main(path=LIMITS_FILE.format(deployment='proxy')):
+    """Prints a recommendation file written by the fuzzing test."""
+    with open(path) as f:
+        report = json.load(f)
+    for entry_point, paths in report['paths'].items():
+        print(f'{entry_point}: limit {report["recommended_gas_limits"][entry_point]}, '
+              f'ceiling {report["ceilings"][entry_point]}')
+        for name, stats in paths.items():
+            print(f'    {name:<24}max {stats["max"]:>7} over {stats["count"]} txs')
@@ -0,0 +1,81 @@
+"""Gas of every `Auction` entry point deployed directly and through the production proxy.
+
+Every call through `TransparentUpgradeableProxy` pays for the proxy code, the implementation
+slot read and the `delegatecall`. The same scenario runs against a direct and a proxied
+deployment, and the report lists both and the overhead per entry point. The scenario starts with
+one throwaway auction: the first `nonReentrant` call of a proxy writes a zero `_status` slot
+(the `ReentrancyGuard` constructor runs only for the implementation), which happens once per
+proxy lifetime and is not overhead of any entry point.
+
+Print the report with `brownie run gas_report`.
+"""
+from collections import OrderedDict
+
+from scripts.deploy_auction import deploy_auction
+from scripts.packed_calldata import pack_bid, short_bid_ether
+
+PRICE = 10**18
+
+
+def entry_point_gas(auction, nft, coin, auctioneer, bidders, sleep):
+    """
+    Runs one call of every user entry point on a fresh, unpaused auction and returns `{name: gas used}`.
+    `auction.allowedNFT()` must be `nft`; bidders need 10 tokens and 10 ether each. `sleep(seconds)` advances
+    the chain time.
+    """
+    bidder, other = bidders[:2]
+    nft_ids = [nft.mintWithTokenURI('uri', {'from': auctioneer}).events['Transfer']['tokenId'] for _ in range(9)]
+    nft.setApprovalForAll(auction, True, {'from': auctioneer})
+    for account in (bidder, other):
+        coin.approve(auction, 10 * PRICE, {'from': account})
+    warm_up, token, ether, packed, short, many_a, many_b, buy_now, cancel = nft_ids
+    auction.createAuction(nft, warm_up, PRICE, False, {'from': auctioneer})
+
+    gas = OrderedDict()
+    gas['createAuction'] = auction.createAuction(nft, token, PRICE, False, {'from': auctioneer}).gas_used
+    gas['createAuctionWithBuyNow'] = auction.createAuctionWithBuyNow(
+        nft, buy_now, PRICE, True, 2 * PRICE, {'from': auctioneer}).gas_used
+    for nft_id, is_ether in ((ether, True), (packed, False), (short, True), (many_a, False), (many_b, False),
+                             (cancel, False)):
+        auction.createAuction(nft, nft_id, PRICE, is_ether, {'from': auctioneer})
+    gas['changeReservePrice'] = auction.changeReservePrice(nft, cancel, 2 * PRICE, {'from': auctioneer}).gas_used
+    gas['cancelAuction'] = auction.cancelAuction(nft, cancel, {'from': auctioneer}).gas_used
+    gas['bid'] = auction.bid(nft, token, PRICE, {'from': bidder}).gas_used
+    gas['bid outbid'] = auction.bid(nft, token, 2 * PRICE, {'from': other}).gas_used
+    gas['bidEther'] = auction.bidEther(nft, ether, PRICE, {'from': bidder, 'value': PRICE}).gas_used
+    gas['bidPacked'] = auction.bidPacked(pack_bid(packed, PRICE), {'from': bidder}).gas_used
+    gas['fallback short bid ether'] = bidder.transfer(auction, PRICE, data=short_bid_ether(short, PRICE)).gas_used
+    gas['bidMany 2'] = auction.bidMany(nft, [many_a, many_b], [PRICE, PRICE], {'from': bidder}).gas_used
+    gas['buyNow'] = auction.buyNow(nft, buy_now, {'from': other, 'value': 2 * PRICE}).gas_used
+    sleep(auction.auctionDuration() + 1)
+    gas['claimWonNFT'] = auction.claimWonNFT(nft, token, {'from': other}).gas_used
+    return gas
+
+
+def proxy_overhead(direct, proxied):
+    """Returns `{name: (direct gas, proxied gas, overhead)}` of two `entry_point_gas` results."""
+    return OrderedDict((name, (direct[name], proxied[name], proxied[name] - direct[name])) for name in direct)
+
+
+def report(admin, proxy_admin, auctioneer, bidders, sleep):
+    """Deploys fresh contracts both ways, runs `entry_point_gas` on each and returns `proxy_overhead`."""
+    from brownie import ThronCoin, ThronNFT
+
+    gas = {}
+    for deployment in ('direct', 'proxy'):
+        coin = ThronCoin.deploy({'from': admin})
+        nft = ThronNFT.deploy({'from': admin})
+        for bidder in bidders[:2]:
+            coin.mint(bidder, 10 * PRICE, {'from': admin})
+        auction = deploy_auction(admin, coin, nft, deployment, proxy_admin)
+        gas[deployment] = entry_point_gas(auction, nft, coin, auctioneer, bidders, sleep)
+    return proxy_overhead(gas['direct'], gas['proxy'])
+
+
+def main():
+    from brownie import accounts, chain
+
+    admin, proxy_admin, auctioneer, *bidders = accounts[:5]
+    print(f'{"entry point":<26}{"direct":>10}{"proxy":>10}{"overhead":>10}')
+    for name, (direct, proxied, overhead) in report(admin, proxy_admin, auctioneer, bidders, chain.sleep).items():
+        print(f'{name:<26}{direct:>10}{proxied:>10}{overhead:>10}')
@@ -0,0 +1,284 @@
+"""Live block follower that fetches logs only for blocks whose `logsBloom` may contain our events.
+
+New headers arrive from an `eth_subscribe('newHeads')` WebSocket subscription (or from polling
+the latest block). The 2048-bit `logsBloom` of a header has 3 bits set for the address and for
+every topic of each log of the block, so a block without all bits of one of the watched
+addresses and of one of the event topic0s has none of our events and is passed on without any
+RPC call. Other blocks are fetched with `eth_getLogs` by block hash, a bloom false positive
+costs one call.
+
+Every followed header is checked against the previous one: a different `parentHash` (or a
+header at an already followed height) is a reorg. The follower walks the new branch back by
+parent hash to the last common block of its `max_reorg_depth` recent headers, calls
+`on_rollback(common block number)` and follows the new branch. Headers missed while
+disconnected are fetched by number.
+
+Compare RPC calls and follow latency with naive per-block `eth_getLogs` on a local chain with
+`brownie run header_follower`.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+import aiohttp
+import websockets
+from eth_utils import keccak
+
+from scripts.aggregates import ReorgTooDeep
+from scripts.log_decoder import LogDecoder
+
+BLOOM_BITS = 2048
+BLOCK_TIME = 13  # seconds, to extrapolate RPC calls per hour of the mainnet
+
+
+def bloom_mask(value):
+    """Returns the `logsBloom` bits of an address or topic (bytes) as an int."""
+    digest = keccak(value)
+    mask = 0
+    for i in (0, 2, 4):
+        mask |= 1 << (((digest[i] << 8) | digest[i + 1]) % BLOOM_BITS)
+    return mask
+
+
+def _to_bytes(value):
+    return bytes.fromhex(value[2:]) if isinstance(value, str) else bytes(value)
+
+
+class LogsBloomFilter:
+    """Tests a block's `logsBloom` for a log of one of `addresses` with one of `topics` as topic0."""
+
+    def __init__(self, addresses, topics):
+        self.address_masks = [bloom_mask(_to_bytes(address)) for address in addresses]
+        self.topic_masks = [bloom_mask(_to_bytes(topic)) for topic in topics]
+
+    def might_match(self, logs_bloom):
+        """False only if the block has no matching log, True may be a false positive."""
+        bloom = int(logs_bloom, 16) if isinstance(logs_bloom, str) else int.from_bytes(logs_bloom, 'big')
+        return (any(bloom & mask == mask for mask in self.address_masks) and
+                any(bloom & mask == mask for mask in self.topic_masks))
+
+
+class HeaderFollower:
+    """
+    :param rpc_url: JSON-RPC endpoint of the node.
+    :param addresses: contract addresses to follow (`Auction`, `ThronNFT`).
+    :param topics: topic0 values to follow, defaults to all events known by the decoder.
+    :param on_block: called with `(number, block_hash, records)` for every followed block in order,
+        `records` is empty for blocks skipped by the bloom filter.
+    :param on_rollback: called with the number of the last common block when a reorg abandons later blocks.
+    :param use_bloom: False fetches logs of every block, the naive follower.
+    :param metrics: `metrics.ServiceMetrics` recording RPC calls and lag, optional.
+    """
+
+    def __init__(self, rpc_url, addresses, topics=None, decoder=None, on_block=None, on_rollback=None,
+                 max_reorg_depth=64, poll_interval=1.0, use_bloom=True, metrics=None):
+        self.rpc_url = rpc_url
+        self.addresses = list(addresses)
+        self.decoder = decoder or LogDecoder()
+        self.topics = ['0x' + _to_bytes(topic).hex() for topic in (topics or self.decoder.topics)]
+        self.filter = LogsBloomFilter(self.addresses, self.topics) if use_bloom else None
+        self.on_block = on_block
+        self.on_rollback = on_rollback
+        self.max_reorg_depth = max_reorg_depth
+        self.poll_interval = poll_interval
+        self.history = deque(maxlen=max_reorg_depth)  # (number, hash) of followed blocks
+        self.stats = {'rpc_calls': 0, 'headers': 0, 'fetched_blocks': 0, 'skipped_blocks': 0,
+                      'false_positives': 0, 'events': 0, 'reorgs': 0}
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.watch_stats('header_follower', self.stats)
+
+    @property
+    def head(self):
+        """Returns `(number, hash)` of the last followed block or None."""
+        return self.history[-1] if self.history else None
+
+    async def _rpc(self, session, method, params):
+        self.stats['rpc_calls'] += 1
+        payload = {'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params}
+        start = time.perf_counter()
+        try:
+            async with session.post(self.rpc_url, json=payload) as response:
+                response.raise_for_status()
+                result = await response.json()
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.rpc(method, time.perf_counter() - start, error=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.rpc(method, time.perf_counter() - start, error='error' in result)
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return result['result']
+
+    async def handle_header(self, session, header):
+        """Follows a new header, fetching headers missed since the last one first."""
+        self.stats['headers'] += 1
+        number = int(header['number'], 16)
+        if self.history and number > self.history[-1][0] + 1:
+            for missing in range(self.history[-1][0] + 1, number):
+                await self._handle(session, await self._rpc(session, 'eth_getBlockByNumber', [hex(missing), False]))
+        await self._handle(session, header)
+        if self.metrics is not None:
+            self.metrics.lag(number, self.history[-1][0])
+
+    async def _handle(self, session, header):
+        number = int(header['number'], 16)
+        if self.history:
+            known = self._known_hash(number)
+            if known == header['hash']:
+                return  # already followed
+            last_number, last_hash = self.history[-1]
+            if number != last_number + 1 or header['parentHash'] != last_hash:
+                await self._reorg(session, header)
+                return
+        await self._process(session, header)
+
+    def _known_hash(self, number):
+        for known_number, block_hash in reversed(self.history):
+            if known_number == number:
+                return block_hash
+            if known_number < number:
+                break
+        return None
+
+    async def _reorg(self, session, header):
+        branch = [header]
+        number = int(header['number'], 16) - 1
+        parent_hash = header['parentHash']
+        while self._known_hash(number) != parent_hash:
+            if number < self.history[0][0]:
+                raise ReorgTooDeep('no common block in the last {} followed blocks'.format(len(self.history)))
+            parent = await self._rpc(session, 'eth_getBlockByHash', [parent_hash, False])
+            branch.append(parent)
+            parent_hash = parent['parentHash']
+            number -= 1
+        self.stats['reorgs'] += 1
+        while self.history and self.history[-1][0] > number:
+            self.history.pop()
+        if self.on_rollback is not None:
+            self.on_rollback(number)
+        for block in reversed(branch):
+            await self._process(session, block)
+
+    async def _process(self, session, header):
+        number = int(header['number'], 16)
+        records = []
+        if self.filter is None or self.filter.might_match(header['logsBloom']):
+            self.stats['fetched_blocks'] += 1
+            logs = await self._rpc(session, 'eth_getLogs', [{
+                'blockHash': header['hash'], 'address': self.addresses, 'topics': [self.topics]}])
+            records = list(self.decoder.decode_many(logs))
+            if not records:
+                self.stats['false_positives'] += 1
+            self.stats['events'] += len(records)
+            if self.metrics is not None:
+                self.metrics.count_events(records)
+        else:
+            self.stats['skipped_blocks'] += 1
+        self.history.append((number, header['hash']))
+        if self.on_block is not None:
+            self.on_block(number, header['hash'], records)
+
+    async def poll(self, session):
+        """Follows the latest block, the fallback without a WebSocket subscription."""
+        await self.handle_header(session, await self._rpc(session, 'eth_getBlockByNumber', ['latest', False]))
+
+    async def follow(self, ws_url=None):
+        """Follows new heads of the WebSocket subscription forever, polls the latest block without `ws_url`."""
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    if ws_url is None:
+                        await self.poll(session)
+                        await asyncio.sleep(self.poll_interval)
+                        continue
+                    async with websockets.connect(ws_url, max_size=None) as websocket:
+                        await websocket.send(json.dumps(
+                            {'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']}))
+                        json.loads(await websocket.recv())  # the subscription id
+                        async for raw in websocket:
+                            await self.handle_header(session, json.loads(raw)['params']['result'])
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, OSError,
+                        websockets.ConnectionClosed):
+                    await asyncio.sleep(self.poll_interval)  # missed headers are fetched after reconnecting
+
+
+def benchmark(blocks=500, match_share=0.05):
+    """
+    Mines `blocks` blocks of which `match_share` contain a bid and the others an unrelated token
+    transfer, prints RPC calls per block and per hour and the follow latency of the bloom and of the
+    naive follower subscribed to the same node, latency is measured from sending the transaction.
+    """
+    from brownie import ThronCoin, ThronNFT, Auction, accounts, web3
+
+    admin, auctioneer, bidder = accounts[:3]
+    coin = ThronCoin.deploy({'from': admin})
+    nft = ThronNFT.deploy({'from': admin})
+    auction = Auction.deploy({'from': admin})
+    auction.initialize(2 * 60, 5 * 60, 500, 100, coin.address, nft.address, admin, {'from': admin})
+    auction.unpause({'from': admin})
+    nft_id = nft.mintWithTokenURI('uri', {'from': auctioneer}).events['Transfer']['tokenId']
+    nft.approve(auction, nft_id, {'from': auctioneer})
+    auction.createAuction(nft, nft_id, 1000, False, {'from': auctioneer})
+    coin.mint(bidder, 10**30, {'from': admin})
+    coin.mint(admin, 10**30, {'from': admin})
+    coin.approve(auction, 2**256 - 1, {'from': bidder})
+
+    http_url = web3.provider.endpoint_uri
+    ws_url = 'ws' + http_url[len('http'):]
+    mined = {}
+    seen = {'logsBloom': {}, 'naive': {}}
+
+    def traffic():
+        rng = random.Random(46)
+        amount = 1000
+        for _ in range(blocks):
+            sent = time.perf_counter()
+            if rng.random() < match_share:
+                amount *= 2
+                tx = auction.bid(nft, nft_id, amount, {'from': bidder})
+            else:
+                tx = coin.transfer(auctioneer, 1, {'from': admin})
+            mined[tx.block_number] = sent
+
+    def on_block(name):
+        def record(number, block_hash, records):
+            seen[name].setdefault(number, time.perf_counter())
+        return record
+
+    followers = {name: HeaderFollower(http_url, [auction.address, nft.address], on_block=on_block(name),
+                                      use_bloom=name == 'logsBloom', decoder=LogDecoder(
+                                          {'Auction': Auction.abi, 'ThronNFT': ThronNFT.abi}))
+                 for name in seen}
+
+    async def run():
+        tasks = [asyncio.ensure_future(follower.follow(ws_url)) for follower in followers.values()]
+        await asyncio.sleep(1)
+        for follower in followers.values():
+            follower.stats['rpc_calls'] = 0
+        start = time.perf_counter()
+        await asyncio.get_event_loop().run_in_executor(None, traffic)
+        last = max(mined)
+        while any(last not in blocks_seen for blocks_seen in seen.values()):
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        for task in tasks:
+            task.cancel()
+        return elapsed
+
+    elapsed = asyncio.get_event_loop().run_until_complete(run())
+    print(f'{len(mined)} blocks in {elapsed:.1f}s')
+    for name, follower in followers.items():
+        latencies = sorted(seen[name][number] - mined[number] for number in mined if number in seen[name])
+        calls_per_block = follower.stats['rpc_calls'] / len(mined)
+        print(f'{name}: {calls_per_block:.3f} RPC calls per block, '
+              f'{calls_per_block * 3600 / BLOCK_TIME:,.0f} calls per hour at {BLOCK_TIME}s blocks, '
+              f'latency p50 {latencies[len(latencies) // 2] * 1000:.1f}ms '
+              f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms, stats {follower.stats}')
+
+
+def main():
+    benchmark()
@@ -0,0 +1,384 @@
+"""Streaming columnar export of decoded `Auction`/`ThronNFT` events and auction outcomes.
+
+Two tables are written into `<directory>/<table>/blocks=<first>-<last>/part-<block>.<ext>`, a
+partition covers `partition_blocks` blocks:
+
+* `events`: one row per decoded event with the common columns (nft, nft id, account, amount,
+  token) and all arguments as JSON in `args`,
+* `outcomes`: one row per claimed, bought or canceled auction with the final price, author
+  royalty, number of bids, overtime extensions and the duration since the first bid.
+
+Rows are buffered up to `batch_rows` per table, so memory is bounded by the batch and the live
+auctions, not by the history. Files are CSV or Parquet (`pyarrow`), uint256 values are written
+as decimal strings. A run commits at every partition boundary and at its end: parts are written
+as `.tmp` files, the export state (last block, live auctions) is saved and the parts are
+renamed. The next run appends from the last committed block, parts of an interrupted run are
+discarded.
+
+Benchmark rows per second and peak RSS with `brownie run history_export`.
+"""
+import csv
+import itertools
+import json
+import os
+import resource
+import tempfile
+import time
+
+from scripts.snapshot import iter_synthetic_events
+
+STATE_FILE = 'export-state.json'
+FORMATS = ('csv', 'parquet')
+EVENT_COLUMNS = (
+    ('block_number', int), ('log_index', int), ('transaction_hash', str), ('contract', str), ('event', str),
+    ('nft', str), ('nft_id', str), ('account', str), ('amount', str), ('token', str), ('args', str),
+)
+OUTCOME_COLUMNS = (
+    ('settled_block', int), ('transaction_hash', str), ('nft', str), ('nft_id', str), ('outcome', str),
+    ('auctioneer', str), ('token', str), ('start_price', str), ('created_block', int), ('winner', str),
+    ('final_price', str), ('royalty', str), ('auctioneer_payout', str), ('bids', int),
+    ('overtime_extensions', int), ('end_timestamp', int), ('duration', int),
+)
+# event name: (account, amount, token) argument names of the common `events` columns
+EVENT_FIELDS = {
+    'AuctionCreated': ('auctioneer', 'startPrice', 'priceToken'),
+    'BidSubmitted': ('bidder', 'amount', 'amountToken'),
+    'WonNftClaimed': ('winner', 'price', 'priceToken'),
+    'RoyaltyPaid': ('author', 'amount', 'amountToken'),
+    'AuctionCanceled': ('canceler', None, None),
+    'ReservePriceChanged': ('reservePriceChanger', 'startPrice', 'startPriceToken'),
+    'BuyNowPriceSet': (None, 'buyNowPrice', None),
+    'Transfer': ('to', None, None),
+    'Approval': ('approved', None, None),
+}
+# live auction fields
+AUCTIONEER, TOKEN, START_PRICE, CREATED_BLOCK, BIDS, EXTENSIONS, START, END, LAST_BID_TX = range(9)
+
+
+class ExportError(ValueError):
+    """Raised when the export directory has a different format or its state is corrupted."""
+
+
+def _hex(value):
+    if value is None or isinstance(value, str):
+        return value
+    return '0x' + bytes(value).hex()
+
+
+def _str(value):
+    return None if value is None else str(value)
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    return str(value)
+
+
+class _CsvPart:
+    def __init__(self, path, columns):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetPart:
+    def __init__(self, path, columns):
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema(
+            [(name, pyarrow.int64() if kind is int else pyarrow.string()) for name, kind in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        arrays = [self._pyarrow.array(column, type=field.type) for column, field in zip(zip(*rows), self._schema)]
+        self._writer.write_table(self._pyarrow.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class _Table:
+    """Rows of one table buffered and written into the part of the current block partition."""
+
+    def __init__(self, exporter, name, columns):
+        self.exporter = exporter
+        self.name = name
+        self.columns = columns
+        self.rows = 0
+        self._buffer = []
+        self._partition = None
+        self._part = None
+        self._part_path = None
+        self._part_block = None
+
+    def append(self, block_number, row):
+        partition = block_number // self.exporter.partition_blocks
+        if partition != self._partition:
+            self.close()
+            self._partition = partition
+        if self._part is None and not self._buffer:
+            self._part_block = block_number
+        self._buffer.append(row)
+        if len(self._buffer) >= self.exporter.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self._part is None:
+            self._open()
+        self._part.write(self._buffer)
+        self.rows += len(self._buffer)
+        self._buffer = []
+
+    def _open(self):
+        size = self.exporter.partition_blocks
+        directory = os.path.join(self.exporter.directory, self.name, 'blocks={:012d}-{:012d}'.format(
+            self._partition * size, (self._partition + 1) * size - 1))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, 'part-{:012d}.{}'.format(self._part_block, self.exporter.file_format))
+        self._part_path = path + '.tmp'
+        self._part = (_ParquetPart if self.exporter.file_format == 'parquet' else _CsvPart)(
+            self._part_path, self.columns)
+
+    def close(self):
+        """Writes the buffer and closes the part, it is renamed on the next commit."""
+        self.flush()
+        if self._part is not None:
+            self._part.close()
+            self.exporter.pending.append(self._part_path)
+            self._part = None
+
+
+class HistoryExporter:
+    """
+    :param directory: export directory, the state of previous runs is loaded from it.
+    :param file_format: 'csv' or 'parquet', must match the existing export.
+    :param partition_blocks: blocks per partition.
+    :param batch_rows: rows buffered per table before a write, the Parquet row group size.
+    """
+
+    def __init__(self, directory, file_format='csv', partition_blocks=100_000, batch_rows=10_000):
+        if file_format not in FORMATS:
+            raise ExportError('unknown format {}'.format(file_format))
+        self.directory = directory
+        self.file_format = file_format
+        self.partition_blocks = partition_blocks
+        self.batch_rows = batch_rows
+        self.last_block = None
+        self.auction_duration = None
+        self.live = {}
+        self.pending = []
+        self._load_state()
+        self.events = _Table(self, 'events', EVENT_COLUMNS)
+        self.outcomes = _Table(self, 'outcomes', OUTCOME_COLUMNS)
+        self._block = None
+
+    def _state_path(self):
+        return os.path.join(self.directory, STATE_FILE)
+
+    def _load_state(self):
+        path = self._state_path()
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+                live = {(nft, int(nft_id)): auction for nft, nft_id, auction in state['live']}
+            except (ValueError, KeyError, TypeError) as e:
+                raise ExportError('corrupted export state') from e
+            if state['format'] != self.file_format:
+                raise ExportError('export is in {} format'.format(state['format']))
+            self.last_block = state['last_block']
+            self.auction_duration = state['auction_duration']
+            self.live = live
+            for tmp_path in state['pending']:  # the last commit was interrupted before renaming
+                if os.path.exists(tmp_path):
+                    os.replace(tmp_path, tmp_path[:-len('.tmp')])
+        # parts of an interrupted run after the last commit
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.tmp'):
+                    os.unlink(os.path.join(root, name))
+
+    def commit(self, last_block):
+        """Closes the parts and saves the state, `last_block` and all blocks before it must be applied."""
+        self.events.close()
+        self.outcomes.close()
+        os.makedirs(self.directory, exist_ok=True)
+        state = {
+            'format': self.file_format,
+            'last_block': last_block,
+            'auction_duration': self.auction_duration,
+            'live': [[nft, nft_id, auction] for (nft, nft_id), auction in self.live.items()],
+            'pending': self.pending,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._state_path())
+        for path in self.pending:
+            os.replace(path, path[:-len('.tmp')])
+        self.pending = []
+        self.last_block = last_block
+
+    def apply(self, record):
+        """Exports a decoded record (`log_decoder.EventRecord`), records must be in chain order."""
+        block_number = record.block_number
+        if self._block is not None and block_number // self.partition_blocks != self._block // self.partition_blocks:
+            self.commit(block_number - 1)
+        self._block = block_number
+        name = record.name
+        args = dict(record.items())
+        nft = args.get('nft', record.address if 'tokenId' in args else None)
+        nft_id = args.get('nftId', args.get('tokenId'))
+        account, amount, token = EVENT_FIELDS.get(name, (None, None, None))
+        self.events.append(block_number, [
+            block_number, record.log_index, _hex(record.transaction_hash), record.address, name, nft, _str(nft_id),
+            args.get(account), _str(args.get(amount)), args.get(token),
+            json.dumps(args, default=_json_default, separators=(',', ':')),
+        ])
+        handler = getattr(self, '_on_' + name, None)
+        if handler is not None:
+            handler(record, args)
+
+    def export(self, records, to_block):
+        """Exports the records of the blocks up to `to_block` and commits, returns the number of records."""
+        count = 0
+        for count, record in enumerate(records, 1):
+            self.apply(record)
+        self.commit(to_block)
+        return count
+
+    def _on_AuctionDurationSet(self, record, args):
+        self.auction_duration = args['auctionDuration']
+
+    def _on_AuctionCreated(self, record, args):
+        self.live[(args['nft'], args['nftId'])] = [
+            args['auctioneer'], args['priceToken'], args['startPrice'], record.block_number, 0, 0, None, 0, None]
+
+    def _on_ReservePriceChanged(self, record, args):
+        auction = self.live.get((args['nft'], args['nftId']))
+        if auction is not None:
+            auction[START_PRICE] = args['startPrice']
+
+    def _on_BidSubmitted(self, record, args):
+        key = (args['nft'], args['nftId'])
+        auction = self.live.get(key)
+        if auction is None:  # created before the first exported block
+            auction = self.live[key] = [None, args['amountToken'], None, None, 0, 0, None, 0, None]
+        end = args['endTimestamp']
+        if auction[BIDS] == 0:
+            if self.auction_duration is not None:
+                auction[START] = end - self.auction_duration
+        elif end > auction[END]:
+            auction[EXTENSIONS] += 1
+        auction[BIDS] += 1
+        auction[END] = end
+        auction[LAST_BID_TX] = _hex(record.transaction_hash)
+
+    def _on_WonNftClaimed(self, record, args):
+        auction = self.live.pop((args['nft'], args['nftId']), None)
+        if auction is None:
+            auction = [args['auctioneer'], args['priceToken'], None, None, 0, 0, None, 0, None]
+        tx_hash = _hex(record.transaction_hash)
+        # `buyNow` submits the buying bid and settles in the same transaction
+        bought = tx_hash is not None and tx_hash == auction[LAST_BID_TX]
+        duration = None
+        if auction[START] is not None and not (bought and auction[BIDS] == 1):
+            duration = auction[END] - auction[START]
+        price = args['price']
+        self.outcomes.append(record.block_number, [
+            record.block_number, tx_hash, args['nft'], str(args['nftId']), 'bought' if bought else 'claimed',
+            args['auctioneer'], args['priceToken'], _str(auction[START_PRICE]), auction[CREATED_BLOCK],
+            args['winner'], str(price), str(price - args['auctioneerPayout']), str(args['auctioneerPayout']),
+            auction[BIDS], auction[EXTENSIONS], auction[END] or None, duration,
+        ])
+
+    def _on_AuctionCanceled(self, record, args):
+        auction = self.live.pop((args['nft'], args['nftId']), None) or [
+            args['auctioneer'], None, None, None, 0, 0, None, 0, None]
+        self.outcomes.append(record.block_number, [
+            record.block_number, _hex(record.transaction_hash), args['nft'], str(args['nftId']), 'canceled',
+            args['auctioneer'], auction[TOKEN], _str(auction[START_PRICE]), auction[CREATED_BLOCK],
+            None, None, None, None, 0, 0, None, None,
+        ])
+
+
+def iter_chain_records(web3, decoder, addresses, from_block, to_block, step=2000):
+    """Yields decoded records of `addresses` in `[from_block, to_block]`, fetched in `step` block chunks."""
+    for start in range(from_block, to_block + 1, step):
+        end = min(start + step - 1, to_block)
+        yield from decoder.decode_many(web3.eth.get_logs({'address': addresses, 'fromBlock': start, 'toBlock': end}))
+
+
+def export_chain(web3, directory, addresses, start_block=0, to_block=None, file_format='csv', decoder=None,
+                 **options):
+    """
+    Exports the events of `addresses` from the last exported block (or `start_block`) to `to_block`
+    (the latest block by default), returns the exporter.
+    """
+    from scripts.log_decoder import LogDecoder
+
+    exporter = HistoryExporter(directory, file_format, **options)
+    from_block = exporter.last_block + 1 if exporter.last_block is not None else start_block
+    to_block = web3.eth.block_number if to_block is None else to_block
+    if to_block >= from_block:
+        records = iter_chain_records(web3, decoder or LogDecoder(), addresses, from_block, to_block)
+        exporter.export(records, to_block)
+    return exporter
+
+
+class _SyntheticRecord:
+    __slots__ = ('name', 'args', 'address', 'block_number', 'log_index', 'transaction_hash')
+
+    def __getitem__(self, key):
+        return self.args[key]
+
+    def items(self):
+        return self.args.items()
+
+
+def iter_synthetic_records(n, events_per_block=20, seed=0):
+    """Yields `n` records of `snapshot.iter_synthetic_events` in blocks of `events_per_block` events."""
+    events = itertools.chain([('AuctionDurationSet', {'auctionDuration': 300})], iter_synthetic_events(seed))
+    for i, (name, args) in enumerate(itertools.islice(events, n)):
+        record = _SyntheticRecord()
+        record.name = name
+        record.args = args
+        record.address = args.get('nft')
+        record.block_number, record.log_index = divmod(i, events_per_block)
+        record.transaction_hash = '0x{:064x}'.format(i)
+        yield record
+
+
+def benchmark(n=10_000_000, file_format='csv', partition_blocks=100_000):
+    """Prints exported rows per second and peak RSS of a synthetic export of `n` events."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryDirectory() as directory:
+        exporter = HistoryExporter(directory, file_format, partition_blocks=partition_blocks)
+        start = time.perf_counter()
+        exporter.export(iter_synthetic_records(n), (n - 1) // 20)
+        elapsed = time.perf_counter() - start
+        rows = exporter.events.rows + exporter.outcomes.rows
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(directory) for name in names)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{file_format}: {exporter.events.rows} event rows, {exporter.outcomes.rows} outcome rows, '
+          f'{size / 2**20:.0f} MiB in {elapsed:.1f}s, {rows / elapsed:,.0f} rows/s')
+    print(f'peak RSS {peak / 1024:.0f} MiB (before export {rss / 1024:.0f} MiB), '
+          f'{len(exporter.live)} live auctions in the state')
+
+
+def main():
+    benchmark()
@@ -0,0 +1,256 @@
+"""Concurrent IPFS metadata fetcher with a content-addressed on-disk cache.
+
+Token URIs are read from `ThronNFT` with batched JSON-RPC `eth_call`s, the CID and path
+are extracted from gateway (`https://ipfs.io/ipfs/<CID>/metadata.json`) or `ipfs://` URIs,
+and the content is fetched from an HTTP gateway or from the IPFS HTTP API (`/api/v0/cat`,
+the endpoint `ipfshttpclient` uses) with bounded concurrency and retries.
+IPFS content is immutable, so cached entries are never revalidated.
+
+Benchmark against a local stand-in gateway with `brownie run ipfs_fetcher`.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+import aiohttp
+from eth_utils import keccak
+
+TOKEN_URI_SELECTOR = keccak(text='tokenURI(uint256)')[:4]
+_GATEWAY_URI = re.compile(r'^https?://[^/]+/ipfs/([^/?#]+)/?([^?#]*)')
+_IPFS_URI = re.compile(r'^ipfs://(?:ipfs/)?([^/?#]+)/?([^?#]*)')
+_CID = re.compile(r'^(?:Qm[1-9A-HJ-NP-Za-km-z]{44}|b[a-z2-7]{58,})$')  # CIDv0 base58btc, CIDv1 base32
+_BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+RETRY_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+
+
+class FetchError(Exception):
+    """Raised when content can't be fetched after all retries."""
+
+
+def parse_ipfs_uri(uri):
+    """
+    Returns `(cid, path)` of an IPFS gateway or `ipfs://` URI or None for other URIs.
+
+    The CID names cache files, so anything but a CIDv0 or base32 CIDv1 raises `ValueError`.
+    """
+    for pattern in (_GATEWAY_URI, _IPFS_URI):
+        match = pattern.match(uri)
+        if match:
+            if not _CID.match(match.group(1)):
+                raise ValueError('invalid CID in {!r}'.format(uri))
+            return match.group(1), match.group(2)
+    return None
+
+
+def synthetic_cid(n):
+    """Returns a well-formed CIDv0 made of the number `n`, for stand-in gateways."""
+    digits = []
+    for _ in range(44):
+        n, digit = divmod(n, 58)
+        digits.append(_BASE58[digit])
+    return 'Qm' + ''.join(reversed(digits))
+
+
+def _encode_token_uri_call(token_id):
+    return '0x' + (TOKEN_URI_SELECTOR + token_id.to_bytes(32, 'big')).hex()
+
+
+def _decode_string(result):
+    data = bytes.fromhex(result[2:])
+    if len(data) < 64:
+        return None
+    offset = int.from_bytes(data[:32], 'big')
+    length = int.from_bytes(data[offset:offset + 32], 'big')
+    return data[offset + 32:offset + 32 + length].decode('utf-8')
+
+
+async def read_token_uris(session, rpc_url, nft_address, token_ids, batch_size=500, metrics=None):
+    """
+    Reads `tokenURI` of many tokens with JSON-RPC batch requests.
+
+    Returns a dict of token id to URI, nonexistent tokens are mapped to None.
+    Batches are recorded as `eth_call` in `metrics` (`metrics.ServiceMetrics`) if given.
+    """
+    uris = {}
+    for start in range(0, len(token_ids), batch_size):
+        batch = token_ids[start:start + batch_size]
+        payload = [
+            {'jsonrpc': '2.0', 'id': i, 'method': 'eth_call',
+             'params': [{'to': nft_address, 'data': _encode_token_uri_call(token_id)}, 'latest']}
+            for i, token_id in enumerate(batch)
+        ]
+        sent = time.perf_counter()
+        async with session.post(rpc_url, json=payload) as response:
+            response.raise_for_status()
+            results = await response.json()
+        if metrics is not None:
+            metrics.rpc('eth_call', time.perf_counter() - sent, batch=len(batch))
+        for item in results:
+            token_id = batch[item['id']]
+            uris[token_id] = _decode_string(item['result']) if 'result' in item else None
+    return uris
+
+
+class ContentCache:
+    """On-disk cache of IPFS content keyed by CID and path."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, cid, path=''):
+        name = cid if not path else cid + '-' + hashlib.sha256(path.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, name)
+
+    def get(self, cid, path=''):
+        try:
+            with open(self.path(cid, path), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, cid, path, content):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, self.path(cid, path))
+
+
+class MetadataFetcher:
+    """
+    :param cache_dir: directory of the content cache.
+    :param gateway: gateway base URL, content is fetched from `<gateway>/ipfs/<cid>/<path>`.
+    :param api: IPFS HTTP API base URL (e.g. `http://127.0.0.1:5001`), used instead of the gateway if set.
+    :param concurrency: maximum number of concurrent HTTP requests.
+    :param retries: attempts after the first failed one, with exponential backoff from `backoff` seconds.
+    """
+
+    def __init__(self, cache_dir, gateway='https://ipfs.io', api=None, concurrency=64, retries=3, backoff=0.5,
+                 timeout=30):
+        self.cache = ContentCache(cache_dir)
+        self.gateway = gateway.rstrip('/')
+        self.api = api.rstrip('/') if api else None
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.stats = {'cache_hits': 0, 'fetched': 0, 'retries': 0, 'failed': 0}
+        self._semaphore = None
+        self._inflight = {}
+
+    async def _request(self, session, cid, path):
+        full_path = cid + ('/' + path if path else '')
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._semaphore:
+                    if self.api:
+                        request = session.post(self.api + '/api/v0/cat', params={'arg': full_path})
+                    else:
+                        request = session.get(self.gateway + '/ipfs/' + full_path)
+                    async with request as response:
+                        if response.status == 200:
+                            return await response.read()
+                        if response.status not in RETRY_STATUSES:
+                            raise FetchError('{} for {}'.format(response.status, full_path))
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        raise FetchError('retries exceeded for {}'.format(full_path))
+
+    async def fetch_content(self, session, cid, path=''):
+        """Returns the content from the cache or fetches it, concurrent requests of the same content are merged."""
+        content = self.cache.get(cid, path)
+        if content is not None:
+            self.stats['cache_hits'] += 1
+            return content
+        key = (cid, path)
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._inflight[key] = asyncio.ensure_future(self._request(session, cid, path))
+        try:
+            content = await future
+        finally:
+            del self._inflight[key]
+        self.cache.put(cid, path, content)
+        self.stats['fetched'] += 1
+        return content
+
+    async def fetch_json(self, session, cid, path=''):
+        """Returns the content parsed as JSON, raises `ValueError` for invalid JSON."""
+        return json.loads(await self.fetch_content(session, cid, path))
+
+    def session(self):
+        """Returns a new HTTP session to pass to `fetch_content`/`fetch_json`."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def fetch_uris(self, uris):
+        """Fetches JSON metadata of `{token_id: uri}`, returns `{token_id: metadata or None}`."""
+        async with self.session() as session:
+            return await self._fetch_all(session, uris)
+
+    async def _fetch_all(self, session, uris):
+        async def fetch_one(token_id, uri):
+            try:
+                parsed = parse_ipfs_uri(uri) if uri else None
+                if parsed is None:
+                    return token_id, None
+                return token_id, await self.fetch_json(session, *parsed)
+            except (FetchError, ValueError):
+                self.stats['failed'] += 1
+                return token_id, None
+
+        results = await asyncio.gather(*(fetch_one(token_id, uri) for token_id, uri in uris.items()))
+        return dict(results)
+
+    async def fetch_tokens(self, rpc_url, nft_address, token_ids, metrics=None):
+        """Reads token URIs in bulk and fetches their metadata, returns `{token_id: metadata or None}`."""
+        async with self.session() as session:
+            uris = await read_token_uris(session, rpc_url, nft_address, list(token_ids), metrics=metrics)
+            return await self._fetch_all(session, uris)
+
+
+async def _benchmark(n, latency, concurrency):
+    from aiohttp import web
+    from aiohttp.test_utils import unused_port
+
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return web.json_response({'name': request.match_info['cid'], 'image': 'ipfs://image'})
+
+    app = web.Application()
+    app.router.add_get('/ipfs/{cid}/metadata.json', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    port = unused_port()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    uris = {i: 'https://ipfs.io/ipfs/{}/metadata.json'.format(synthetic_cid(i)) for i in range(n)}
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            fetcher = MetadataFetcher(cache_dir, gateway='http://127.0.0.1:{}'.format(port), concurrency=concurrency)
+            for label in ('cold', 'warm'):
+                start = time.perf_counter()
+                results = await fetcher.fetch_uris(uris)
+                elapsed = time.perf_counter() - start
+                assert all(results.values())
+                print(f'{label} cache: {n} tokens in {elapsed:.2f}s, {n / elapsed:,.0f} tokens/s')
+    finally:
+        await runner.cleanup()
+
+
+def benchmark(n=10_000, latency=0.05, concurrency=64):
+    """Prints tokens per second with a local stand-in gateway answering after `latency` seconds."""
+    asyncio.get_event_loop().run_until_complete(_benchmark(n, latency, concurrency))
+
+
+def main():
+    benchmark()
@@ -0,0 +1,262 @@
+"""Settlement keeper: claims ended auctions with `claimWonNFT`.
+
+Live auctions with bids are kept in a heap ordered by `endTimestamp`. `BidSubmitted` carries the
+new end time, so overtime extensions push a fresher heap entry and the stale one is skipped when
+popped (lazy deletion). The keeper sleeps until the earliest auction ends, claims every due
+auction in batches, retries transient failures with exponential backoff and drops auctions
+that are already settled.
+
+Run against a node with `brownie run keeper --network <network>`, see `main`.
+"""
+import heapq
+import time
+
+from scripts.auction_state import ADDRESS_ZERO
+
+# revert reasons (custom errors of `Errors`) meaning the auction has nothing to settle anymore
+SETTLED_REASONS = ('EmptyWinner', 'AuctionNotExists')
+
+
+class ClaimError(Exception):
+    """A failed claim, `reason` is the revert reason if the transaction reverted."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class KeeperMetrics:
+    """Counters and lag between the end of auctions and their settlement, in clock seconds."""
+
+    def __init__(self):
+        self.claimed = 0
+        self.already_settled = 0
+        self.retries = 0
+        self.failed = 0
+        self.batches = 0
+        self.lags = []
+
+    def as_dict(self, pending=0, overdue=0, max_overdue=0):
+        return {
+            'claimed': self.claimed,
+            'already_settled': self.already_settled,
+            'retries': self.retries,
+            'failed': self.failed,
+            'batches': self.batches,
+            'pending': pending,
+            'overdue': overdue,
+            'max_overdue': max_overdue,
+            'lag_p50': _percentile(self.lags, 0.5),
+            'lag_p99': _percentile(self.lags, 0.99),
+            'lag_max': max(self.lags) if self.lags else 0,
+        }
+
+
+def brownie_claimer(auction, account, gas_limit=None):
+    """
+    Returns a `claim(keys)` callable for `SettlementKeeper` sending claims of a batch without
+    waiting for each other, then collecting their receipts.
+    """
+    from brownie.exceptions import VirtualMachineError
+
+    def claim(keys):
+        params = {'from': account, 'required_confs': 0}
+        if gas_limit:
+            params['gas_limit'] = gas_limit
+        sent = []
+        for nft, nft_id in keys:
+            try:
+                sent.append(auction.claimWonNFT(nft, nft_id, params))
+            except VirtualMachineError as exc:  # reverted on the development network or in gas estimation
+                sent.append(ClaimError(exc.revert_msg))
+            except (ValueError, ConnectionError) as exc:  # RPC errors
+                sent.append(exc)
+        results = []
+        for tx in sent:
+            if isinstance(tx, Exception):
+                results.append(tx)
+                continue
+            try:
+                tx.wait(1)
+            except VirtualMachineError:
+                pass
+            results.append(None if tx.status == 1 else ClaimError(tx.revert_msg))
+        return results
+
+    return claim
+
+
+class SettlementKeeper:
+    """
+    :param claim: `claim(keys)` settling a batch of `(nft, nftId)` keys, returns a list of None
+        for settled auctions or the exception of the failed claim, see `brownie_claimer`.
+    :param clock: current chain time in seconds, `claimWonNFT` succeeds once it's past `endTimestamp`.
+    :param batch_size: maximum number of claims sent at once.
+    :param retries: attempts after the first failed one, then the auction is given up.
+    :param backoff: seconds before the first retry, doubled on every next one.
+    """
+
+    def __init__(self, claim, clock=time.time, batch_size=50, retries=5, backoff=2):
+        self.claim = claim
+        self.clock = clock
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics = KeeperMetrics()
+        self._heap = []  # (due time, nft, nftId)
+        self._ends = {}  # (nft, nftId) -> endTimestamp of the live auction
+        self._due = {}  # (nft, nftId) -> due time of the live heap entry
+        self._attempts = {}
+
+    def __len__(self):
+        return len(self._ends)
+
+    def track(self, nft, nft_id, end_timestamp):
+        """Schedules the claim of an auction ending at `end_timestamp`, replaces the previous end time."""
+        key = (nft, nft_id)
+        self._ends[key] = end_timestamp
+        self._attempts.pop(key, None)
+        self._schedule(key, end_timestamp + 1)
+
+    def _schedule(self, key, due):
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, key[0], key[1]))
+
+    def untrack(self, nft, nft_id):
+        key = (nft, nft_id)
+        self._ends.pop(key, None)
+        self._due.pop(key, None)
+        self._attempts.pop(key, None)
+
+    def on_event(self, name, args):
+        """Updates the schedule from a decoded `Auction` event."""
+        if name == 'BidSubmitted':
+            self.track(args['nft'], args['nftId'], args['endTimestamp'])
+        elif name in ('WonNftClaimed', 'AuctionCanceled'):
+            self.untrack(args['nft'], args['nftId'])
+
+    def on_events(self, events):
+        """Applies decoded events having `name` (brownie events or `LogDecoder` records)."""
+        for event in events:
+            self.on_event(event.name, event)
+
+    def load(self, state):
+        """Schedules all auctions with bids of an `AuctionState`."""
+        for (nft, nft_id), auction in state.auctions.items():
+            if auction[3] != ADDRESS_ZERO:
+                self.track(nft, nft_id, auction[4])
+
+    def _peek(self):
+        """Returns the earliest live heap entry, dropping stale ones."""
+        heap = self._heap
+        while heap:
+            due, nft, nft_id = heap[0]
+            if self._due.get((nft, nft_id)) == due:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def next_wakeup(self):
+        """Returns the time the next auction becomes claimable or None if there is nothing to claim."""
+        entry = self._peek()
+        return entry[0] if entry is not None else None
+
+    def due(self, now=None):
+        """Pops up to `batch_size` claimable keys."""
+        now = self.clock() if now is None else now
+        keys = []
+        while len(keys) < self.batch_size:
+            entry = self._peek()
+            if entry is None or entry[0] > now:
+                break
+            heapq.heappop(self._heap)
+            key = (entry[1], entry[2])
+            del self._due[key]
+            keys.append(key)
+        return keys
+
+    def settle_due(self):
+        """Claims all auctions claimable now, returns the number of claim attempts."""
+        attempts = 0
+        while True:
+            keys = self.due()
+            if not keys:
+                return attempts
+            attempts += len(keys)
+            self.metrics.batches += 1
+            results = self.claim(keys)
+            settled_at = self.clock()
+            for key, error in zip(keys, results):
+                self._settled(key, error, settled_at)
+
+    def _settled(self, key, error, settled_at):
+        end = self._ends.get(key)
+        if end is None or key in self._due:  # settled or rescheduled by an event while the batch was in flight
+            return
+        if error is None:
+            self.metrics.claimed += 1
+            self.metrics.lags.append(settled_at - end)
+            self.untrack(*key)
+        elif getattr(error, 'reason', None) in SETTLED_REASONS:
+            self.metrics.already_settled += 1
+            self.untrack(*key)
+        else:
+            attempt = self._attempts.get(key, 0)
+            if attempt >= self.retries:
+                self.metrics.failed += 1
+                self.untrack(*key)
+                return
+            self.metrics.retries += 1
+            self._attempts[key] = attempt + 1
+            self._schedule(key, settled_at + self.backoff * 2 ** attempt)
+
+    def lag_metrics(self):
+        """Returns counters and lag percentiles, `overdue` counts claimable auctions not settled yet."""
+        now = self.clock()
+        overdue = [now - end for end in self._ends.values() if end < now]
+        return self.metrics.as_dict(len(self._ends), len(overdue), max(overdue, default=0))
+
+    def run(self, poll=None, max_sleep=15, sleep=time.sleep, stop=lambda: False):
+        """
+        Settles auctions until `stop()` returns True.
+
+        `poll()` is called on every wake-up to feed new events with `on_events`, the keeper
+        sleeps until the next auction ends but at most `max_sleep` seconds to poll for new bids.
+        """
+        while not stop():
+            if poll is not None:
+                poll()
+            self.settle_due()
+            wakeup = self.next_wakeup()
+            delay = max_sleep if wakeup is None else min(max_sleep, wakeup - self.clock())
+            if delay > 0:
+                sleep(delay)
+
+
+def main():
+    """Follows `Auction` logs of the latest deployment and settles auctions, needs a funded first account."""
+    from brownie import Auction, accounts, chain, web3
+    from brownie.network.event import decode_logs
+
+    auction = Auction[-1]
+    account = accounts[0]
+    keeper = SettlementKeeper(brownie_claimer(auction, account), clock=lambda: chain[-1].timestamp)
+    cursor = {'block': auction.tx.block_number if auction.tx else 0}
+
+    def poll():
+        head = web3.eth.block_number
+        if head < cursor['block']:
+            return
+        logs = web3.eth.get_logs({'address': auction.address, 'fromBlock': cursor['block'], 'toBlock': head})
+        keeper.on_events(decode_logs(logs))
+        cursor['block'] = head + 1
+        print(keeper.lag_metrics())
+
+    keeper.run(poll)
@@ -0,0 +1,257 @@
+"""Fast decoder of `Auction` and `ThronNFT` event logs.
+
+A topic0 dispatch table is built once from the compiled ABIs. Every event gets a precomputed
+layout: indexed arguments are read from topics and static data arguments are sliced from
+32-byte words, only events with dynamic data arguments fall back to `eth_abi`.
+Decoded logs are `__slots__` records instead of web3 `AttributeDict`s.
+
+Run the benchmark against the web3 decoder with `brownie run log_decoder`.
+"""
+import json
+import os
+import random
+import time
+from functools import lru_cache
+
+import eth_abi
+from eth_utils import keccak, to_checksum_address
+
+BUILD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'build', 'contracts')
+DEFAULT_CONTRACTS = ('Auction', 'ThronNFT')
+
+
+def load_abi(contract_name, build_dir=BUILD_DIR):
+    """Loads the ABI of a compiled contract from the brownie build directory."""
+    with open(os.path.join(build_dir, contract_name + '.json')) as f:
+        return json.load(f)['abi']
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value)
+
+
+@lru_cache(maxsize=4096)
+def _checksum(word):
+    return to_checksum_address(word[12:])
+
+
+def _lower_address(word):
+    return '0x' + word[12:].hex()
+
+
+def _uint(word):
+    return int.from_bytes(word, 'big')
+
+
+def _int(word):
+    return int.from_bytes(word, 'big', signed=True)
+
+
+def _bool(word):
+    return word[31] == 1
+
+
+def _bytes_n(size):
+    def decode(word):
+        return word[:size]
+    return decode
+
+
+def _word(word):
+    return word
+
+
+def _checksum_addresses(value):
+    """Checksums an address or the addresses of a (nested) address array decoded by `eth_abi`."""
+    if isinstance(value, (list, tuple)):
+        return [_checksum_addresses(item) for item in value]
+    return to_checksum_address(value)
+
+
+def _static_decoder(abi_type, checksum):
+    """Returns a decoder of a single 32-byte word or None if `abi_type` is not a static scalar type."""
+    if '[' in abi_type:  # arrays, even fixed-size ones of static types, are decoded by `eth_abi`
+        return None
+    if abi_type == 'address':
+        return _checksum if checksum else _lower_address
+    if abi_type.startswith('uint'):
+        return _uint
+    if abi_type.startswith('int'):
+        return _int
+    if abi_type == 'bool':
+        return _bool
+    if abi_type.startswith('bytes') and abi_type != 'bytes':
+        return _bytes_n(int(abi_type[5:]))
+    return None
+
+
+class EventRecord:
+    """Base class of decoded events, fields are also readable by key (`record['nftId']`)."""
+    __slots__ = ('address', 'block_number', 'log_index', 'transaction_hash')
+    name = None
+    fields = ()
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def keys(self):
+        return self.fields
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.fields]
+
+    def __eq__(self, other):
+        if isinstance(other, EventRecord):
+            return self.name == other.name and self.items() == other.items()
+        return dict(self.items()) == other
+
+    def __repr__(self):
+        return '{}({})'.format(self.name, ', '.join('{}={!r}'.format(k, v) for k, v in self.items()))
+
+
+class _EventLayout:
+    __slots__ = ('record_class', 'topic_count', 'topic_slots', 'data_slots', 'data_types', 'dynamic', 'size',
+                 'data_addresses')
+
+    def __init__(self, event_abi, checksum):
+        inputs = event_abi['inputs']
+        fields = tuple(i['name'] for i in inputs)
+        self.record_class = type(event_abi['name'], (EventRecord,), {
+            '__slots__': fields, 'name': event_abi['name'], 'fields': fields})
+        self.size = len(fields)
+        indexed = [(pos, i) for pos, i in enumerate(inputs) if i['indexed']]
+        data = [(pos, i) for pos, i in enumerate(inputs) if not i['indexed']]
+        self.topic_count = 1 + len(indexed)
+        # indexed dynamic values are stored as keccak hashes, so every topic is a single word
+        self.topic_slots = tuple((pos, _static_decoder(i['type'], checksum) or _word) for pos, i in indexed)
+        self.data_types = [i['type'] for _, i in data]
+        decoders = [_static_decoder(t, checksum) for t in self.data_types]
+        self.dynamic = any(d is None for d in decoders)
+        self.data_slots = tuple((pos, d) for (pos, _), d in zip(data, decoders))
+        self.data_addresses = tuple(t.split('[')[0] == 'address' for t in self.data_types)
+
+
+class LogDecoder:
+    """
+    Decodes raw logs (web3 log entries or JSON-RPC dicts) of the given ABIs.
+
+    :param abis: mapping of contract name to ABI, defaults to compiled `Auction` and `ThronNFT`.
+    :param checksum: return checksum addresses (cached), lowercase hex otherwise.
+    """
+
+    def __init__(self, abis=None, checksum=True):
+        if abis is None:
+            abis = {name: load_abi(name) for name in DEFAULT_CONTRACTS}
+        self._checksum = checksum
+        self._layouts = {}
+        for abi in abis.values():
+            for item in abi:
+                if item.get('type') != 'event' or item.get('anonymous'):
+                    continue
+                signature = '{}({})'.format(item['name'], ','.join(i['type'] for i in item['inputs']))
+                self._layouts.setdefault(keccak(text=signature), _EventLayout(item, checksum))
+
+    @property
+    def topics(self):
+        """The topic0 values of all known events."""
+        return list(self._layouts)
+
+    def decode(self, log):
+        """Returns the decoded record or None for unknown events."""
+        topics = log['topics']
+        layout = self._layouts.get(_to_bytes(topics[0]))
+        # ERC20 and ERC721 `Transfer`/`Approval` share topic0 but differ in indexed arguments
+        if layout is None or len(topics) != layout.topic_count:
+            return None
+        values = [None] * layout.size
+        for topic, (pos, decode) in zip(topics[1:], layout.topic_slots):
+            values[pos] = decode(_to_bytes(topic))
+        data = _to_bytes(log['data'])
+        if layout.dynamic:
+            decoded = eth_abi.decode_abi(layout.data_types, data)
+            for value, (pos, _), is_address in zip(decoded, layout.data_slots, layout.data_addresses):
+                values[pos] = _checksum_addresses(value) if is_address and self._checksum else value
+        else:
+            offset = 0
+            for pos, decode in layout.data_slots:
+                values[pos] = decode(data[offset:offset + 32])
+                offset += 32
+        record = layout.record_class.__new__(layout.record_class)
+        for name, value in zip(layout.record_class.fields, values):
+            setattr(record, name, value)
+        record.address = log.get('address')
+        record.block_number = log.get('blockNumber')
+        record.log_index = log.get('logIndex')
+        record.transaction_hash = log.get('transactionHash')
+        return record
+
+    def decode_many(self, logs):
+        """Yields decoded records of known events in the order of `logs`."""
+        decode = self.decode
+        for log in logs:
+            record = decode(log)
+            if record is not None:
+                yield record
+
+
+def synthetic_logs(abis, n, seed=0):
+    """Returns `n` JSON-RPC style logs of `BidSubmitted` events for benchmarks."""
+    rng = random.Random(seed)
+    event_abi = next(i for i in abis['Auction'] if i.get('type') == 'event' and i['name'] == 'BidSubmitted')
+    signature = 'BidSubmitted({})'.format(','.join(i['type'] for i in event_abi['inputs']))
+    topic0 = '0x' + keccak(text=signature).hex()
+    data_types = [i['type'] for i in event_abi['inputs'] if not i['indexed']]
+    addresses = ['0x' + rng.getrandbits(160).to_bytes(20, 'big').hex() for _ in range(100)]
+    logs = []
+    for i in range(n):
+        values = []
+        for t in data_types:
+            values.append(rng.choice(addresses) if t == 'address' else rng.getrandbits(40))
+        logs.append({
+            'address': addresses[0],
+            'topics': [topic0,
+                       '0x' + bytes(12).hex() + addresses[1][2:],
+                       '0x' + rng.getrandbits(16).to_bytes(32, 'big').hex(),
+                       '0x' + bytes(12).hex() + rng.choice(addresses)[2:]],
+            'data': '0x' + eth_abi.encode_abi(data_types, values).hex(),
+            'blockNumber': i // 10,
+            'blockHash': '0x' + bytes(32).hex(),
+            'logIndex': i % 10,
+            'transactionIndex': 0,
+            'transactionHash': '0x' + bytes(32).hex(),
+        })
+    return logs
+
+
+def benchmark(n=1_000_000, web3_sample=100_000):
+    """Prints decoded logs per second of `LogDecoder` and of web3's `get_event_data`."""
+    from web3 import Web3
+    from web3._utils.events import get_event_data
+    from hexbytes import HexBytes
+
+    abis = {name: load_abi(name) for name in DEFAULT_CONTRACTS}
+    logs = synthetic_logs(abis, n)
+
+    decoder = LogDecoder(abis)
+    start = time.perf_counter()
+    for _ in decoder.decode_many(logs):
+        pass
+    elapsed = time.perf_counter() - start
+    print(f'LogDecoder: {n} logs in {elapsed:.2f}s, {n / elapsed:,.0f} logs/s')
+
+    codec = Web3().codec
+    event_abi = next(i for i in abis['Auction'] if i.get('type') == 'event' and i['name'] == 'BidSubmitted')
+    sample = [dict(log, topics=[HexBytes(t) for t in log['topics']]) for log in logs[:web3_sample]]
+    start = time.perf_counter()
+    for log in sample:
+        get_event_data(codec, event_abi, log)
+    web3_elapsed = time.perf_counter() - start
+    print(f'web3 get_event_data: {len(sample)} logs in {web3_elapsed:.2f}s, '
+          f'{len(sample) / web3_elapsed:,.0f} logs/s')
+    print(f'speedup: {(n / elapsed) / (len(sample) / web3_elapsed):.1f}x')
+
+
+def main():
+    benchmark()
@@ -0,0 +1,442 @@
+"""Metrics and per-stage timing spans of the chain-facing services, exported in Prometheus text format.
+
+Metrics are plain Python objects updated in place without locks (a lost increment under
+thread contention is accepted to keep updates at a few hundred nanoseconds), histograms keep
+per-bucket counts and are made cumulative only when rendered. Components that already keep
+their own counters (`ViewCache.stats`, `MetadataFetcher.stats`, `SettlementKeeper.metrics`,
+`BidPushServer.stats`) are read by collectors at scrape time, so they cost nothing in between.
+
+`ServiceMetrics` defines the common metric set: RPC calls by method with latency and batch
+sizes, blocks behind head, decoded events per `Auction` event type, cache hit rates and store
+write latency. RPC calls of web3 are measured by `web3_middleware`, raw JSON-RPC clients call
+`ServiceMetrics.rpc` themselves. Serve `/metrics` with `serve`.
+
+Measure the overhead on the decode -> apply path with `brownie run metrics`.
+"""
+import bisect
+import threading
+import time
+from collections import Counter as _TypeCounter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import attrgetter
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 10, 100, 500, 1000, 2000, 5000, 10_000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+_record_name = attrgetter('name')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ('{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+             for name, value in zip(names, values))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """Base class of metrics, `labels(*values)` returns the child of a label combination."""
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children = {}
+        if not self.label_names:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError('{} expects labels {}'.format(self.name, self.label_names))
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        """Yields `(suffix, label names, label values, value)` of all children."""
+        for values, child in list(self._children.items()):
+            yield '', self.label_names, values, child.value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._default.value = value
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def samples(self):
+        names = self.label_names + ('le',)
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                yield '_bucket', names, values + (_format_value(bound),), cumulative
+            yield '_sum', self.label_names, values, child.sum
+            yield '_count', self.label_names, values, child.count
+
+
+class Registry:
+    """Named metrics and collectors rendered together by `render`."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels, **kwargs)
+            elif type(metric) is not cls or metric.label_names != tuple(labels):
+                raise ValueError('metric {} is already registered differently'.format(name))
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._get_or_create(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+    def add_collector(self, collect):
+        """
+        Adds `collect()` called on every render, it returns `(name, kind, help, samples)` tuples where
+        samples are `(label dict, value)` pairs.
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append('# HELP {} {}'.format(metric.name, metric.help))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.kind))
+            for suffix, names, values, value in metric.samples():
+                lines.append('{}{}{} {}'.format(metric.name, suffix, _format_labels(names, values), _format_value(value)))
+        for collect in self._collectors:
+            for name, kind, help, samples in collect():
+                lines.append('# HELP {} {}'.format(name, help))
+                lines.append('# TYPE {} {}'.format(name, kind))
+                for labels, value in samples:
+                    lines.append('{}{} {}'.format(name, _format_labels(labels, labels.values()), _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+
+class _Span:
+    __slots__ = ('_tracer', '_child', 'stage', 'start', 'parent')
+
+    def __init__(self, tracer, stage):
+        self._tracer = tracer
+        self._child = tracer.histogram.labels(stage)
+        self.stage = stage
+
+    def __enter__(self):
+        local = self._tracer._local
+        self.parent = getattr(local, 'span', None)
+        local.span = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        self._child.observe(duration)
+        self._tracer._local.span = self.parent
+        if self._tracer.recent is not None:
+            self._tracer.recent.append((self.stage, self.parent.stage if self.parent else None, self.start, duration))
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """
+    Per-stage timing spans, `with tracer.span('decode'): ...` observes the duration in
+    `stage_seconds{stage=...}`.
+
+    :param enabled: spans are no-ops if False.
+    :param keep: number of finished spans `(stage, parent stage, start, duration)` kept in `recent`.
+    """
+
+    def __init__(self, registry, enabled=True, keep=0):
+        self.enabled = enabled
+        self.histogram = registry.histogram('stage_seconds', 'Duration of pipeline stages.', ('stage',))
+        self.recent = deque(maxlen=keep) if keep else None
+        self._local = threading.local()
+
+    def span(self, stage):
+        return _Span(self, stage) if self.enabled else _NO_SPAN
+
+
+class ServiceMetrics:
+    """The metric set of the services, with helpers to feed it."""
+
+    def __init__(self, registry=None, spans=True, keep_spans=0):
+        self.registry = registry = registry or Registry()
+        self.rpc_calls = registry.counter('rpc_calls_total', 'JSON-RPC calls by method.', ('method',))
+        self.rpc_errors = registry.counter('rpc_errors_total', 'Failed JSON-RPC calls by method.', ('method',))
+        self.rpc_seconds = registry.histogram('rpc_seconds', 'JSON-RPC call latency by method.', ('method',))
+        self.rpc_batch_size = registry.histogram(
+            'rpc_batch_size', 'Requests per JSON-RPC batch, logs per eth_getLogs call.', ('method',), SIZE_BUCKETS)
+        self.head_block = registry.gauge('chain_head_block', 'Latest block number of the node.')
+        self.processed_block = registry.gauge('processed_block', 'Last block processed by the service.')
+        self.blocks_behind = registry.gauge('blocks_behind_head', 'Blocks between the node head and processing.')
+        self.events = registry.counter('events_decoded_total', 'Decoded events by event type.', ('event',))
+        self.store_write_seconds = registry.histogram(
+            'store_write_seconds', 'Latency of writes to state stores and snapshots.', ('store',))
+        self.tracer = Tracer(registry, spans, keep_spans)
+        self._event_children = {}
+        self._started = time.monotonic()
+        registry.add_collector(self._collect_rates)
+
+    def rpc(self, method, seconds, batch=None, error=False):
+        """Records a JSON-RPC call, `batch` is the number of requests of a batch or of returned items."""
+        self.rpc_calls.labels(method).value += 1
+        self.rpc_seconds.labels(method).observe(seconds)
+        if batch is not None:
+            self.rpc_batch_size.labels(method).observe(batch)
+        if error:
+            self.rpc_errors.labels(method).value += 1
+
+    def lag(self, head, processed):
+        self.head_block.set(head)
+        self.processed_block.set(processed)
+        self.blocks_behind.set(max(0, head - processed))
+
+    def count_events(self, records):
+        """Counts decoded events (records with a `name`) by event type, returns `records`."""
+        children = self._event_children
+        for name, count in _TypeCounter(map(_record_name, records)).items():
+            child = children.get(name)
+            if child is None:
+                child = children[name] = self.events.labels(name)
+            child.value += count
+        return records
+
+    def store_write(self, store):
+        """Returns a context manager timing a write to `store`, independent of `spans`."""
+        return _StoreWrite(self.store_write_seconds.labels(store))
+
+    def span(self, stage):
+        return self.tracer.span(stage)
+
+    def _collect_rates(self):
+        elapsed = time.monotonic() - self._started
+        samples = [({'event': name}, child.value / elapsed) for name, child in list(self._event_children.items())]
+        yield 'events_decoded_per_second', 'gauge', 'Average decoded events per second since start.', samples
+
+    def watch_stats(self, component, stats):
+        """
+        Exports a stats dict (e.g. `MetadataFetcher.stats`) or an object with `as_dict`
+        (`CacheStats`, `KeeperMetrics`) as `<component>_<key>` gauges at scrape time.
+        """
+        def collect():
+            values = stats.as_dict() if hasattr(stats, 'as_dict') else dict(stats)
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield '{}_{}'.format(component, key), 'gauge', '{} {}.'.format(component, key), [({}, value)]
+        self.registry.add_collector(collect)
+
+    def watch_view_cache(self, cache, name='view_cache'):
+        self.watch_stats(name, cache.stats)
+
+    def watch_metadata_fetcher(self, fetcher, name='metadata'):
+        def hit_rate():
+            stats = fetcher.stats
+            total = stats['cache_hits'] + stats['fetched']
+            yield name + '_cache_hit_rate', 'gauge', 'Share of metadata served from the content cache.', \
+                [({}, stats['cache_hits'] / total if total else 0.0)]
+        self.watch_stats(name, fetcher.stats)
+        self.registry.add_collector(hit_rate)
+
+
+class _StoreWrite:
+    __slots__ = ('_child', '_start')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+
+
+def web3_middleware(metrics):
+    """
+    Returns a web3 middleware recording every RPC call, add it with
+    `web3.middleware_onion.add(web3_middleware(metrics), 'metrics')`.
+    """
+    def middleware(make_request, web3):
+        def request(method, params):
+            start = time.perf_counter()
+            try:
+                response = make_request(method, params)
+            except Exception:
+                metrics.rpc(method, time.perf_counter() - start, error=True)
+                raise
+            result = response.get('result')
+            metrics.rpc(method, time.perf_counter() - start,
+                        batch=len(result) if isinstance(result, list) else None, error='error' in response)
+            return response
+        return request
+    return middleware
+
+
+def serve(registry, host='0.0.0.0', port=9100):
+    """Serves `GET /metrics` from a daemon thread, returns the server (`shutdown()` stops it)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark(n=1_000_000, chunk=2000):
+    """Prints the decode -> apply throughput of synthetic logs with and without instrumentation."""
+    from scripts.auction_state import AuctionState
+    from scripts.log_decoder import DEFAULT_CONTRACTS, LogDecoder, load_abi, synthetic_logs
+
+    abis = {name: load_abi(name) for name in DEFAULT_CONTRACTS}
+    logs = synthetic_logs(abis, n)
+    decoder = LogDecoder(abis)
+    # the logs are bids of auctions that were never created, so they are created up front
+    keys = {(record['nft'], record['nftId']) for record in decoder.decode_many(logs)}
+
+    def run(metrics):
+        state = AuctionState()
+        for nft, nft_id in keys:
+            state.auctions[(nft, nft_id)] = [0, None, None, None, 0]
+        start = time.perf_counter()
+        for i in range(0, n, chunk):
+            batch = logs[i:i + chunk]
+            if metrics is None:
+                for record in decoder.decode_many(batch):
+                    state.apply(record.name, record)
+                continue
+            metrics.rpc('eth_getLogs', 0.0, batch=len(batch))
+            with metrics.span('decode_apply'), metrics.store_write('auction_state'):
+                for record in metrics.count_events(list(decoder.decode_many(batch))):
+                    state.apply(record.name, record)
+            metrics.lag(n // 10, i // 10)
+        return time.perf_counter() - start
+
+    run(None)  # warm up the decoder caches
+    plain = min(run(None) for _ in range(3))
+    metrics = ServiceMetrics(keep_spans=1000)
+    instrumented = min(run(metrics) for _ in range(3))
+    print(f'plain: {n / plain:,.0f} events/s, instrumented: {n / instrumented:,.0f} events/s, '
+          f'overhead {(instrumented - plain) / plain:.1%}')
+
+    counter = metrics.rpc_calls.labels('eth_call')
+    histogram = metrics.rpc_seconds.labels('eth_call')
+    for name, op in (('counter inc', lambda: counter.inc()), ('histogram observe', lambda: histogram.observe(0.01)),
+                     ('span', lambda: metrics.span('x').__enter__().__exit__())):
+        start = time.perf_counter()
+        for _ in range(100_000):
+            op()
+        print(f'{name}: {(time.perf_counter() - start) / 100_000 * 1e9:.0f} ns')
+    start = time.perf_counter()
+    size = len(metrics.registry.render())
+    print(f'render: {size} bytes in {(time.perf_counter() - start) * 1000:.2f} ms')
+
+
+def main():
+    benchmark()
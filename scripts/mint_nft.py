@@ -0,0 +1,49 @@
+"""Mints `ThronNFT` tokens through `TxPipeline`, the Python counterpart of `mint-nft.js`.
+
+All mints of a collection are sent back to back, token ids are predicted from `nextTokenId`
+so dependent transactions (approvals, auctions) can be sent before the mints are mined.
+
+Mint with `brownie run mint_nft --network <network>`.
+"""
+from eth_utils import keccak
+
+from scripts.tx_pipeline import TxPipeline, TxError, local_accounts, web3_contract
+
+MINT_GAS = 300_000
+TRANSFER_TOPIC = keccak(text='Transfer(address,address,uint256)')
+NFT_URI = 'empty_uri'
+
+
+def minted_token_ids(receipt, nft_address):
+    """Returns ids of tokens minted in a receipt."""
+    return [int.from_bytes(bytes(log['topics'][3]), 'big') for log in receipt['logs']
+            if log['address'] == nft_address and bytes(log['topics'][0]) == TRANSFER_TOPIC
+            and int.from_bytes(bytes(log['topics'][1]), 'big') == 0]
+
+
+def send_mints(pipeline, nft, account, uris, gas=MINT_GAS):
+    """Sends mints of `uris` without waiting, returns `(pending transactions, expected token ids)`."""
+    first_id = nft.functions.nextTokenId().call()
+    pending = [pipeline.transact(account, nft.functions.mintWithTokenURI(uri), gas) for uri in uris]
+    return pending, list(range(first_id, first_id + len(uris)))
+
+
+def check_minted(pipeline, pending, token_ids, nft_address):
+    """Waits for mints sent by `send_mints`, raises `TxError` if the ids differ from the expected ones."""
+    receipts = pipeline.wait_all(pending)
+    minted = [token_id for receipt in receipts for token_id in minted_token_ids(receipt, nft_address)]
+    if minted != token_ids:
+        raise TxError('minted ids {} differ from expected {}, tokens were minted concurrently'.format(
+            minted, token_ids))
+    return minted
+
+
+def main(count=1, uri=NFT_URI):
+    from brownie import ThronNFT, accounts, web3
+
+    nft = web3_contract(web3, ThronNFT[-1])
+    account = local_accounts([accounts[0]])[0]
+    with TxPipeline(web3) as pipeline:
+        pending, token_ids = send_mints(pipeline, nft, account, [uri] * count)
+        check_minted(pipeline, pending, token_ids, nft.address)
+    print(f'NFT tokens {token_ids} minted to {account.address}')
@@ -0,0 +1,96 @@
+"""Encoder of the packed `Auction` entry points on `allowedNFT` tokens.
+
+`bidPacked(bytes32)`/`bidEtherPacked(bytes32)` take `nftId` (uint96) in the highest 12 bytes
+followed by `amount` (uint128), the lowest 4 bytes are unused. The short entry points routed by
+the contract's `fallback` drop the function selector and the unused bytes: one operation byte
+followed by the packed arguments. Send them as plain transactions to the auction with the
+calldata as `data` (and the bid as `value` for ether bids).
+
+Compare calldata bytes and gas of all bid encodings with `brownie run packed_calldata`.
+"""
+SHORT_BID = 0x01
+SHORT_BID_ETHER = 0x02
+SHORT_CLAIM = 0x03
+MAX_NFT_ID = 2**96 - 1
+MAX_AMOUNT = 2**128 - 1
+# EIP-2028 calldata costs
+ZERO_BYTE_GAS = 4
+NONZERO_BYTE_GAS = 16
+
+
+def _check(nft_id, amount=0):
+    if not 0 <= nft_id <= MAX_NFT_ID:
+        raise ValueError('nftId {} does not fit into uint96'.format(nft_id))
+    if not 0 <= amount <= MAX_AMOUNT:
+        raise ValueError('amount {} does not fit into uint128'.format(amount))
+
+
+def pack_bid(nft_id, amount):
+    """Returns the `bytes32` argument of `bidPacked`/`bidEtherPacked`."""
+    _check(nft_id, amount)
+    return nft_id.to_bytes(12, 'big') + amount.to_bytes(16, 'big') + bytes(4)
+
+
+def unpack_bid(packed):
+    """Returns `(nftId, amount)` of a packed bid, the inverse of `pack_bid`."""
+    value = int.from_bytes(bytes(packed), 'big')
+    return value >> 160, (value >> 32) & MAX_AMOUNT
+
+
+def _hex(data):
+    return '0x' + data.hex()
+
+
+def short_bid(nft_id, amount):
+    """Returns the 29-byte calldata of a token bid."""
+    return _hex(bytes([SHORT_BID]) + pack_bid(nft_id, amount)[:28])
+
+
+def short_bid_ether(nft_id, amount):
+    """Returns the 29-byte calldata of an ether bid, send `amount` less the own previous bid as value."""
+    return _hex(bytes([SHORT_BID_ETHER]) + pack_bid(nft_id, amount)[:28])
+
+
+def short_claim(nft_id):
+    """Returns the 13-byte calldata of `claimWonNFT`."""
+    _check(nft_id)
+    return _hex(bytes([SHORT_CLAIM]) + nft_id.to_bytes(12, 'big'))
+
+
+def calldata_gas(data):
+    """Returns the intrinsic gas of calldata bytes or hex string."""
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:] if data.startswith('0x') else data)
+    zeros = data.count(0)
+    return zeros * ZERO_BYTE_GAS + (len(data) - zeros) * NONZERO_BYTE_GAS
+
+
+def main(amount=5 * 10**17):
+    """Deploys fresh contracts and prints calldata size, calldata gas and gas used of every bid encoding."""
+    from brownie import ThronCoin, ThronNFT, Auction, accounts
+
+    admin, author, bidder = accounts[:3]
+    coin = ThronCoin.deploy({'from': admin})
+    nft = ThronNFT.deploy({'from': admin})
+    auction = Auction.deploy({'from': admin})
+    auction.initialize(2 * 60, 5 * 60, 500, 100, coin.address, nft.address, admin, {'from': admin})
+    auction.unpause({'from': admin})
+    coin.mint(bidder, 10**24, {'from': admin})
+    coin.approve(auction, 2**256 - 1, {'from': bidder})
+
+    def listed():
+        token_id = nft.mintWithTokenURI('uri', {'from': author}).events['Transfer']['tokenId']
+        nft.approve(auction, token_id, {'from': author})
+        auction.createAuction(nft, token_id, 1, False, {'from': author})
+        return token_id
+
+    encodings = {
+        'bid': lambda token_id: auction.bid.encode_input(nft, token_id, amount),
+        'bidPacked': lambda token_id: auction.bidPacked.encode_input(pack_bid(token_id, amount)),
+        'short bid': lambda token_id: short_bid(token_id, amount),
+    }
+    for name, encode in encodings.items():
+        token_id = listed()
+        data = encode(token_id)
+        tx = bidder.transfer(auction, 0, data=data)
+        print(f'{name}: {(len(data) - 2) // 2} bytes, {calldata_gas(data)} calldata gas, {tx.gas_used} gas used')
@@ -0,0 +1,445 @@
+"""Recorded replay corpus of a synthetic marketplace and a replay harness for chain consumers.
+
+`simulate` drives a local chain through mints, token and ether listings, reserve price
+changes, cancels, single and `bidMany` bids, overtime storms (bursts of bids inside the
+overtime window) and claims. `record` stores the raw JSON-RPC blocks and receipts of a block
+range as gzip-compressed JSON lines: a header line with the chain id, contract addresses and
+block range, then one `{"block": ..., "receipts": [...]}` line per block.
+
+`replay` serves a recording from a stand-in JSON-RPC server in a child process and runs a
+consumer `consume(rpc_url, header)` returning the number of processed events, at full speed
+and then under `tracemalloc` for its peak memory. Consumers are looked up in `CONSUMERS` or
+given as `module:function`.
+
+Record with `brownie run replay_corpus` on a development network, replay offline with
+`brownie run replay_corpus benchmark <path> <consumer>`.
+"""
+import bisect
+import gzip
+import importlib
+import json
+import multiprocessing
+import random
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.create_auctions import APPROVE_GAS, BID_GAS, CANCEL_GAS, CLAIM_GAS, URI, seed_collection
+from scripts.tx_pipeline import TxError, TxPipeline, local_accounts, web3_contract
+
+CORPUS_VERSION = 1
+MAX_UINT256 = 2**256 - 1
+MINT_COIN_GAS = 100_000
+RESERVE_GAS = 200_000
+BID_MANY_GAS = 100_000  # plus BID_GAS per auction
+
+
+class CorpusError(ValueError):
+    """Raised for recordings of unknown version or malformed content."""
+
+
+def _wait(pipeline, pending, stats):
+    """Waits for `pending`, reverted transactions are counted instead of raised."""
+    for tx in pending:
+        try:
+            tx.wait()
+        except TxError:
+            stats['reverted'] += 1
+    pending.clear()
+
+
+def _next_amount(price, step, has_bid):
+    return price if not has_bid else price * (10_000 + 2 * step) // 10_000 + 1
+
+
+def simulate(pipeline, coin, nft, auction, accounts, sleep, auctions=2000, round_size=200, seed=0):
+    """
+    Runs the marketplace scenario with web3 contracts and local accounts: the first account
+    mints payable tokens (it must have the minter role), the next three are authors, the others bid.
+    `sleep(seconds)` advances the chain time, e.g. `chain.sleep`. Returns action counters.
+    """
+    rng = random.Random(seed)
+    admin, authors, bidders = accounts[0], accounts[1:4], accounts[4:]
+    step = auction.functions.minPriceStepNumerator().call()
+    duration = auction.functions.auctionDuration().call()
+    overtime = auction.functions.overtimeWindow().call()
+    stats = dict.fromkeys(('listed', 'ether_listed', 'reserve_changes', 'cancels', 'bids', 'bid_many',
+                           'storm_bids', 'claims', 'reverted'), 0)
+    pending = []
+    for bidder in bidders:
+        pending.append(pipeline.transact(admin, coin.functions.mint(bidder.address, 10**30), MINT_COIN_GAS))
+        pending.append(pipeline.transact(bidder, coin.functions.approve(auction.address, MAX_UINT256), APPROVE_GAS))
+    _wait(pipeline, pending, stats)
+
+    def place(bidder, nft_id):
+        item = live[nft_id]
+        amount = _next_amount(item['price'], step, item['bidder'] is not None)
+        if item['ether']:
+            call = auction.functions.bidEther(nft.address, nft_id, amount)
+            pending.append(pipeline.transact(bidder, call, BID_GAS, value=amount))
+        else:
+            pending.append(pipeline.transact(bidder, auction.functions.bid(nft.address, nft_id, amount), BID_GAS))
+        item['price'], item['bidder'] = amount, bidder
+
+    for offset in range(0, auctions, round_size):
+        live = {}
+        count = min(round_size, auctions - offset)
+        for author in authors:
+            for is_ether in (False, True):
+                share = count // (len(authors) * (3 if is_ether else 1))
+                if not share:
+                    continue
+                start_price = rng.randint(10**14, 10**16)
+                for nft_id in seed_collection(pipeline, nft, auction, author, [URI] * share, start_price, is_ether):
+                    live[nft_id] = {'author': author, 'ether': is_ether, 'price': start_price, 'bidder': None}
+                stats['ether_listed' if is_ether else 'listed'] += share
+
+        for nft_id, item in list(live.items()):
+            if rng.random() < 0.1:
+                item['price'] = rng.randint(10**14, 10**16)
+                call = auction.functions.changeReservePrice(nft.address, nft_id, item['price'])
+                pending.append(pipeline.transact(item['author'], call, RESERVE_GAS))
+                stats['reserve_changes'] += 1
+            if rng.random() < 0.1:
+                pending.append(pipeline.transact(
+                    item['author'], auction.functions.cancelAuction(nft.address, nft_id), CANCEL_GAS))
+                del live[nft_id]
+                stats['cancels'] += 1
+
+        # first bids on token auctions partly in bulk
+        token_ids = [nft_id for nft_id, item in live.items() if not item['ether']]
+        bulk = token_ids[:len(token_ids) // 3]
+        for start in range(0, len(bulk), 20):
+            bidder, chunk = rng.choice(bidders), bulk[start:start + 20]
+            amounts = [live[nft_id]['price'] for nft_id in chunk]
+            call = auction.functions.bidMany(nft.address, chunk, amounts)
+            pending.append(pipeline.transact(bidder, call, BID_MANY_GAS + BID_GAS * len(chunk)))
+            for nft_id in chunk:
+                live[nft_id]['bidder'] = bidder
+            stats['bid_many'] += 1
+        bulk = set(bulk)
+        for nft_id, item in live.items():
+            for _ in range(rng.randint(1 if nft_id in bulk else 0, 5)):
+                place(rng.choice([b for b in bidders if b is not item['bidder']]), nft_id)
+                stats['bids'] += 1
+        _wait(pipeline, pending, stats)
+
+        # overtime storms: alternating bids inside the overtime window, each extending the end
+        sleep(duration - overtime // 2)
+        started = [nft_id for nft_id, item in live.items() if item['bidder'] is not None]
+        for nft_id in rng.sample(started, len(started) // 10):
+            first, second = rng.sample(bidders, 2)
+            for _ in range(rng.randint(10, 30)):
+                place(first if live[nft_id]['bidder'] is not first else second, nft_id)
+                stats['storm_bids'] += 1
+        _wait(pipeline, pending, stats)
+
+        sleep(overtime + 1)
+        for nft_id in started:
+            winner = live[nft_id]['bidder']
+            pending.append(pipeline.transact(winner, auction.functions.claimWonNFT(nft.address, nft_id), CLAIM_GAS))
+            stats['claims'] += 1
+        _wait(pipeline, pending, stats)
+    return stats
+
+
+def record(web3, path, from_block, to_block, contracts):
+    """
+    Writes raw blocks (with transaction hashes) and receipts of `[from_block, to_block]` to a
+    gzip JSON lines file, `contracts` maps contract names to addresses. Returns the number of logs.
+    """
+    def request(method, params):
+        response = web3.provider.make_request(method, params)
+        if 'error' in response:
+            raise CorpusError('{} failed: {}'.format(method, response['error']))
+        return response['result']
+
+    header = {'version': CORPUS_VERSION, 'chainId': request('eth_chainId', []), 'contracts': contracts,
+              'fromBlock': from_block, 'toBlock': to_block}
+    logs = 0
+    with gzip.open(path, 'wt', compresslevel=6) as f:
+        f.write(json.dumps(header) + '\n')
+        for number in range(from_block, to_block + 1):
+            block = request('eth_getBlockByNumber', [hex(number), False])
+            receipts = [request('eth_getTransactionReceipt', [tx_hash]) for tx_hash in block['transactions']]
+            logs += sum(len(receipt['logs']) for receipt in receipts)
+            f.write(json.dumps({'block': block, 'receipts': receipts}, separators=(',', ':')) + '\n')
+    return logs
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else [v.lower() for v in value]
+
+
+class Corpus:
+    """A loaded recording answering the JSON-RPC methods consumers of logs use."""
+
+    def __init__(self, path):
+        self.blocks = []
+        self.block_by_hash = {}
+        self.receipts = {}
+        self.logs = []
+        self.log_blocks = []  # block number of every log, for bisection
+        with gzip.open(path, 'rt') as f:
+            self.header = json.loads(f.readline())
+            if self.header.get('version') != CORPUS_VERSION:
+                raise CorpusError('unsupported corpus version')
+            for line in f:
+                item = json.loads(line)
+                block = item['block']
+                self.blocks.append(block)
+                self.block_by_hash[block['hash']] = block
+                number = int(block['number'], 16)
+                for receipt in item['receipts']:
+                    self.receipts[receipt['transactionHash']] = receipt
+                    for log in receipt['logs']:
+                        self.logs.append(log)
+                        self.log_blocks.append(number)
+        if not self.blocks:
+            raise CorpusError('empty corpus')
+        self.first_block = int(self.blocks[0]['number'], 16)
+
+    @property
+    def head(self):
+        return self.first_block + len(self.blocks) - 1
+
+    def _block_number(self, tag):
+        if tag in (None, 'latest', 'pending', 'safe', 'finalized'):
+            return self.head
+        if tag == 'earliest':
+            return self.first_block
+        return int(tag, 16) if isinstance(tag, str) else tag
+
+    def _block(self, number):
+        index = number - self.first_block
+        return self.blocks[index] if 0 <= index < len(self.blocks) else None
+
+    def get_logs(self, log_filter):
+        if 'blockHash' in log_filter:
+            block = self.block_by_hash.get(log_filter['blockHash'])
+            if block is None:
+                return []
+            from_block = to_block = int(block['number'], 16)
+        else:
+            from_block = self._block_number(log_filter.get('fromBlock'))
+            to_block = self._block_number(log_filter.get('toBlock'))
+        address = log_filter.get('address')
+        addresses = None if address is None else set(_lower([address] if isinstance(address, str) else address))
+        topics = [None if t is None else set(_lower([t] if isinstance(t, str) else t))
+                  for t in log_filter.get('topics') or []]
+        result = []
+        start = bisect.bisect_left(self.log_blocks, from_block)
+        end = bisect.bisect_right(self.log_blocks, to_block)
+        for log in self.logs[start:end]:
+            if addresses is not None and log['address'].lower() not in addresses:
+                continue
+            if len(topics) > len(log['topics']) or any(
+                    wanted is not None and topic.lower() not in wanted for wanted, topic in zip(topics, log['topics'])):
+                continue
+            result.append(log)
+        return result
+
+    def call(self, method, params):
+        """Returns the result of a JSON-RPC method, raises `KeyError` for unsupported methods."""
+        if method == 'eth_blockNumber':
+            return hex(self.head)
+        if method == 'eth_chainId':
+            return self.header['chainId']
+        if method == 'net_version':
+            return str(int(self.header['chainId'], 16))
+        if method == 'eth_getBlockByNumber':
+            return self._block(self._block_number(params[0]))
+        if method == 'eth_getBlockByHash':
+            return self.block_by_hash.get(params[0])
+        if method == 'eth_getTransactionReceipt':
+            return self.receipts.get(params[0])
+        if method == 'eth_getLogs':
+            return self.get_logs(params[0])
+        raise KeyError(method)
+
+    def handle(self, request):
+        """Answers a JSON-RPC request or batch (parsed JSON)."""
+        if isinstance(request, list):
+            return [self.handle(item) for item in request]
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            response['result'] = self.call(request['method'], request.get('params') or [])
+        except KeyError:
+            response['error'] = {'code': -32601, 'message': 'method not found: {}'.format(request.get('method'))}
+        except (ValueError, TypeError, IndexError) as e:
+            response['error'] = {'code': -32602, 'message': 'invalid params: {}'.format(e)}
+        return response
+
+
+def serve_corpus(corpus, host='127.0.0.1', port=0):
+    """Returns a `ThreadingHTTPServer` answering JSON-RPC from `corpus`, call `serve_forever` to run it."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            body = json.dumps(corpus.handle(request), separators=(',', ':')).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def _serve_process(path, connection):
+    server = serve_corpus(Corpus(path))
+    connection.send(server.server_port)
+    server.serve_forever()
+
+
+def _rpc(session, url, method, params):
+    response = session.post(url, json={'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params})
+    response.raise_for_status()
+    result = response.json()
+    if 'error' in result:
+        raise CorpusError(result['error'])
+    return result['result']
+
+
+def decode_consumer(rpc_url, header, step=2000):
+    """Fetches `Auction` logs with raw JSON-RPC and decodes them with `LogDecoder`."""
+    import requests
+    from scripts.log_decoder import LogDecoder
+
+    decoder = LogDecoder()
+    count = 0
+    with requests.Session() as session:
+        head = int(_rpc(session, rpc_url, 'eth_blockNumber', []), 16)
+        for start in range(header['fromBlock'], head + 1, step):
+            logs = _rpc(session, rpc_url, 'eth_getLogs', [{
+                'address': header['contracts']['Auction'], 'fromBlock': hex(start),
+                'toBlock': hex(min(start + step - 1, head))}])
+            for _ in decoder.decode_many(logs):
+                count += 1
+    return count
+
+
+def state_consumer(rpc_url, header, step=2000):
+    """Rebuilds `AuctionState` through web3 and `snapshot.replay`, the indexer cold start path."""
+    from web3 import Web3
+    from scripts.auction_state import AuctionState
+    from scripts.log_decoder import LogDecoder
+    from scripts.snapshot import replay as replay_logs
+
+    web3 = Web3(Web3.HTTPProvider(rpc_url))
+    decoder = LogDecoder()
+    counted = []
+
+    class CountingState(AuctionState):
+        def apply(self, name, args):
+            counted.append(None)
+            super().apply(name, args)
+
+    replay_logs(web3, decoder, CountingState(), [header['contracts']['Auction']], header['fromBlock'],
+                web3.eth.block_number, step)
+    return len(counted)
+
+
+def aggregates_consumer(rpc_url, header, step=2000):
+    """Decodes logs with raw JSON-RPC and applies them block by block to `Aggregates`."""
+    import requests
+    from scripts.aggregates import Aggregates
+    from scripts.log_decoder import LogDecoder
+
+    decoder = LogDecoder()
+    aggregates = Aggregates()
+    count = 0
+    with requests.Session() as session:
+        head = int(_rpc(session, rpc_url, 'eth_blockNumber', []), 16)
+        for start in range(header['fromBlock'], head + 1, step):
+            logs = _rpc(session, rpc_url, 'eth_getLogs', [{
+                'address': header['contracts']['Auction'], 'fromBlock': hex(start),
+                'toBlock': hex(min(start + step - 1, head))}])
+            blocks = {}
+            for record in decoder.decode_many(logs):
+                blocks.setdefault(int(record.block_number, 16), []).append((record.name, record))
+                count += 1
+            for number in sorted(blocks):
+                aggregates.apply_block(number, str(number).encode(), blocks[number])
+    return count
+
+
+CONSUMERS = {'decode': decode_consumer, 'state': state_consumer, 'aggregates': aggregates_consumer}
+
+
+def _consumer(consumer):
+    if callable(consumer):
+        return consumer
+    if consumer in CONSUMERS:
+        return CONSUMERS[consumer]
+    module, _, function = consumer.partition(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def replay(path, consumer, measure_memory=True):
+    """
+    Runs `consumer` against a stand-in RPC server of the recording at `path`, returns
+    `{'events', 'seconds', 'events_per_second', 'peak_memory'}` (peak traced bytes or None).
+    """
+    consume = _consumer(consumer)
+    with gzip.open(path, 'rt') as f:
+        header = json.loads(f.readline())
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = multiprocessing.Process(target=_serve_process, args=(path, sender), daemon=True)
+    server.start()
+    try:
+        if not receiver.poll(600):
+            raise CorpusError('stand-in RPC server did not start')
+        rpc_url = 'http://127.0.0.1:{}'.format(receiver.recv())
+        start = time.perf_counter()
+        events = consume(rpc_url, header)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            try:
+                consume(rpc_url, header)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    finally:
+        server.terminate()
+        server.join()
+    return {'events': events, 'seconds': elapsed, 'events_per_second': events / elapsed if elapsed else 0.0,
+            'peak_memory': peak}
+
+
+def main(path='corpus.jsonl.gz', auctions=2000):
+    """Deploys fresh contracts, runs the scenario on the development chain and records it."""
+    from brownie import ThronCoin, ThronNFT, Auction, accounts, chain, web3
+
+    admin = accounts[0]
+    from_block = web3.eth.block_number + 1
+    coin = ThronCoin.deploy({'from': admin})
+    nft = ThronNFT.deploy({'from': admin})
+    auction = Auction.deploy({'from': admin})
+    auction.initialize(2 * 60, 5 * 60, 500, 100, coin.address, nft.address, admin, {'from': admin})
+    auction.unpause({'from': admin})
+
+    with TxPipeline(web3, poll_interval=0.01) as pipeline:
+        stats = simulate(pipeline, web3_contract(web3, coin), web3_contract(web3, nft), web3_contract(web3, auction),
+                         local_accounts(accounts[:10]), chain.sleep, int(auctions))
+    print(stats)
+    contracts = {'ThronCoin': coin.address, 'ThronNFT': nft.address, 'Auction': auction.address}
+    logs = record(web3, path, from_block, web3.eth.block_number, contracts)
+    print(f'recorded blocks {from_block}..{web3.eth.block_number} with {logs} logs to {path}')
+
+
+def benchmark(path='corpus.jsonl.gz', *consumers):
+    """Replays the recording with every consumer (all of `CONSUMERS` by default) and prints the results."""
+    for consumer in consumers or CONSUMERS:
+        result = replay(path, consumer)
+        print(f'{consumer}: {result["events"]} events in {result["seconds"]:.2f}s, '
+              f'{result["events_per_second"]:,.0f} events/s, peak memory {result["peak_memory"] / 2**20:.1f} MiB')
@@ -0,0 +1,282 @@
+"""Compact msgpack snapshots of `AuctionState` for fast indexer cold start.
+
+A snapshot holds live auctions, bid history, per-author royalty totals, free deposits, admin
+settings and the last processed block. Addresses are interned into a single table and uint256
+values that don't fit into 64 bits are stored as big-endian bytes. Snapshots are memory mapped
+on load and checked against the on-chain block hash, so a snapshot of a reorged block is never used.
+
+Report the cold start time with and without a snapshot with `brownie run snapshot`.
+"""
+import itertools
+import mmap
+import os
+import random
+import re
+import tempfile
+import time
+
+import msgpack
+from web3.exceptions import BlockNotFound
+
+from scripts.auction_state import AuctionState, ADDRESS_ZERO
+
+VERSION = 2
+SNAPSHOT_NAME = re.compile(r'^snapshot-(\d+)\.msgpack$')
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot is corrupted, of unknown version or doesn't match the chain."""
+
+
+def _pack_int(value):
+    return value if value < 2**64 else value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+def _unpack_int(value):
+    return int.from_bytes(value, 'big') if isinstance(value, bytes) else value
+
+
+def dumps(state):
+    """Serializes the state to msgpack bytes."""
+    index = {}
+    addresses = []
+
+    def intern(address):
+        i = index.get(address)
+        if i is None:
+            i = index[address] = len(addresses)
+            addresses.append(address)
+        return i
+
+    auctions = [
+        [intern(nft), _pack_int(nft_id), _pack_int(bid), intern(token), intern(auctioneer), intern(bidder), end]
+        for (nft, nft_id), (bid, token, auctioneer, bidder, end) in state.auctions.items()
+    ]
+    bids = [
+        [intern(nft), _pack_int(nft_id),
+         [[intern(bidder), _pack_int(amount), intern(token), end] for bidder, amount, token, end in history]]
+        for (nft, nft_id), history in state.bids.items()
+    ]
+    royalties = [[intern(author), intern(token), _pack_int(total)]
+                 for (author, token), total in state.royalties.items()]
+    deposits = [[intern(account), intern(token), _pack_int(balance)]
+                for (account, token), balance in state.deposits.items()]
+    return msgpack.packb({
+        'version': VERSION,
+        'block_number': state.block_number,
+        'block_hash': bytes(state.block_hash) if state.block_hash is not None else None,
+        'addresses': addresses,
+        'auctions': auctions,
+        'bids': bids,
+        'royalties': royalties,
+        'deposits': deposits,
+        'config': state.config,
+        'paused': state.paused,
+        'admin': state.admin,
+    }, use_bin_type=True)
+
+
+def _restore(raw):
+    addresses = raw['addresses']
+    state = AuctionState()
+    state.set_block(raw['block_number'], raw['block_hash'])
+    for nft, nft_id, bid, token, auctioneer, bidder, end in raw['auctions']:
+        state.auctions[(addresses[nft], _unpack_int(nft_id))] = [
+            _unpack_int(bid), addresses[token], addresses[auctioneer], addresses[bidder], end]
+    for nft, nft_id, history in raw['bids']:
+        state.bids[(addresses[nft], _unpack_int(nft_id))] = [
+            (addresses[bidder], _unpack_int(amount), addresses[token], end) for bidder, amount, token, end in history]
+    for author, token, total in raw['royalties']:
+        state.royalties[(addresses[author], addresses[token])] = _unpack_int(total)
+    for account, token, balance in raw['deposits']:
+        state.deposits[(addresses[account], addresses[token])] = _unpack_int(balance)
+    state.config = raw['config']
+    state.paused = raw['paused']
+    state.admin = raw['admin']
+    return state
+
+
+def loads(data):
+    """Deserializes the state from msgpack bytes or any buffer (e.g. `mmap`)."""
+    try:
+        raw = msgpack.unpackb(data, raw=False)
+    except Exception as e:
+        raise SnapshotError('corrupted snapshot') from e
+    if not isinstance(raw, dict) or raw.get('version') != VERSION:
+        raise SnapshotError('unsupported snapshot version')
+    try:
+        return _restore(raw)
+    except (KeyError, TypeError, IndexError, ValueError) as e:  # well-formed msgpack of a different shape
+        raise SnapshotError('corrupted snapshot') from e
+
+
+def save(state, directory, metrics=None):
+    """Atomically writes `snapshot-<block>.msgpack` into `directory` and returns its path."""
+    if state.block_number is None:
+        raise SnapshotError('state has no processed block')
+    if metrics is not None:
+        with metrics.store_write('snapshot'):
+            return save(state, directory)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'snapshot-{:012d}.msgpack'.format(state.block_number))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps(state))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def load(path, web3=None):
+    """
+    Loads a snapshot file with memory mapping.
+
+    If `web3` is given the snapshot block hash is checked against the chain.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise SnapshotError('empty snapshot')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            state = loads(data)
+    if web3 is not None:
+        try:
+            block = web3.eth.get_block(state.block_number)
+        except BlockNotFound:  # the chain is behind the snapshot, e.g. reset
+            raise SnapshotError('snapshot block {} is not on chain'.format(state.block_number))
+        if bytes(block['hash']) != state.block_hash:
+            raise SnapshotError('snapshot block {} is not on chain'.format(state.block_number))
+    return state
+
+
+def list_snapshots(directory):
+    """Returns snapshot paths, the newest first."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = SNAPSHOT_NAME.match(name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, name)))
+    return [path for _, path in sorted(found, reverse=True)]
+
+
+def replay(web3, decoder, state, addresses, from_block, to_block, step=2000, metrics=None):
+    """
+    Applies logs of `addresses` in `[from_block, to_block]` to the state in `step` block chunks.
+
+    `metrics` (`metrics.ServiceMetrics`) records lag, decoded events and the decode/apply span if given,
+    RPC calls are recorded by its web3 middleware.
+    """
+    for start in range(from_block, to_block + 1, step):
+        end = min(start + step - 1, to_block)
+        logs = web3.eth.get_logs({'address': addresses, 'fromBlock': start, 'toBlock': end})
+        if metrics is None:
+            for record in decoder.decode_many(logs):
+                state.apply(record.name, record)
+            continue
+        with metrics.span('decode_apply'):
+            for record in metrics.count_events(list(decoder.decode_many(logs))):
+                state.apply(record.name, record)
+        metrics.lag(to_block, end)
+    if to_block >= from_block:
+        state.set_block(to_block, bytes(web3.eth.get_block(to_block)['hash']))
+    return state
+
+
+def cold_start(directory, web3, decoder, addresses, start_block=0, metrics=None, paused=True):
+    """
+    Loads the newest snapshot that is still on chain and replays only the tail of logs.
+
+    Falls back to older snapshots and finally to a full replay from `start_block`, starting with the
+    `paused` state of `AuctionState`.
+    """
+    state = None
+    for path in list_snapshots(directory):
+        try:
+            state = load(path, web3)
+            break
+        except SnapshotError:
+            continue
+    from_block = state.block_number + 1 if state is not None else start_block
+    if state is None:
+        state = AuctionState(paused)
+    return replay(web3, decoder, state, addresses, from_block, web3.eth.block_number, metrics=metrics)
+
+
+def synthetic_events(n, seed=0):
+    """Returns `n` decoded-like `(name, args)` events of a marketplace: listings, outbids and claims."""
+    return list(itertools.islice(iter_synthetic_events(seed), n))
+
+
+def iter_synthetic_events(seed=0):
+    """Yields the endless event stream of `synthetic_events`."""
+    rng = random.Random(seed)
+    nft = '0x' + rng.getrandbits(160).to_bytes(20, 'big').hex()
+    token = '0x' + rng.getrandbits(160).to_bytes(20, 'big').hex()
+    users = ['0x' + rng.getrandbits(160).to_bytes(20, 'big').hex() for _ in range(1000)]
+    nft_id = 0
+    while True:
+        nft_id += 1
+        auctioneer = rng.choice(users)
+        price_token = token if rng.random() < 0.7 else ADDRESS_ZERO
+        price = rng.randint(10**17, 10**19)
+        yield ('AuctionCreated', {'nft': nft, 'nftId': nft_id, 'auctioneer': auctioneer,
+                                  'startPrice': price, 'priceToken': price_token})
+        end = 1600000000 + nft_id
+        bids = rng.randint(0, 8)
+        bidder = ADDRESS_ZERO
+        for _ in range(bids):
+            previous_bidder, refund = bidder, price if bidder != ADDRESS_ZERO else 0
+            price = price * 105 // 100
+            end += rng.randint(0, 120)
+            bidder = rng.choice(users)
+            yield ('BidSubmitted', {'nft': nft, 'nftId': nft_id, 'bidder': bidder,
+                                    'amount': price, 'amountToken': price_token, 'endTimestamp': end,
+                                    'previousBidder': previous_bidder, 'refund': refund})
+        outcome = rng.random()
+        if bids and outcome < 0.8:
+            author = rng.choice(users)
+            royalty = price // 100 if author != auctioneer else 0
+            yield ('WonNftClaimed', {'nft': nft, 'nftId': nft_id, 'winner': bidder, 'claimCaller': bidder,
+                                     'auctioneer': auctioneer, 'price': price, 'priceToken': price_token,
+                                     'auctioneerPayout': price - royalty})
+            if royalty:
+                yield ('RoyaltyPaid', {'nft': nft, 'nftId': nft_id, 'author': author,
+                                       'amount': royalty, 'amountToken': price_token})
+        elif not bids and outcome < 0.5:
+            yield ('AuctionCanceled', {'nft': nft, 'nftId': nft_id, 'canceler': auctioneer,
+                                       'auctioneer': auctioneer})
+
+
+def benchmark(n=1_000_000, tail=0.01):
+    """Prints the cold start time of a full replay of `n` events and of snapshot load plus replay of the tail."""
+    events = synthetic_events(n)
+    split = int(n * (1 - tail))
+
+    start = time.perf_counter()
+    state = AuctionState()
+    state.apply_many(events)
+    full = time.perf_counter() - start
+    print(f'full replay of {n} events: {full:.2f}s')
+
+    state = AuctionState()
+    state.apply_many(events[:split])
+    state.set_block(split, bytes(32))
+    with tempfile.TemporaryDirectory() as directory:
+        path = save(state, directory)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        state = load(path)
+        state.apply_many(events[split:])
+        warm = time.perf_counter() - start
+    print(f'snapshot ({size / 2**20:.1f} MiB) load + replay of {n - split} events: {warm:.2f}s')
+    print(f'live auctions: {len(state.auctions)}, bid histories: {len(state.bids)}')
+
+
+def main():
+    benchmark()
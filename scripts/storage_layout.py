@@ -0,0 +1,162 @@
+"""Storage layout snapshots of `Auction` and their compatibility between `getRevision` versions.
+
+An upgrade of the proxy keeps its storage. A new revision therefore may only add variables in the
+slots of `__gap`, or after every variable of the previous revision. Variables of the previous
+revision must keep their slot, offset and type; renaming them is allowed. The layout of every
+revision is kept in `contracts_flat/storage_layouts/Auction-<revision>.json`, as reported by solc
+for `contracts_flat/FlatAuction.sol`. The tests compare the current source with the snapshot of
+its revision and every snapshot with the one of the previous revision.
+
+Check the current source and write the snapshot of its revision with `brownie run storage_layout`.
+"""
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, 'contracts_flat', 'FlatAuction.sol')
+LAYOUT_DIR = os.path.join(ROOT, 'contracts_flat', 'storage_layouts')
+CONTRACT = 'Auction'
+SOLC_VERSION = '0.8.6'
+GAP_PREFIX = '__gap'
+
+
+class StorageLayoutError(ValueError):
+    """A new revision moves or retypes variables of the previous one."""
+
+
+def source_revision(source):
+    """Returns the revision returned by `getRevision` in a Solidity source."""
+    match = re.search(r'function getRevision\(\)[^{]*\{\s*return\s+(\d+)\s*;', source)
+    if match is None:
+        raise StorageLayoutError('getRevision not found')
+    return int(match.group(1))
+
+
+def _describe(type_id, types):
+    """Returns a type name including the member layout of structs, stable across compilations."""
+    layout = types[type_id]
+    if 'members' in layout:
+        members = ', '.join('{}@{}:{} {}'.format(
+            member['label'], member['slot'], member['offset'], _describe(member['type'], types))
+            for member in layout['members'])
+        return '{}{{{}}}'.format(layout['label'], members)
+    if 'key' in layout:
+        return 'mapping({} => {})'.format(_describe(layout['key'], types), _describe(layout['value'], types))
+    if 'base' in layout:
+        label = layout['label']
+        return _describe(layout['base'], types) + label[label.rindex('['):]
+    return layout['label']
+
+
+def normalize(storage_layout):
+    """Converts a solc `storageLayout` output to the snapshot entries sorted by position."""
+    types = storage_layout['types'] or {}
+    entries = [{'label': variable['label'], 'slot': int(variable['slot']), 'offset': variable['offset'],
+                'bytes': int(types[variable['type']]['numberOfBytes']),
+                'type': _describe(variable['type'], types)}
+               for variable in storage_layout['storage']]
+    return sorted(entries, key=lambda entry: (entry['slot'], entry['offset']))
+
+
+def compile_layout(source_path=SOURCE, contract=CONTRACT, solc_version=SOLC_VERSION):
+    """Compiles the flattened source with solc and returns the normalized layout of `contract`."""
+    import solcx
+
+    with open(source_path) as f:
+        source = f.read()
+    name = os.path.basename(source_path)
+    output = solcx.compile_standard({
+        'language': 'Solidity',
+        'sources': {name: {'content': source}},
+        'settings': {'outputSelection': {name: {contract: ['storageLayout']}}},
+    }, solc_version=solc_version)
+    return normalize(output['contracts'][name][contract]['storageLayout'])
+
+
+def load_layouts(directory=LAYOUT_DIR, contract=CONTRACT):
+    """Returns the snapshots as `{revision: entries}`."""
+    layouts = {}
+    for name in os.listdir(directory):
+        match = re.fullmatch(r'{}-(\d+)\.json'.format(contract), name)
+        if match is not None:
+            with open(os.path.join(directory, name)) as f:
+                layouts[int(match.group(1))] = json.load(f)['storage']
+    return layouts
+
+
+def write_layout(revision, entries, directory=LAYOUT_DIR, contract=CONTRACT):
+    path = os.path.join(directory, '{}-{}.json'.format(contract, revision))
+    with open(path, 'w') as f:
+        json.dump({'contract': contract, 'revision': revision, 'storage': entries}, f, indent=2)
+        f.write('\n')
+    return path
+
+
+def _bytes_range(entry):
+    start = entry['slot'] * 32 + entry['offset']
+    return start, start + entry['bytes']
+
+
+def compatibility_errors(old, new):
+    """Returns the problems of upgrading storage laid out as `old` to `new`, empty if the upgrade is safe."""
+    errors = []
+    new_at = {(entry['slot'], entry['offset']): entry for entry in new}
+    checked = set()  # positions of variables of the previous revision
+    for entry in old:
+        if entry['label'].startswith(GAP_PREFIX):
+            continue
+        moved = new_at.get((entry['slot'], entry['offset']))
+        if moved is None or moved['label'].startswith(GAP_PREFIX):
+            errors.append('{label} at slot {slot} offset {offset} was removed or moved'.format(**entry))
+            continue
+        if moved['type'] != entry['type'] or moved['bytes'] != entry['bytes']:
+            errors.append('{} at slot {} changed type from {} to {}'.format(
+                entry['label'], entry['slot'], entry['type'], moved['type']))
+        checked.add((entry['slot'], entry['offset']))
+    used = [_bytes_range(entry) for entry in old if not entry['label'].startswith(GAP_PREFIX)]
+    for entry in new:
+        if (entry['slot'], entry['offset']) in checked:
+            continue
+        start, end = _bytes_range(entry)
+        if any(start < used_end and used_start < end for used_start, used_end in used):
+            errors.append('{label} at slot {slot} offset {offset} overlaps variables of the previous revision'.format(
+                **entry))
+    new_gaps = {entry['label']: entry for entry in new if entry['label'].startswith(GAP_PREFIX)}
+    for gap in old:
+        shrunk = new_gaps.get(gap['label']) if gap['label'].startswith(GAP_PREFIX) else None
+        if shrunk is not None and _bytes_range(shrunk)[1] != _bytes_range(gap)[1]:
+            errors.append('{} ends at slot {} instead of {}, shrink it by the slots of added variables'.format(
+                gap['label'], _bytes_range(shrunk)[1] // 32, _bytes_range(gap)[1] // 32))
+    return errors
+
+
+def check_upgrade(old, new):
+    """Raises `StorageLayoutError` listing the problems of upgrading `old` to `new`."""
+    errors = compatibility_errors(old, new)
+    if errors:
+        raise StorageLayoutError('\n'.join(errors))
+
+
+def check_revisions(layouts):
+    """Checks every snapshot against the one of the previous revision."""
+    revisions = sorted(layouts)
+    for previous, revision in zip(revisions, revisions[1:]):
+        try:
+            check_upgrade(layouts[previous], layouts[revision])
+        except StorageLayoutError as e:
+            raise StorageLayoutError('revision {} -> {}:\n{}'.format(previous, revision, e)) from None
+
+
+def main():
+    """Checks the current source against the previous revisions and writes the snapshot of its revision."""
+    with open(SOURCE) as f:
+        revision = source_revision(f.read())
+    entries = compile_layout()
+    layouts = load_layouts()
+    if revision in layouts and layouts[revision] != entries:
+        raise StorageLayoutError('the layout of revision {} changed, bump getRevision'.format(revision))
+    previous = [known for known in layouts if known < revision]
+    if previous:
+        check_upgrade(layouts[max(previous)], entries)
+    print(f'{CONTRACT} revision {revision}: {len(entries)} variables, written to {write_layout(revision, entries)}')
@@ -0,0 +1,188 @@
+"""Parallel thumbnail generation of minted `ThronNFT` media.
+
+Mints (`Transfer` from the zero address) are resolved to metadata and media with
+`MetadataFetcher`, media is resized to every size of `SIZES` in a process pool with Pillow
+and written to a store keyed by the media CID, so the same content is never processed twice.
+The input queue is bounded: `submit` waits while the queue is full.
+
+Report images per second per core on a synthetic corpus with `brownie run thumbnails`.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from scripts.ipfs_fetcher import FetchError, parse_ipfs_uri, read_token_uris
+
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+SIZES = (128, 256, 512)
+FORMAT = 'JPEG'
+EXTENSION = 'jpg'
+
+log = logging.getLogger(__name__)
+
+
+def minted_token_ids(events, nft_address):
+    """Returns token ids of `Transfer` events from the zero address emitted by `nft_address`."""
+    return [event['tokenId'] for event in events
+            if event.name == 'Transfer' and event.address == nft_address and event['from'] == ADDRESS_ZERO]
+
+
+class ThumbnailStore:
+    """Thumbnails stored as `<directory>/<key[:2]>/<key>/<size>.jpg`, `key` identifies the media content."""
+
+    def __init__(self, directory, sizes=SIZES):
+        self.directory = directory
+        self.sizes = sizes
+
+    def path(self, key, size):
+        return os.path.join(self.directory, key[:2], key, '{}.{}'.format(size, EXTENSION))
+
+    def has(self, key):
+        return all(os.path.exists(self.path(key, size)) for size in self.sizes)
+
+
+def render(source_path, store_dir, key, sizes=SIZES):
+    """Writes thumbnails of the image at `source_path`, runs in a worker process."""
+    store = ThumbnailStore(store_dir, sizes)
+    with Image.open(source_path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for size in sorted(sizes, reverse=True):
+            image.thumbnail((size, size), Image.LANCZOS)  # downscale the previous (bigger) thumbnail
+            path = store.path(key, size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, FORMAT, quality=85)
+            os.replace(tmp_path, path)
+    return key
+
+
+class ThumbnailPipeline:
+    """
+    :param store_dir: directory of generated thumbnails.
+    :param fetcher: `MetadataFetcher` used for metadata and media, its cache holds the source media.
+    :param workers: number of worker processes.
+    :param queue_size: maximum number of queued mints before `submit` blocks.
+    """
+
+    def __init__(self, store_dir, fetcher, sizes=SIZES, workers=None, queue_size=256):
+        self.store = ThumbnailStore(store_dir, sizes)
+        self.fetcher = fetcher
+        self.sizes = sizes
+        self.workers = workers or os.cpu_count()
+        self.queue = None
+        self.queue_size = queue_size
+        self.stats = {'rendered': 0, 'skipped': 0, 'failed': 0}
+        self._seen = set()
+        self._executor = None
+
+    async def submit(self, token_id, uri):
+        """Queues a minted token, waits while the queue is full."""
+        await self.queue.put((token_id, uri))
+
+    async def _handle(self, session, token_id, uri):
+        try:
+            parsed = parse_ipfs_uri(uri) if uri else None
+            metadata = await self.fetcher.fetch_json(session, *parsed) if parsed else None
+            media = parse_ipfs_uri(metadata.get('image') or '') if isinstance(metadata, dict) else None
+        except (FetchError, ValueError):
+            media = None
+        if media is None:
+            self.stats['failed'] += 1
+            return
+        key = os.path.basename(self.fetcher.cache.path(*media))
+        if key in self._seen or self.store.has(key):
+            self.stats['skipped'] += 1
+            return
+        self._seen.add(key)
+        try:
+            await self.fetcher.fetch_content(session, *media)
+            await asyncio.get_event_loop().run_in_executor(
+                self._executor, render, self.fetcher.cache.path(*media), self.store.directory, key, self.sizes)
+            self.stats['rendered'] += 1
+        except (FetchError, OSError):  # PIL raises OSError subclasses for broken images
+            self._seen.discard(key)
+            self.stats['failed'] += 1
+        except Exception:
+            self._seen.discard(key)
+            raise
+
+    async def _worker(self, session):
+        while True:
+            token_id, uri = await self.queue.get()
+            try:
+                await self._handle(session, token_id, uri)
+            except Exception:  # e.g. malformed metadata or a broken process pool, the worker must survive
+                self.stats['failed'] += 1
+                log.exception('thumbnails of token %s (%s) failed', token_id, uri)
+            finally:
+                self.queue.task_done()
+
+    async def run(self, produce):
+        """
+        Runs the pipeline until the `produce(pipeline)` coroutine returns and the queue is drained.
+
+        `produce` feeds mints with `await pipeline.submit(token_id, uri)`.
+        """
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        # more coroutines than processes, so media downloads overlap with rendering
+        concurrency = self.workers * 2
+        with ProcessPoolExecutor(max_workers=self.workers) as self._executor:
+            async with self.fetcher.session() as session:
+                tasks = [asyncio.ensure_future(self._worker(session)) for _ in range(concurrency)]
+                try:
+                    await produce(self)
+                    await self.queue.join()
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        return self.stats
+
+    async def process_mints(self, rpc_url, nft_address, events):
+        """Renders thumbnails of tokens minted in `events`, token URIs are read in bulk."""
+        token_ids = minted_token_ids(events, nft_address)
+        # read before `run`, a session opened while it runs would replace the fetcher's concurrency bound
+        async with self.fetcher.session() as session:
+            uris = await read_token_uris(session, rpc_url, nft_address, token_ids)
+
+        async def produce(pipeline):
+            for token_id in token_ids:
+                await pipeline.submit(token_id, uris.get(token_id))
+
+        return await self.run(produce)
+
+
+def _synthetic_corpus(directory, n, size):
+    """Writes `n` noise images of `size` x `size` pixels, returns their paths."""
+    paths = []
+    for i in range(n):
+        path = os.path.join(directory, 'source-{}.png'.format(i))
+        Image.frombytes('RGB', (size, size), os.urandom(size * size * 3)).save(path)
+        paths.append(path)
+    return paths
+
+
+def benchmark(n=200, size=2048, workers=None):
+    """Prints images per second per core of `render` over a synthetic corpus."""
+    workers = workers or os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        sources = _synthetic_corpus(directory, n, size)
+        store_dir = os.path.join(directory, 'store')
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(render, sources, [store_dir] * n, ['key{:06d}'.format(i) for i in range(n)]))
+        elapsed = time.perf_counter() - start
+    print(f'{n} images {size}x{size} -> {SIZES} on {workers} processes in {elapsed:.2f}s: '
+          f'{n / elapsed:.1f} images/s, {n / elapsed / workers:.1f} images/s/core')
+
+
+def main():
+    benchmark()
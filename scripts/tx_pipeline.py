@@ -0,0 +1,233 @@
+"""Pipelined transaction sender with local nonce management.
+
+Transactions are signed locally with consecutive nonces per account and sent back to back
+without waiting for receipts. A tracker thread polls receipts of all pending transactions
+concurrently, rebroadcasts transactions dropped from the mempool and, after `max_resubmits`
+rebroadcasts, replaces them with the same nonce at a bumped gas price.
+
+Gas limits are given explicitly: estimation runs against the current state, so it fails for
+transactions depending on not yet mined ones (e.g. `createAuction` after `approve`).
+See `mint_nft.py` and `create_auctions.py` for scripts built on it.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from web3.exceptions import TransactionNotFound
+
+
+class TxError(Exception):
+    """Raised when a transaction can't be sent, reverts or is never mined."""
+
+
+class NonceManager:
+    """Hands out consecutive nonces per address, starting from the node's pending transaction count."""
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def next(self, address):
+        with self._lock:
+            nonce = self._next.get(address)
+            if nonce is None:
+                nonce = self.web3.eth.get_transaction_count(address, 'pending')
+            self._next[address] = nonce + 1
+            return nonce
+
+    def reset(self, address):
+        """Forgets the local nonce, the next one is read from the node again."""
+        with self._lock:
+            self._next.pop(address, None)
+
+
+class PendingTx:
+    """A sent transaction, `wait` returns its receipt."""
+    __slots__ = ('account', 'tx', 'hash', 'hashes', 'sent_at', 'resubmits', 'receipt', 'error', '_done')
+
+    def __init__(self, account, tx):
+        self.account = account
+        self.tx = tx
+        self.hash = None
+        self.hashes = []  # of all broadcast versions, a replaced one may still be mined
+        self.sent_at = None
+        self.resubmits = 0
+        self.receipt = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def nonce(self):
+        return self.tx['nonce']
+
+    def _finish(self, receipt=None, error=None):
+        self.receipt = receipt
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TxError('timeout waiting for {}'.format(self.hash.hex()))
+        if self.error is not None:
+            raise self.error
+        return self.receipt
+
+
+class TxPipeline:
+    """
+    :param web3: connected `Web3` instance.
+    :param poll_interval: seconds between receipt polls.
+    :param resubmit_after: seconds without the transaction in the node before it's rebroadcast.
+    :param max_resubmits: rebroadcasts before the gas price is bumped by `gas_price_bump`.
+    :param receipt_workers: threads fetching receipts concurrently.
+    """
+
+    def __init__(self, web3, poll_interval=0.1, resubmit_after=30, max_resubmits=3, gas_price_bump=1.125,
+                 receipt_workers=16, gas_price=None):
+        self.web3 = web3
+        self.nonces = NonceManager(web3)
+        self.poll_interval = poll_interval
+        self.resubmit_after = resubmit_after
+        self.max_resubmits = max_resubmits
+        self.gas_price_bump = gas_price_bump
+        self.gas_price = gas_price
+        self.chain_id = web3.eth.chain_id
+        self.stats = {'sent': 0, 'mined': 0, 'reverted': 0, 'resubmitted': 0, 'replaced': 0}
+        self._pending = {}  # hash -> PendingTx
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=receipt_workers)
+        self._stop = threading.Event()
+        self._tracker = threading.Thread(target=self._track, daemon=True)
+        self._tracker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._stop.set()
+        self._tracker.join()
+        self._executor.shutdown()
+
+    def transact(self, account, call, gas, value=0):
+        """
+        Signs and sends a contract function call (`contract.functions.name(*args)`) from a local
+        account (`eth_account.LocalAccount`), returns a `PendingTx` without waiting for the receipt.
+        """
+        nonce = self.nonces.next(account.address)
+        try:
+            tx = call.buildTransaction({
+                'from': account.address,
+                'chainId': self.chain_id,
+                'gas': gas,
+                'gasPrice': self.gas_price or self.web3.eth.gas_price,
+                'nonce': nonce,
+                'value': value,
+            })
+            pending = PendingTx(account, tx)
+            self._send(pending)
+        except Exception as exc:
+            # the nonce may be unused (e.g. a timeout) or consumed by the node (development nodes
+            # mine reverted transactions), either way the next one is read from the chain again
+            self.nonces.reset(account.address)
+            if isinstance(exc, ValueError):
+                raise TxError(str(exc)) from exc
+            raise
+        return pending
+
+    def _send(self, pending):
+        signed = pending.account.sign_transaction(pending.tx)
+        tx_hash = self.web3.eth.send_raw_transaction(signed.rawTransaction)
+        with self._lock:
+            self._pending.pop(pending.hash, None)
+            pending.hash = tx_hash
+            pending.hashes.append(tx_hash)
+            pending.sent_at = time.monotonic()
+            self._pending[tx_hash] = pending
+        self.stats['sent'] += 1
+
+    def _receipt(self, tx_hash):
+        try:
+            return self.web3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def _is_known(self, tx_hash):
+        try:
+            return self.web3.eth.get_transaction(tx_hash) is not None
+        except TransactionNotFound:
+            return False
+
+    def _track(self):
+        while not self._stop.is_set():
+            with self._lock:
+                pending = list(self._pending.values())
+            if not pending:
+                self._stop.wait(self.poll_interval)
+                continue
+            for tx, receipt in zip(pending, self._executor.map(self._receipt, [tx.hash for tx in pending])):
+                if receipt is not None:
+                    self._mined(tx, receipt)
+                elif time.monotonic() - tx.sent_at > self.resubmit_after and not self._is_known(tx.hash):
+                    self._resubmit(tx)
+            self._stop.wait(self.poll_interval)
+
+    def _mined(self, pending, receipt):
+        with self._lock:
+            self._pending.pop(pending.hash, None)
+        if receipt['status'] == 1:
+            self.stats['mined'] += 1
+            pending._finish(receipt)
+        else:
+            self.stats['reverted'] += 1
+            pending._finish(receipt, TxError('reverted: {}'.format(pending.hash.hex())))
+
+    def _resubmit(self, pending):
+        """Rebroadcasts a dropped transaction, replaces it at a higher gas price after `max_resubmits`."""
+        address = pending.account.address
+        if self.web3.eth.get_transaction_count(address, 'latest') > pending.nonce:
+            for tx_hash in pending.hashes:
+                receipt = self._receipt(tx_hash)
+                if receipt is not None:
+                    self._mined(pending, receipt)
+                    return
+            # the nonce was used by another transaction, e.g. sent outside of the pipeline
+            with self._lock:
+                self._pending.pop(pending.hash, None)
+            pending._finish(error=TxError('nonce {} of {} was replaced'.format(pending.nonce, address)))
+            return
+        pending.resubmits += 1
+        if pending.resubmits > self.max_resubmits:
+            pending.tx['gasPrice'] = int(pending.tx['gasPrice'] * self.gas_price_bump)
+            self.stats['replaced'] += 1
+        else:
+            self.stats['resubmitted'] += 1
+        try:
+            self._send(pending)
+        except ValueError as exc:
+            if 'already known' in str(exc):  # it got back to the mempool meanwhile
+                pending.sent_at = time.monotonic()
+                return
+            with self._lock:
+                self._pending.pop(pending.hash, None)
+            pending._finish(error=TxError(str(exc)))
+
+    def wait_all(self, pending, timeout=None):
+        """Returns receipts of `pending` in order, raises the first error."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return [tx.wait(None if deadline is None else max(0, deadline - time.monotonic())) for tx in pending]
+
+
+def local_accounts(brownie_accounts):
+    """Returns `eth_account` local accounts of brownie accounts having private keys."""
+    from eth_account import Account
+
+    return [Account.from_key(account.private_key) for account in brownie_accounts]
+
+
+def web3_contract(web3, contract):
+    """Returns the web3 contract of a brownie contract, its `functions` are accepted by `transact`."""
+    return web3.eth.contract(address=contract.address, abi=contract.abi)
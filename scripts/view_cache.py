@@ -0,0 +1,213 @@
+"""Read-through cache of `Auction` and `ThronNFT` view calls invalidated by events.
+
+Entries are keyed by `(contract address, function, args)`, evicted in LRU order when the
+entry count or the approximate memory cap is exceeded, and invalidated precisely by the
+events that change them (e.g. `BidSubmitted(nft, nftId)` evicts `getAuctionData(nft, nftId)`,
+`Transfer(tokenId)` evicts `ownerOf(tokenId)`). Results that never change for an existing
+token (`tokenAuthor`, `tokenURI`) have no TTL. Reverted calls are never cached. Only views of the
+two watched contracts are cached, calls to other contracts (e.g. `ThronCoin.balanceOf`) pass through.
+
+Addresses in call args and in events must use the same format (checksum addresses for brownie).
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+
+# views that can't change while the token exists, they are still invalidated by burn
+IMMUTABLE_VIEWS = frozenset(('tokenAuthor', 'tokenURI', 'name', 'symbol', 'payableToken', 'allowedNFT'))
+# views with known invalidating events per contract, other calls (e.g. `tokenOfOwnerByIndex`) bypass the cache
+AUCTION_VIEWS = frozenset((
+    'getAuctionData', 'minPriceStepNumerator', 'auctionDuration', 'overtimeWindow', 'authorRoyaltyNumerator',
+    'getPaused', 'getAdmin', 'payableToken', 'allowedNFT',
+))
+NFT_VIEWS = frozenset((
+    'tokenAuthor', 'tokenURI', 'name', 'symbol', 'ownerOf', 'getApproved', 'balanceOf', 'totalSupply',
+    'isApprovedForAll', 'owner',
+))
+
+# admin setter event -> the view it changes
+_AUCTION_CONFIG_EVENTS = {
+    'MinPriceStepNumeratorSet': 'minPriceStepNumerator',
+    'AuctionDurationSet': 'auctionDuration',
+    'OvertimeWindowSet': 'overtimeWindow',
+    'AuthorRoyaltyNumeratorSet': 'authorRoyaltyNumerator',
+    'Paused': 'getPaused',
+    'Unpaused': 'getPaused',
+    'AdminChanged': 'getAdmin',
+}
+_AUCTION_ITEM_EVENTS = frozenset((
+    'AuctionCreated', 'BidSubmitted', 'ReservePriceChanged', 'AuctionCanceled', 'WonNftClaimed'))
+
+
+def default_call(contract, function, args):
+    """Calls a view of a brownie contract."""
+    return getattr(contract, function)(*args)
+
+
+def _sizeof(value):
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+
+class CacheStats:
+    """Hit/miss counters and cumulative latency of cached and uncached calls."""
+    __slots__ = ('hits', 'misses', 'evictions', 'invalidations', 'hit_seconds', 'miss_seconds')
+
+    def __init__(self):
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self.hit_seconds = self.miss_seconds = 0.0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hit_rate,
+            'avg_hit_latency': self.hit_seconds / self.hits if self.hits else 0.0,
+            'avg_miss_latency': self.miss_seconds / self.misses if self.misses else 0.0,
+        }
+
+
+class ViewCache:
+    """
+    :param auction: address of the `Auction` contract.
+    :param nft: address of the `ThronNFT` contract.
+    :param max_entries: maximum number of entries.
+    :param max_bytes: approximate memory cap of the cached keys and values.
+    :param ttl: seconds to keep mutable entries as a safety net for missed events, None to disable.
+    :param call: `call(contract, function, args)` performing the real view call.
+    """
+
+    def __init__(self, auction, nft, max_entries=100_000, max_bytes=64 * 2**20, ttl=None, call=default_call,
+                 clock=time.monotonic):
+        self.auction = auction
+        self.nft = nft
+        # only events of these two contracts are watched, calls to any other contract bypass the cache
+        self._views = {auction: AUCTION_VIEWS, nft: NFT_VIEWS}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._call = call
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        # key -> [running fetches, invalidations], protects from storing results fetched before an event
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def call(self, contract, function, *args):
+        """Returns the cached result of `contract.function(*args)` or calls the contract and caches the result."""
+        if function not in self._views.get(contract.address, ()):
+            return self._call(contract, function, args)
+        key = (contract.address, function, args)
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] is None or entry[2] > self._clock()):
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                self.stats.hit_seconds += time.perf_counter() - start
+                return entry[0]
+            pending = self._pending.setdefault(key, [0, 0])
+            pending[0] += 1
+            invalidations = pending[1]
+        try:
+            value = self._call(contract, function, args)
+        finally:
+            with self._lock:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    del self._pending[key]
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.miss_seconds += time.perf_counter() - start
+            if pending[1] == invalidations:
+                self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        self._remove(key)
+        size = _sizeof(key) + _sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = None if self.ttl is None or key[1] in IMMUTABLE_VIEWS else self._clock() + self.ttl
+        self._entries[key] = (value, size, expires_at)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.stats.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def invalidate(self, address, function, args):
+        """Evicts a single entry."""
+        key = (address, function, args)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[1] += 1
+            if key in self._entries:
+                self._remove(key)
+                self.stats.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for pending in self._pending.values():
+                pending[1] += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def on_event(self, address, name, args):
+        """Invalidates the entries changed by a decoded event emitted by `address`."""
+        if address == self.auction:
+            if name in _AUCTION_ITEM_EVENTS:
+                self.invalidate(self.auction, 'getAuctionData', (args['nft'], args['nftId']))
+            elif name in _AUCTION_CONFIG_EVENTS:
+                self.invalidate(self.auction, _AUCTION_CONFIG_EVENTS[name], ())
+        elif address == self.nft:
+            if name == 'Transfer':
+                token_id = args['tokenId']
+                self.invalidate(self.nft, 'ownerOf', (token_id,))
+                self.invalidate(self.nft, 'getApproved', (token_id,))
+                for owner in (args['from'], args['to']):
+                    if owner != ADDRESS_ZERO:
+                        self.invalidate(self.nft, 'balanceOf', (owner,))
+                if args['from'] == ADDRESS_ZERO or args['to'] == ADDRESS_ZERO:
+                    self.invalidate(self.nft, 'totalSupply', ())
+                if args['to'] == ADDRESS_ZERO:  # burn
+                    self.invalidate(self.nft, 'tokenURI', (token_id,))
+                    self.invalidate(self.nft, 'tokenAuthor', (token_id,))
+            elif name == 'Approval':
+                self.invalidate(self.nft, 'getApproved', (args['tokenId'],))
+            elif name == 'ApprovalForAll':
+                self.invalidate(self.nft, 'isApprovedForAll', (args['owner'], args['operator']))
+            elif name == 'OwnershipTransferred':
+                self.invalidate(self.nft, 'owner', ())
+
+    def on_events(self, events):
+        """Invalidates by decoded events having `address` and `name` (brownie events or `LogDecoder` records)."""
+        for event in events:
+            self.on_event(event.address, event.name, event)
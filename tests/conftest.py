@@ -1,6 +1,21 @@
-from brownie import ThronCoin, ThronNFT, Auction
+from brownie import ThronCoin, ThronNFT
 import pytest
 
+from scripts.deploy_auction import DEPLOYMENTS, deploy_auction
+
+PROXY_ADMIN_KEY = '0x' + '47' * 32
+
+
+def pytest_addoption(parser):
+    parser.addoption('--deployment', choices=DEPLOYMENTS + ('both',), default='both',
+                     help='deploy the auction fixture directly, through the proxy as in production, or run both ways')
+
+
+def pytest_generate_tests(metafunc):
+    if 'deployment' in metafunc.fixturenames:
+        option = metafunc.config.getoption('deployment')
+        metafunc.parametrize('deployment', DEPLOYMENTS if option == 'both' else (option,), scope='session')
+
 
 @pytest.fixture
 def admin(accounts):
@@ -12,6 +27,15 @@ def users(accounts):
     return accounts[1:]
 
 
+@pytest.fixture(scope='session')
+def proxy_admin():
+    from brownie import accounts
+
+    account = accounts.add(PROXY_ADMIN_KEY)
+    accounts.remove(account)  # never one of `users`, calls of the proxy admin are not forwarded to `Auction`
+    return account
+
+
 @pytest.fixture
 def throne_coin(accounts, admin):
     contract = ThronCoin.deploy({'from': admin})
@@ -27,16 +51,8 @@ def throne_nft(admin):
 
 
 @pytest.fixture
-def auction(admin, throne_nft, throne_coin):
-    contract = Auction.deploy({'from': admin})
-    overtime = 2*60  # in prod 15*60
-    duration = 5*60  # in prod 24*3600
-    _minStepNumerator = 500  # 5%
-    _authorRoyaltyNumerator = 100  # 1%
-    contract.initialize(
-        overtime,
-        duration,
-        _minStepNumerator, _authorRoyaltyNumerator, throne_coin.address, throne_nft.address, admin)
-    contract.unpause({'from': admin})  # not required when deployed on prod through proxy
+def auction(admin, throne_nft, throne_coin, deployment, proxy_admin):
+    # overtime 2*60 (in prod 15*60), duration 5*60 (in prod 24*3600), min step 5%, author royalty 1%
+    contract = deploy_auction(admin, throne_coin, throne_nft, deployment, proxy_admin)
     assert not contract.getPaused({'from': admin})
     return contract
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from scripts.aggregates import Aggregates, ReorgTooDeep, check_consistency
+from scripts.snapshot import synthetic_events
+
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+
+
+def test_queries():
+    aggregates = Aggregates()
+    events = [e for e in synthetic_events(3000) if e[0] in ('WonNftClaimed', 'RoyaltyPaid')]
+    aggregates.apply_block(1, b'1', events)
+    claim = next(args for name, args in events if name == 'WonNftClaimed')
+    assert aggregates.last_sale[(claim['nft'], claim['nftId'])] == (claim['price'], claim['priceToken'], claim['winner'])
+    volume, sales = aggregates.auctioneer_volume(claim['auctioneer'])
+    assert sales >= 1 and volume[claim['priceToken']] >= claim['price']
+    royalty = next(args for name, args in events if name == 'RoyaltyPaid')
+    assert aggregates.author_earnings(royalty['author'])[royalty['amountToken']] >= royalty['amount']
+    tokens = {token for earnings in aggregates.royalties.values() for token in earnings}
+    assert ADDRESS_ZERO in tokens and len(tokens) == 2  # split by token and ether
+    assert aggregates.author_earnings('0x' + '00' * 19 + '01') == {}
+
+
+def test_reorgs_match_full_recomputation():
+    rng = random.Random(35)
+    events = synthetic_events(20_000)
+    blocks = [events[i:i + rng.randint(1, 40)] for i in range(0, len(events), 40)]
+    aggregates = Aggregates(max_reorg_depth=16)
+    canonical = []  # blocks of the canonical chain
+    i = 0
+    while i < len(blocks):
+        if canonical and rng.random() < 0.1:
+            # a fork replaces the last blocks with other events, then the original blocks come back
+            depth = rng.randint(1, min(10, len(canonical)))
+            fork_point = len(canonical) - depth
+            aggregates.rollback(fork_point - 1)
+            for number, block in enumerate(rng.sample(blocks, depth), start=fork_point):
+                aggregates.apply_block(number, b'fork', block)
+            assert aggregates.head == (len(canonical) - 1, b'fork')
+            aggregates.rollback(fork_point - 1)
+            for number in range(fork_point, len(canonical)):
+                aggregates.apply_block(number, b'main', canonical[number])
+        aggregates.apply_block(len(canonical), b'main', blocks[i])
+        canonical.append(blocks[i])
+        i += 1
+    assert check_consistency(aggregates, [event for block in canonical for event in block]) == []
+
+    with pytest.raises(ReorgTooDeep):
+        aggregates.rollback(len(canonical) - 20)
+    with pytest.raises(ValueError):
+        aggregates.apply_block(0, b'main', [])
+
+
+def test_claims_on_chain(auction, throne_nft, throne_coin, admin, users, chain):
+    minter, bidder = users[0], users[1]
+    aggregates = Aggregates()
+    history = []
+
+    def apply(tx):
+        events = [(event.name, event) for event in tx.events]
+        aggregates.apply_block(tx.block_number, None, events)
+        history.extend(events)
+
+    start_price = 10**18
+    for is_ether in (False, True):
+        nft_id = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json",
+            {'from': minter}).events['Transfer']['tokenId']
+        throne_nft.transferFrom(minter, users[2], nft_id, {'from': minter})  # the author isn't the auctioneer
+        throne_nft.approve(auction.address, nft_id, {'from': users[2]})
+        apply(auction.createAuction(throne_nft.address, nft_id, start_price, is_ether, {'from': users[2]}))
+        if is_ether:
+            apply(auction.bidEther(throne_nft.address, nft_id, start_price, {'from': bidder, 'value': start_price}))
+        else:
+            throne_coin.approve(auction.address, start_price, {'from': bidder})
+            apply(auction.bid(throne_nft.address, nft_id, start_price, {'from': bidder}))
+        chain.sleep(auction.getAuctionData(throne_nft.address, nft_id)[4] - chain.time() + 1)
+        apply(auction.claimWonNFT(throne_nft.address, nft_id, {'from': bidder}))
+        assert aggregates.last_sale[(throne_nft.address, nft_id)][0] == start_price
+
+    royalty = start_price * auction.authorRoyaltyNumerator() // 10000
+    assert aggregates.author_earnings(minter) == {throne_coin.address: royalty, ADDRESS_ZERO: royalty}
+    assert aggregates.auctioneer_volume(users[2]) == ({throne_coin.address: start_price, ADDRESS_ZERO: start_price}, 2)
+    assert check_consistency(aggregates, history) == []
@@ -0,0 +1,111 @@
+import base64
+import json
+import random
+
+import pytest
+from brownie.network.event import decode_logs
+
+from scripts.auction_query import (
+    AuctionQuery, InvalidCursor, scan_ending_soon, scan_price_between, synthetic_events)
+from scripts.auction_state import ADDRESS_ZERO
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+NOW = 1_600_000_000
+
+
+def all_pages(view, limit, **kwargs):
+    items, cursor = [], None
+    while True:
+        page = view(limit=limit, cursor=cursor, **kwargs)
+        items.extend(page.items)
+        cursor = page.cursor
+        if cursor is None:
+            return items
+
+
+def test_indexes_match_scans():
+    query = AuctionQuery()
+    query.apply_many(synthetic_events(3000, now=NOW))
+    rng = random.Random(48)
+    for key in rng.sample(list(query.auctions), 500):
+        listing = query.get(*key)
+        query.apply('BidSubmitted', {'nft': key[0], 'nftId': key[1], 'bidder': listing.auctioneer,
+                                     'amount': listing.current_bid * 2, 'amountToken': listing.bid_token,
+                                     'endTimestamp': max(listing.end_timestamp, NOW + rng.randint(0, 900))})
+    for key in rng.sample(list(query.auctions), 200):
+        query.apply('WonNftClaimed' if query.get(*key).end_timestamp else 'AuctionCanceled',
+                    {'nft': key[0], 'nftId': key[1]})
+
+    assert all_pages(query.ending_soon, 7, now=NOW) == scan_ending_soon(query, NOW, limit=len(query))
+    assert all_pages(query.price_between, 7, low=10**17, high=10**18) == scan_price_between(
+        query, 10**17, 10**18, limit=len(query))
+    without_bids = all_pages(query.without_bids, 7)
+    assert {item.current_bidder for item in without_bids} == {ADDRESS_ZERO}
+    assert len(without_bids) == sum(record[3] == ADDRESS_ZERO for record in query.auctions.values())
+    auctioneer = query.get(*next(iter(query.auctions))).auctioneer
+    mine = all_pages(query.by_auctioneer_of, 3, auctioneer=auctioneer, newest_first=False)
+    assert mine == [query.get(*key) for key, record in query.auctions.items() if record[2] == auctioneer]
+
+    page = query.ending_soon(NOW, limit=5)
+    with pytest.raises(InvalidCursor):
+        query.without_bids(cursor=page.cursor)
+    with pytest.raises(InvalidCursor):
+        query.ending_soon(NOW, cursor='not a cursor')
+    views = {'ending_soon': lambda cursor: query.ending_soon(NOW, cursor=cursor),
+             'price_between': lambda cursor: query.price_between(0, 1, cursor=cursor),
+             'by_auctioneer': lambda cursor: query.by_auctioneer_of(auctioneer, cursor=cursor),
+             'without_bids': lambda cursor: query.without_bids(cursor=cursor)}
+    for view, key in [('without_bids', ['x', {}]), ('without_bids', [1, 'nft']), ('ending_soon', 5),
+                      ('price_between', [ADDRESS_ZERO, True, 'nft', 1]), ('by_auctioneer', [None, 1, 'nft', 1])]:
+        with pytest.raises(InvalidCursor):  # well-formed JSON, but not a key of the view's index
+            views[view](base64.urlsafe_b64encode(json.dumps([view, key]).encode()).decode())
+
+
+def test_price_cursor_reused_for_other_token():
+    token = '0x' + '22' * 20
+    query = AuctionQuery()
+    query.apply_many(synthetic_events(1000, now=NOW, token=token))
+    for descending in (False, True):
+        for first, second in ((ADDRESS_ZERO, token), (token, ADDRESS_ZERO)):
+            cursor = query.price_between(0, 10**20, bid_token=first, limit=5, descending=descending).cursor
+            page = query.price_between(10**17, 10**18, bid_token=second, limit=1000, cursor=cursor,
+                                       descending=descending)
+            assert all(item.bid_token == second and 10**17 <= item.current_bid <= 10**18 for item in page.items)
+
+
+def test_ending_soon_cursor_reused_later():
+    query = AuctionQuery()
+    query.apply_many(synthetic_events(1000, now=NOW))
+    cursor = query.ending_soon(NOW, limit=5).cursor
+    later = NOW + 12 * 3600
+    items = all_pages(query.ending_soon, 7, now=later)
+    assert query.ending_soon(later, limit=len(query), cursor=cursor).items == items
+    assert items and all(item.end_timestamp > later for item in items)
+
+
+def test_follows_auction_events(auction, throne_nft, throne_coin, users, web3, chain):
+    auctioneer, bidder = users[:2]
+    throne_coin.approve(auction.address, 10**20, {'from': bidder})
+    nft_ids = []
+    for price in (3000, 1000, 2000):
+        nft_id = throne_nft.mintWithTokenURI(URI, {'from': auctioneer}).events['Transfer']['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+        auction.createAuction(throne_nft.address, nft_id, price, False, {'from': auctioneer})
+        nft_ids.append(nft_id)
+    auction.bid(throne_nft.address, nft_ids[0], 3000, {'from': bidder})
+    chain.sleep(60)
+    auction.bid(throne_nft.address, nft_ids[1], 1000, {'from': bidder})
+    auction.changeReservePrice(throne_nft.address, nft_ids[2], 5000, {'from': auctioneer})
+
+    query = AuctionQuery()
+    for event in decode_logs(web3.eth.get_logs({'address': auction.address, 'fromBlock': auction.tx.block_number})):
+        query.apply(event.name, event)
+    coin = throne_coin.address
+    assert [item.nft_id for item in query.ending_soon(chain.time()).items] == nft_ids[:2]
+    assert [item.nft_id for item in query.price_between(1000, 3000, coin).items] == nft_ids[1::-1]
+    assert [item.nft_id for item in query.without_bids().items] == nft_ids[2:]
+    assert [item.nft_id for item in query.by_auctioneer_of(auctioneer).items] == nft_ids[::-1]
+    assert query.price_between(1000, 3000).items == []  # ether auctions only
+    for nft_id in nft_ids[:2]:
+        listing = query.get(throne_nft.address, nft_id)
+        assert auction.getAuctionData(throne_nft.address, nft_id) == listing[2:]
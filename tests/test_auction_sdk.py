@@ -0,0 +1,107 @@
+import pytest
+from brownie.convert import Fixed
+
+from scripts.auction_sdk import (
+    AuctionClient, AuctionData, AuctionFinished, AuctionNotFinished, AuctionPaused, BidContext, BidTooSmall,
+    InsufficientAllowance, WrongBidCurrency, check_bid, minimum_bid)
+from scripts.tx_pipeline import local_accounts
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
+BIDDER = '0x' + '11' * 20
+
+
+def context(current_bid=1000, bidder=ADDRESS_ZERO, end=0, timestamp=100, token=BIDDER, allowance=10**6):
+    auction = AuctionData(current_bid, token, '0x' + '22' * 20, bidder, end)
+    return BidContext(auction, False, 500, 10**6, allowance, 10**18, 1, 0, 1, timestamp)
+
+
+def test_check_bid():
+    assert check_bid(context(), BIDDER, 1000, False) == 1000
+    assert minimum_bid(context(end=200, bidder='0x' + '33' * 20).auction, 500) == 1050
+    assert check_bid(context(end=200, bidder=BIDDER), BIDDER, 1050, False) == 50
+    with pytest.raises(BidTooSmall) as e:
+        check_bid(context(end=200, bidder=BIDDER), BIDDER, 1049, False)
+    assert e.value.details['minimum'] == 1050 and e.value.reason == 'SmallBidAmount'
+    with pytest.raises(AuctionFinished):
+        check_bid(context(end=100), BIDDER, 2000, False)
+    with pytest.raises(AuctionFinished):
+        check_bid(context(end=110), BIDDER, 2000, False, time_margin=10)
+    with pytest.raises(WrongBidCurrency):
+        check_bid(context(), BIDDER, 1000, True)
+    with pytest.raises(WrongBidCurrency):
+        check_bid(context(token=ADDRESS_ZERO), BIDDER, 1000, False)
+    with pytest.raises(InsufficientAllowance):
+        check_bid(context(allowance=999), BIDDER, 1000, False)
+    with pytest.raises(AuctionPaused):
+        check_bid(context()._replace(paused=True), BIDDER, 1000, False)
+
+
+@pytest.fixture
+def client(auction, web3):
+    return AuctionClient(web3.provider.endpoint_uri, auction.address, poll_interval=0.01)
+
+
+def list_auction(auction, throne_nft, auctioneer, start_price, is_ether):
+    nft_id = throne_nft.mintWithTokenURI(URI, {'from': auctioneer}).events['Transfer']['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+    auction.createAuction(throne_nft.address, nft_id, start_price, is_ether, {'from': auctioneer})
+    return nft_id
+
+
+def test_context_is_one_batch(client, auction, throne_nft, throne_coin, users):
+    assert client.token == throne_coin.address and client.nft == throne_nft.address
+    nft_id = list_auction(auction, throne_nft, users[0], Fixed('1 ether'), False)
+    throne_coin.approve(auction.address, Fixed('2 ether'), {'from': users[1]})
+    batches = client.stats['batches']
+    context = client.read_bid_context(throne_nft.address, nft_id, users[1].address)
+    assert client.stats['batches'] == batches + 1
+    assert context.auction == (Fixed('1 ether'), throne_coin.address, users[0], ADDRESS_ZERO, 0)
+    assert context.allowance == Fixed('2 ether') and context.token_balance == throne_coin.balanceOf(users[1])
+    assert not context.paused and context.min_price_step_numerator == 500
+
+
+def test_bid_and_claim(client, auction, throne_nft, throne_coin, users, chain):
+    bidder1, bidder2 = local_accounts(users[1:3])
+    nft_id = list_auction(auction, throne_nft, users[0], Fixed('1 ether'), False)
+    ether_nft_id = list_auction(auction, throne_nft, users[0], Fixed('1 ether'), True)
+    client.approve_token(bidder1, Fixed('10 ether'))
+    client.approve_token(bidder2, Fixed('10 ether'))
+    client.bid(bidder1, nft_id, Fixed('1 ether'))
+    client.bid(bidder2, nft_id, Fixed('2 ether'))
+    client.bid(bidder1, ether_nft_id, Fixed('1 ether'), is_ether=True)
+    with pytest.raises(AuctionNotFinished):
+        client.claim(bidder2, nft_id)
+    chain.sleep(5 * 60 + 1)
+    chain.mine()
+    client.claim(bidder2, nft_id)
+    client.claim(bidder1, ether_nft_id)
+    assert throne_nft.ownerOf(nft_id) == bidder2.address and throne_nft.ownerOf(ether_nft_id) == bidder1.address
+    assert client.stats['reverted'] == 0
+
+
+def test_preflight_errors_send_nothing(client, auction, throne_nft, throne_coin, admin, users, chain, web3):
+    bidder, other = local_accounts(users[1:3])
+    nft_id = list_auction(auction, throne_nft, users[0], Fixed('1 ether'), False)
+    throne_coin.approve(auction.address, Fixed('1 ether'), {'from': users[1]})
+    nonce = web3.eth.get_transaction_count(bidder.address)
+    with pytest.raises(InsufficientAllowance):
+        client.bid(bidder, nft_id, Fixed('2 ether'))
+    with pytest.raises(BidTooSmall):
+        client.bid(bidder, nft_id, Fixed('0.5 ether'))
+    with pytest.raises(WrongBidCurrency):
+        client.bid(bidder, nft_id, Fixed('1 ether'), is_ether=True)
+    client.bid(bidder, nft_id, Fixed('1 ether'))
+    nonce += 1
+    client.approve_token(other, Fixed('10 ether'))
+    with pytest.raises(BidTooSmall):
+        client.bid(other, nft_id, Fixed('1.04 ether'))
+    chain.sleep(5 * 60 + 1)
+    chain.mine()
+    with pytest.raises(AuctionFinished):
+        client.bid(other, nft_id, Fixed('5 ether'))
+    auction.pause({'from': admin})
+    with pytest.raises(AuctionPaused):
+        client.claim(bidder, nft_id)
+    assert web3.eth.get_transaction_count(bidder.address) == nonce
+    assert client.stats['sent'] == 2 and client.stats['rejected'] == 6 and client.stats['reverted'] == 0
@@ -0,0 +1,161 @@
+import random
+
+import brownie
+from brownie.network.event import decode_logs
+
+from scripts.auction_state import AuctionState, AUCTIONEER, CURRENT_BID, CURRENT_BIDDER, END_TIMESTAMP, \
+    ADDRESS_ZERO
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+MAX_UINT256 = 2**256 - 1
+
+
+class LogFollower:
+    """Feeds `Auction` logs of new blocks into `AuctionState`."""
+
+    def __init__(self, web3, auction, state):
+        self.web3 = web3
+        self.auction = auction
+        self.state = state
+        self.last_block = auction.tx.block_number - 1
+
+    def sync(self):
+        head = self.web3.eth.block_number
+        logs = self.web3.eth.get_logs({'address': self.auction.address, 'fromBlock': self.last_block + 1,
+                                       'toBlock': head})
+        for event in decode_logs(logs):
+            self.state.apply(event.name, event)
+        self.last_block = head
+
+
+def assert_state_matches(state, auction, throne_nft, nft_ids):
+    for nft_id in nft_ids:
+        expected = state.get(throne_nft.address, nft_id)
+        if expected is None:
+            with brownie.reverts('AuctionNotExists'):
+                auction.getAuctionData(throne_nft.address, nft_id)
+        else:
+            assert auction.getAuctionData(throne_nft.address, nft_id) == expected
+    assert state.config == {
+        'minPriceStepNumerator': auction.minPriceStepNumerator(),
+        'auctionDuration': auction.auctionDuration(),
+        'overtimeWindow': auction.overtimeWindow(),
+        'authorRoyaltyNumerator': auction.authorRoyaltyNumerator(),
+    }
+    assert state.paused == auction.getPaused()
+
+
+def test_bid_and_claim_events_are_self_describing(auction, throne_nft, throne_coin, admin, users, chain):
+    minter, bidder1, bidder2 = users[0], users[1], users[2]
+    nft_id = throne_nft.mintWithTokenURI(URI, {'from': minter}).events['Transfer']['tokenId']
+    throne_nft.transferFrom(minter, bidder1, nft_id, {'from': minter})
+    throne_nft.approve(auction.address, nft_id, {'from': bidder1})
+    auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': bidder1})
+
+    throne_coin.approve(auction.address, MAX_UINT256, {'from': bidder2})
+    throne_coin.approve(auction.address, MAX_UINT256, {'from': minter})
+    tx = auction.bid(throne_nft.address, nft_id, 1000, {'from': minter})
+    assert tx.events['BidSubmitted']['previousBidder'] == ADDRESS_ZERO
+    assert tx.events['BidSubmitted']['refund'] == 0
+    tx = auction.bid(throne_nft.address, nft_id, 2000, {'from': bidder2})
+    assert tx.events['BidSubmitted']['previousBidder'] == minter
+    assert tx.events['BidSubmitted']['refund'] == 1000
+
+    chain.sleep(auction.getAuctionData(throne_nft.address, nft_id)[END_TIMESTAMP] - chain.time() + 10)
+    chain.mine()
+    tx = auction.claimWonNFT(throne_nft.address, nft_id, {'from': admin})
+    royalty = 2000 * auction.authorRoyaltyNumerator() // 10000
+    assert tx.events['WonNftClaimed'] == {
+        'nft': throne_nft.address, 'nftId': nft_id, 'winner': bidder2, 'claimCaller': admin,
+        'auctioneer': bidder1, 'price': 2000, 'priceToken': throne_coin.address, 'auctioneerPayout': 2000 - royalty}
+    assert tx.events['RoyaltyPaid']['amount'] == royalty
+
+
+def test_state_rebuilt_from_logs(auction, throne_nft, throne_coin, admin, users, chain, web3, deployment):
+    rng = random.Random(27)
+    state = AuctionState(paused=deployment == 'direct')  # the proxy is initialized unpaused, without an event
+    follower = LogFollower(web3, auction, state)
+    follower.sync()
+
+    nft_ids = [throne_nft.mintWithTokenURI(URI, {'from': rng.choice(users)}).events['Transfer']['tokenId']
+               for _ in range(6)]
+    for user in users:
+        throne_coin.approve(auction.address, MAX_UINT256, {'from': user})
+
+    def create():
+        free = [i for i in nft_ids if state.get(throne_nft.address, i) is None]
+        if not free:
+            return
+        nft_id = rng.choice(free)
+        owner = throne_nft.ownerOf(nft_id)
+        throne_nft.approve(auction.address, nft_id, {'from': owner})
+        auction.createAuction(throne_nft.address, nft_id, rng.randint(10**15, 10**16), rng.random() < 0.5,
+                              {'from': owner})
+
+    def live(started=None):
+        result = []
+        for (nft, nft_id), data in state.auctions.items():
+            if started is not None and (data[CURRENT_BIDDER] != ADDRESS_ZERO) != started:
+                continue
+            result.append((nft_id, data))
+        return result
+
+    def place_bid():
+        candidates = [(i, d) for i, d in live() if d[END_TIMESTAMP] == 0 or d[END_TIMESTAMP] - chain.time() > 5]
+        if not candidates:
+            return
+        nft_id, data = rng.choice(candidates)
+        bidder = rng.choice(users)
+        if data[CURRENT_BIDDER] == ADDRESS_ZERO:
+            amount = data[CURRENT_BID] + rng.randint(0, 10**15)
+        else:
+            amount = data[CURRENT_BID] * (10000 + auction.minPriceStepNumerator()) // 10000 + rng.randint(1, 10**15)
+        if data[1] == ADDRESS_ZERO:
+            value = amount - data[CURRENT_BID] if data[CURRENT_BIDDER] == bidder else amount
+            auction.bidEther(throne_nft.address, nft_id, amount, {'from': bidder, 'value': value})
+        else:
+            auction.bid(throne_nft.address, nft_id, amount, {'from': bidder})
+
+    def change_reserve():
+        candidates = live(started=False)
+        if candidates:
+            nft_id, data = rng.choice(candidates)
+            caller = rng.choice([data[AUCTIONEER], admin])
+            auction.changeReservePrice(throne_nft.address, nft_id, rng.randint(10**15, 10**16), {'from': caller})
+
+    def cancel():
+        candidates = live(started=False)
+        if candidates:
+            nft_id, data = rng.choice(candidates)
+            auction.cancelAuction(throne_nft.address, nft_id, {'from': rng.choice([data[AUCTIONEER], admin])})
+
+    def claim():
+        candidates = [(i, d) for i, d in live(started=True) if d[END_TIMESTAMP] < chain.time() - 1]
+        if candidates:
+            nft_id, _ = rng.choice(candidates)
+            auction.claimWonNFT(throne_nft.address, nft_id, {'from': rng.choice(users)})
+
+    def sleep():
+        chain.sleep(rng.randint(10, 400))
+        chain.mine()
+
+    def change_settings():
+        rng.choice([
+            lambda: auction.setOvertimeWindow(rng.randint(60, 300), {'from': admin}),
+            lambda: auction.setAuctionDuration(rng.randint(60, 600), {'from': admin}),
+            lambda: auction.setMinPriceStepNumerator(rng.randint(1, 1000), {'from': admin}),
+            lambda: auction.setAuthorRoyaltyNumerator(rng.randint(0, 1000), {'from': admin}),
+        ])()
+
+    def toggle_pause():
+        auction.pause({'from': admin})
+        follower.sync()
+        assert_state_matches(state, auction, throne_nft, nft_ids)
+        auction.unpause({'from': admin})
+
+    operations = [create, create, place_bid, place_bid, place_bid, change_reserve, cancel, claim, sleep,
+                  change_settings, toggle_pause]
+    for _ in range(80):
+        rng.choice(operations)()
+        follower.sync()
+        assert_state_matches(state, auction, throne_nft, nft_ids)
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import websockets
+from aiohttp import ClientSession
+from aiohttp.test_utils import unused_port
+
+from scripts.bid_push import BidPushServer, Subscriber
+
+NFT = '0x1111111111111111111111111111111111111111'
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class SlowSocket:
+    """Stand-in of a client connection whose `send` blocks until released."""
+
+    def __init__(self):
+        self.messages = []
+        self.gate = asyncio.Event()
+
+    async def send(self, message):
+        await self.gate.wait()
+        self.messages.append(message)
+
+
+def test_slow_client_gets_latest_state_only():
+    async def scenario():
+        socket = SlowSocket()
+        subscriber = Subscriber(socket)
+        writer = asyncio.ensure_future(subscriber.write())
+        subscriber.push((NFT, 1), 'a1')
+        await asyncio.sleep(0)  # the writer is blocked sending a1
+        for message in ('a2', 'a3'):
+            subscriber.push((NFT, 1), message)
+        subscriber.push((NFT, 2), 'b1')
+        assert len(subscriber.pending) == 2
+        socket.gate.set()
+        await asyncio.sleep(0.01)
+        writer.cancel()
+        assert socket.messages == ['a1', 'a3', 'b1']
+        assert subscriber.coalesced == 1
+
+    run(scenario())
+
+
+def test_fan_out_per_auction():
+    async def scenario():
+        server = BidPushServer('http://127.0.0.1:0', NFT, max_subscriptions=2)
+        port = unused_port()
+        async with websockets.serve(server.handler, '127.0.0.1', port):
+            url = 'ws://127.0.0.1:{}'.format(port)
+            clients = [await websockets.connect(url) for _ in range(3)]
+            await clients[0].send(json.dumps({'subscribe': [[NFT.lower(), 1]]}))
+            await clients[1].send(json.dumps({'subscribe': [[NFT, 1], [NFT, '2']]}))
+            await clients[2].send(json.dumps({'subscribe': [[NFT, 3], [NFT, 4], [NFT, 5]]}))
+            assert 'too many' in json.loads(await clients[2].recv())['error']
+            assert not {(NFT, 3), (NFT, 4), (NFT, 5)} & set(server.subscriptions)
+            while len(server.subscriptions.get((NFT, 1), ())) < 2:
+                await asyncio.sleep(0.01)
+
+            assert server.publish('BidSubmitted', {'nft': NFT, 'nftId': 1, 'amount': 10**20}) == 2
+            assert server.publish('BidSubmitted', {'nft': NFT, 'nftId': 2, 'amount': 5}) == 1
+            assert server.publish('BidSubmitted', {'nft': NFT, 'nftId': 9, 'amount': 5}) == 0
+            assert json.loads(await clients[0].recv()) == {
+                'event': 'BidSubmitted', 'nft': NFT, 'nftId': '1', 'amount': str(10**20)}
+            received = [json.loads(await clients[1].recv()) for _ in range(2)]
+            assert [message['nftId'] for message in received] == ['1', '2']
+
+            await clients[0].close()
+            while len(server.clients) > 2:
+                await asyncio.sleep(0.01)
+            assert len(server.subscriptions[(NFT, 1)]) == 1
+            for client in clients[1:]:
+                await client.close()
+
+    run(scenario())
+
+
+def test_follows_chain(auction, throne_nft, throne_coin, users, web3):
+    server = BidPushServer(web3.provider.endpoint_uri, auction.address)
+    minter, bidder = users[0], users[1]
+    nft_id = throne_nft.mintWithTokenURI(URI, {'from': minter}).events['Transfer']['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': minter})
+    auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': minter})
+
+    async def scenario():
+        socket = SlowSocket()
+        socket.gate.set()
+        subscriber = Subscriber(socket)
+        server._subscribe(subscriber, [(throne_nft.address, nft_id)])
+        async with ClientSession() as session:
+            assert await server.poll(session) == 0  # starts from the head
+            throne_coin.approve(auction.address, 1000, {'from': bidder})
+            auction.bid(throne_nft.address, nft_id, 1000, {'from': bidder})
+            assert await server.poll(session) == 1
+        writer = asyncio.ensure_future(subscriber.write())
+        await asyncio.sleep(0.01)
+        writer.cancel()
+        message = json.loads(socket.messages[0])
+        assert (message['event'], message['bidder'], message['amount']) == ('BidSubmitted', bidder, '1000')
+
+    run(scenario())
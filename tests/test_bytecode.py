@@ -0,0 +1,26 @@
+from brownie import Auction
+
+from scripts.bytecode_report import EIP170_LIMIT, UPGRADE_HEADROOM, auction_bytecode_budget, deployed_size, \
+    latest_report, revert_gas
+
+
+def test_auction_bytecode_budget():
+    size = deployed_size(Auction)
+    report = latest_report()
+    budget = auction_bytecode_budget(report)
+    measured = report['bytecode_size']['Auction'] if report is not None else None
+    print(f'Auction: {size} bytes deployed, last report {measured}, budget {budget}')
+    assert size <= budget <= EIP170_LIMIT - UPGRADE_HEADROOM
+
+
+def test_custom_errors_in_abi(auction):
+    errors = {item['name'] for item in auction.abi if item['type'] == 'error'}
+    assert {'ContractPaused', 'AuctionFinished', 'SmallBidAmount', 'CantBidEtherAuctionByTokens',
+            'CantBidTokenAuctionByEther', 'InvalidEtherAmount'} <= errors
+
+
+def test_revert_gas(auction, throne_nft, throne_coin, admin, users, chain):
+    gas = revert_gas(auction, throne_nft, throne_coin, admin, users[0], users[1], chain.sleep)
+    for name, used in gas.items():
+        print(f'{name}: {used} gas')
+    assert len(gas) == 6 and all(used < 100_000 for used in gas.values())
@@ -0,0 +1,41 @@
+from scripts.auction_state import AuctionState
+from scripts.compact_store import CompactAuctionStore, DENSE_ID_LIMIT
+from scripts.snapshot import synthetic_events
+
+NFT = '0x' + '22' * 20
+USER = '0x' + '33' * 20
+TOKEN = '0x' + '44' * 20
+
+
+def test_matches_auction_state():
+    events = synthetic_events(20_000)
+    store = CompactAuctionStore()
+    state = AuctionState()
+    for name, args in events:
+        store.apply(name, args)
+        state.apply(name, args)
+    assert len(store) == len(state.auctions)
+    for (nft, nft_id), auction in state.auctions.items():
+        assert store.get(nft, nft_id) == tuple(auction)
+        bids = [bid.as_tuple() for bid in store.bids(nft, nft_id)]
+        if bids:
+            history = state.bids[(nft, nft_id)][-len(bids):]
+            assert bids == [(bidder, amount, end) for bidder, amount, _, end in history]
+    settled = {(args['nft'], args['nftId']) for name, args in events if name == 'WonNftClaimed'}
+    for nft, nft_id in settled - set(state.auctions):
+        assert store.get(nft, nft_id) is None and store.bids(nft, nft_id) == []
+    assert store.bid_count == sum(1 for name, _ in events if name == 'BidSubmitted')
+
+
+def test_rows_reused_and_sparse_ids():
+    store = CompactAuctionStore()
+    created = {'nft': NFT, 'startPrice': 10, 'priceToken': TOKEN, 'auctioneer': USER}
+    store.apply('AuctionCreated', dict(created, nftId=1))
+    store.apply('BidSubmitted', {'nft': NFT, 'nftId': 1, 'bidder': USER, 'amount': 2 ** 255, 'endTimestamp': 2 ** 40 - 1})
+    store.apply('WonNftClaimed', {'nft': NFT, 'nftId': 1})
+    store.apply('AuctionCreated', dict(created, nftId=DENSE_ID_LIMIT + 5))
+    view = store.view(NFT, DENSE_ID_LIMIT + 5)
+    assert (view.current_bid, view.current_bidder, view.end_timestamp) == (10, '0x' + '00' * 20, 0)
+    assert len(store._bid_token) == 1 and store.get(NFT, 1) is None
+    assert store.bids(NFT, DENSE_ID_LIMIT + 5) == []
+    assert len(store.addresses) == 4  # zero address, NFT, token, user
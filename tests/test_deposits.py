@@ -0,0 +1,145 @@
+import brownie
+from brownie import Fixed
+from brownie.network.event import decode_logs
+
+from scripts.auction_state import AuctionState
+from scripts.deposit_gas import outbid_gas
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+ETHER = '0x0000000000000000000000000000000000000000'
+
+
+def list_auction(auction, throne_nft, auctioneer, price, is_ether):
+    nft_id = throne_nft.mintWithTokenURI(URI, {'from': auctioneer}).events['Transfer']['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+    auction.createAuction(throne_nft.address, nft_id, price, is_ether, {'from': auctioneer})
+    return nft_id
+
+
+def test_deposit_and_withdraw(auction, throne_coin, users):
+    user = users[0]
+    coin_balance, ether_balance = throne_coin.balanceOf(user), user.balance()
+    throne_coin.approve(auction.address, Fixed('3 ether'), {'from': user})
+    tx = auction.deposit(Fixed('3 ether'), {'from': user})
+    assert tx.events['Deposited'] == {'account': user, 'token': throne_coin.address, 'amount': Fixed('3 ether')}
+    auction.depositEther({'from': user, 'value': Fixed('2 ether')})
+    assert auction.deposits(user, throne_coin.address) == Fixed('3 ether')
+    assert auction.deposits(user, ETHER) == Fixed('2 ether')
+
+    with brownie.reverts('InsufficientDeposit'):
+        auction.withdraw(throne_coin.address, Fixed('3 ether') + 1, {'from': user})
+    with brownie.reverts('InsufficientDeposit'):
+        auction.withdraw(ETHER, 1, {'from': users[1]})
+    tx = auction.withdraw(throne_coin.address, Fixed('3 ether'), {'from': user})
+    assert tx.events['Withdrawn'] == {'account': user, 'token': throne_coin.address, 'amount': Fixed('3 ether')}
+    auction.withdraw(ETHER, Fixed('2 ether'), {'from': user})
+    assert throne_coin.balanceOf(user) == coin_balance and user.balance() == ether_balance
+    assert auction.deposits(user, throne_coin.address) == auction.deposits(user, ETHER) == 0
+
+
+def test_withdraw_while_paused(auction, throne_coin, admin, users):
+    user = users[0]
+    throne_coin.approve(auction.address, Fixed('2 ether'), {'from': user})
+    auction.deposit(Fixed('2 ether'), {'from': user})
+    auction.depositEther({'from': user, 'value': Fixed('1 ether')})
+    auction.pause({'from': admin})
+    with brownie.reverts('ContractPaused'):
+        auction.deposit(1, {'from': user})
+    balance = throne_coin.balanceOf(user)
+    auction.withdraw(throne_coin.address, Fixed('2 ether'), {'from': user})  # free deposits are never frozen
+    auction.withdraw(ETHER, Fixed('1 ether'), {'from': user})
+    assert throne_coin.balanceOf(user) - balance == Fixed('2 ether')
+    assert auction.deposits(user, throne_coin.address) == auction.deposits(user, ETHER) == 0
+
+
+def test_bid_from_deposit(auction, throne_nft, throne_coin, users, chain):
+    auctioneer, wallet_bidder, bidder1, bidder2 = users[:4]
+    coin = throne_coin.address
+    held = throne_coin.balanceOf(auction.address)
+    for bidder in (bidder1, bidder2):
+        throne_coin.approve(auction.address, Fixed('10 ether'), {'from': bidder})
+        auction.deposit(Fixed('10 ether'), {'from': bidder})
+    throne_coin.approve(auction.address, Fixed('1 ether'), {'from': wallet_bidder})
+    nft_id = list_auction(auction, throne_nft, auctioneer, Fixed('1 ether'), False)
+
+    auction.bid(throne_nft.address, nft_id, Fixed('1 ether'), {'from': wallet_bidder})
+    tx = auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('2 ether'), {'from': bidder1})
+    assert 'Transfer' not in tx.events  # the token is not called
+    assert tx.events['BidSubmitted']['refund'] == Fixed('1 ether')
+    assert [dict(event) for event in tx.events['DepositMoved']] == [
+        {'account': bidder1, 'token': coin, 'delta': -Fixed('2 ether')},
+        {'account': wallet_bidder, 'token': coin, 'delta': Fixed('1 ether')}]
+    assert auction.deposits(wallet_bidder, coin) == Fixed('1 ether')  # the wallet bidder is refunded to its deposit
+    assert auction.deposits(bidder1, coin) == Fixed('8 ether')
+    with brownie.reverts('InsufficientDeposit'):
+        auction.withdraw(coin, Fixed('8 ether') + 1, {'from': bidder1})  # the winning bid is locked
+
+    auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('3 ether'), {'from': bidder2})
+    auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('4 ether'), {'from': bidder2})  # raise by 1 ether
+    assert auction.deposits(bidder1, coin) == Fixed('10 ether')
+    assert auction.deposits(bidder2, coin) == Fixed('6 ether')
+    with brownie.reverts('InsufficientDeposit'):
+        auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('11 ether'), {'from': bidder1})
+    assert throne_coin.balanceOf(auction.address) == held + Fixed('21 ether')
+
+    chain.sleep(auction.auctionDuration() + 1)
+    auction.claimWonNFT(throne_nft.address, nft_id, {'from': bidder2})
+    assert throne_nft.ownerOf(nft_id) == bidder2
+    assert throne_coin.balanceOf(auction.address) == held + Fixed('17 ether')  # deposits left of 3 accounts
+
+
+def test_bid_ether_from_deposit(auction, throne_nft, users):
+    auctioneer, bidder1, bidder2 = users[:3]
+    nft_id = list_auction(auction, throne_nft, auctioneer, Fixed('1 ether'), True)
+    auction.depositEther({'from': bidder1, 'value': Fixed('1 ether')})
+    with brownie.reverts('InsufficientDeposit'):
+        auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('2 ether'), {'from': bidder1})
+    auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('1 ether'), {'from': bidder1})
+    auction.bidEther(throne_nft.address, nft_id, Fixed('2 ether'), {'from': bidder2, 'value': Fixed('2 ether')})
+    assert auction.deposits(bidder1, ETHER) == 0  # refunded by a wallet bid to the wallet
+    with brownie.reverts('AuctionNotExists'):
+        auction.bidFromDeposit(throne_nft.address, nft_id + 1, Fixed('1 ether'), {'from': bidder1})
+
+
+def test_state_rebuilds_deposits(auction, throne_nft, throne_coin, users, web3):
+    auctioneer, wallet_bidder, bidder1, bidder2 = users[:4]
+    coin = throne_coin.address
+    start_block = web3.eth.block_number + 1
+    for bidder in (wallet_bidder, bidder1, bidder2):
+        throne_coin.approve(auction.address, Fixed('10 ether'), {'from': bidder})
+        auction.deposit(Fixed('5 ether'), {'from': bidder})
+        auction.depositEther({'from': bidder, 'value': Fixed('1 ether')})
+    nft_id = list_auction(auction, throne_nft, auctioneer, Fixed('1 ether'), False)
+    auction.bid(throne_nft.address, nft_id, Fixed('1 ether'), {'from': wallet_bidder})
+    auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('2 ether'), {'from': bidder1})
+    auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('3 ether'), {'from': bidder2})
+    auction.bidFromDeposit(throne_nft.address, nft_id, Fixed('4 ether'), {'from': bidder2})
+    auction.withdraw(coin, Fixed('6 ether'), {'from': wallet_bidder})  # its deposit and the credited refund
+    ether_id = list_auction(auction, throne_nft, auctioneer, Fixed('1 ether'), True)
+    auction.bidFromDeposit(throne_nft.address, ether_id, Fixed('1 ether'), {'from': bidder1})
+    auction.withdraw(ETHER, Fixed('1 ether'), {'from': bidder2})
+
+    logs = web3.eth.get_logs({'address': auction.address, 'fromBlock': start_block, 'toBlock': 'latest'})
+    state = AuctionState(paused=False)
+    for event in decode_logs(logs):
+        state.apply(event.name, event)
+    expected = {(account, token): auction.deposits(account, token)
+                for account in (wallet_bidder, bidder1, bidder2) for token in (coin, ETHER)}
+    assert state.deposits == {key: balance for key, balance in expected.items() if balance}
+    assert expected[bidder1, coin] == Fixed('5 ether') and expected[bidder1, ETHER] == 0
+
+
+def test_deposit_bids_save_gas(auction, throne_nft, throne_coin, users):
+    auctioneer, *bidders = users[:4]
+    for bidder in bidders:
+        throne_coin.approve(auction.address, Fixed('20 ether'), {'from': bidder})
+        auction.deposit(Fixed('10 ether'), {'from': bidder})
+        auction.depositEther({'from': bidder, 'value': Fixed('1 ether')})
+    gas = {}
+    for is_ether in (False, True):
+        for from_deposit in (False, True):
+            used = outbid_gas(auction, throne_nft, auctioneer, bidders, 10, is_ether, from_deposit)
+            gas[is_ether, from_deposit] = used
+            print(f'{"ether" if is_ether else "token"} {"deposit" if from_deposit else "wallet"} outbid gas: '
+                  f'{sum(used) // len(used)}')
+    assert max(gas[False, True]) < min(gas[False, False])  # no token calls, ether refunds are cheap already
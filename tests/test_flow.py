@@ -8,7 +8,7 @@ ADDRESS_ZERO = '0x0000000000000000000000000000000000000000'
 
 def test_revision(auction):
     rev = auction.getRevision()
-    expected = 7
+    expected = 9
     assert rev == expected, f'wrong auction version is tested, actual'
 
 
@@ -35,7 +35,7 @@ def test_incorrect_nfthub(auction, throne_nft, throne_coin, admin, users, chain)
 
     # create auction
     start_price = Fixed('1 ether')
-    with brownie.reverts("NFT_CONTRACT_IS_NOT_ALLOWED"):
+    with brownie.reverts("NftContractIsNotAllowed"):
         some_wrong_address = users[-1]
         auction.createAuction(some_wrong_address, nft_id, start_price, False, {'from': minter})
 
@@ -57,7 +57,7 @@ def test_incorrect_startprice(auction, throne_nft, throne_coin, admin, users, ch
 
     # create auction
     start_price = Fixed('0 ether')
-    with brownie.reverts("INVALID_AUCTION_PARAMS"):
+    with brownie.reverts("InvalidAuctionParams"):
         auction.createAuction(throne_nft.address, nft_id, start_price, False, {'from': minter})
 
 
@@ -121,7 +121,7 @@ def test_claim_empty_winner(auction, throne_nft, throne_coin, admin, users, chai
     assert tx.events['AuctionCreated'] == {'nft': throne_nft.address, 'nftId': nft_id, 'auctioneer': minter,
                                            'startPrice': start_price, 'priceToken': throne_coin.address}
 
-    with brownie.reverts('EMPTY_WINNER'):
+    with brownie.reverts('EmptyWinner'):
         auction.claimWonNFT(throne_nft.address, nft_id, {'from': claimer})
 
 
@@ -423,7 +423,7 @@ def test_failed_to_place_bid_on_finished(auction, throne_nft, throne_coin, admin
     chain.sleep(end_timestamp - chain.time() + 10)
     chain.mine()
 
-    with brownie.reverts('AUCTION_FINISHED'):
+    with brownie.reverts('AuctionFinished'):
         bid2_price = bid_price * 105 / Fixed(100)
         auction.bid(throne_nft.address, nft_id, bid2_price, {'from': bidder})
 
@@ -502,7 +502,7 @@ def test_change_reserve_price_after_bid(auction, throne_nft, throne_coin, admin,
 
     # change reserve price
     start_price2 = Fixed('1 ether')
-    with brownie.reverts('AUCTION_ALREADY_STARTED'):
+    with brownie.reverts('AuctionAlreadyStarted'):
         auction.changeReservePrice(throne_nft.address, nft_id, start_price2, {'from': minter})
 
 
@@ -529,7 +529,7 @@ def test_change_reserve_price_wrong_value(auction, throne_nft, throne_coin, admi
 
     # change reserve price
     start_price2 = Fixed('0 ether')
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.changeReservePrice(throne_nft.address, nft_id, start_price2, {'from': minter})
 
 
@@ -583,7 +583,7 @@ def test_change_reserve_price_by_other_user(auction, throne_nft, throne_coin, ad
 
     # change reserve price by admin works
     start_price2 = Fixed('1 ether')
-    with brownie.reverts('NO_RIGHTS'):
+    with brownie.reverts('NoRights'):
         auction.changeReservePrice(throne_nft.address, nft_id, start_price2, {'from': users[-1]})
 
 
@@ -714,7 +714,7 @@ def test_2_bids_2nd_low(auction, throne_nft, throne_coin, admin, users, chain):
     throne_coin.approve(auction.address, bid2_price, {'from': bidder2})
 
     # bid2
-    with brownie.reverts('SMALL_BID_AMOUNT'):
+    with brownie.reverts('SmallBidAmount'):
         auction.bid(throne_nft.address, nft_id, bid2_price, {'from': bidder2})
 
 
@@ -757,7 +757,7 @@ def test_2nd_bids_already_finished(auction, throne_nft, throne_coin, admin, user
     throne_coin.approve(auction.address, bid2_price, {'from': bidder2})
 
     # bid2
-    with brownie.reverts('AUCTION_FINISHED'):
+    with brownie.reverts('AuctionFinished'):
         auction.bid(throne_nft.address, nft_id, bid2_price, {'from': bidder2})
 
 
@@ -948,7 +948,7 @@ def test_failed_low_bid(auction, throne_nft, throne_coin, admin, users, chain):
     throne_coin.approve(auction.address, bid_price, {'from': bidder})
 
     # bid
-    with brownie.reverts('SMALL_BID_AMOUNT'):
+    with brownie.reverts('SmallBidAmount'):
         auction.bid(throne_nft.address, nft_id, bid_price, {'from': bidder})
 
 
@@ -973,7 +973,7 @@ def test_create_auction_twice_fails(auction, throne_nft, throne_coin, admin, use
     assert tx.events['AuctionCreated'] == {'nft': throne_nft.address, 'nftId': nft_id, 'auctioneer': minter,
                                            'startPrice': start_price, 'priceToken': throne_coin.address}
 
-    with brownie.reverts("AUCTION_EXISTS"):
+    with brownie.reverts("AuctionExists"):
         auction.createAuction(throne_nft.address, nft_id, start_price, False, {'from': minter})
 
 
@@ -1003,7 +1003,7 @@ def test_cancel_auction_started_auction_failed(auction, throne_nft, throne_coin,
     throne_coin.approve(auction.address, bid_price, {'from': bidder})
     auction.bid(throne_nft.address, nft_id, bid_price, {'from': bidder})
 
-    with brownie.reverts('AUCTION_ALREADY_STARTED'):
+    with brownie.reverts('AuctionAlreadyStarted'):
         auction.cancelAuction(throne_nft.address, nft_id, {'from': minter})
 
 
@@ -1029,7 +1029,8 @@ def test_cancel_auction(auction, throne_nft, throne_coin, admin, users, chain):
                                            'startPrice': start_price, 'priceToken': throne_coin.address}
 
     tx = auction.cancelAuction(throne_nft.address, nft_id, {'from': minter})
-    assert tx.events['AuctionCanceled'] == {'nft': throne_nft.address, 'nftId': nft_id, 'canceler': minter}
+    assert tx.events['AuctionCanceled'] == {'nft': throne_nft.address, 'nftId': nft_id, 'canceler': minter,
+                                           'auctioneer': minter}
 
 
 def test_cancel_auction_after_change_reserve_price(auction, throne_nft, throne_coin, admin, users, chain):
@@ -1058,7 +1059,8 @@ def test_cancel_auction_after_change_reserve_price(auction, throne_nft, throne_c
     assert tx.events['ReservePriceChanged']['startPrice'] == start_price2
 
     tx = auction.cancelAuction(throne_nft.address, nft_id, {'from': minter})
-    assert tx.events['AuctionCanceled'] == {'nft': throne_nft.address, 'nftId': nft_id, 'canceler': minter}
+    assert tx.events['AuctionCanceled'] == {'nft': throne_nft.address, 'nftId': nft_id, 'canceler': minter,
+                                           'auctioneer': minter}
 
 
 def test_cancel_auction_by_admin(auction, throne_nft, throne_coin, admin, users, chain):
@@ -1083,7 +1085,8 @@ def test_cancel_auction_by_admin(auction, throne_nft, throne_coin, admin, users,
                                            'startPrice': start_price, 'priceToken': throne_coin.address}
 
     tx = auction.cancelAuction(throne_nft.address, nft_id, {'from': admin})
-    assert tx.events['AuctionCanceled'] == {'nft': throne_nft.address, 'nftId': nft_id, 'canceler': admin}
+    assert tx.events['AuctionCanceled'] == {'nft': throne_nft.address, 'nftId': nft_id, 'canceler': admin,
+                                           'auctioneer': minter}
 
 
 def test_cancel_auction_by_someone_else(auction, throne_nft, throne_coin, admin, users, chain):
@@ -1107,7 +1110,7 @@ def test_cancel_auction_by_someone_else(auction, throne_nft, throne_coin, admin,
     assert tx.events['AuctionCreated'] == {'nft': throne_nft.address, 'nftId': nft_id, 'auctioneer': minter,
                                            'startPrice': start_price, 'priceToken': throne_coin.address}
 
-    with brownie.reverts('NO_RIGHTS'):
+    with brownie.reverts('NoRights'):
         auction.cancelAuction(throne_nft.address, nft_id, {'from': users[-1]})
 
 
@@ -1139,7 +1142,7 @@ def test_cancel_auction_after_bid_failed(auction, throne_nft, throne_coin, admin
     # bid
     auction.bid(throne_nft.address, nft_id, bid_price, {'from': bidder})
 
-    with brownie.reverts('AUCTION_ALREADY_STARTED'):
+    with brownie.reverts('AuctionAlreadyStarted'):
         auction.cancelAuction(throne_nft.address, nft_id, {'from': minter})
 
 
@@ -1147,14 +1150,14 @@ def test_bid_on_nonexistant_auction_failed(auction, throne_nft, throne_coin, adm
     nft_id = 9000
     bid_price = Fixed('1 ether')
     bidder = users[0]
-    with brownie.reverts('AUCTION_NOT_EXISTS'):
+    with brownie.reverts('AuctionNotExists'):
         auction.bid(throne_nft.address, nft_id, bid_price, {'from': bidder})
 
 
 def test_cancel_of_nonexistant_auction_failed(auction, throne_nft, throne_coin, admin, users, chain):
     minter = users[0]
     nft_id = 9000
-    with brownie.reverts('AUCTION_NOT_EXISTS'):
+    with brownie.reverts('AuctionNotExists'):
         auction.cancelAuction(throne_nft.address, nft_id, {'from': minter})
 
 
@@ -1165,12 +1168,12 @@ def test_set_overtime_widnow(auction, admin):
 
 
 def test_set_overtime_widnow_low(auction, admin):
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setOvertimeWindow(59, {'from': admin})
 
 
 def test_set_overtime_widnow_high(auction, admin):
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setOvertimeWindow(365*24*3600+1, {'from': admin})
 
 
@@ -1182,7 +1185,7 @@ def test_set_royalty(auction, admin):
 
 def test_set_royalty_high(auction, admin):
     value = 10000 + 1  # > 100%
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setAuthorRoyaltyNumerator(value, {'from': admin})
 
 
@@ -1193,12 +1196,12 @@ def test_set_pricestep(auction, admin):
 
 
 def test_set_pricestep_low(auction, admin):
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setMinPriceStepNumerator(0, {'from': admin})
 
 
 def test_set_pricestep_high(auction, admin):
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setMinPriceStepNumerator(10000+1, {'from': admin})
 
 
@@ -1209,12 +1212,12 @@ def test_set_auctionduration(auction, admin):
 
 
 def test_set_auctionduration_low(auction, admin):
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setAuctionDuration(59, {'from': admin})
 
 
 def test_set_auctionduration_high(auction, admin):
-    with brownie.reverts('INVALID_AUCTION_PARAMS'):
+    with brownie.reverts('InvalidAuctionParams'):
         auction.setAuctionDuration(365*24*3600+1, {'from': admin})
 
 
@@ -1243,7 +1246,7 @@ def test_initialize_zero_admin(admin, throne_nft, throne_coin):
     duration = 5 * 60  # in prod 24*3600
     _minStepNumerator = 500  # 5%
     _authorRoyaltyNumerator = 100  # 1%
-    with brownie.reverts('ZERO_ADDRESS'):
+    with brownie.reverts('ZeroAddress'):
         contract.initialize(
             overtime,
             duration,
@@ -1261,7 +1264,7 @@ def test_initialize_zero_erc721(admin, throne_nft, throne_coin):
     duration = 5 * 60  # in prod 24*3600
     _minStepNumerator = 500  # 5%
     _authorRoyaltyNumerator = 100  # 1%
-    with brownie.reverts('ZERO_ADDRESS'):
+    with brownie.reverts('ZeroAddress'):
         contract.initialize(
             overtime,
             duration,
@@ -1279,7 +1282,7 @@ def test_initialize_zero_erc20(admin, throne_nft, throne_coin):
     duration = 5 * 60  # in prod 24*3600
     _minStepNumerator = 500  # 5%
     _authorRoyaltyNumerator = 100  # 1%
-    with brownie.reverts('ZERO_ADDRESS'):
+    with brownie.reverts('ZeroAddress'):
         contract.initialize(
             overtime,
             duration,
@@ -1364,3 +1367,312 @@ def test_burn_not_owner(auction, throne_nft, throne_coin, admin, users, chain):
 def test_supports_interface(auction, throne_nft, throne_coin, admin, users, chain):
     interface_id = '0xf1e9ff9f'  # type(IERC721TokenAuthor).interfaceId
     assert throne_nft.supportsInterface(interface_id)
+
+
+def test_bid_many(auction, throne_nft, throne_coin, admin, users, chain):
+    minter = users[0]
+    bidder1 = users[1]
+    bidder2 = users[2]
+
+    # mint and create 3 auctions
+    start_price = Fixed('1 ether')
+    nft_ids = []
+    for i in range(3):
+        tx = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': minter})
+        nft_id = tx.events["Transfer"]['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': minter})
+        auction.createAuction(throne_nft.address, nft_id, start_price, False, {'from': minter})
+        nft_ids.append(nft_id)
+
+    # bidder1 sweeps all 3
+    amounts = [start_price] * 3
+    throne_coin.approve(auction.address, sum(amounts), {'from': bidder1})
+    tx = auction.bidMany(throne_nft.address, nft_ids, amounts, {'from': bidder1})
+    assert len(tx.events['BidSubmitted']) == 3
+    assert len(tx.events['Transfer']) == 1  # single token pull
+    for nft_id in nft_ids:
+        assert auction.getAuctionData(throne_nft.address, nft_id)[3] == bidder1
+
+    # bidder2 outbids all 3, bidder1 gets a single netted refund
+    bidder1_balance_before = throne_coin.balanceOf(bidder1)
+    amounts2 = [start_price * Fixed(105) / Fixed(100)] * 3
+    throne_coin.approve(auction.address, sum(amounts2), {'from': bidder2})
+    tx = auction.bidMany(throne_nft.address, nft_ids, amounts2, {'from': bidder2})
+    assert len(tx.events['BidSubmitted']) == 3
+    assert len(tx.events['Transfer']) == 2  # pull + netted refund
+    assert throne_coin.balanceOf(bidder1) - bidder1_balance_before == sum(amounts)
+    assert throne_coin.balanceOf(auction) == sum(amounts2)
+
+    # travel to the future
+    end_timestamp = auction.getAuctionData(throne_nft.address, nft_ids[0])[4]
+    chain.sleep(end_timestamp - chain.time() + 10)
+    chain.mine()
+
+    for nft_id in nft_ids:
+        auction.claimWonNFT(throne_nft.address, nft_id, {'from': bidder2})
+        assert throne_nft.ownerOf(nft_id) == bidder2
+
+
+def test_bid_many_wrong_lengths(auction, throne_nft, throne_coin, admin, users, chain):
+    with brownie.reverts('InvalidBidParams'):
+        auction.bidMany(throne_nft.address, [1, 2], [Fixed('1 ether')], {'from': users[0]})
+    with brownie.reverts('InvalidBidParams'):
+        auction.bidMany(throne_nft.address, [], [], {'from': users[0]})
+
+
+def test_bid_many_low_bid_fails(auction, throne_nft, throne_coin, admin, users, chain):
+    minter = users[0]
+    bidder = users[1]
+
+    start_price = Fixed('1 ether')
+    nft_ids = []
+    for i in range(2):
+        tx = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': minter})
+        nft_id = tx.events["Transfer"]['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': minter})
+        auction.createAuction(throne_nft.address, nft_id, start_price, False, {'from': minter})
+        nft_ids.append(nft_id)
+
+    throne_coin.approve(auction.address, 2 * start_price, {'from': bidder})
+    with brownie.reverts('SmallBidAmount'):
+        auction.bidMany(throne_nft.address, nft_ids, [start_price, start_price - 1], {'from': bidder})
+
+
+def test_bid_ether_many(auction, throne_nft, throne_coin, admin, users, chain):
+    minter = users[0]
+    bidder1 = users[1]
+    bidder2 = users[2]
+
+    start_price = Fixed('1 ether')
+    nft_ids = []
+    for i in range(2):
+        tx = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': minter})
+        nft_id = tx.events["Transfer"]['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': minter})
+        tx = auction.createAuction(throne_nft.address, nft_id, start_price, True, {'from': minter})
+        assert tx.events['AuctionCreated']['priceToken'] == ADDRESS_ZERO
+        nft_ids.append(nft_id)
+
+    amounts = [start_price] * 2
+    with brownie.reverts('InvalidEtherAmount'):
+        auction.bidEtherMany(throne_nft.address, nft_ids, amounts, {'from': bidder1, 'value': start_price})
+    with brownie.reverts('CantBidEtherAuctionByTokens'):
+        auction.bidMany(throne_nft.address, nft_ids, amounts, {'from': bidder1})
+    auction.bidEtherMany(throne_nft.address, nft_ids, amounts, {'from': bidder1, 'value': sum(amounts)})
+
+    bidder1_balance_before = bidder1.balance()
+    amounts2 = [start_price * Fixed(105) / Fixed(100)] * 2
+    tx = auction.bidEtherMany(throne_nft.address, nft_ids, amounts2, {'from': bidder2, 'value': sum(amounts2)})
+    assert len(tx.events['BidSubmitted']) == 2
+    assert bidder1.balance() - bidder1_balance_before == sum(amounts)
+    assert auction.balance() == sum(amounts2)
+
+
+def test_bid_many_gas(auction, throne_nft, throne_coin, admin, users, chain):
+    minter = users[0]
+    bidder1 = users[1]
+    bidder2 = users[2]
+    n = 5
+
+    start_price = Fixed('1 ether')
+    nft_ids = []
+    for i in range(2 * n):
+        tx = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': minter})
+        nft_id = tx.events["Transfer"]['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': minter})
+        auction.createAuction(throne_nft.address, nft_id, start_price, False, {'from': minter})
+        nft_ids.append(nft_id)
+    single_ids, many_ids = nft_ids[:n], nft_ids[n:]
+
+    # first bids, then outbids with refunds
+    for bidder, price in [(bidder1, start_price), (bidder2, start_price * Fixed(105) / Fixed(100))]:
+        throne_coin.approve(auction.address, 2 * n * price, {'from': bidder})
+        single_gas = sum(
+            auction.bid(throne_nft.address, nft_id, price, {'from': bidder}).gas_used for nft_id in single_ids)
+        many_gas = auction.bidMany(throne_nft.address, many_ids, [price] * n, {'from': bidder}).gas_used
+        print(f'gas per item: bid={single_gas // n}, bidMany={many_gas // n}')
+        assert many_gas < single_gas
+
+
+def test_tokens_of_owner_and_by_author(auction, throne_nft, throne_coin, admin, users, chain):
+    author1 = users[0]
+    author2 = users[1]
+    uri = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/{}.json"
+    nft_ids = [throne_nft.mintWithTokenURI(uri.format(i), {'from': author1 if i % 2 else author2}).events['Transfer']['tokenId']
+               for i in range(6)]
+    throne_nft.transferFrom(author1, author2, nft_ids[1], {'from': author1})
+    throne_nft.burn(nft_ids[3], {'from': author1})
+
+    ids, uris, authors = throne_nft.tokensOfOwner(author2, 0, 10)
+    assert sorted(ids) == [nft_ids[0], nft_ids[1], nft_ids[2], nft_ids[4]]
+    assert all(uris[i] == uri.format(nft_ids.index(token_id)) for i, token_id in enumerate(ids))
+    assert dict(zip(ids, authors))[nft_ids[1]] == author1
+    assert [list(x) for x in throne_nft.tokensOfOwner(author2, 4, 10)] == [[], [], []]
+    assert len(throne_nft.tokensOfOwner(author2, 1, 2)[0]) == 2
+
+    assert throne_nft.authoredTokensCount(author1) == 2
+    ids, uris, owners = throne_nft.tokensByAuthor(author1, 0, 10)
+    assert sorted(ids) == [nft_ids[1], nft_ids[5]]
+    assert dict(zip(ids, owners)) == {nft_ids[1]: author2, nft_ids[5]: author1}
+    assert [list(x) for x in throne_nft.tokensByAuthor(users[2], 0, 10)] == [[], [], []]
+
+
+def test_tokens_of_owner_pagination_gas(throne_nft, users):
+    owner = users[0]
+    n = 2000
+    page = 100
+    uri = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+    for _ in range(n):
+        throne_nft.mintWithTokenURI(uri, {'from': owner})
+
+    # a page costs the same regardless of the offset and stays far below eth_call gas caps
+    for view in (throne_nft.tokensOfOwner, throne_nft.tokensByAuthor):
+        tokens = []
+        gas = []
+        for offset in range(0, n, page):
+            gas.append(view.estimate_gas(owner, offset, page))
+            tokens.extend(view(owner, offset, page)[0])
+        print(f'{view.abi["name"]} gas per page of {page} tokens: min={min(gas)}, max={max(gas)}')
+        assert tokens == list(range(n))
+        assert max(gas) < 10_000_000
+        assert max(gas) < min(gas) * 1.1
+
+
+def test_buy_now(auction, throne_nft, throne_coin, admin, users, chain):
+    author = users[0]
+    auctioneer = users[1]
+    bidder = users[2]
+    buyer = users[3]
+
+    tx = throne_nft.mintWithTokenURI(
+        "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': author})
+    nft_id = tx.events["Transfer"]['tokenId']
+    throne_nft.transferFrom(author, auctioneer, nft_id, {'from': author})
+    throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+
+    start_price = Fixed('1 ether')
+    buy_now_price = Fixed('3 ether')
+    with brownie.reverts('InvalidAuctionParams'):
+        auction.createAuctionWithBuyNow(throne_nft.address, nft_id, start_price, False, start_price - 1,
+                                        {'from': auctioneer})
+    tx = auction.createAuctionWithBuyNow(throne_nft.address, nft_id, start_price, False, buy_now_price,
+                                         {'from': auctioneer})
+    assert tx.events['BuyNowPriceSet'] == {'nft': throne_nft.address, 'nftId': nft_id, 'buyNowPrice': buy_now_price}
+    assert auction.nftAuction2nftID2buyNowPrice(throne_nft.address, nft_id) == buy_now_price
+    with brownie.reverts('InvalidAuctionParams'):  # the reserve price can't exceed the buy-now price
+        auction.changeReservePrice(throne_nft.address, nft_id, buy_now_price + 1, {'from': auctioneer})
+    auction.changeReservePrice(throne_nft.address, nft_id, buy_now_price, {'from': auctioneer})
+    auction.changeReservePrice(throne_nft.address, nft_id, start_price, {'from': auctioneer})
+
+    throne_coin.approve(auction.address, start_price, {'from': bidder})
+    auction.bid(throne_nft.address, nft_id, start_price, {'from': bidder})
+
+    bidder_balance = throne_coin.balanceOf(bidder)
+    author_balance = throne_coin.balanceOf(author)
+    auctioneer_balance = throne_coin.balanceOf(auctioneer)
+    throne_coin.approve(auction.address, buy_now_price, {'from': buyer})
+    with brownie.reverts('InvalidEtherAmount'):
+        auction.buyNow(throne_nft.address, nft_id, {'from': buyer, 'value': 1})
+    tx = auction.buyNow(throne_nft.address, nft_id, {'from': buyer})
+
+    royalty = buy_now_price * auction.authorRoyaltyNumerator() // 10000
+    assert tx.events['BidSubmitted']['previousBidder'] == bidder
+    assert tx.events['BidSubmitted']['refund'] == start_price
+    assert tx.events['WonNftClaimed']['winner'] == buyer
+    assert tx.events['WonNftClaimed']['auctioneerPayout'] == buy_now_price - royalty
+    assert tx.events['RoyaltyPaid']['amount'] == royalty
+    assert throne_nft.ownerOf(nft_id) == buyer
+    assert throne_coin.balanceOf(bidder) - bidder_balance == start_price
+    assert throne_coin.balanceOf(author) - author_balance == royalty
+    assert throne_coin.balanceOf(auctioneer) - auctioneer_balance == buy_now_price - royalty
+    assert throne_coin.balanceOf(auction) == 0
+    assert auction.nftAuction2nftID2buyNowPrice(throne_nft.address, nft_id) == 0
+    with brownie.reverts('AuctionNotExists'):
+        auction.getAuctionData(throne_nft.address, nft_id)
+
+
+def test_buy_now_ether(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer = users[0]
+    bidder = users[1]
+    buyer = users[2]
+
+    tx = throne_nft.mintWithTokenURI(
+        "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': auctioneer})
+    nft_id = tx.events["Transfer"]['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+    start_price = Fixed('1 ether')
+    buy_now_price = Fixed('2 ether')
+    auction.createAuctionWithBuyNow(throne_nft.address, nft_id, start_price, True, buy_now_price, {'from': auctioneer})
+    auction.bidEther(throne_nft.address, nft_id, start_price, {'from': bidder, 'value': start_price})
+
+    bidder_balance = bidder.balance()
+    auctioneer_balance = auctioneer.balance()
+    with brownie.reverts('InvalidEtherAmount'):
+        auction.buyNow(throne_nft.address, nft_id, {'from': buyer, 'value': start_price})
+    tx = auction.buyNow(throne_nft.address, nft_id, {'from': buyer, 'value': buy_now_price})
+    assert 'RoyaltyPaid' not in tx.events  # the auctioneer is the author
+    assert throne_nft.ownerOf(nft_id) == buyer
+    assert bidder.balance() - bidder_balance == start_price
+    assert auctioneer.balance() - auctioneer_balance == buy_now_price
+    assert auction.balance() == 0
+
+
+def test_buy_now_not_available(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer = users[0]
+    bidder = users[1]
+    nft_ids = []
+    for i in range(3):
+        tx = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': auctioneer})
+        nft_ids.append(tx.events["Transfer"]['tokenId'])
+        throne_nft.approve(auction.address, nft_ids[-1], {'from': auctioneer})
+    start_price = Fixed('1 ether')
+
+    auction.createAuction(throne_nft.address, nft_ids[0], start_price, False, {'from': auctioneer})
+    with brownie.reverts('BuyNowNotAvailable'):
+        auction.buyNow(throne_nft.address, nft_ids[0], {'from': bidder})
+
+    # the bid reached the buy-now price
+    auction.createAuctionWithBuyNow(throne_nft.address, nft_ids[1], start_price, False, start_price,
+                                    {'from': auctioneer})
+    throne_coin.approve(auction.address, start_price, {'from': bidder})
+    auction.bid(throne_nft.address, nft_ids[1], start_price, {'from': bidder})
+    with brownie.reverts('BuyNowNotAvailable'):
+        auction.buyNow(throne_nft.address, nft_ids[1], {'from': users[2]})
+
+    # canceled auctions forget the buy-now price
+    auction.createAuctionWithBuyNow(throne_nft.address, nft_ids[2], start_price, False, 2 * start_price,
+                                    {'from': auctioneer})
+    auction.cancelAuction(throne_nft.address, nft_ids[2], {'from': auctioneer})
+    assert auction.nftAuction2nftID2buyNowPrice(throne_nft.address, nft_ids[2]) == 0
+    with brownie.reverts('AuctionNotExists'):
+        auction.buyNow(throne_nft.address, nft_ids[2], {'from': bidder})
+
+
+def test_buy_now_gas(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer = users[0]
+    buyer = users[1]
+    start_price = Fixed('1 ether')
+    nft_ids = []
+    for i in range(2):
+        tx = throne_nft.mintWithTokenURI(
+            "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json", {'from': auctioneer})
+        nft_ids.append(tx.events["Transfer"]['tokenId'])
+        throne_nft.approve(auction.address, nft_ids[-1], {'from': auctioneer})
+    throne_coin.approve(auction.address, 2 * start_price, {'from': buyer})
+
+    bid_and_claim = auction.createAuction(throne_nft.address, nft_ids[0], start_price, False,
+                                          {'from': auctioneer}).gas_used
+    bid_and_claim += auction.bid(throne_nft.address, nft_ids[0], start_price, {'from': buyer}).gas_used
+    chain.sleep(auction.getAuctionData(throne_nft.address, nft_ids[0])[4] - chain.time() + 1)
+    bid_and_claim += auction.claimWonNFT(throne_nft.address, nft_ids[0], {'from': buyer}).gas_used
+
+    buy_now = auction.createAuctionWithBuyNow(throne_nft.address, nft_ids[1], start_price, False, start_price,
+                                              {'from': auctioneer}).gas_used
+    buy_now += auction.buyNow(throne_nft.address, nft_ids[1], {'from': buyer}).gas_used
+    print(f'gas per completed sale: bid and claim={bid_and_claim}, buy now={buy_now}')
+    assert buy_now < bid_and_claim
@@ -0,0 +1,136 @@
+import os
+
+from brownie.test import state_machine, strategy
+
+from scripts.gas_fuzz import ADDRESS_ZERO, LIMITS_FILE, GasRecorder, bid_path, claim_path
+
+MAX_UINT256 = 2**256 - 1
+STEPS = int(os.environ.get('GAS_FUZZ_STEPS', 40))
+EXAMPLES = int(os.environ.get('GAS_FUZZ_EXAMPLES', 30))
+
+
+class AuctionGasMachine:
+    st_index = strategy('uint16')
+    st_price = strategy('uint256', min_value=10**15, max_value=10**17)
+    st_raise = strategy('uint256', max_value=10**17)
+    st_ether = strategy('bool')
+    st_sleep = strategy('uint256', min_value=1, max_value=400)
+    st_setting = strategy('uint8', max_value=3)
+    st_value = strategy('uint256', min_value=1, max_value=300)
+
+    def __init__(cls, auction, nft, coin, admin, users, chain, recorder):
+        cls.auction = auction
+        cls.chain = chain
+        cls.nft = nft
+        cls.coin = coin
+        cls.admin = admin
+        cls.authors = users[:3]
+        cls.bidders = users[3:6]  # few bidders, so the current bidder often raises its own bid
+        cls.recorder = recorder
+        for account in users[:6]:
+            nft.setApprovalForAll(auction, True, {'from': account})
+            coin.approve(auction, MAX_UINT256, {'from': account})
+
+    def setup(self):
+        self.listed = []  # nft ids, auctions may be settled since
+        self.paused = False
+
+    def _pick(self, items, index):
+        return items[index % len(items)] if items else None
+
+    def _data(self, nft_id):
+        current_bid, bid_token, auctioneer, bidder, end = self.auction.nftAuction2nftID2auction(self.nft, nft_id)
+        return None if auctioneer == ADDRESS_ZERO else (current_bid, bid_token, auctioneer, bidder, end)
+
+    def _record(self, entry_point, path, tx):
+        self.recorder.record(entry_point, path, tx)
+
+    def rule_list(self, st_index, st_price, st_ether):
+        if self.paused:
+            return
+        author = self._pick(self.authors, st_index)
+        auctioneer = self._pick(self.authors, st_index // 3)
+        nft_id = self.nft.mintWithTokenURI('uri', {'from': author}).events['Transfer']['tokenId']
+        if auctioneer != author:
+            self.nft.transferFrom(author, auctioneer, nft_id, {'from': author})
+        tx = self.auction.createAuction(self.nft, nft_id, st_price, st_ether, {'from': auctioneer})
+        self._record('createAuction', 'ether' if st_ether else 'token', tx)
+        self.listed.append(nft_id)
+
+    def rule_bid(self, st_index, st_raise):
+        nft_id = self._pick(self.listed, st_index)
+        data = None if nft_id is None or self.paused else self._data(nft_id)
+        if data is None or (data[4] and self.chain.time() + 2 >= data[4]):  # the bid may be mined a bit later
+            return
+        current_bid, bid_token, _, current_bidder, end = data
+        bidder = self._pick(self.bidders, st_index // 7)
+        step = self.auction.minPriceStepNumerator()
+        amount = current_bid if not end else -(-(10000 + step) * current_bid // 10000)
+        amount += st_raise
+        if bid_token == ADDRESS_ZERO:
+            value = amount - current_bid if current_bidder == bidder else amount
+            tx = self.auction.bidEther(self.nft, nft_id, amount, {'from': bidder, 'value': value})
+            entry_point = 'bidEther'
+        else:
+            tx = self.auction.bid(self.nft, nft_id, amount, {'from': bidder})
+            entry_point = 'bid'
+        self._record(entry_point, bid_path(bidder, tx.events['BidSubmitted'], end), tx)
+
+    def rule_sleep(self, st_sleep):
+        self.chain.sleep(st_sleep)
+
+    def rule_claim(self, st_index):
+        finished = [nft_id for nft_id in self.listed if self._claimable(nft_id)]
+        nft_id = self._pick(finished, st_index)
+        if nft_id is None or self.paused:
+            return
+        is_ether = self._data(nft_id)[1] == ADDRESS_ZERO
+        tx = self.auction.claimWonNFT(self.nft, nft_id, {'from': self._pick(self.bidders, st_index)})
+        self._record('claimWonNFT', claim_path(tx.events, is_ether), tx)
+        self.listed.remove(nft_id)
+
+    def _claimable(self, nft_id):
+        data = self._data(nft_id)
+        return data is not None and data[4] and self.chain.time() > data[4]
+
+    def rule_cancel_or_change_price(self, st_index, st_price):
+        idle = [nft_id for nft_id in self.listed if self._idle(nft_id)]
+        nft_id = self._pick(idle, st_index)
+        if nft_id is None or self.paused:
+            return
+        auctioneer = self._data(nft_id)[2]
+        if st_index % 2:
+            tx = self.auction.changeReservePrice(self.nft, nft_id, st_price, {'from': auctioneer})
+            self._record('changeReservePrice', 'auctioneer', tx)
+        else:
+            tx = self.auction.cancelAuction(self.nft, nft_id, {'from': auctioneer})
+            self._record('cancelAuction', 'auctioneer', tx)
+            self.listed.remove(nft_id)
+
+    def _idle(self, nft_id):
+        data = self._data(nft_id)
+        return data is not None and data[3] == ADDRESS_ZERO
+
+    def rule_admin_setting(self, st_setting, st_value):
+        setter, value = [
+            ('setAuctionDuration', 60 + st_value),
+            ('setOvertimeWindow', st_value),
+            ('setMinPriceStepNumerator', st_value * 10),
+            ('setAuthorRoyaltyNumerator', st_value * 10),
+        ][st_setting]
+        self._record(setter, 'admin', getattr(self.auction, setter)(value, {'from': self.admin}))
+
+    def rule_toggle_pause(self):
+        entry_point = 'unpause' if self.paused else 'pause'
+        self._record(entry_point, 'admin', getattr(self.auction, entry_point)({'from': self.admin}))
+        self.paused = not self.paused
+
+
+def test_worst_case_gas(auction, throne_nft, throne_coin, admin, users, chain, deployment):
+    recorder = GasRecorder()
+    state_machine(AuctionGasMachine, auction, throne_nft, throne_coin, admin, users, chain, recorder,
+                  settings={'max_examples': EXAMPLES, 'stateful_step_count': STEPS})
+    report = recorder.write(LIMITS_FILE.format(deployment=deployment))
+    for entry_point, limit in report['recommended_gas_limits'].items():
+        print(f'{entry_point}: max {recorder.maximum(entry_point)}, recommended limit {limit}')
+    assert {'bid', 'bidEther', 'claimWonNFT', 'cancelAuction'} <= set(report['recommended_gas_limits'])
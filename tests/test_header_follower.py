@@ -0,0 +1,89 @@
+import asyncio
+
+import aiohttp
+from brownie import Auction, ThronNFT
+
+from scripts.header_follower import HeaderFollower, LogsBloomFilter, bloom_mask
+from scripts.log_decoder import LogDecoder
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+AUCTION = '0x' + '11' * 20
+TOPIC = '0x' + '22' * 32
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+def test_bloom_filter():
+    bloom_filter = LogsBloomFilter([AUCTION], [TOPIC])
+    bloom = bloom_mask(bytes.fromhex(AUCTION[2:])) | bloom_mask(bytes.fromhex(TOPIC[2:]))
+    assert bloom_filter.might_match('0x' + bloom.to_bytes(256, 'big').hex())
+    assert not bloom_filter.might_match('0x' + bloom_mask(bytes.fromhex(AUCTION[2:])).to_bytes(256, 'big').hex())
+    assert not bloom_filter.might_match(bytes(256))
+
+
+def test_bloom_of_chain_blocks(auction, throne_coin, users, web3):
+    tx = throne_coin.transfer(users[1], 1, {'from': users[0]})
+    bloom = web3.eth.get_block(tx.block_number)['logsBloom']
+    transfer = tx.logs[0]['topics'][0]
+    assert LogsBloomFilter([throne_coin.address], [transfer]).might_match(bytes(bloom))
+    assert not LogsBloomFilter([auction.address], [transfer]).might_match(bytes(bloom))
+
+
+def follower_of(auction, throne_nft, web3, blocks, rollbacks):
+    decoder = LogDecoder({'Auction': Auction.abi, 'ThronNFT': ThronNFT.abi})
+    return HeaderFollower(web3.provider.endpoint_uri, [auction.address, throne_nft.address], decoder=decoder,
+                          on_block=lambda number, block_hash, records: blocks.append((number, block_hash, records)),
+                          on_rollback=rollbacks.append)
+
+
+def test_skips_blocks_without_events(auction, throne_nft, throne_coin, users, web3):
+    blocks, rollbacks = [], []
+    follower = follower_of(auction, throne_nft, web3, blocks, rollbacks)
+
+    async def follow():
+        async with aiohttp.ClientSession() as session:
+            await follower.poll(session)
+            throne_coin.transfer(users[1], 1, {'from': users[0]})
+            throne_coin.transfer(users[1], 1, {'from': users[0]})
+            nft_id = throne_nft.mintWithTokenURI(URI, {'from': users[0]}).events['Transfer']['tokenId']
+            throne_coin.transfer(users[1], 1, {'from': users[0]})
+            await follower.poll(session)  # the missed blocks are fetched by number
+            return nft_id
+
+    nft_id = run(follow())
+    assert [number for number, _, _ in blocks] == list(range(blocks[0][0], web3.eth.block_number + 1))
+    assert [len(records) for _, _, records in blocks[1:]] == [0, 0, 1, 0]
+    assert blocks[3][2][0].name == 'Transfer' and blocks[3][2][0]['tokenId'] == nft_id
+    assert follower.stats['skipped_blocks'] >= 3 and not rollbacks
+
+
+def test_reorg_rolls_back_to_common_block(auction, throne_nft, throne_coin, users, web3, chain):
+    blocks, rollbacks = [], []
+    follower = follower_of(auction, throne_nft, web3, blocks, rollbacks)
+    throne_coin.approve(auction.address, 10**20, {'from': users[1]})
+    nft_id = throne_nft.mintWithTokenURI(URI, {'from': users[0]}).events['Transfer']['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': users[0]})
+    common = auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': users[0]}).block_number
+
+    async def follow():
+        async with aiohttp.ClientSession() as session:
+            await follower.poll(session)
+            chain.snapshot()
+            auction.bid(throne_nft.address, nft_id, 1000, {'from': users[1]})
+            chain.mine(2)
+            await follower.poll(session)
+            abandoned = follower.head
+            chain.revert()  # the fork replaces the bid with another bidder's bid and is one block longer
+            auction.bid(throne_nft.address, nft_id, 2000, {'from': users[2]})
+            chain.mine(3)
+            await follower.poll(session)
+            return abandoned
+
+    abandoned = run(follow())
+    assert rollbacks == [common] and follower.stats['reorgs'] == 1
+    assert follower.head == (web3.eth.block_number, web3.eth.get_block('latest')['hash'].hex())
+    assert abandoned != follower.head
+    bids = [record for _, _, records in blocks for record in records if record.name == 'BidSubmitted']
+    assert [bid['bidder'] for bid in bids] == [users[1], users[2]]
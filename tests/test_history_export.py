@@ -0,0 +1,83 @@
+import csv
+import os
+
+import pytest
+from brownie import Auction, ThronNFT
+
+from scripts.history_export import ExportError, HistoryExporter, export_chain, iter_synthetic_records
+from scripts.log_decoder import LogDecoder
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def read_rows(directory, table):
+    rows = []
+    for root, _, names in os.walk(os.path.join(directory, table)):
+        for name in names:
+            assert name.endswith('.csv')
+            with open(os.path.join(root, name), newline='') as f:
+                rows.extend(csv.DictReader(f))
+    return sorted(rows, key=lambda row: [row[key] for key in sorted(row)])
+
+
+def test_incremental_export_matches_full(tmp_path):
+    records = list(iter_synthetic_records(20_000))
+    last_block = records[-1].block_number
+    full = HistoryExporter(str(tmp_path / 'full'), partition_blocks=100, batch_rows=500)
+    full.export(iter(records), last_block)
+
+    directory = str(tmp_path / 'incremental')
+    HistoryExporter(directory, partition_blocks=100, batch_rows=500).export(
+        (r for r in records if r.block_number <= 420), 420)
+    interrupted = HistoryExporter(directory, partition_blocks=100, batch_rows=500)
+    for record in records:  # crashes before the commit at the end of the run
+        if 420 < record.block_number < 480:
+            interrupted.apply(record)
+    interrupted.events.flush()
+    exporter = HistoryExporter(directory, partition_blocks=100, batch_rows=500)
+    assert exporter.last_block == 420
+    exporter.export((r for r in records if r.block_number > 420), last_block)
+
+    for table in ('events', 'outcomes'):
+        assert read_rows(directory, table) == read_rows(str(tmp_path / 'full'), table)
+    assert len(read_rows(directory, 'events')) == len(records)
+    assert sorted(os.listdir(os.path.join(directory, 'events', 'blocks=000000000400-000000000499'))) == [
+        'part-000000000400.csv', 'part-000000000421.csv']
+    with pytest.raises(ExportError):
+        HistoryExporter(directory, 'parquet')
+
+
+def test_export_chain_outcomes(auction, throne_nft, throne_coin, admin, users, chain, web3, tmp_path):
+    decoder = LogDecoder({'Auction': Auction.abi, 'ThronNFT': ThronNFT.abi})
+    addresses = [auction.address, throne_nft.address]
+    auctioneer, bidder1, bidder2 = users[:3]
+    for bidder in (bidder1, bidder2):
+        throne_coin.approve(auction.address, 10**20, {'from': bidder})
+    nft_ids = []
+    for _ in range(2):
+        nft_id = throne_nft.mintWithTokenURI(URI, {'from': auctioneer}).events['Transfer']['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+        auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': auctioneer})
+        nft_ids.append(nft_id)
+    sold, canceled = nft_ids
+    auction.bid(throne_nft.address, sold, 1000, {'from': bidder1})
+    export_chain(web3, str(tmp_path), addresses, auction.tx.block_number, decoder=decoder)
+
+    chain.sleep(5 * 60 - 60)  # inside the overtime window
+    auction.bid(throne_nft.address, sold, 2000, {'from': bidder2})
+    auction.cancelAuction(throne_nft.address, canceled, {'from': auctioneer})
+    chain.sleep(5 * 60)
+    claim = auction.claimWonNFT(throne_nft.address, sold, {'from': bidder2})
+    exporter = export_chain(web3, str(tmp_path), addresses, decoder=decoder)
+    assert exporter.last_block == web3.eth.block_number and not exporter.live
+
+    outcomes = {row['nft_id']: row for row in read_rows(str(tmp_path), 'outcomes')}
+    row = outcomes[str(sold)]
+    assert (row['outcome'], row['winner'], row['final_price'], row['bids'], row['overtime_extensions']) == (
+        'claimed', bidder2, '2000', '2', '1')
+    assert row['settled_block'] == str(claim.block_number) and row['auctioneer_payout'] == '2000'
+    assert int(row['duration']) > 5 * 60
+    assert outcomes[str(canceled)]['outcome'] == 'canceled'
+    events = read_rows(str(tmp_path), 'events')
+    assert sum(row['event'] == 'BidSubmitted' for row in events) == 2
+    assert {row['nft_id'] for row in events if row['event'] == 'Transfer'} == {str(sold), str(canceled)}
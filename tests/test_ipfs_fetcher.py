@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import unused_port
+
+from scripts.ipfs_fetcher import MetadataFetcher, parse_ipfs_uri, synthetic_cid as cid
+
+CID = 'QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ'
+URI = "https://ipfs.io/ipfs/{}/metadata.json"
+MISSING = cid(404)
+
+
+def run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class StandInGateway:
+    """Local HTTP stand-in of an IPFS gateway and API, fails the first request of `flaky` CIDs with 503."""
+
+    def __init__(self, flaky=()):
+        self.requests = []
+        self.flaky = set(flaky)
+        self.port = unused_port()
+        self.url = 'http://127.0.0.1:{}'.format(self.port)
+        self._runner = None
+
+    async def _respond(self, cid):
+        self.requests.append(cid)
+        if cid in self.flaky:
+            self.flaky.discard(cid)
+            return web.Response(status=503)
+        if cid == MISSING:
+            return web.Response(status=404)
+        return web.json_response({'name': cid})
+
+    async def gateway(self, request):
+        return await self._respond(request.match_info['cid'])
+
+    async def api_cat(self, request):
+        return await self._respond(request.query['arg'].split('/')[0])
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get('/ipfs/{cid}/metadata.json', self.gateway)
+        app.router.add_post('/api/v0/cat', self.api_cat)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, '127.0.0.1', self.port).start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
+
+
+def test_parse_ipfs_uri():
+    assert parse_ipfs_uri(URI.format(CID)) == (CID, 'metadata.json')
+    assert parse_ipfs_uri('ipfs://{}/metadata.json'.format(CID)) == (CID, 'metadata.json')
+    assert parse_ipfs_uri('ipfs://ipfs/{}'.format(CID)) == (CID, '')
+    assert parse_ipfs_uri('empty_uri') is None
+    cid_v1 = 'bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi'
+    assert parse_ipfs_uri('ipfs://{}'.format(cid_v1)) == (cid_v1, '')
+    for uri in ('ipfs://..', 'ipfs://../metadata.json', URI.format('..'), URI.format('Qm1'), 'ipfs://ipfs/.'):
+        with pytest.raises(ValueError):
+            parse_ipfs_uri(uri)
+
+
+def test_fetch_retries_dedupes_and_caches(tmp_path):
+    async def scenario():
+        async with StandInGateway(flaky=[cid(1)]) as gateway:
+            uris = {0: URI.format(cid(1)), 1: URI.format(cid(2)), 2: URI.format(cid(2)), 3: URI.format(MISSING),
+                    4: 'empty_uri', 5: 'ipfs://../metadata.json'}
+            fetcher = MetadataFetcher(str(tmp_path / 'cache'), gateway=gateway.url, backoff=0.01)
+            results = await fetcher.fetch_uris(uris)
+            assert results == {0: {'name': cid(1)}, 1: {'name': cid(2)}, 2: {'name': cid(2)}, 3: None, 4: None,
+                               5: None}
+            assert sorted(gateway.requests) == sorted([cid(1), cid(1), cid(2), MISSING])
+            assert fetcher.stats['retries'] == 1
+            assert fetcher.stats['failed'] == 2
+
+            # content is immutable, the second run is served from disk without requests
+            fetcher = MetadataFetcher(str(tmp_path / 'cache'), gateway=gateway.url)
+            assert (await fetcher.fetch_uris({0: URI.format(cid(1))})) == {0: {'name': cid(1)}}
+            assert len(gateway.requests) == 4
+            assert fetcher.stats['cache_hits'] == 1
+
+    run(scenario())
+
+
+def test_fetch_through_ipfs_api(tmp_path):
+    async def scenario():
+        async with StandInGateway() as gateway:
+            fetcher = MetadataFetcher(str(tmp_path), api=gateway.url)
+            assert (await fetcher.fetch_uris({7: URI.format(CID)})) == {7: {'name': CID}}
+
+    run(scenario())
+
+
+def test_fetch_tokens_reads_uris_in_bulk(throne_nft, users, web3, tmp_path):
+    token_ids = [throne_nft.mintWithTokenURI(URI.format(cid(i)), {'from': users[0]}).events['Transfer']['tokenId']
+                 for i in range(3)]
+
+    async def scenario():
+        async with StandInGateway() as gateway:
+            fetcher = MetadataFetcher(str(tmp_path), gateway=gateway.url)
+            results = await fetcher.fetch_tokens(web3.provider.endpoint_uri, throne_nft.address, token_ids + [9000])
+            expected = {token_id: {'name': cid(i)} for i, token_id in enumerate(token_ids)}
+            expected[9000] = None  # nonexistent token
+            assert results == expected
+
+    run(scenario())
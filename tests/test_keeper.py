@@ -0,0 +1,85 @@
+from scripts.keeper import SettlementKeeper, ClaimError, brownie_claimer
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+MAX_UINT256 = 2**256 - 1
+NFT = '0x' + '11' * 20
+
+
+def test_schedule_retries_and_extensions():
+    now = [0]
+    failures = {(NFT, 2): [ClaimError(None), ClaimError(None)], (NFT, 3): [ClaimError('EmptyWinner')]}
+    claimed = []
+
+    def claim(keys):
+        claimed.append(list(keys))
+        return [failures[key].pop(0) if failures.get(key) else None for key in keys]
+
+    keeper = SettlementKeeper(claim, clock=lambda: now[0], batch_size=2, backoff=10)
+    for nft_id, end in [(1, 100), (2, 100), (3, 150), (4, 200)]:
+        keeper.on_event('BidSubmitted', {'nft': NFT, 'nftId': nft_id, 'endTimestamp': end})
+    keeper.on_event('BidSubmitted', {'nft': NFT, 'nftId': 1, 'endTimestamp': 120})  # overtime extension
+    keeper.on_event('AuctionCanceled', {'nft': NFT, 'nftId': 4})
+    assert len(keeper) == 3
+    assert keeper.next_wakeup() == 101
+
+    now[0] = 100
+    assert keeper.settle_due() == 0
+    now[0] = 101
+    assert keeper.settle_due() == 1
+    assert claimed[-1] == [(NFT, 2)]
+    assert keeper.next_wakeup() == 111  # retry after the backoff
+
+    now[0] = 151
+    keeper.settle_due()
+    assert sorted(claimed[-2]) == [(NFT, 1), (NFT, 2)]  # batched, the second retry of 2 fails again
+    assert claimed[-1] == [(NFT, 3)]
+    now[0] = 200
+    keeper.settle_due()
+    metrics = keeper.lag_metrics()
+    assert len(keeper) == 0
+    assert keeper.next_wakeup() is None
+    assert (metrics['claimed'], metrics['already_settled'], metrics['retries']) == (2, 1, 2)
+    assert metrics['lag_max'] == 200 - 100
+
+
+def test_settles_staggered_auctions(auction, throne_nft, throne_coin, admin, users, chain):
+    minter, bidder, outbidder = users[0], users[1], users[2]
+    n = 2000
+    chunk = 100
+    start_price = 1000
+
+    keeper = SettlementKeeper(brownie_claimer(auction, admin), clock=chain.time, batch_size=50)
+    throne_nft.setApprovalForAll(auction.address, True, {'from': minter})
+    for user in (bidder, outbidder):
+        throne_coin.approve(auction.address, MAX_UINT256, {'from': user})
+    nft_ids = []
+    for _ in range(n):
+        nft_id = throne_nft.mintWithTokenURI(URI, {'from': minter}).events['Transfer']['tokenId']
+        auction.createAuction(throne_nft.address, nft_id, start_price, False, {'from': minter})
+        nft_ids.append(nft_id)
+
+    # auctions end staggered by 7 seconds per chunk
+    for i in range(0, n, chunk):
+        tx = auction.bidMany(throne_nft.address, nft_ids[i:i + chunk], [start_price] * chunk, {'from': bidder})
+        keeper.on_events(tx.events)
+        chain.sleep(7)
+
+    # outbids within the overtime window extend some auctions of the first chunk
+    chain.sleep(max(0, auction.getAuctionData(throne_nft.address, nft_ids[0])[4] - chain.time() - 30))
+    extended = nft_ids[:10]
+    tx = auction.bidMany(throne_nft.address, extended, [start_price * 2] * len(extended), {'from': outbidder})
+    keeper.on_events(tx.events)
+
+    while len(keeper):
+        chain.sleep(max(0, keeper.next_wakeup() - chain.time()))
+        chain.mine()
+        keeper.settle_due()
+
+    metrics = keeper.lag_metrics()
+    print(metrics)
+    assert metrics['claimed'] == n
+    assert metrics['failed'] == 0
+    assert metrics['batches'] < n
+    assert metrics['lag_max'] < 60
+    assert all(throne_nft.ownerOf(nft_id) == bidder for nft_id in nft_ids[len(extended):])
+    assert all(throne_nft.ownerOf(nft_id) == outbidder for nft_id in extended)
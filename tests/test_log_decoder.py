@@ -0,0 +1,84 @@
+import eth_abi
+from brownie import Auction, ThronNFT
+from brownie.network.event import decode_logs
+from eth_utils import keccak, to_checksum_address
+
+from scripts.auction_state import AuctionState
+from scripts.log_decoder import LogDecoder, synthetic_logs
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def make_decoder(**kwargs):
+    return LogDecoder({'Auction': Auction.abi, 'ThronNFT': ThronNFT.abi}, **kwargs)
+
+
+def test_decoder_matches_brownie(auction, throne_nft, throne_coin, admin, users, chain, web3):
+    minter, bidder = users[0], users[1]
+    nft_id = throne_nft.mintWithTokenURI(URI, {'from': minter}).events['Transfer']['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': minter})
+    auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': minter})
+    throne_coin.approve(auction.address, 2000, {'from': bidder})
+    auction.bid(throne_nft.address, nft_id, 1000, {'from': bidder})
+    chain.sleep(auction.getAuctionData(throne_nft.address, nft_id)[4] - chain.time() + 10)
+    chain.mine()
+    auction.claimWonNFT(throne_nft.address, nft_id, {'from': bidder})
+
+    logs = web3.eth.get_logs({'address': [auction.address, throne_nft.address],
+                              'fromBlock': auction.tx.block_number, 'toBlock': 'latest'})
+    records = list(make_decoder().decode_many(logs))
+    expected = decode_logs(logs)
+    assert [r.name for r in records] == [e.name for e in expected]
+    for record, event in zip(records, expected):
+        assert record == dict(event)
+        assert record.address == event.address
+
+    state = AuctionState()
+    for record in records:
+        state.apply(record.name, record)
+    assert state.get(throne_nft.address, nft_id) is None
+    assert throne_nft.ownerOf(nft_id) == bidder
+
+
+def test_decoder_skips_unknown_and_erc20_logs(auction, throne_coin, users):
+    tx = throne_coin.transfer(users[1], 1, {'from': users[0]})
+    logs = [{'topics': log['topics'], 'data': log['data']} for log in tx.logs]
+    # ERC20 Transfer has the same topic0 as ERC721 Transfer but only 2 indexed arguments
+    assert list(make_decoder().decode_many(logs)) == []
+
+
+def test_decoder_synthetic_roundtrip():
+    abis = {'Auction': Auction.abi, 'ThronNFT': ThronNFT.abi}
+    logs = synthetic_logs(abis, 100)
+    decoder = LogDecoder(abis, checksum=False)
+    records = list(decoder.decode_many(logs))
+    assert len(records) == 100
+    for log, record in zip(logs, records):
+        assert record.name == 'BidSubmitted'
+        assert int(log['topics'][2], 16) == record.nftId
+        assert record.bidder == '0x' + log['topics'][3][-40:]
+        assert record.endTimestamp == int(log['data'][2 + 64 * 2:2 + 64 * 3], 16)
+
+
+def test_decoder_array_arguments():
+    abi = [{'type': 'event', 'name': 'Batch', 'anonymous': False, 'inputs': [
+        {'name': 'nft', 'type': 'address', 'indexed': True},
+        {'name': 'ids', 'type': 'uint256[]', 'indexed': True},
+        {'name': 'pair', 'type': 'address[2]', 'indexed': False},
+        {'name': 'amounts', 'type': 'uint256[]', 'indexed': False},
+        {'name': 'hashes', 'type': 'bytes32[]', 'indexed': False},
+        {'name': 'count', 'type': 'uint8', 'indexed': False}]}]
+    nft, pair = '0x' + '11' * 20, ['0x' + 'aB' * 20, '0x' + '0c' * 20]
+    ids_hash = keccak(eth_abi.encode_abi(['uint256[]'], [[1, 2]]))
+    data = eth_abi.encode_abi(['address[2]', 'uint256[]', 'bytes32[]', 'uint8'],
+                              [pair, [5, 6, 7], [b'\x01' * 32], 3])
+    log = {'topics': [keccak(text='Batch(address,uint256[],address[2],uint256[],bytes32[],uint8)'),
+                      bytes(12) + bytes.fromhex(nft[2:]), ids_hash], 'data': data}
+    record = LogDecoder({'Batch': abi}).decode(log)
+    assert record.nft == to_checksum_address(nft)
+    # indexed arrays are only available as the keccak hash of their encoding
+    assert record.ids == ids_hash
+    assert list(record.pair) == [to_checksum_address(a) for a in pair]
+    assert list(record.amounts) == [5, 6, 7]
+    assert list(record.hashes) == [b'\x01' * 32]
+    assert record.count == 3
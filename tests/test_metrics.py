@@ -0,0 +1,76 @@
+import urllib.request
+
+from scripts.keeper import KeeperMetrics
+from scripts.metrics import Registry, ServiceMetrics, serve, web3_middleware
+from scripts.view_cache import CacheStats
+
+
+class Record:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_render_counters_and_histograms():
+    metrics = ServiceMetrics()
+    metrics.rpc('eth_getLogs', 0.003, batch=120)
+    metrics.rpc('eth_getLogs', 0.2, batch=5)
+    metrics.rpc('eth_call', 20, error=True)
+    metrics.lag(110, 100)
+    records = [Record('BidSubmitted')] * 3 + [Record('AuctionCreated')]
+    assert metrics.count_events(records) is records
+    with metrics.store_write('snapshot'):
+        pass
+    text = metrics.registry.render()
+    lines = set(text.splitlines())
+    assert 'rpc_calls_total{method="eth_getLogs"} 2' in lines
+    assert 'rpc_errors_total{method="eth_call"} 1' in lines
+    assert 'rpc_seconds_bucket{method="eth_getLogs",le="0.005"} 1' in lines
+    assert 'rpc_seconds_bucket{method="eth_getLogs",le="0.25"} 2' in lines
+    assert 'rpc_seconds_bucket{method="eth_call",le="+Inf"} 1' in lines
+    assert 'rpc_seconds_count{method="eth_getLogs"} 2' in lines
+    assert 'rpc_batch_size_bucket{method="eth_getLogs",le="10"} 1' in lines
+    assert 'blocks_behind_head 10' in lines
+    assert 'events_decoded_total{event="BidSubmitted"} 3' in lines
+    assert 'store_write_seconds_count{store="snapshot"} 1' in lines
+    assert '# TYPE rpc_seconds histogram' in lines
+    assert any(line.startswith('events_decoded_per_second{event="AuctionCreated"} ') for line in lines)
+
+
+def test_watched_stats_and_spans():
+    metrics = ServiceMetrics(keep_spans=10)
+    cache_stats = CacheStats()
+    cache_stats.hits, cache_stats.misses = 3, 1
+    metrics.watch_stats('view_cache', cache_stats)
+    keeper = KeeperMetrics()
+    metrics.watch_stats('keeper', keeper)
+    with metrics.span('poll'):
+        with metrics.span('decode'):
+            pass
+    keeper.claimed = 7  # read at scrape time
+    lines = set(metrics.registry.render().splitlines())
+    assert 'view_cache_hit_rate 0.75' in lines
+    assert 'keeper_claimed 7' in lines
+    assert 'stage_seconds_count{stage="decode"} 1' in lines
+    assert [(stage, parent) for stage, parent, _, _ in metrics.tracer.recent] == [('decode', 'poll'), ('poll', None)]
+
+    disabled = ServiceMetrics(spans=False)
+    with disabled.span('poll'):
+        pass
+    assert 'stage_seconds_count' not in disabled.registry.render()
+
+
+def test_web3_middleware_and_endpoint():
+    metrics = ServiceMetrics(Registry())
+    responses = {'eth_getLogs': {'result': [{}, {}, {}]}, 'eth_call': {'error': {'message': 'execution reverted'}}}
+    request = web3_middleware(metrics)(lambda method, params: responses[method], None)
+    request('eth_getLogs', [])
+    request('eth_call', [])
+    server = serve(metrics.registry, '127.0.0.1', 0)
+    try:
+        with urllib.request.urlopen('http://127.0.0.1:{}/metrics'.format(server.server_port)) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            lines = set(response.read().decode().splitlines())
+    finally:
+        server.shutdown()
+    assert 'rpc_batch_size_sum{method="eth_getLogs"} 3' in lines
+    assert 'rpc_errors_total{method="eth_call"} 1' in lines
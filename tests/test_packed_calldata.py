@@ -0,0 +1,121 @@
+import brownie
+import pytest
+from brownie.convert import Fixed
+
+from scripts.packed_calldata import (
+    SHORT_BID, SHORT_BID_ETHER, SHORT_CLAIM, calldata_gas, pack_bid, short_bid, short_bid_ether, short_claim,
+    unpack_bid)
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def test_encoder():
+    packed = pack_bid(2**96 - 1, 2**128 - 1)
+    assert len(packed) == 32 and unpack_bid(packed) == (2**96 - 1, 2**128 - 1)
+    assert short_bid(5, 7) == '0x01' + '00' * 11 + '05' + '00' * 15 + '07'
+    assert len(short_bid_ether(5, 7)) == 2 + 2 * 29 and len(short_claim(5)) == 2 + 2 * 13
+    assert calldata_gas(short_claim(5)) == 2 * 16 + 11 * 4
+    with pytest.raises(ValueError):
+        pack_bid(2**96, 1)
+    with pytest.raises(ValueError):
+        short_bid(1, 2**128)
+
+
+def test_short_operations_do_not_collide(auction):
+    first_bytes = {int(selector[2:4], 16) for selector in auction.signatures.values()}
+    assert not first_bytes & {SHORT_BID, SHORT_BID_ETHER, SHORT_CLAIM}
+
+
+def list_auctions(auction, throne_nft, auctioneer, count, start_price, is_ether):
+    nft_ids = []
+    for _ in range(count):
+        nft_id = throne_nft.mintWithTokenURI(URI, {'from': auctioneer}).events['Transfer']['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+        auction.createAuction(throne_nft.address, nft_id, start_price, is_ether, {'from': auctioneer})
+        nft_ids.append(nft_id)
+    return nft_ids
+
+
+def test_packed_bids_match_abi_bids(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer, bidder1, bidder2 = users[:3]
+    start_price = Fixed('1 ether')
+    standard, packed, short = list_auctions(auction, throne_nft, auctioneer, 3, start_price, False)
+    throne_coin.approve(auction.address, 20 * start_price, {'from': bidder1})
+    throne_coin.approve(auction.address, 20 * start_price, {'from': bidder2})
+    # bidder1 bids, bidder2 outbids, bidder1 raises on every auction
+    bids = [(bidder1, start_price), (bidder2, start_price * 2), (bidder1, start_price * 3)]
+    events = {}
+    for bidder, amount in bids:
+        txs = [auction.bid(throne_nft.address, standard, amount, {'from': bidder}),
+               auction.bidPacked(pack_bid(packed, amount), {'from': bidder}),
+               bidder.transfer(auction, 0, data=short_bid(short, amount))]
+        for nft_id, tx in zip((standard, packed, short), txs):
+            event = dict(tx.events['BidSubmitted'])
+            assert event.pop('nftId') == nft_id
+            event.pop('endTimestamp')
+            events.setdefault(nft_id, []).append(event)
+    assert events[standard] == events[packed] == events[short]
+    data = [auction.getAuctionData(throne_nft.address, nft_id) for nft_id in (standard, packed, short)]
+    assert data[0][:4] == data[1][:4] == data[2][:4] == (start_price * 3, throne_coin.address, auctioneer, bidder1)
+    assert throne_coin.balanceOf(auction.address) == 3 * start_price * 3
+
+    chain.sleep(max(d[4] for d in data) - chain.time() + 1)
+    auction.claimWonNFT(throne_nft.address, standard, {'from': bidder1})
+    tx = bidder1.transfer(auction, 0, data=short_claim(short))
+    assert tx.events['WonNftClaimed']['nftId'] == short
+    assert throne_nft.ownerOf(standard) == throne_nft.ownerOf(short) == bidder1
+
+
+def test_packed_ether_bids_match_abi_bids(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer, bidder1, bidder2 = users[:3]
+    start_price = Fixed('0.1 ether')
+    standard, packed, short = list_auctions(auction, throne_nft, auctioneer, 3, start_price, True)
+    auction.bidEther(throne_nft.address, standard, start_price, {'from': bidder1, 'value': start_price})
+    auction.bidEtherPacked(pack_bid(packed, start_price), {'from': bidder1, 'value': start_price})
+    bidder1.transfer(auction, start_price, data=short_bid_ether(short, start_price))
+    balance = bidder1.balance()
+    tx = bidder2.transfer(auction, 2 * start_price, data=short_bid_ether(short, 2 * start_price))
+    assert tx.events['BidSubmitted']['refund'] == start_price and bidder1.balance() == balance + start_price
+    auction.bidEther(throne_nft.address, standard, 2 * start_price, {'from': bidder2, 'value': 2 * start_price})
+    for nft_id in (standard, packed, short):
+        assert auction.getAuctionData(throne_nft.address, nft_id)[1] == brownie.ZERO_ADDRESS
+    assert auction.getAuctionData(throne_nft.address, short)[:4] == \
+        auction.getAuctionData(throne_nft.address, standard)[:4]
+    assert auction.balance() == start_price + 2 * 2 * start_price
+
+
+def test_short_operations_fail(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer, bidder = users[:2]
+    nft_id, = list_auctions(auction, throne_nft, auctioneer, 1, Fixed('1 ether'), False)
+    throne_coin.approve(auction.address, Fixed('1 ether'), {'from': bidder})
+    with brownie.reverts('InvalidBidParams'):
+        bidder.transfer(auction, 0, data=short_bid(nft_id, Fixed('1 ether')) + '00', gas_limit=300_000)
+    with brownie.reverts('InvalidEtherAmount'):
+        bidder.transfer(auction, 1, data=short_bid(nft_id, Fixed('1 ether')), gas_limit=300_000)
+    with brownie.reverts('InvalidEtherAmount'):
+        bidder.transfer(auction, 1, gas_limit=300_000)  # plain ether transfers are still rejected
+    with brownie.reverts('SmallBidAmount'):
+        bidder.transfer(auction, 0, data=short_bid(nft_id, 1), gas_limit=300_000)
+    with brownie.reverts('EmptyWinner'):
+        bidder.transfer(auction, 0, data=short_claim(nft_id), gas_limit=300_000)
+    auction.pause({'from': admin})
+    with brownie.reverts('ContractPaused'):
+        bidder.transfer(auction, 0, data=short_bid(nft_id, Fixed('1 ether')), gas_limit=300_000)
+
+
+def test_packed_calldata_gas(auction, throne_nft, throne_coin, admin, users, chain):
+    auctioneer, bidder = users[:2]
+    amount = Fixed('1 ether')
+    nft_ids = list_auctions(auction, throne_nft, auctioneer, 3, amount, False)
+    throne_coin.approve(auction.address, 3 * amount, {'from': bidder})
+    encodings = [('bid', auction.bid.encode_input(throne_nft.address, nft_ids[0], amount)),
+                 ('bidPacked', auction.bidPacked.encode_input(pack_bid(nft_ids[1], amount))),
+                 ('short bid', short_bid(nft_ids[2], amount))]
+    gas = {}
+    for name, data in encodings:
+        used = bidder.transfer(auction, 0, data=data).gas_used
+        gas[name] = calldata_gas(data)
+        print(f'{name}: {(len(data) - 2) // 2} calldata bytes, {gas[name]} calldata gas, '
+              f'{used - gas[name]} other gas, {used} gas used')
+    assert [(len(data) - 2) // 2 for _, data in encodings] == [100, 36, 29]
+    assert gas['short bid'] < gas['bidPacked'] < gas['bid'] / 2
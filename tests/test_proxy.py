@@ -0,0 +1,93 @@
+import copy
+
+import pytest
+from brownie import Auction, web3
+
+from scripts.deploy_auction import deploy_auction, upgrade_auction
+from scripts.gas_report import report
+from scripts.storage_layout import (
+    SOURCE, StorageLayoutError, check_revisions, check_upgrade, compatibility_errors, compile_layout, load_layouts,
+    source_revision)
+
+IMPLEMENTATION_SLOT = int(web3.keccak(text='eip1967.proxy.implementation').hex(), 16) - 1
+
+
+def test_proxy_deployment(auction, admin, deployment):
+    with open(SOURCE) as f:
+        assert auction.getAdmin() == admin and auction.getRevision() == source_revision(f.read())
+    implementation = Auction[-1].address
+    if deployment == 'proxy':
+        stored = web3.eth.get_storage_at(auction.address, IMPLEMENTATION_SLOT)[-20:]
+        assert web3.toChecksumAddress(stored) == implementation != auction.address
+        assert auction.tx.contract_address == auction.address
+    else:
+        assert auction.address == implementation
+
+
+def test_storage_layout_snapshots():
+    layouts = load_layouts()
+    with open(SOURCE) as f:
+        revision = source_revision(f.read())
+    assert revision in layouts, f'write the layout of revision {revision} with `brownie run storage_layout`'
+    assert compile_layout() == layouts[revision], 'the storage layout changed, bump getRevision'
+    check_revisions(layouts)
+
+
+def test_storage_layout_rules():
+    old = load_layouts()[7]
+    by_label = {entry['label']: entry for entry in old}
+    assert compatibility_errors(old, old) == []
+
+    appended = copy.deepcopy(old)
+    gap = appended[-1]
+    appended.insert(-1, {'label': 'fee', 'slot': gap['slot'], 'offset': 0, 'bytes': 32, 'type': 'uint256'})
+    gap.update(slot=gap['slot'] + 1, bytes=gap['bytes'] - 32, type='uint256[{}]'.format(gap['bytes'] // 32 - 1))
+    assert compatibility_errors(old, appended) == []
+    check_revisions({7: old, 8: appended})
+
+    not_shrunk = copy.deepcopy(appended)
+    not_shrunk[-1].update(bytes=old[-1]['bytes'], type=old[-1]['type'])
+    assert len(compatibility_errors(old, not_shrunk)) == 1
+
+    inserted = copy.deepcopy(old)
+    for entry in inserted:
+        if entry['slot'] >= by_label['minPriceStepNumerator']['slot']:
+            entry['slot'] += 1
+    inserted.append({'label': 'fee', 'slot': by_label['minPriceStepNumerator']['slot'], 'offset': 0, 'bytes': 32,
+                     'type': 'uint256'})
+    assert len(compatibility_errors(old, inserted)) > 1
+
+    retyped = copy.deepcopy(old)
+    next(entry for entry in retyped if entry['label'] == 'auctionDuration')['type'] = 'uint48'
+    assert compatibility_errors(old, retyped) == [
+        'auctionDuration at slot 6 changed type from uint40 to uint48']
+    with pytest.raises(StorageLayoutError):
+        check_upgrade(old, retyped)
+
+
+def test_upgrade_keeps_state(throne_nft, throne_coin, admin, users, proxy_admin):
+    auctioneer, bidder = users[:2]
+    auction = deploy_auction(admin, throne_coin, throne_nft, 'proxy', proxy_admin)
+    nft_id = throne_nft.mintWithTokenURI('uri', {'from': auctioneer}).events['Transfer']['tokenId']
+    throne_nft.approve(auction.address, nft_id, {'from': auctioneer})
+    auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': auctioneer})
+    throne_coin.approve(auction.address, 1000, {'from': bidder})
+    auction.bid(throne_nft.address, nft_id, 1000, {'from': bidder})
+    before = auction.getAuctionData(throne_nft.address, nft_id)
+    admin.transfer(proxy_admin, '1 ether')
+
+    implementation = upgrade_auction(auction.address, proxy_admin, deployer=admin)
+    stored = web3.eth.get_storage_at(auction.address, IMPLEMENTATION_SLOT)[-20:]
+    assert web3.toChecksumAddress(stored) == implementation.address
+    assert auction.getAuctionData(throne_nft.address, nft_id) == before
+    assert (auction.getAdmin(), auction.auctionDuration(), auction.payableToken()) == (
+        admin, 5 * 60, throne_coin.address)
+    assert not auction.getPaused()
+
+
+def test_proxy_gas_overhead(admin, proxy_admin, users, chain):
+    overhead = report(admin, proxy_admin, users[0], users[1:3], chain.sleep)
+    for name, (direct, proxied, extra) in overhead.items():
+        print(f'{name}: direct {direct}, proxy {proxied}, overhead {extra}')
+    assert len(overhead) == 12
+    assert all(0 < extra < 10_000 for _, _, extra in overhead.values())
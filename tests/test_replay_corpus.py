@@ -0,0 +1,69 @@
+import gzip
+import json
+
+from scripts.replay_corpus import Corpus, CORPUS_VERSION, decode_consumer, record, replay, simulate
+from scripts.tx_pipeline import TxPipeline, local_accounts, web3_contract
+
+AUCTION = '0x' + '11' * 20
+OTHER = '0x' + '22' * 20
+TOPIC_A = '0x' + 'aa' * 32
+TOPIC_B = '0x' + 'bb' * 32
+
+
+def write_corpus(path, blocks):
+    header = {'version': CORPUS_VERSION, 'chainId': '0x539', 'contracts': {'Auction': AUCTION},
+              'fromBlock': 10, 'toBlock': 10 + len(blocks) - 1}
+    with gzip.open(path, 'wt') as f:
+        f.write(json.dumps(header) + '\n')
+        for number, logs in enumerate(blocks, start=10):
+            tx_hash = '0x{:064x}'.format(number)
+            block = {'number': hex(number), 'hash': '0x{:064x}'.format(number + 1000), 'transactions': [tx_hash]}
+            receipt = {'transactionHash': tx_hash, 'logs': [
+                {'address': address, 'topics': [topic], 'blockNumber': hex(number), 'data': '0x'}
+                for address, topic in logs]}
+            f.write(json.dumps({'block': block, 'receipts': [receipt]}) + '\n')
+
+
+def test_corpus_answers_log_queries(tmp_path):
+    path = str(tmp_path / 'corpus.jsonl.gz')
+    write_corpus(path, [[(AUCTION, TOPIC_A)], [(OTHER, TOPIC_A), (AUCTION, TOPIC_B)], [(AUCTION, TOPIC_A)]])
+    corpus = Corpus(path)
+    assert corpus.call('eth_blockNumber', []) == hex(12)
+    assert len(corpus.get_logs({'fromBlock': '0xa', 'toBlock': 'latest'})) == 4
+    assert len(corpus.get_logs({'address': AUCTION.upper().replace('X', 'x'), 'fromBlock': '0xb'})) == 2
+    assert len(corpus.get_logs({'address': [AUCTION], 'topics': [[TOPIC_A]], 'fromBlock': '0xa'})) == 2
+    assert corpus.get_logs({'blockHash': '0x{:064x}'.format(1011)})[1]['topics'] == [TOPIC_B]
+    responses = corpus.handle([{'id': 1, 'method': 'eth_getBlockByNumber', 'params': ['0xb', False]},
+                               {'id': 2, 'method': 'eth_sendRawTransaction', 'params': ['0x']}])
+    assert responses[0]['result']['number'] == '0xb' and responses[1]['error']['code'] == -32601
+
+
+def count_logs(rpc_url, header):
+    import requests
+
+    response = requests.post(rpc_url, json={'jsonrpc': '2.0', 'id': 1, 'method': 'eth_getLogs', 'params': [
+        {'address': header['contracts']['Auction'], 'fromBlock': hex(header['fromBlock'])}]})
+    return len(response.json()['result'])
+
+
+def test_replay_through_stand_in_server(tmp_path):
+    path = str(tmp_path / 'corpus.jsonl.gz')
+    write_corpus(path, [[(AUCTION, TOPIC_A)] * 3, [(OTHER, TOPIC_B)]])
+    result = replay(path, count_logs)
+    assert result['events'] == 3 and result['events_per_second'] > 0 and result['peak_memory'] > 0
+    # unknown topics are skipped by the decoder
+    result = replay(path, 'scripts.replay_corpus:decode_consumer', measure_memory=False)
+    assert result['events'] == 0 and result['peak_memory'] is None
+
+
+def test_record_and_decode_marketplace(auction, throne_nft, throne_coin, accounts, chain, web3, tmp_path):
+    from_block = web3.eth.block_number + 1
+    with TxPipeline(web3, poll_interval=0.01) as pipeline:
+        stats = simulate(pipeline, web3_contract(web3, throne_coin), web3_contract(web3, throne_nft),
+                         web3_contract(web3, auction), local_accounts(accounts[:10]), chain.sleep, auctions=40,
+                         round_size=20)
+    assert stats['reverted'] == 0 and stats['claims'] > 0 and stats['storm_bids'] > 0
+    path = str(tmp_path / 'corpus.jsonl.gz')
+    record(web3, path, from_block, web3.eth.block_number, {'Auction': auction.address})
+    expected = len(web3.eth.get_logs({'address': auction.address, 'fromBlock': from_block}))
+    assert replay(path, decode_consumer, measure_memory=False)['events'] == expected
@@ -0,0 +1,100 @@
+import os
+
+import msgpack
+import pytest
+from brownie import Auction, ThronNFT
+
+from scripts.auction_state import AuctionState
+from scripts.log_decoder import LogDecoder
+from scripts import snapshot
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def assert_same_state(a, b):
+    assert a.auctions == b.auctions
+    assert a.bids == b.bids
+    assert a.royalties == b.royalties
+    assert a.deposits == b.deposits
+    assert a.config == b.config
+    assert (a.paused, a.admin, a.block_number, a.block_hash) == (b.paused, b.admin, b.block_number, b.block_hash)
+
+
+def test_snapshot_roundtrip(tmp_path):
+    state = AuctionState()
+    state.apply_many(snapshot.synthetic_events(5000))
+    state.royalties[('0x' + '11' * 20, '0x' + '22' * 20)] = 2**200  # doesn't fit into msgpack int
+    state.deposits[('0x' + '33' * 20, '0x' + '22' * 20)] = 2**100
+    state.set_block(5000, bytes(range(32)))
+    path = snapshot.save(state, str(tmp_path))
+    assert os.path.basename(path) == 'snapshot-000000005000.msgpack'
+    assert_same_state(snapshot.load(path), state)
+
+
+def test_snapshot_corrupted(tmp_path):
+    path = tmp_path / 'snapshot-000000000001.msgpack'
+    path.write_bytes(b'\xc1garbage')
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(str(path))
+
+
+@pytest.mark.parametrize('broken', [
+    {'auctions': None},
+    {'auctions': [[0, 1]]},
+    {'auctions': [[10**6, 1, 1, 0, 0, 0, 0]]},
+    {'bids': [[0, 1, [[0, 1, 0]]]]},
+    {'deposits': None},
+])
+def test_snapshot_structurally_corrupted(broken):
+    state = AuctionState()
+    state.apply_many(snapshot.synthetic_events(10))
+    raw = msgpack.unpackb(snapshot.dumps(state), raw=False)
+    raw.update(broken)
+    for key, value in broken.items():
+        if value is None:
+            del raw[key]
+    with pytest.raises(snapshot.SnapshotError, match='corrupted snapshot'):
+        snapshot.loads(msgpack.packb(raw, use_bin_type=True))
+
+
+def test_list_snapshots_newest_first(tmp_path):
+    state = AuctionState()
+    for block in (10, 200, 3):
+        state.set_block(block, bytes(32))
+        snapshot.save(state, str(tmp_path))
+    (tmp_path / 'unrelated.txt').write_text('')
+    assert [os.path.basename(p) for p in snapshot.list_snapshots(str(tmp_path))] == [
+        'snapshot-000000000200.msgpack', 'snapshot-000000000010.msgpack', 'snapshot-000000000003.msgpack']
+
+
+def test_cold_start_replays_tail(auction, throne_nft, throne_coin, admin, users, chain, web3, tmp_path):
+    decoder = LogDecoder({'Auction': Auction.abi, 'ThronNFT': ThronNFT.abi})
+    addresses = [auction.address]
+    start_block = auction.tx.block_number
+    throne_coin.approve(auction.address, 10**20, {'from': users[1]})
+
+    def list_token():
+        nft_id = throne_nft.mintWithTokenURI(URI, {'from': users[0]}).events['Transfer']['tokenId']
+        throne_nft.approve(auction.address, nft_id, {'from': users[0]})
+        auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': users[0]})
+        auction.bid(throne_nft.address, nft_id, 1000, {'from': users[1]})
+
+    list_token()
+    state = snapshot.replay(web3, decoder, AuctionState(), addresses, start_block, web3.eth.block_number)
+    snapshot.save(state, str(tmp_path))
+    list_token()
+
+    # the newest snapshot doesn't match the chain (e.g. reorged), so the previous one is used
+    state.set_block(state.block_number + 1, bytes(32))
+    bad_path = snapshot.save(state, str(tmp_path))
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(bad_path, web3)
+    # a snapshot ahead of the chain (e.g. the node was reset) is skipped as well
+    state.set_block(web3.eth.block_number + 100, bytes(32))
+    with pytest.raises(snapshot.SnapshotError):
+        snapshot.load(snapshot.save(state, str(tmp_path)), web3)
+
+    restored = snapshot.cold_start(str(tmp_path), web3, decoder, addresses, start_block)
+    full = snapshot.replay(web3, decoder, AuctionState(), addresses, start_block, web3.eth.block_number)
+    assert_same_state(restored, full)
+    assert len(restored.auctions) == 2
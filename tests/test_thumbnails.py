@@ -0,0 +1,92 @@
+import asyncio
+import io
+import os
+
+from aiohttp import web
+from aiohttp.test_utils import unused_port
+from PIL import Image
+
+from scripts.ipfs_fetcher import MetadataFetcher, synthetic_cid
+from scripts.thumbnails import ThumbnailPipeline, ThumbnailStore, render, minted_token_ids, SIZES
+
+URI = "https://ipfs.io/ipfs/{}/metadata.json"
+TOKEN_CIDS = [synthetic_cid(i) for i in range(10)]
+SHARED_MEDIA = synthetic_cid(1000)
+
+
+def png_bytes(size=(600, 400), color=(200, 10, 10)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_render_all_sizes(tmp_path):
+    source = tmp_path / 'source.png'
+    source.write_bytes(png_bytes())
+    render(str(source), str(tmp_path / 'store'), 'QmKey')
+    store = ThumbnailStore(str(tmp_path / 'store'))
+    assert store.has('QmKey')
+    for size in SIZES:
+        with Image.open(store.path('QmKey', size)) as image:
+            assert max(image.size) == min(size, 600)
+
+
+def test_pipeline_dedupes_media_and_bounds_queue(tmp_path):
+    requests = []
+
+    async def metadata(request):
+        cid = request.match_info['cid']
+        requests.append(cid)
+        # tokens 0 and 1 share the same media, tokens from 6 on have malformed metadata
+        i = TOKEN_CIDS.index(cid)
+        image = 'ipfs://' + (SHARED_MEDIA if i < 2 else synthetic_cid(1000 + i)) if i < 6 else 123
+        return web.json_response({'name': cid, 'image': image})
+
+    async def media(request):
+        requests.append(request.match_info['cid'])
+        return web.Response(body=png_bytes(), content_type='image/png')
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/ipfs/{cid}/metadata.json', metadata)
+        app.router.add_get('/ipfs/{cid}', media)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        port = unused_port()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        try:
+            fetcher = MetadataFetcher(str(tmp_path / 'cache'), gateway='http://127.0.0.1:{}'.format(port))
+            pipeline = ThumbnailPipeline(str(tmp_path / 'store'), fetcher, workers=2, queue_size=2)
+            max_queued = []
+
+            async def produce(p):
+                for i in range(9, -1, -1):  # malformed ones first, more than the worker coroutines
+                    await p.submit(i, URI.format(TOKEN_CIDS[i]))
+                    max_queued.append(p.queue.qsize())
+                await p.submit(10, 'empty_uri')
+
+            stats = await asyncio.wait_for(pipeline.run(produce), 60)
+            assert stats == {'rendered': 5, 'skipped': 1, 'failed': 5}
+            assert max(max_queued) <= 2
+            assert requests.count(SHARED_MEDIA) == 1
+
+            # already rendered media isn't processed again by a new pipeline
+            pipeline = ThumbnailPipeline(str(tmp_path / 'store'), fetcher, workers=1)
+
+            async def produce_again(p):
+                await p.submit(0, URI.format(TOKEN_CIDS[0]))
+
+            assert (await pipeline.run(produce_again))['skipped'] == 1
+        finally:
+            await runner.cleanup()
+
+    asyncio.get_event_loop().run_until_complete(scenario())
+    assert len(os.listdir(str(tmp_path / 'store'))) > 0
+
+
+def test_minted_token_ids(throne_nft, users):
+    tx = throne_nft.mintWithTokenURI(URI.format('Qm0'), {'from': users[0]})
+    nft_id = tx.events['Transfer']['tokenId']
+    tx2 = throne_nft.transferFrom(users[0], users[1], nft_id, {'from': users[0]})
+    events = list(tx.events) + list(tx2.events)
+    assert minted_token_ids(events, throne_nft.address) == [nft_id]
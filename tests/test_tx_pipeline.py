@@ -0,0 +1,108 @@
+import pytest
+from eth_account import Account
+from web3.exceptions import TransactionNotFound
+
+from scripts.create_auctions import seed_collection, CREATE_AUCTION_GAS
+from scripts.mint_nft import send_mints, check_minted
+from scripts.tx_pipeline import TxPipeline, TxError, local_accounts, web3_contract
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+
+
+def test_seed_collection_pipelined(auction, throne_nft, users, web3):
+    account, = local_accounts([users[0]])
+    nonce = web3.eth.get_transaction_count(account.address)
+    with TxPipeline(web3, poll_interval=0.01) as pipeline:
+        token_ids = seed_collection(pipeline, web3_contract(web3, throne_nft), web3_contract(web3, auction),
+                                    account, [URI] * 30, 1000)
+        assert pipeline.stats['mined'] == pipeline.stats['sent'] == 90
+    assert web3.eth.get_transaction_count(account.address) == nonce + 90
+    for token_id in token_ids:
+        assert throne_nft.ownerOf(token_id) == auction.address
+        assert auction.getAuctionData(throne_nft.address, token_id)[2] == users[0]
+
+
+def test_failed_transaction_resyncs_nonce(auction, throne_nft, users, web3):
+    account, = local_accounts([users[0]])
+    nft = web3_contract(web3, throne_nft)
+    with TxPipeline(web3, poll_interval=0.01) as pipeline:
+        pending, token_ids = send_mints(pipeline, nft, account, [URI])
+        check_minted(pipeline, pending, token_ids, nft.address)
+        with pytest.raises(TxError):  # not approved, development nodes fail on send, others revert
+            call = web3_contract(web3, auction).functions.createAuction(nft.address, token_ids[0], 1000, False)
+            pipeline.transact(account, call, CREATE_AUCTION_GAS).wait()
+        pending, token_ids = send_mints(pipeline, nft, account, [URI, URI])
+        assert check_minted(pipeline, pending, token_ids, nft.address) == token_ids
+
+
+class DroppingNode:
+    """Stand-in of `web3` whose mempool drops the first broadcast of every transaction."""
+
+    def __init__(self):
+        self.broadcasts = []
+        self.mined = {}
+        self.eth = self
+
+    chain_id = 1
+    gas_price = 10
+
+    def get_transaction_count(self, address, block):
+        return 0
+
+    def send_raw_transaction(self, raw):
+        self.broadcasts.append(raw)
+        tx_hash = bytes([len(self.broadcasts)]) * 32
+        if self.broadcasts.count(raw) > 1:
+            self.mined[tx_hash] = {'status': 1, 'transactionHash': tx_hash}
+        return tx_hash
+
+    def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.mined:
+            raise TransactionNotFound(tx_hash)
+        return self.mined[tx_hash]
+
+    def get_transaction(self, tx_hash):
+        raise TransactionNotFound(tx_hash)
+
+
+class Call:
+    def buildTransaction(self, params):
+        return dict(params, to='0x' + '11' * 20, data='0x')
+
+
+def test_dropped_transaction_resubmitted():
+    node = DroppingNode()
+    with TxPipeline(node, poll_interval=0.01, resubmit_after=0) as pipeline:
+        receipt = pipeline.transact(Account.create(), Call(), 21000).wait(5)
+    assert receipt['status'] == 1
+    assert len(node.broadcasts) == 2 and node.broadcasts[0] == node.broadcasts[1]
+    assert pipeline.stats['resubmitted'] == 1
+
+
+class TimingOutNode(DroppingNode):
+    """Stand-in of `web3` whose first broadcast times out and which counts nonce reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.nonce_reads = 0
+
+    def get_transaction_count(self, address, block):
+        self.nonce_reads += 1
+        return 0
+
+    def send_raw_transaction(self, raw):
+        if not self.broadcasts:
+            self.broadcasts.append(raw)
+            raise TimeoutError('broadcast timed out')
+        return super().send_raw_transaction(raw)
+
+
+def test_any_send_error_resyncs_nonce():
+    node = TimingOutNode()
+    account = Account.create()
+    with TxPipeline(node, poll_interval=0.01) as pipeline:
+        with pytest.raises(TimeoutError):
+            pipeline.transact(account, Call(), 21000)
+        pending = pipeline.transact(account, Call(), 21000)
+    assert node.nonce_reads == 2
+    assert pending.tx['nonce'] == 0
@@ -0,0 +1,148 @@
+import random
+
+import brownie
+
+from scripts.view_cache import ViewCache
+
+URI = "https://ipfs.io/ipfs/QmU84SmCFee2ekP7PWpr4zXaqf96jqLQ7oiDR7Qw8qSfiZ/metadata.json"
+MAX_UINT256 = 2**256 - 1
+
+
+class FakeNFT:
+    address = '0x' + '11' * 20
+
+    def __init__(self):
+        self.calls = 0
+
+    def ownerOf(self, token_id):
+        self.calls += 1
+        return '0x' + '22' * 20
+
+    def tokenAuthor(self, token_id):
+        self.calls += 1
+        return '0x' + '33' * 20
+
+    def tokenOfOwnerByIndex(self, owner, index):
+        self.calls += 1
+        return index
+
+
+def test_lru_eviction_and_memory_cap():
+    nft = FakeNFT()
+    cache = ViewCache('0x' + '00' * 20, nft.address, max_entries=10)
+    for token_id in range(20):
+        cache.call(nft, 'ownerOf', token_id)
+    assert len(cache) == 10
+    assert cache.stats.evictions == 10
+    cache.call(nft, 'ownerOf', 19)
+    assert cache.stats.hits == 1
+    cache.call(nft, 'ownerOf', 0)
+    assert cache.stats.misses == 21
+
+    small = ViewCache('0x' + '00' * 20, nft.address, max_bytes=2000)
+    for token_id in range(100):
+        small.call(nft, 'ownerOf', token_id)
+    assert 0 < small.size_bytes <= 2000
+    assert len(small) < 100
+
+
+def test_ttl_only_for_mutable_views():
+    nft = FakeNFT()
+    now = [0.0]
+    cache = ViewCache('0x' + '00' * 20, nft.address, ttl=10, clock=lambda: now[0])
+    cache.call(nft, 'ownerOf', 1)
+    cache.call(nft, 'tokenAuthor', 1)
+    now[0] = 11.0
+    cache.call(nft, 'ownerOf', 1)
+    cache.call(nft, 'tokenAuthor', 1)
+    assert cache.stats.misses == 3
+    assert cache.stats.hits == 1
+
+
+def test_index_views_bypass_cache():
+    nft = FakeNFT()
+    cache = ViewCache('0x' + '00' * 20, nft.address)
+    cache.call(nft, 'tokenOfOwnerByIndex', '0x' + '22' * 20, 0)
+    cache.call(nft, 'tokenOfOwnerByIndex', '0x' + '22' * 20, 0)
+    assert nft.calls == 2
+    assert len(cache) == 0
+
+
+def test_unwatched_contracts_bypass_cache():
+    nft = FakeNFT()
+    cache = ViewCache('0x' + '00' * 20, '0x' + '44' * 20)
+    cache.call(nft, 'ownerOf', 1)
+    cache.call(nft, 'ownerOf', 1)
+    assert nft.calls == 2
+    assert len(cache) == 0
+
+
+def test_coin_balance_bypasses_cache(auction, throne_nft, throne_coin, users):
+    cache = ViewCache(auction.address, throne_nft.address)
+    balance = cache.call(throne_coin, 'balanceOf', users[1])
+    tx = throne_coin.transfer(users[1], 1000, {'from': users[0]})
+    cache.on_events(tx.events)
+    # ERC20 `Transfer` events aren't watched, so the coin balance must never have been cached
+    assert cache.call(throne_coin, 'balanceOf', users[1]) == balance + 1000
+    assert len(cache) == 0
+    assert cache.stats.misses == 0
+
+
+def test_cache_never_stale(auction, throne_nft, throne_coin, admin, users, chain):
+    rng = random.Random(30)
+    cache = ViewCache(auction.address, throne_nft.address)
+    users = list(users)[:5]
+    for user in users:
+        throne_coin.approve(auction.address, MAX_UINT256, {'from': user})
+    nft_ids = [throne_nft.mintWithTokenURI(URI, {'from': rng.choice(users)}).events['Transfer']['tokenId']
+               for _ in range(5)]
+
+    def auction_data(nft_id):
+        try:
+            return auction.getAuctionData(throne_nft.address, nft_id)
+        except brownie.exceptions.VirtualMachineError:
+            return None
+
+    def cached_auction_data(nft_id):
+        try:
+            return cache.call(auction, 'getAuctionData', throne_nft.address, nft_id)
+        except brownie.exceptions.VirtualMachineError:
+            return None
+
+    def list_or_bid():
+        nft_id = rng.choice(nft_ids)
+        data = auction_data(nft_id)
+        if data is None:
+            owner = throne_nft.ownerOf(nft_id)
+            throne_nft.approve(auction.address, nft_id, {'from': owner})
+            return auction.createAuction(throne_nft.address, nft_id, 1000, False, {'from': owner})
+        if data[4] == 0 or data[4] - chain.time() > 5:
+            amount = data[0] * 2 if data[4] else data[0]
+            return auction.bid(throne_nft.address, nft_id, amount, {'from': rng.choice(users)})
+        chain.sleep(data[4] - chain.time() + 2)
+        return auction.claimWonNFT(throne_nft.address, nft_id, {'from': admin})
+
+    def transfer():
+        nft_id = rng.choice(nft_ids)
+        owner = throne_nft.ownerOf(nft_id)
+        if owner in users:
+            return throne_nft.transferFrom(owner, rng.choice(users), nft_id, {'from': owner})
+
+    def change_settings():
+        return auction.setMinPriceStepNumerator(rng.randint(1, 1000), {'from': admin})
+
+    operations = [list_or_bid, list_or_bid, list_or_bid, transfer, change_settings]
+    for _ in range(60):
+        tx = rng.choice(operations)()
+        if tx is not None:
+            cache.on_events(tx.events)
+        for _ in range(10):
+            nft_id = rng.choice(nft_ids)
+            assert cache.call(throne_nft, 'ownerOf', nft_id) == throne_nft.ownerOf(nft_id)
+            assert cache.call(throne_nft, 'tokenAuthor', nft_id) == throne_nft.tokenAuthor(nft_id)
+            assert cache.call(throne_nft, 'tokenURI', nft_id) == throne_nft.tokenURI(nft_id)
+            assert cached_auction_data(nft_id) == auction_data(nft_id)
+            owner = rng.choice(users)
+            assert cache.call(throne_nft, 'balanceOf', owner) == throne_nft.balanceOf(owner)
+        assert cache.call(auction, 'minPriceStepNumerator') == auction.minPriceStepNumerator()
+    assert cache.stats.hit_rate > 0.5